@@ -4,6 +4,9 @@ import json
 import os
 from datetime import datetime, timedelta
 import logging
+from query_cache import query_result_cache
+from query_executor import query_executor
+from flight_tables import DEFAULT_YEARS, flights_source
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -35,6 +38,7 @@ def airline_performance_analysis(request):
         airline_code = request_json.get('airline_code') if request_json else None
         
         logger.info(f"LOGS START - {datetime.now()}")
+        query_costs = query_executor.track()
         logger.info(f"Airline Performance Analysis Request - Airline: {airline_code}")
         
         # Define the dataset and table
@@ -44,11 +48,7 @@ def airline_performance_analysis(request):
         # Base query for airline performance metrics - Using 3 years of data (2016, 2017, 2018)
         base_query = f"""
         WITH combined_data AS (
-            SELECT * FROM `{dataset_id}.flights_2016`
-            UNION ALL
-            SELECT * FROM `{dataset_id}.flights_2017`
-            UNION ALL
-            SELECT * FROM `{dataset_id}.flights_2018`
+            {flights_source(dataset_id, DEFAULT_YEARS, ['OP_CARRIER', 'DEP_DELAY', 'ARR_DELAY', 'CANCELLED', 'DIVERTED'])}
         )
         SELECT 
             OP_CARRIER as airline_code,
@@ -75,8 +75,7 @@ def airline_performance_analysis(request):
         """
         
         # Execute query
-        query_job = client.query(base_query)
-        results = query_job.result()
+        results = query_result_cache.query(client, base_query, call_site='airline_performance.airlines')
         
         # Process results
         airlines_data = []
@@ -108,11 +107,7 @@ def airline_performance_analysis(request):
         for airline in airlines_data[:5]:  # Top 5 airlines
             route_query = f"""
             WITH combined_data AS (
-                SELECT * FROM `{dataset_id}.flights_2016`
-                UNION ALL
-                SELECT * FROM `{dataset_id}.flights_2017`
-                UNION ALL
-                SELECT * FROM `{dataset_id}.flights_2018`
+                {flights_source(dataset_id, DEFAULT_YEARS, ['OP_CARRIER', 'ORIGIN', 'DEST', 'DEP_DELAY', 'CANCELLED'])}
             )
             SELECT 
                 ORIGIN as origin_airport,
@@ -129,8 +124,7 @@ def airline_performance_analysis(request):
             LIMIT 10
             """
             
-            route_job = client.query(route_query)
-            route_results = route_job.result()
+            route_results = query_result_cache.query(client, route_query, call_site='airline_performance.routes')
             
             routes = []
             for route_row in route_results:
@@ -154,11 +148,7 @@ def airline_performance_analysis(request):
             COUNT(CASE WHEN DEP_DELAY > 0 THEN 1 END) as delayed_flights,
             AVG(DEP_DELAY) as avg_delay
         FROM (
-            SELECT * FROM `{dataset_id}.flights_2016`
-            UNION ALL
-            SELECT * FROM `{dataset_id}.flights_2017`
-            UNION ALL
-            SELECT * FROM `{dataset_id}.flights_2018`
+            {flights_source(dataset_id, DEFAULT_YEARS, ['OP_CARRIER', 'DEP_DELAY'])}
         )
         """
         
@@ -170,8 +160,7 @@ def airline_performance_analysis(request):
         ORDER BY OP_CARRIER, period
         """
         
-        trend_job = client.query(trend_query)
-        trend_results = trend_job.result()
+        trend_results = query_result_cache.query(client, trend_query, call_site='airline_performance.trends')
         
         # Calculate trends
         trends = {}
@@ -279,10 +268,15 @@ def airline_performance_analysis(request):
             'trends': trends,
             'industry_benchmarks': industry_benchmarks,
             'analysis_date': datetime.now().isoformat(),
-            'data_period': '2016-2018 (3 years of historical data)'
+            'data_period': '2016-2018 (3 years of historical data)',
+            'analysis_metadata': {
+                'bigquery': query_costs.to_dict()
+            }
         }
         
         logger.info(f"Analysis completed successfully - {len(airlines_data)} airlines analyzed")
+        logger.info(f"Query cache: {query_result_cache.get_stats()['call_sites']}")
+        logger.info(f"BigQuery jobs: {query_costs.to_dict()}")
         logger.info(f"LOGS END - {datetime.now()}")
         
         return (json.dumps(response_data), 200, headers)
@@ -0,0 +1,340 @@
+"""
+BigQuery Result Cache for Flight Risk Radar
+Historical query results keyed by query fingerprint, parameters and table versions, in an in-memory LRU tier and a persistent SQLite tier
+
+Every Cloud Function that queries the flight tables deploys from its own
+directory, so each of them ships a copy of this module.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+from fnmatch import fnmatch
+from typing import Any, Dict, Iterable, List, Optional
+
+from query_executor import query_executor
+
+# Set to 0 to send every query to BigQuery
+QUERY_CACHE_ENABLED = os.environ.get("QUERY_CACHE_ENABLED", "1") == "1"
+
+# Persistent tier location; point it at a mounted volume to keep entries across instances
+QUERY_CACHE_PATH = os.environ.get("QUERY_CACHE_PATH", "/tmp/bigquery_result_cache.sqlite3")
+
+# Set to 0 to keep only the in-memory tier
+QUERY_CACHE_PERSISTENT = os.environ.get("QUERY_CACHE_PERSISTENT", "1") == "1"
+
+# Result sets kept in the in-memory LRU tier
+QUERY_CACHE_MEMORY_ENTRIES = int(os.environ.get("QUERY_CACHE_MEMORY_ENTRIES", "1024"))
+
+# Result sets kept in the persistent tier; the least recently used ones are evicted beyond this
+QUERY_CACHE_DISK_ENTRIES = int(os.environ.get("QUERY_CACHE_DISK_ENTRIES", "20000"))
+
+# Seconds an entry stays valid; 0 keeps it until a table it reads is modified (the BTS years never change)
+QUERY_CACHE_TTL_SECONDS = int(os.environ.get("QUERY_CACHE_TTL_SECONDS", "0"))
+
+# Seconds between last-modified checks of each table a query reads
+QUERY_CACHE_TABLE_CHECK_SECONDS = int(os.environ.get("QUERY_CACHE_TABLE_CHECK_SECONDS", "600"))
+
+# Concurrent get_table calls when reading the tables behind a wildcard reference
+_TABLE_CHECK_WORKERS = 8
+
+# Versions for which a query's results are not cached: the table could not be read or does not exist
+_UNCACHEABLE_VERSIONS = ('unknown', 'missing')
+
+# `project.dataset.table`, `dataset.table` and wildcard `dataset.flights_*` references
+_TABLE_REFERENCE = re.compile(r"`([\w-]+(?:\.[\w-]+)?\.[\w*-]+)`")
+
+
+class CachedRow:
+    """Result row served by the cache; supports row.column, row['column'], get(), keys() and items() like bigquery.Row"""
+
+    def __init__(self, values: Dict[str, Any]):
+        self._values = values
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self.__dict__['_values'][name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __getitem__(self, key: str) -> Any:
+        return self._values[key]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._values.get(key, default)
+
+    def keys(self):
+        return self._values.keys()
+
+    def items(self):
+        return self._values.items()
+
+    def __repr__(self) -> str:
+        return f"CachedRow({self._values!r})"
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Unsupported result type {type(value).__name__}")
+
+
+class QueryResultCache:
+    """
+    Two-tier cache of BigQuery result rows.
+
+    Keys combine the whitespace-normalized query text, its query parameters and
+    the last-modified time of every table it reads, so reloading or rebuilding a
+    table retires its entries without a TTL; a query whose table versions cannot
+    be read is not cached. Lookups try memory first, then SQLite, and promote
+    disk hits into memory. Both tiers evict their least recently used entries
+    beyond their size. Each stored result remembers the bytes its query scanned,
+    which every later hit counts as bytes saved.
+    """
+
+    def __init__(self, path: str = QUERY_CACHE_PATH, max_entries: int = QUERY_CACHE_MEMORY_ENTRIES,
+                 persistent: bool = QUERY_CACHE_PERSISTENT, ttl_seconds: int = QUERY_CACHE_TTL_SECONDS,
+                 max_disk_entries: int = QUERY_CACHE_DISK_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.persistent = persistent
+        self.ttl_seconds = ttl_seconds
+        self._memory: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._table_versions: Dict[str, tuple] = {}
+        # Table id -> event set when the in-progress version check of that table finishes
+        self._table_checks: Dict[str, threading.Event] = {}
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def make_key(self, client, query: str, job_config=None) -> Optional[str]:
+        """
+        Fingerprint of the query, its parameters and the current version of the tables it reads.
+
+        Returns None when a table's version could not be read, since its
+        results could not be retired when the table changes; don't cache those.
+        """
+        versions = self.table_versions(client, query)
+        uncacheable = [table_id for table_id, version in versions.items() if version in _UNCACHEABLE_VERSIONS]
+        if uncacheable:
+            print(f"⚠️ QUERY CACHE: Not caching a query on {', '.join(uncacheable)} (table version unavailable)")
+            return None
+
+        parameters = getattr(job_config, 'query_parameters', None) or []
+        payload = json.dumps({
+            'query': ' '.join(query.split()),
+            'parameters': [parameter.to_api_repr() for parameter in parameters],
+            'tables': versions
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def table_versions(self, client, query: str) -> Dict[str, str]:
+        """Last-modified time of each table the query references, re-read every QUERY_CACHE_TABLE_CHECK_SECONDS"""
+        versions = {}
+        for reference in sorted(set(_TABLE_REFERENCE.findall(query))):
+            table_id = reference if reference.count('.') == 2 else f"{client.project}.{reference}"
+            versions[table_id] = self._table_version(client, table_id)
+        return versions
+
+    def _table_version(self, client, table_id: str) -> str:
+        # One thread re-reads an expired version; the others keep using the previous
+        # version meanwhile, or wait for the check when there is none yet
+        while True:
+            now = time.time()
+            with self._lock:
+                cached = self._table_versions.get(table_id)
+                if cached is not None and now - cached[1] < QUERY_CACHE_TABLE_CHECK_SECONDS:
+                    return cached[0]
+                check = self._table_checks.get(table_id)
+                if check is None:
+                    self._table_checks[table_id] = threading.Event()
+                    break
+                if cached is not None:
+                    return cached[0]
+            check.wait()
+
+        try:
+            version = self._read_table_version(client, table_id)
+        finally:
+            with self._lock:
+                self._table_checks.pop(table_id).set()
+        return version
+
+    def _read_table_version(self, client, table_id: str) -> str:
+        now = time.time()
+        try:
+            if '*' in table_id:
+                # Wildcard table: the newest of the matching tables, read concurrently
+                project_id, dataset_id, pattern = table_id.split('.')
+                table_ids = [
+                    f"{project_id}.{dataset_id}.{table.table_id}"
+                    for table in client.list_tables(f"{project_id}.{dataset_id}")
+                    if fnmatch(table.table_id, pattern)
+                ]
+                with ThreadPoolExecutor(max_workers=_TABLE_CHECK_WORKERS) as executor:
+                    modified = [table.modified for table in executor.map(client.get_table, table_ids)]
+                if None in modified:
+                    version = 'unknown'
+                else:
+                    version = max(modified).isoformat() if modified else 'missing'
+            else:
+                modified = client.get_table(table_id).modified
+                version = modified.isoformat() if modified else 'unknown'
+        except Exception as e:
+            print(f"⚠️ QUERY CACHE: Could not read last-modified time of {table_id} ({type(e).__name__}: {e})")
+            version = 'unknown'
+
+        with self._lock:
+            previous = self._table_versions.get(table_id)
+            if previous is not None and previous[0] != version:
+                print(f"🔄 QUERY CACHE: {table_id} changed ({previous[0]} -> {version}), its cached results are retired")
+            self._table_versions[table_id] = (version, now)
+        return version
+
+    def get(self, call_site: str, key: str) -> Optional[List[CachedRow]]:
+        """Cached rows, or None on a miss or expired entry"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                rows, bytes_processed, expires_at = entry
+                if expires_at is None or expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._count(call_site, 'memory_hits')
+                    self._count(call_site, 'bytes_saved', bytes_processed)
+                    return [CachedRow(values) for values in rows]
+                del self._memory[key]
+
+        row = self._db_execute("SELECT rows, bytes_processed, expires_at FROM query_cache WHERE key = ?", (key,), fetch=True)
+        if row and (row[2] is None or row[2] > now):
+            rows = json.loads(row[0])
+            self._db_execute("UPDATE query_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._remember(key, rows, row[1], row[2])
+            with self._lock:
+                self._count(call_site, 'disk_hits')
+                self._count(call_site, 'bytes_saved', row[1])
+            return [CachedRow(values) for values in rows]
+
+        with self._lock:
+            self._count(call_site, 'misses')
+        return None
+
+    def put(self, call_site: str, key: str, results: Iterable, bytes_processed: int = 0) -> List[CachedRow]:
+        """Store the rows of a finished query in both tiers and return them as CachedRows"""
+        rows = [dict(row.items()) for row in results]
+        bytes_processed = bytes_processed or 0
+        try:
+            serialized = json.dumps(rows, default=_json_value)
+        except TypeError as e:
+            print(f"⚠️ QUERY CACHE: Result of {call_site} not cached: {e}")
+            return [CachedRow(values) for values in rows]
+        # Round-trip so memory hits return the same values as disk hits
+        rows = json.loads(serialized)
+
+        expires_at = time.time() + self.ttl_seconds if self.ttl_seconds > 0 else None
+        self._remember(key, rows, bytes_processed, expires_at)
+        self._db_execute(
+            "INSERT OR REPLACE INTO query_cache (key, call_site, rows, bytes_processed, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (key, call_site, serialized, bytes_processed, expires_at, time.time())
+        )
+        if self.max_disk_entries > 0:
+            # Keep the most recently used entries, dropping the rest
+            self._db_execute(
+                "DELETE FROM query_cache WHERE key IN "
+                "(SELECT key FROM query_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_disk_entries,)
+            )
+        with self._lock:
+            self._count(call_site, 'stores')
+            self._count(call_site, 'bytes_processed', bytes_processed)
+        return [CachedRow(values) for values in rows]
+
+    def query(self, client, query: str, job_config=None, call_site: str = 'bigquery') -> List:
+        """Run a query through the cache; returns a list of rows (CachedRows unless the cache is disabled)"""
+        if not QUERY_CACHE_ENABLED:
+            return query_executor.run(client, query, job_config, call_site)
+
+        key = self.make_key(client, query, job_config)
+        if key is None:
+            return query_executor.run(client, query, job_config, call_site)
+        rows = self.get(call_site, key)
+        if rows is not None:
+            return rows
+
+        query_job, results = query_executor.run_job(client, query, job_config, call_site)
+        return self.put(call_site, key, results, query_job.total_bytes_processed)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hits, misses, hit ratio and bytes scanned vs. avoided per call site"""
+        with self._lock:
+            call_sites = {}
+            for call_site, counts in self.stats.items():
+                hits = counts['memory_hits'] + counts['disk_hits']
+                lookups = hits + counts['misses']
+                call_sites[call_site] = {**counts, 'hit_ratio': hits / lookups if lookups else 0.0}
+            return {
+                'enabled': QUERY_CACHE_ENABLED,
+                'memory_entries': len(self._memory),
+                'max_disk_entries': self.max_disk_entries,
+                'persistent': self._db is not None,
+                'bytes_saved': sum(counts['bytes_saved'] for counts in self.stats.values()),
+                'table_versions': {table_id: version for table_id, (version, _) in self._table_versions.items()},
+                'call_sites': call_sites
+            }
+
+    def _count(self, call_site: str, counter: str, amount: int = 1):
+        # Caller holds self._lock
+        counts = self.stats.setdefault(call_site, {
+            'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0, 'bytes_processed': 0, 'bytes_saved': 0
+        })
+        counts[counter] += amount or 0
+
+    def _remember(self, key: str, rows: List[Dict[str, Any]], bytes_processed: int, expires_at: Optional[float]):
+        with self._lock:
+            self._memory[key] = (rows, bytes_processed, expires_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _db_execute(self, sql: str, params: tuple, fetch: bool = False):
+        if not self.persistent:
+            return None
+        with self._db_lock:
+            try:
+                if self._db is None:
+                    self._db = sqlite3.connect(self.path, check_same_thread=False)
+                    columns = [column[1] for column in self._db.execute("PRAGMA table_info(query_cache)")]
+                    if columns and 'accessed_at' not in columns:
+                        # Written before entries were evicted; it only holds cached results, so start over
+                        self._db.execute("DROP TABLE query_cache")
+                    self._db.execute(
+                        "CREATE TABLE IF NOT EXISTS query_cache "
+                        "(key TEXT PRIMARY KEY, call_site TEXT, rows TEXT, bytes_processed INTEGER, expires_at REAL, accessed_at REAL)"
+                    )
+                    self._db.execute("CREATE INDEX IF NOT EXISTS query_cache_accessed_at ON query_cache (accessed_at)")
+                    self._db.execute("DELETE FROM query_cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+                    self._db.commit()
+                    print(f"💾 QUERY CACHE: Persistent tier opened at {self.path}")
+                cursor = self._db.execute(sql, params)
+                if fetch:
+                    return cursor.fetchone()
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"❌ QUERY CACHE: Persistent tier disabled after SQLite error: {e}")
+                self.persistent = False
+                self._db = None
+            return None
+
+
+query_result_cache = QueryResultCache()
@@ -0,0 +1,191 @@
+"""
+BigQuery Query Executor for Flight Risk Radar
+Every query job goes through here: a bytes-billed cap, an optional dry-run preflight and per-call-site job statistics
+
+Every Cloud Function that queries BigQuery deploys from its own directory, so
+each of them ships a copy of this module.
+"""
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from google.cloud import bigquery
+
+# Bytes one query may bill; BigQuery fails the job rather than bill more. 0 removes the cap
+BIGQUERY_MAX_BYTES_BILLED = int(os.environ.get("BIGQUERY_MAX_BYTES_BILLED", str(10 * 1024 ** 3)))
+
+# Set to 1 to dry-run every query first and reject it before it runs when its estimate is over the cap
+BIGQUERY_DRY_RUN_PREFLIGHT = os.environ.get("BIGQUERY_DRY_RUN_PREFLIGHT", "0") == "1"
+
+_COUNTERS = ('queries', 'failures', 'rejected', 'cache_hits', 'bytes_processed', 'bytes_billed', 'slot_ms', 'wall_time')
+
+
+class QueryCostExceeded(Exception):
+    """A dry run estimated more bytes than BIGQUERY_MAX_BYTES_BILLED; the query was not run"""
+
+
+def _new_counts() -> Dict[str, Any]:
+    return {counter: 0.0 if counter == 'wall_time' else 0 for counter in _COUNTERS}
+
+
+class QueryCosts:
+    """Job statistics per call site: totals for the process, or for one request (see QueryExecutor.track)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.call_sites: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, call_site: str, **amounts):
+        with self._lock:
+            counts = self.call_sites.setdefault(call_site, _new_counts())
+            for counter, amount in amounts.items():
+                counts[counter] += amount or 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            call_sites = {call_site: dict(counts) for call_site, counts in self.call_sites.items()}
+        totals = _new_counts()
+        for counts in call_sites.values():
+            for counter in _COUNTERS:
+                totals[counter] += counts[counter]
+        totals['wall_time'] = round(totals['wall_time'], 3)
+        for counts in call_sites.values():
+            counts['wall_time'] = round(counts['wall_time'], 3)
+        return {**totals, 'call_sites': call_sites}
+
+
+# Costs of the request being handled; the worker pools and the event loop carry it into their tasks
+_request_costs: contextvars.ContextVar = contextvars.ContextVar('bigquery_request_costs', default=None)
+
+
+class QueryExecutor:
+    """
+    Runs BigQuery jobs with cost guardrails and records what each one cost.
+
+    Every job gets maximum_bytes_billed (unless its config sets one; the caller's
+    config is copied, never modified), so BigQuery
+    itself refuses a query that would bill more. With the dry-run preflight on,
+    the estimate is checked first and an over-cap query raises QueryCostExceeded
+    without starting a job. Bytes processed and billed, slot milliseconds, the
+    BigQuery cache-hit flag and wall time are added to the process totals and to
+    the current request's totals (see track).
+    """
+
+    def __init__(self, max_bytes_billed: int = BIGQUERY_MAX_BYTES_BILLED, dry_run_preflight: bool = BIGQUERY_DRY_RUN_PREFLIGHT):
+        self.max_bytes_billed = max_bytes_billed
+        self.dry_run_preflight = dry_run_preflight
+        self.totals = QueryCosts()
+
+    def track(self) -> QueryCosts:
+        """Start collecting the costs of the current request; returns its totals, filled in as its queries finish"""
+        costs = QueryCosts()
+        _request_costs.set(costs)
+        return costs
+
+    def start(self, client: bigquery.Client, query: str, job_config: bigquery.QueryJobConfig = None,
+              call_site: str = 'bigquery') -> bigquery.QueryJob:
+        """Apply the cap (and preflight when enabled) and start the query job without waiting for it"""
+        if job_config is None:
+            job_config = bigquery.QueryJobConfig()
+        else:
+            # Callers reuse their configs, and a config shared by several queries must not pick up the cap
+            job_config = bigquery.QueryJobConfig.from_api_repr(job_config.to_api_repr())
+        if self.max_bytes_billed and job_config.maximum_bytes_billed is None:
+            job_config.maximum_bytes_billed = self.max_bytes_billed
+        if self.dry_run_preflight and self.max_bytes_billed:
+            self._preflight(client, query, job_config, call_site)
+        return client.query(query, job_config=job_config)
+
+    def record(self, call_site: str, query_job: Optional[bigquery.QueryJob], wall_time: float, error: Exception = None):
+        """Add a finished (or failed) job's statistics to the process and request totals"""
+        amounts = {'queries': 1, 'wall_time': wall_time}
+        if error is not None:
+            amounts['failures'] = 1
+            print(f"❌ BIGQUERY [{call_site}]: Query failed after {wall_time:.2f}s ({type(error).__name__}: {error})")
+        if query_job is not None and error is None:
+            amounts.update(
+                cache_hits=1 if query_job.cache_hit else 0,
+                bytes_processed=query_job.total_bytes_processed,
+                bytes_billed=query_job.total_bytes_billed,
+                slot_ms=query_job.slot_millis
+            )
+            print(f"📊 BIGQUERY [{call_site}]: {query_job.total_bytes_processed or 0:,} bytes processed, "
+                  f"{query_job.slot_millis or 0:,} slot-ms, cache hit: {bool(query_job.cache_hit)}, {wall_time:.2f}s")
+        self._add(call_site, **amounts)
+
+    def run_job(self, client: bigquery.Client, query: str, job_config: bigquery.QueryJobConfig = None,
+                call_site: str = 'bigquery') -> Tuple[bigquery.QueryJob, List]:
+        """Run a query to completion; returns the finished job and its rows"""
+        started = time.time()
+        query_job = None
+        try:
+            query_job = self.start(client, query, job_config, call_site)
+            rows = list(query_job.result())
+        except Exception as e:
+            if not isinstance(e, QueryCostExceeded):
+                self.record(call_site, query_job, time.time() - started, e)
+            raise
+        self.record(call_site, query_job, time.time() - started)
+        return query_job, rows
+
+    async def run_job_async(self, client: bigquery.Client, query: str, job_config: bigquery.QueryJobConfig = None,
+                            call_site: str = 'bigquery', poll_interval: float = 0.25) -> Tuple[bigquery.QueryJob, List]:
+        """Async variant of run_job: starts the job and polls its state without blocking the event loop"""
+        started = time.time()
+        query_job = None
+        try:
+            query_job = await _run_blocking(self.start, client, query, job_config, call_site)
+            while not await _run_blocking(query_job.done):
+                await asyncio.sleep(poll_interval)
+            # The job is finished, so fetching its rows does not wait on BigQuery
+            rows = await _run_blocking(lambda: list(query_job.result()))
+        except Exception as e:
+            if not isinstance(e, QueryCostExceeded):
+                self.record(call_site, query_job, time.time() - started, e)
+            raise
+        self.record(call_site, query_job, time.time() - started)
+        return query_job, rows
+
+    def run(self, client: bigquery.Client, query: str, job_config: bigquery.QueryJobConfig = None,
+            call_site: str = 'bigquery') -> List:
+        """Run a query to completion and return its rows"""
+        return self.run_job(client, query, job_config, call_site)[1]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Process totals per call site, with the guardrail settings"""
+        return {
+            'max_bytes_billed': self.max_bytes_billed,
+            'dry_run_preflight': self.dry_run_preflight,
+            **self.totals.to_dict()
+        }
+
+    def _preflight(self, client: bigquery.Client, query: str, job_config: bigquery.QueryJobConfig, call_site: str):
+        dry_run_config = bigquery.QueryJobConfig(
+            dry_run=True,
+            use_query_cache=False,
+            query_parameters=job_config.query_parameters
+        )
+        estimate = client.query(query, job_config=dry_run_config).total_bytes_processed or 0
+        if estimate > self.max_bytes_billed:
+            self._add(call_site, rejected=1)
+            print(f"🛑 BIGQUERY [{call_site}]: Rejected before running - dry run estimates {estimate:,} bytes, cap is {self.max_bytes_billed:,}")
+            raise QueryCostExceeded(f"{call_site} would process {estimate:,} bytes (cap {self.max_bytes_billed:,})")
+
+    def _add(self, call_site: str, **amounts):
+        self.totals.add(call_site, **amounts)
+        request_costs = _request_costs.get()
+        if request_costs is not None:
+            request_costs.add(call_site, **amounts)
+
+
+async def _run_blocking(func: Callable[..., Any], *args) -> Any:
+    # Off the event loop, in the caller's context so the job is counted against its request
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(None, functools.partial(context.run, func, *args))
+
+
+query_executor = QueryExecutor()
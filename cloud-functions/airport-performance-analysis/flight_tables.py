@@ -0,0 +1,50 @@
+"""
+Flight Table Queries for Flight Risk Radar
+FROM sources over the yearly flights_YYYY tables: one wildcard table, _TABLE_SUFFIX year pruning and only the columns a query reads
+
+Every Cloud Function that queries the flight tables deploys from its own
+directory, so each of them ships a copy of this module.
+"""
+from typing import Iterable, Sequence
+
+# Years loaded into the dataset (flights_2009 ... flights_2018)
+FLIGHT_TABLE_YEARS = list(range(2009, 2019))
+
+# Years the analyses use unless a request asks for others
+DEFAULT_YEARS = [2016, 2017, 2018]
+
+
+def wildcard_table(dataset: str) -> str:
+    """Wildcard reference to the yearly tables; dataset is 'dataset' or 'project.dataset'"""
+    return f"`{dataset}.flights_*`"
+
+
+def year_filter(years: Iterable[int]) -> str:
+    """
+    _TABLE_SUFFIX condition selecting the tables of the given years.
+
+    The suffixes are constants rather than query parameters, so BigQuery
+    prunes the other years' tables before reading anything.
+    """
+    suffixes = sorted({int(year) for year in years})
+    if not suffixes:
+        raise ValueError("At least one year is required")
+    return f"_TABLE_SUFFIX IN ({', '.join(repr(str(year)) for year in suffixes)})"
+
+
+def flights_source(dataset: str, years: Iterable[int], columns: Sequence[str], with_year: bool = False) -> str:
+    """
+    SELECT of the given columns from the flights tables of the given years, for use as a CTE or subquery.
+
+    Args:
+        dataset: 'dataset' or 'project.dataset' holding the flights_YYYY tables
+        years: Years to read
+        columns: Raw columns the outer query uses (e.g. ['OP_CARRIER', 'DEP_DELAY'])
+        with_year: Also select the table's year as table_year (INT64)
+    """
+    if not columns:
+        raise ValueError("At least one column is required")
+    select = ", ".join(columns)
+    if with_year:
+        select += ", CAST(_TABLE_SUFFIX AS INT64) AS table_year"
+    return f"SELECT {select} FROM {wildcard_table(dataset)} WHERE {year_filter(years)}"
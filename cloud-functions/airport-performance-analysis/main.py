@@ -5,6 +5,9 @@ import os
 from datetime import datetime, timedelta
 import logging
 from airport_status import AirportStatusService
+from query_cache import query_result_cache
+from query_executor import query_executor
+from flight_tables import DEFAULT_YEARS, flights_source
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -34,6 +37,7 @@ def airport_performance_analysis(request):
         request_type = request_json.get('type', 'performance') if request_json else 'performance'
         
         logger.info(f"LOGS START - {datetime.now()}")
+        query_costs = query_executor.track()
         logger.info(f"Airport Analysis Request - Type: {request_type}, Airport: {airport_code}")
         
         # Handle airport status requests
@@ -66,8 +70,7 @@ def airport_performance_analysis(request):
             
             airport_details = {}
             try:
-                query_job = client.query(airport_query)
-                results = query_job.result()
+                results = query_result_cache.query(client, airport_query, call_site='airport_performance.airport_details')
                 for row in results:
                     airport_details[airport_code] = {
                         'iata_code': row.iata_code,
@@ -103,11 +106,7 @@ def airport_performance_analysis(request):
         # Base query for airport performance metrics - Using 3 years of data (2016, 2017, 2018)
         base_query = f"""
         WITH combined_data AS (
-            SELECT * FROM `{dataset_id}.flights_2016`
-            UNION ALL
-            SELECT * FROM `{dataset_id}.flights_2017`
-            UNION ALL
-            SELECT * FROM `{dataset_id}.flights_2018`
+            {flights_source(dataset_id, DEFAULT_YEARS, ['ORIGIN', 'DEST', 'OP_CARRIER', 'DEP_DELAY', 'CANCELLED', 'DIVERTED'])}
         ),
         airport_info AS (
             SELECT 
@@ -155,8 +154,7 @@ def airport_performance_analysis(request):
         """
         
         # Execute query
-        query_job = client.query(base_query)
-        results = query_job.result()
+        results = query_result_cache.query(client, base_query, call_site='airport_performance.airports')
         
         # Process results
         airports_data = []
@@ -216,11 +214,7 @@ def airport_performance_analysis(request):
         # Get arrival performance data
         arrival_query = f"""
         WITH combined_data AS (
-            SELECT * FROM `{dataset_id}.flights_2016`
-            UNION ALL
-            SELECT * FROM `{dataset_id}.flights_2017`
-            UNION ALL
-            SELECT * FROM `{dataset_id}.flights_2018`
+            {flights_source(dataset_id, DEFAULT_YEARS, ['DEST', 'ARR_DELAY', 'CANCELLED'])}
         )
         SELECT 
             DEST as airport_code,
@@ -241,8 +235,7 @@ def airport_performance_analysis(request):
         LIMIT 20
         """
         
-        arrival_job = client.query(arrival_query)
-        arrival_results = arrival_job.result()
+        arrival_results = query_result_cache.query(client, arrival_query, call_site='airport_performance.arrivals')
         
         # Merge arrival data with departure data
         arrival_data = {}
@@ -278,11 +271,7 @@ def airport_performance_analysis(request):
         for airport in airports_data[:10]:  # Top 10 airports
             airline_query = f"""
             WITH combined_data AS (
-                SELECT * FROM `{dataset_id}.flights_2016`
-                UNION ALL
-                SELECT * FROM `{dataset_id}.flights_2017`
-                UNION ALL
-                SELECT * FROM `{dataset_id}.flights_2018`
+                {flights_source(dataset_id, DEFAULT_YEARS, ['OP_CARRIER', 'ORIGIN', 'DEP_DELAY', 'CANCELLED'])}
             )
             SELECT 
                 OP_CARRIER as airline_code,
@@ -298,8 +287,7 @@ def airport_performance_analysis(request):
             LIMIT 5
             """
             
-            airline_job = client.query(airline_query)
-            airline_results = airline_job.result()
+            airline_results = query_result_cache.query(client, airline_query, call_site='airport_performance.airlines')
             
             airlines = []
             for airline_row in airline_results:
@@ -323,11 +311,7 @@ def airport_performance_analysis(request):
             COUNT(CASE WHEN DEP_DELAY > 0 THEN 1 END) as delayed_flights,
             AVG(DEP_DELAY) as avg_delay
         FROM (
-            SELECT * FROM `{dataset_id}.flights_2016`
-            UNION ALL
-            SELECT * FROM `{dataset_id}.flights_2017`
-            UNION ALL
-            SELECT * FROM `{dataset_id}.flights_2018`
+            {flights_source(dataset_id, DEFAULT_YEARS, ['ORIGIN', 'DEP_DELAY'])}
         )
         """
         
@@ -339,8 +323,7 @@ def airport_performance_analysis(request):
         ORDER BY ORIGIN, period
         """
         
-        trend_job = client.query(trend_query)
-        trend_results = trend_job.result()
+        trend_results = query_result_cache.query(client, trend_query, call_site='airport_performance.trends')
         
         # Calculate trends
         trends = {}
@@ -387,11 +370,7 @@ def airport_performance_analysis(request):
         for airport in airports_data[:5]:  # Top 5 airports
             detailed_query = f"""
             WITH combined_data AS (
-                SELECT * FROM `{dataset_id}.flights_2016`
-                UNION ALL
-                SELECT * FROM `{dataset_id}.flights_2017`
-                UNION ALL
-                SELECT * FROM `{dataset_id}.flights_2018`
+                {flights_source(dataset_id, DEFAULT_YEARS, ['ORIGIN', 'DEST', 'DEP_DELAY', 'ARR_DELAY', 'CANCELLED', 'DIVERTED'])}
             )
             SELECT 
                 COUNT(*) as total_flights,
@@ -403,8 +382,7 @@ def airport_performance_analysis(request):
             WHERE (ORIGIN = '{airport['code']}' OR DEST = '{airport['code']}')
             """
             
-            detailed_job = client.query(detailed_query)
-            detailed_results = detailed_job.result()
+            detailed_results = query_result_cache.query(client, detailed_query, call_site='airport_performance.detailed')
             
             for row in detailed_results:
                 detailed_metrics[airport['code']] = {
@@ -497,10 +475,15 @@ def airport_performance_analysis(request):
             'detailed_metrics': detailed_metrics,
             'industry_benchmarks': industry_benchmarks,
             'analysis_date': datetime.now().isoformat(),
-            'data_period': '2016-2018 (3 years of historical data)'
+            'data_period': '2016-2018 (3 years of historical data)',
+            'analysis_metadata': {
+                'bigquery': query_costs.to_dict()
+            }
         }
         
         logger.info(f"Analysis completed successfully - {len(airports_data)} airports analyzed")
+        logger.info(f"Query cache: {query_result_cache.get_stats()['call_sites']}")
+        logger.info(f"BigQuery jobs: {query_costs.to_dict()}")
         logger.info(f"LOGS END - {datetime.now()}")
         
         return (json.dumps(response_data), 200, headers)
@@ -7,6 +7,8 @@ from google.cloud import bigquery
 from google.cloud import language_v1
 import logging
 
+from query_executor import query_executor
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -54,8 +56,7 @@ def get_airport_info(airport_code):
             ]
         )
         
-        query_job = client.query(query, job_config=job_config)
-        results = list(query_job.result())
+        results = query_executor.run(client, query, job_config, call_site='community_feed.airport_info')
         
         if results:
             row = results[0]
@@ -148,8 +149,7 @@ def get_posts(filters=None, limit=20, offset=0):
         query += f" ORDER BY created_at DESC LIMIT {limit} OFFSET {offset}"
         
         # Execute query
-        query_job = client.query(query)
-        results = list(query_job.result())
+        results = query_executor.run(client, query, call_site='community_feed.posts')
         
         # Convert to list of dictionaries
         posts = []
@@ -201,8 +201,7 @@ def update_post(post_id, data):
             ]
         )
         
-        query_job = client.query(query, job_config=job_config)
-        results = list(query_job.result())
+        results = query_executor.run(client, query, job_config, call_site='community_feed.update_lookup')
         
         if not results:
             return {
@@ -244,7 +243,7 @@ def update_post(post_id, data):
             """
             
             job_config = bigquery.QueryJobConfig(query_parameters=query_params)
-            client.query(query, job_config=job_config)
+            query_executor.run(client, query, job_config, call_site='community_feed.update')
             
             logger.info(f"Updated post {post_id}")
             return {
@@ -280,8 +279,7 @@ def delete_post(post_id, user_id):
             ]
         )
         
-        query_job = client.query(query, job_config=job_config)
-        results = list(query_job.result())
+        results = query_executor.run(client, query, job_config, call_site='community_feed.delete_lookup')
         
         if not results:
             return {
@@ -303,7 +301,7 @@ def delete_post(post_id, user_id):
             ]
         )
         
-        client.query(query, job_config=job_config)
+        query_executor.run(client, query, job_config, call_site='community_feed.delete')
         
         logger.info(f"Deleted post {post_id}")
         return {
@@ -333,8 +331,7 @@ def like_post(post_id, user_id):
             ]
         )
         
-        query_job = client.query(query, job_config=job_config)
-        results = list(query_job.result())
+        results = query_executor.run(client, query, job_config, call_site='community_feed.like_lookup')
         
         if not results:
             return {
@@ -359,7 +356,7 @@ def like_post(post_id, user_id):
             ]
         )
         
-        client.query(query, job_config=job_config)
+        query_executor.run(client, query, job_config, call_site='community_feed.like')
         
         logger.info(f"Liked post {post_id}")
         return {
@@ -408,8 +405,7 @@ def get_airports():
         LIMIT 100
         """
         
-        query_job = client.query(query)
-        results = list(query_job.result())
+        results = query_executor.run(client, query, call_site='community_feed.airports')
         
         airports = []
         for row in results:
@@ -449,8 +445,7 @@ def get_statistics():
         WHERE is_active = true
         """
         
-        query_job = client.query(query)
-        results = list(query_job.result())
+        results = query_executor.run(client, query, call_site='community_feed.statistics')
         
         if results:
             row = results[0]
@@ -1,42 +1,241 @@
+import argparse
+import concurrent.futures
+import gzip
+import os
+import re
+
+# Requires google-cloud-bigquery; checking Parquet row counts also requires pyarrow:
+#   pip install google-cloud-bigquery pyarrow
+from google.api_core.exceptions import NotFound
 from google.cloud import bigquery
 
+# Columns of the BTS "Airline Delay and Cancellation" yearly files (2009-2018).
+# The trailing empty column of the CSV export is not loaded (ignore_unknown_values).
+FLIGHTS_SCHEMA = [
+    bigquery.SchemaField("FL_DATE", "DATE"),
+    bigquery.SchemaField("OP_CARRIER", "STRING"),
+    bigquery.SchemaField("OP_CARRIER_FL_NUM", "INTEGER"),
+    bigquery.SchemaField("ORIGIN", "STRING"),
+    bigquery.SchemaField("DEST", "STRING"),
+    bigquery.SchemaField("CRS_DEP_TIME", "INTEGER"),
+    bigquery.SchemaField("DEP_TIME", "FLOAT"),
+    bigquery.SchemaField("DEP_DELAY", "FLOAT"),
+    bigquery.SchemaField("TAXI_OUT", "FLOAT"),
+    bigquery.SchemaField("WHEELS_OFF", "FLOAT"),
+    bigquery.SchemaField("WHEELS_ON", "FLOAT"),
+    bigquery.SchemaField("TAXI_IN", "FLOAT"),
+    bigquery.SchemaField("CRS_ARR_TIME", "INTEGER"),
+    bigquery.SchemaField("ARR_TIME", "FLOAT"),
+    bigquery.SchemaField("ARR_DELAY", "FLOAT"),
+    bigquery.SchemaField("CANCELLED", "FLOAT"),
+    bigquery.SchemaField("CANCELLATION_CODE", "STRING"),
+    bigquery.SchemaField("DIVERTED", "FLOAT"),
+    bigquery.SchemaField("CRS_ELAPSED_TIME", "FLOAT"),
+    bigquery.SchemaField("ACTUAL_ELAPSED_TIME", "FLOAT"),
+    bigquery.SchemaField("AIR_TIME", "FLOAT"),
+    bigquery.SchemaField("DISTANCE", "FLOAT"),
+    bigquery.SchemaField("CARRIER_DELAY", "FLOAT"),
+    bigquery.SchemaField("WEATHER_DELAY", "FLOAT"),
+    bigquery.SchemaField("NAS_DELAY", "FLOAT"),
+    bigquery.SchemaField("SECURITY_DELAY", "FLOAT"),
+    bigquery.SchemaField("LATE_AIRCRAFT_DELAY", "FLOAT"),
+]
+
+# Daily partitions on the flight date, clustered for the carrier / route lookups
+PARTITION_FIELD = "FL_DATE"
+CLUSTERING_FIELDS = ["OP_CARRIER", "ORIGIN", "DEST"]
+
+# Files are loaded and verified here first, so a failed load never touches the live table
+STAGING_SUFFIX = "_staging"
+
+
+def _source_format(file_path):
+    """BigQuery source format from the file name: .csv, .csv.gz or .parquet"""
+    name = file_path.lower()
+    if name.endswith(".parquet"):
+        return bigquery.SourceFormat.PARQUET
+    if name.endswith(".csv") or name.endswith(".csv.gz"):
+        return bigquery.SourceFormat.CSV
+    raise ValueError(f"Unsupported input file {file_path} (expected .csv, .csv.gz or .parquet)")
+
+
+def count_source_rows(file_path, skip_header=True):
+    """Data rows in a local CSV (plain or gzip) or Parquet file, to check the load against"""
+    if file_path.lower().endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Verifying a Parquet load requires pyarrow: pip install pyarrow (or pass --no-verify)")
+        return pq.ParquetFile(file_path).metadata.num_rows
+
+    opener = gzip.open if file_path.lower().endswith(".gz") else open
+    with opener(file_path, "rb") as source_file:
+        lines = sum(1 for line in source_file if line.strip())
+    return lines - 1 if skip_header else lines
+
+
+def table_id_for_file(file_path):
+    """flights_<year> from a file named like 2018.csv, 2018.csv.gz or flights_2018.parquet"""
+    match = re.search(r"(20\d\d)", os.path.basename(file_path))
+    if not match:
+        raise ValueError(f"Cannot tell the year of {file_path}; pass table_id explicitly")
+    return f"flights_{match.group(1)}"
+
+
+def _has_flights_layout(table):
+    """True if the table is partitioned on FL_DATE and clustered by carrier and route"""
+    partition_field = table.time_partitioning.field if table.time_partitioning else None
+    return partition_field == PARTITION_FIELD and (table.clustering_fields or []) == CLUSTERING_FIELDS
+
+
+def _replace_table(client, staging_ref, table_ref):
+    """
+    Swap a verified staging table in for the live table, then drop the staging table.
+
+    A copy job replaces the contents when the live table is missing or already has
+    the flights layout. A load or copy cannot change partitioning or clustering, so
+    an older layout is replaced in one statement with CREATE OR REPLACE TABLE; either
+    way the live table is never missing or partly loaded.
+    """
+    try:
+        live_table = client.get_table(table_ref)
+    except NotFound:
+        live_table = None
+
+    if live_table is None or _has_flights_layout(live_table):
+        copy_config = bigquery.CopyJobConfig(write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE)
+        client.copy_table(staging_ref, table_ref, job_config=copy_config).result()
+    else:
+        partition_field = live_table.time_partitioning.field if live_table.time_partitioning else None
+        print(f"Recreating {live_table.table_id}: partitioned on {partition_field}, clustered by {live_table.clustering_fields}")
+        client.query(
+            f"""
+            CREATE OR REPLACE TABLE `{table_ref}`
+            PARTITION BY {PARTITION_FIELD}
+            CLUSTER BY {', '.join(CLUSTERING_FIELDS)}
+            AS SELECT * FROM `{staging_ref}`
+            """
+        ).result()
+
+    client.delete_table(staging_ref, not_found_ok=True)
+
+
 def upload_csv_to_bq(
     csv_file_path,
     project_id="argon-acumen-268900",
     dataset_id="airline_data",
-    table_id="flights_2018",
+    table_id=None,
     location="us-central1",
     skip_header=True,
-    autodetect=True
+    verify=True
 ):
+    """
+    Load one yearly file (CSV, gzip CSV or Parquet) into a partitioned, clustered table, replacing its contents.
+
+    The file is loaded into <table_id>_staging and only swapped in for the live
+    table once it has loaded (and, if verify is set, matched the source row count),
+    so the live table keeps its previous contents if anything fails.
+
+    Returns the number of rows loaded. Raises if verify is set and the table
+    row count differs from the rows in the source file.
+    """
     client = bigquery.Client(project=project_id, location=location)
+    table_id = table_id or table_id_for_file(csv_file_path)
+    table_ref = f"{project_id}.{dataset_id}.{table_id}"
+    staging_ref = f"{table_ref}{STAGING_SUFFIX}"
 
-    dataset_ref = client.dataset(dataset_id)
-    table_ref = dataset_ref.table(table_id)
+    source_format = _source_format(csv_file_path)
+    job_config = bigquery.LoadJobConfig(
+        source_format=source_format,
+        write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,
+        time_partitioning=bigquery.TimePartitioning(
+            type_=bigquery.TimePartitioningType.DAY,
+            field=PARTITION_FIELD
+        ),
+        clustering_fields=CLUSTERING_FIELDS
+    )
+    if source_format == bigquery.SourceFormat.CSV:
+        # Gzip CSV is detected by BigQuery from the content, no extra option needed
+        job_config.schema = FLIGHTS_SCHEMA
+        job_config.skip_leading_rows = 1 if skip_header else 0
+        job_config.ignore_unknown_values = True
 
-    job_config = bigquery.LoadJobConfig()
-    job_config.source_format = bigquery.SourceFormat.CSV
-    job_config.skip_leading_rows = 1 if skip_header else 0
-    job_config.autodetect = autodetect
-    # job_config.schema = [...]  # optional explicit schema
+    # Start from an empty staging table with the flights layout
+    client.delete_table(staging_ref, not_found_ok=True)
 
     with open(csv_file_path, "rb") as source_file:
         load_job = client.load_table_from_file(
             source_file,
-            table_ref,
+            staging_ref,
             job_config=job_config
         )
 
-    print(f"Starting job {load_job.job_id}")
+    print(f"Starting job {load_job.job_id} for {os.path.basename(csv_file_path)} -> {table_id}{STAGING_SUFFIX}")
     load_job.result()  # wait for the job to complete
 
-    destination = client.get_table(table_ref)
+    staging = client.get_table(staging_ref)
     print(
-        f"Loaded {destination.num_rows} rows into "
-        f"{project_id}:{dataset_id}.{table_id}"
+        f"Loaded {staging.num_rows} rows into "
+        f"{project_id}:{dataset_id}.{table_id}{STAGING_SUFFIX}"
     )
 
+    if verify:
+        expected_rows = count_source_rows(csv_file_path, skip_header)
+        if staging.num_rows != expected_rows or load_job.output_rows != expected_rows:
+            raise RuntimeError(
+                f"Row count mismatch for {table_id}: source {expected_rows}, "
+                f"load job {load_job.output_rows}, table {staging.num_rows} "
+                f"(live table left unchanged, staging table kept for inspection)"
+            )
+        print(f"Verified {table_id}{STAGING_SUFFIX}: {expected_rows} rows")
+
+    _replace_table(client, staging_ref, table_ref)
+
+    destination = client.get_table(table_ref)
+    print(f"Replaced {project_id}:{dataset_id}.{table_id} with {destination.num_rows} rows")
+
+    return destination.num_rows
+
+
+def load_flight_files(file_paths, max_workers=4, **kwargs):
+    """
+    Load many yearly files concurrently (one load job per file).
+
+    Returns {file_path: rows loaded}; raises after all loads finish if any failed.
+    """
+    results, failures = {}, {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(upload_csv_to_bq, file_path, **kwargs): file_path for file_path in file_paths}
+        for future in concurrent.futures.as_completed(futures):
+            file_path = futures[future]
+            try:
+                results[file_path] = future.result()
+            except Exception as e:
+                failures[file_path] = e
+                print(f"Failed to load {file_path}: {e}")
+
+    print(f"Loaded {len(results)} of {len(file_paths)} files, {sum(results.values())} rows in total")
+    if failures:
+        raise RuntimeError(f"{len(failures)} load(s) failed: {', '.join(sorted(failures))}")
+    print("Rebuild the route summary next: python flight-risk-analysis/route_summary.py")
+    return results
+
+
 if __name__ == "__main__":
-    upload_csv_to_bq(
-        csv_file_path="/Users/eimis/Documents/HACKTHONS-2025/GOOGLE-AI-IN-ACTION/GFlightRiskRadar/project/2018.csv" # change to your file path
+    parser = argparse.ArgumentParser(description="Load yearly BTS flight files into partitioned, clustered flights_<year> tables")
+    parser.add_argument("files", nargs="+", help="Yearly .csv, .csv.gz or .parquet files, e.g. 2016.csv.gz 2017.csv.gz")
+    parser.add_argument("--project", default="argon-acumen-268900")
+    parser.add_argument("--dataset", default="airline_data")
+    parser.add_argument("--location", default="us-central1")
+    parser.add_argument("--workers", type=int, default=4, help="Files loaded at once")
+    parser.add_argument("--no-verify", action="store_true", help="Skip the row count check")
+    args = parser.parse_args()
+
+    load_flight_files(
+        args.files,
+        max_workers=args.workers,
+        project_id=args.project,
+        dataset_id=args.dataset,
+        location=args.location,
+        verify=not args.no_verify
     )
@@ -0,0 +1,135 @@
+"""
+Agent Registry for Flight Risk Analysis
+Process-wide agents and clients built on first use and shared by every request afterwards
+"""
+import importlib
+import os
+import threading
+import time
+from typing import Any, Callable, Dict
+
+from import_timer import print_import_report
+
+# HTTP connections the shared BigQuery client keeps open (requests' default pool is 10)
+BIGQUERY_HTTP_POOL_SIZE = int(os.environ.get("BIGQUERY_HTTP_POOL_SIZE", "32"))
+
+
+class LazyAgent:
+    """
+    Proxy for an agent (or client) that is only constructed when first used.
+
+    Attribute access builds the instance once, thread-safely, and forwards to
+    it. A failed build is not cached, so the next use retries it.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        self._name = name
+        self._factory = factory
+        self._instance = None
+        self._lock = threading.Lock()
+        self.build_time = None
+
+    @property
+    def built(self) -> bool:
+        return self._instance is not None
+
+    def get(self) -> Any:
+        """Return the shared instance, building it on first call"""
+        instance = self._instance
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            if self._instance is None:
+                start = time.time()
+                self._instance = self._factory()
+                self.build_time = time.time() - start
+                print(f"🏗️ AGENT REGISTRY: Built '{self._name}' in {self.build_time:.2f} seconds")
+                print_import_report(f"agent '{self._name}' build")
+            return self._instance
+
+    def reset(self):
+        """Drop the shared instance so the next use builds a new one"""
+        with self._lock:
+            self._instance = None
+            self.build_time = None
+        print(f"🔄 AGENT REGISTRY: Reset '{self._name}'")
+
+    def __getattr__(self, attribute: str) -> Any:
+        return getattr(self.get(), attribute)
+
+    def __repr__(self) -> str:
+        state = 'built' if self.built else 'not built'
+        return f"<LazyAgent {self._name} ({state})>"
+
+
+_registry: Dict[str, LazyAgent] = {}
+_registry_lock = threading.Lock()
+
+
+def register(name: str, factory: Callable[[], Any]) -> LazyAgent:
+    """
+    Register a lazily built agent or client.
+
+    Args:
+        name: Registry name, reported by the health check
+        factory: Zero-argument callable that constructs the instance
+
+    Returns:
+        The LazyAgent proxy; registering an existing name returns the existing proxy
+    """
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = LazyAgent(name, factory)
+        return _registry[name]
+
+
+def _class_factory(module_name: str, class_name: str) -> Callable[[], Any]:
+    # The agent module is imported by the factory, so its import cost is deferred too
+    def factory():
+        return getattr(importlib.import_module(module_name), class_name)()
+    return factory
+
+
+def _build_bigquery_client():
+    import google.auth
+    from google.auth.transport.requests import AuthorizedSession
+    from google.cloud import bigquery
+    from requests.adapters import HTTPAdapter
+
+    # One authorized session with a connection pool sized for the concurrent historical lookups
+    credentials, project = google.auth.default(scopes=bigquery.Client.SCOPE)
+    session = AuthorizedSession(credentials)
+    adapter = HTTPAdapter(pool_connections=BIGQUERY_HTTP_POOL_SIZE, pool_maxsize=BIGQUERY_HTTP_POOL_SIZE)
+    session.mount('https://', adapter)
+    return bigquery.Client(project=project, credentials=credentials, _http=session)
+
+
+bigquery_client = register('bigquery_client', _build_bigquery_client)
+weather_agent = register('weather_intelligence', _class_factory('weather_intelligence_agent', 'WeatherIntelligenceAgent'))
+data_agent = register('data_analyst', _class_factory('data_analyst_agent', 'DataAnalystAgent'))
+risk_agent = register('risk_assessment', _class_factory('risk_assessment_agent', 'RiskAssessmentAgent'))
+layover_agent = register('layover_analysis', _class_factory('layover_analysis_agent', 'LayoverAnalysisAgent'))
+chat_agent = register('chat_advisor', _class_factory('chat_advisor_agent', 'ChatAdvisorAgent'))
+insurance_agent = register('insurance_recommendation', _class_factory('insurance_recommendation_agent', 'InsuranceRecommendationAgent'))
+airport_complexity_agent = register('airport_complexity', _class_factory('airport_complexity_agent', 'AirportComplexityAgent'))
+weather_impact_agent = register('weather_impact', _class_factory('weather_impact_agent', 'WeatherImpactAgent'))
+bigquery_tool = register('bigquery_tool', _class_factory('bigquery_tool', 'BigQueryFlightTool'))
+
+
+def get_bigquery_client():
+    """Shared BigQuery client; raises if the client cannot be created"""
+    return bigquery_client.get()
+
+
+def get_registry_status() -> Dict[str, Dict[str, Any]]:
+    """Build state of every registered agent and client, without building any of them"""
+    with _registry_lock:
+        entries = list(_registry.items())
+    return {
+        name: {
+            'built': entry.built,
+            'build_time': entry.build_time
+        }
+        for name, entry in entries
+    }
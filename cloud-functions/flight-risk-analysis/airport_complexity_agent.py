@@ -3,7 +3,9 @@ Airport Complexity Analysis Agent - Google ADK Implementation
 Analyzes airport operational complexity using AI instead of hardcoded data
 """
 import os
-import google.generativeai as genai
+from llm_gateway import get_model
+from llm_cache import LLMCachePolicy, llm_response_cache
+from async_support import llm_step, run_steps
 
 # Import Google ADK - REAL IMPLEMENTATION ONLY
 from google.adk.agents import Agent
@@ -12,6 +14,9 @@ print("✅ Airport Complexity Agent: Using real Google ADK")
 
 from typing import Dict, Any, List
 
+# Airport characteristics change slowly; bump the version when the prompt changes
+COMPLEXITY_CACHE = LLMCachePolicy('airport_complexity_agent.analyze_airport_complexity', version='v1', ttl_seconds=7 * 24 * 3600)
+
 class AirportComplexityAgent(Agent):
     """
     Google ADK Airport Complexity Agent for real-time airport analysis
@@ -28,8 +33,7 @@ class AirportComplexityAgent(Agent):
         if not api_key:
             raise ValueError("GOOGLE_API_KEY environment variable is required")
         
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.0-flash')
+        self.model = get_model()
         
         print("🏢 Google ADK Airport Complexity Agent initialized")
     
@@ -37,6 +41,9 @@ class AirportComplexityAgent(Agent):
         """
         Analyze airport operational complexity using AI
         """
+        return run_steps(self.analyze_airport_complexity_steps(airport_code, airport_name))
+    
+    def analyze_airport_complexity_steps(self, airport_code: str, airport_name: str = None):
         try:
             print(f"🏢 AIRPORT COMPLEXITY AGENT: Analyzing {airport_code}")
             
@@ -72,8 +79,9 @@ class AirportComplexityAgent(Agent):
             Be specific and factual based on real airport characteristics.
             """
             
-            # Get AI analysis
-            response = self.model.generate_content(prompt)
+            # Get AI analysis (cached per airport)
+            cache_inputs = {'airport_code': airport_code, 'airport_name': airport_name}
+            response = yield llm_step(self.model, prompt, cache=COMPLEXITY_CACHE, cache_inputs=cache_inputs)
             
             # Parse AI response
             try:
@@ -105,6 +113,7 @@ class AirportComplexityAgent(Agent):
             except (json.JSONDecodeError, AttributeError) as e:
                 print(f"❌ AIRPORT COMPLEXITY AGENT: Failed to parse AI response for {airport_code}: {e}")
                 print(f"🔍 DEBUG: Raw AI response: {response.text[:500]}")
+                llm_response_cache.invalidate(COMPLEXITY_CACHE, cache_inputs, self.model.generation_config)
                 return self._get_fallback_analysis(airport_code)
                 
         except Exception as e:
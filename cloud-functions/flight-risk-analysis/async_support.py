@@ -0,0 +1,190 @@
+"""
+Async Support for Flight Risk Analysis
+Process-wide event loop and step drivers that give agents one code path for sync and async execution
+"""
+import asyncio
+import concurrent.futures
+import contextvars
+import functools
+import os
+import sys
+import threading
+from typing import Any, Callable, Generator
+
+# Run the route per-flight fan-out and the direct flight analysis stages on the event loop instead of on threads
+ASYNC_EXECUTION = os.environ.get("ASYNC_EXECUTION", "1") == "1"
+
+# Flights of one route search analyzed concurrently on the event loop
+ASYNC_ROUTE_MAX_CONCURRENCY = int(os.environ.get("ASYNC_ROUTE_MAX_CONCURRENCY", "10"))
+
+# Threads for the blocking calls that have no async client (BigQuery job calls, slot waits, legacy tools)
+ASYNC_OFFLOAD_THREADS = int(os.environ.get("ASYNC_OFFLOAD_THREADS", "32"))
+
+# Seconds between BigQuery job status checks on the async path
+BIGQUERY_POLL_INTERVAL = float(os.environ.get("BIGQUERY_POLL_INTERVAL", "0.25"))
+
+_loop = None
+_loop_lock = threading.Lock()
+_http_session = None
+
+
+class Step:
+    """
+    One I/O call yielded by a steps generator.
+
+    Agent logic is written once as a generator that yields Steps and receives
+    their results; ``run_steps`` executes each Step with its blocking function,
+    ``run_steps_async`` awaits its async function. Failures are thrown back
+    into the generator, so its own try/except blocks behave the same either way.
+    """
+
+    def __init__(self, func: Callable[..., Any], async_func: Callable[..., Any], *args, **kwargs):
+        self.func = func
+        self.async_func = async_func
+        self.args = args
+        self.kwargs = kwargs
+
+
+def run_steps(steps: Generator) -> Any:
+    """Drive a steps generator synchronously and return its result"""
+    try:
+        step = next(steps)
+        while True:
+            try:
+                result = step.func(*step.args, **step.kwargs)
+            except Exception as e:
+                step = steps.throw(e)
+            else:
+                step = steps.send(result)
+    except StopIteration as stop:
+        return stop.value
+
+
+async def run_steps_async(steps: Generator) -> Any:
+    """Drive a steps generator on the event loop and return its result"""
+    try:
+        step = next(steps)
+        while True:
+            try:
+                result = await step.async_func(*step.args, **step.kwargs)
+            except Exception as e:
+                step = steps.throw(e)
+            else:
+                step = steps.send(result)
+    except StopIteration as stop:
+        return stop.value
+
+
+def llm_step(model, prompt, **kwargs) -> Step:
+    """Gemini call through the LLM gateway; the call site defaults to the function building the step"""
+    if kwargs.get('call_site') is None and kwargs.get('cache') is None:
+        caller = sys._getframe(1)
+        kwargs['call_site'] = f"{caller.f_globals.get('__name__', '?')}.{caller.f_code.co_name}"
+    return Step(model.generate_content, model.generate_content_async, prompt, **kwargs)
+
+
+def http_get_step(url: str, params: dict = None, timeout: float = 30) -> Step:
+    """HTTP GET; the result has status_code, text, json() and raise_for_status() on both paths"""
+    import requests
+    return Step(requests.get, _http_get_async, url, params=params, timeout=timeout)
+
+
+class AsyncHTTPResponse:
+    """Response read by the aiohttp client, exposing the parts of requests.Response the agents use"""
+
+    def __init__(self, url: str, status_code: int, reason: str, text: str):
+        self.url = url
+        self.status_code = status_code
+        self.reason = reason
+        self.text = text
+
+    def json(self):
+        import json
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            import requests
+            kind = 'Client' if self.status_code < 500 else 'Server'
+            raise requests.exceptions.HTTPError(f"{self.status_code} {kind} Error: {self.reason} for url: {self.url}")
+
+
+async def _http_get_async(url: str, params: dict = None, timeout: float = 30) -> AsyncHTTPResponse:
+    import aiohttp
+    import requests
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        _http_session = aiohttp.ClientSession()
+    try:
+        async with _http_session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            return AsyncHTTPResponse(str(response.url), response.status, response.reason or '', await response.text())
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        # Surface the same exception family as the requests-based path
+        raise requests.exceptions.RequestException(f"{type(e).__name__}: {e}") from e
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """The process-wide event loop, started on first use in a daemon thread"""
+    global _loop
+    if _loop is not None:
+        return _loop
+
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            loop.set_default_executor(concurrent.futures.ThreadPoolExecutor(
+                max_workers=ASYNC_OFFLOAD_THREADS,
+                thread_name_prefix="async-offload"
+            ))
+            threading.Thread(target=loop.run_forever, name="async-event-loop", daemon=True).start()
+            _loop = loop
+            print(f"🔁 ASYNC: Event loop started with {ASYNC_OFFLOAD_THREADS} offload threads")
+        return _loop
+
+
+def submit(coroutine) -> concurrent.futures.Future:
+    """Schedule a coroutine on the process-wide loop; callable from any thread except the loop's own"""
+    return asyncio.run_coroutine_threadsafe(_in_context(coroutine, contextvars.copy_context()), get_event_loop())
+
+
+async def _in_context(coroutine, context: contextvars.Context) -> Any:
+    # Tasks start from the loop thread's context; carry over the submitter's (e.g. the request's BigQuery cost totals)
+    for var, value in context.items():
+        var.set(value)
+    return await coroutine
+
+
+def run(coroutine, timeout: float = None) -> Any:
+    """Run a coroutine on the process-wide loop and wait for its result"""
+    return submit(coroutine).result(timeout)
+
+
+def drive_steps(steps: Generator) -> Any:
+    """
+    Drive a steps generator from an orchestrator thread: on the event loop with
+    ASYNC_EXECUTION, in the calling thread otherwise. Never call it from the loop's own thread.
+    """
+    if ASYNC_EXECUTION:
+        return run(run_steps_async(steps))
+    return run_steps(steps)
+
+
+async def run_blocking(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking call on the loop's offload threads without blocking the loop"""
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(None, functools.partial(context.run, func, *args, **kwargs))
+
+
+class StepsExecutor:
+    """
+    Pool-like adapter for the orchestrators: ``submit(steps_func, *args)`` drives
+    the generator returned by ``steps_func(*args)`` on the event loop and returns a
+    concurrent Future, so the existing windowed fan-out code can use it in place
+    of a thread pool.
+    """
+
+    def submit(self, steps_func: Callable[..., Generator], *args) -> concurrent.futures.Future:
+        return submit(run_steps_async(steps_func(*args)))
+
+
+steps_executor = StepsExecutor()
@@ -3,26 +3,68 @@ BigQuery Tool for Flight Risk Analysis
 Integrates with the airline delay and cancellation dataset (2009-2018)
 """
 from google.cloud import bigquery
-from typing import Dict, List, Optional, Any
-import pandas as pd
+from typing import Dict, List, Optional, Any, Tuple
 import json
 from datetime import datetime, timedelta
 import logging
 import os
+import threading
+import time
+
+from agent_registry import get_bigquery_client, bigquery_tool as shared_tool
+from async_support import Step, run_steps, run_blocking, BIGQUERY_POLL_INTERVAL
+from route_summary import route_summary_available, summary_table_name
+from query_cache import QUERY_CACHE_ENABLED, query_result_cache
+from query_executor import query_executor
+from flight_tables import FLIGHT_TABLE_YEARS, flights_source
+from route_snapshot import route_snapshot
 
 logger = logging.getLogger(__name__)
 
+# Seconds before a shared tool whose BigQuery connection failed is rebuilt
+BIGQUERY_TOOL_RETRY_SECONDS = float(os.environ.get("BIGQUERY_TOOL_RETRY_SECONDS", "60"))
+
+# "bigquery" (default) or "local"; local_flight_store (and NumPy) is only imported for "local"
+HISTORICAL_BACKEND = os.environ.get("HISTORICAL_BACKEND", "bigquery")
+
+# Raw columns each query reads from the flights tables (BigQuery bills by the columns read)
+_DELAY_CAUSE_COLUMNS = ['CARRIER_DELAY', 'WEATHER_DELAY', 'NAS_DELAY', 'SECURITY_DELAY', 'LATE_AIRCRAFT_DELAY']
+_PROFILE_COLUMNS = ['OP_CARRIER', 'OP_CARRIER_FL_NUM', 'ORIGIN', 'DEST', 'CANCELLED', 'DIVERTED', 'CANCELLATION_CODE',
+                    'DEP_DELAY', 'ARR_DELAY', *_DELAY_CAUSE_COLUMNS, 'AIR_TIME', 'DISTANCE']
+_ROUTE_STATISTICS_COLUMNS = ['OP_CARRIER', 'ORIGIN', 'DEST', 'CANCELLED', 'DIVERTED',
+                             'DEP_DELAY', 'ARR_DELAY', *_DELAY_CAUSE_COLUMNS, 'AIR_TIME', 'DISTANCE']
+_ON_TIME_COLUMNS = ['OP_CARRIER', 'ORIGIN', 'DEST', 'CANCELLED', 'DIVERTED', 'DEP_DELAY', 'ARR_DELAY', *_DELAY_CAUSE_COLUMNS]
+
 class BigQueryFlightTool:
     """Tool for querying flight delay and cancellation data from BigQuery"""
     
     def __init__(self):
+        self.created_at = time.time()
+        self._health_lock = threading.Lock()
+        self.health = {
+            'queries': 0,
+            'failures': 0,
+            'consecutive_failures': 0,
+            'total_query_time': 0.0,
+            'last_success': None,
+            'last_error': None
+        }
+        # Columnar store read in-process instead of BigQuery (HISTORICAL_BACKEND=local, see local_flight_store.py)
+        self.local_store = None
+        if HISTORICAL_BACKEND == 'local':
+            self._init_local_store()
+            return
+        self.data_source = "BigQuery"
         try:
             logger.info("🔄 INITIALIZING BIGQUERY CONNECTION...")
-            self.client = bigquery.Client()
+            # Process-wide client shared with the agents
+            self.client = get_bigquery_client()
             self.dataset_id = "airline_data"  # Default dataset
             self.project_id = self.client.project
             # Available years: 2009-2018
-            self.available_years = list(range(2009, 2019))
+            self.available_years = list(FLIGHT_TABLE_YEARS)
+            # Pre-aggregated monthly route table instead of scanning the yearly tables (see route_summary.py)
+            self.use_route_summary = route_summary_available(self.client, self.dataset_id)
             logger.info("✅ BIGQUERY CONNECTION SUCCESSFUL - USING REAL HISTORICAL DATA")
             logger.info(f"📊 PROJECT: {self.project_id}")
             logger.info(f"📊 DATASET: {self.dataset_id}")
@@ -34,8 +76,37 @@ class BigQueryFlightTool:
             self.dataset_id = None
             self.project_id = None
             self.available_years = []
+            self.use_route_summary = False
+    
+    def _init_local_store(self):
+        from local_flight_store import get_local_flight_store
+        self.client = None
+        self.dataset_id = None
+        self.project_id = None
+        self.use_route_summary = False
+        self.data_source = "local flight store"
+        try:
+            logger.info("🔄 OPENING LOCAL FLIGHT STORE...")
+            self.local_store = get_local_flight_store()
+            self.available_years = [year for year in FLIGHT_TABLE_YEARS if year in self.local_store.years]
+            logger.info("✅ LOCAL FLIGHT STORE OPENED - USING REAL HISTORICAL DATA")
+            logger.info(f"📅 AVAILABLE YEARS: {self.available_years}")
+        except Exception as e:
+            logger.error(f"❌ LOCAL FLIGHT STORE FAILED: {type(e).__name__}: {str(e)}")
+            self.local_store = None
+            self.available_years = []
+    
+    def _available_years(self) -> List[int]:
+        """Years that can be analyzed; without a connection or local store, those of the route snapshot"""
+        if self.available_years or route_snapshot is None:
+            return self.available_years
+        return route_snapshot.years
     
     def get_flight_historical_performance(self, airline_code: str, flight_number: str, origin: str, destination: str, years: List[int] = None) -> Dict[str, Any]:
+        """Historical route performance for an airline (see _flight_historical_performance_steps)"""
+        return run_steps(self._flight_historical_performance_steps(airline_code, flight_number, origin, destination, years))
+    
+    def _flight_historical_performance_steps(self, airline_code: str, flight_number: str, origin: str, destination: str, years: List[int] = None):
         """
         Get historical performance for a specific flight route (airline + origin + destination)
         
@@ -49,12 +120,50 @@ class BigQueryFlightTool:
         Returns:
             Dictionary with historical route performance (aggregated across all flight numbers)
         """
-        if not self.client:
-            logger.error("❌ BigQuery connection not available")
-            raise Exception("BigQuery connection required for historical analysis")
-
-        logger.info(f"📊 ANALYZING ROUTE HISTORY: {airline_code} {origin} -> {destination} (ALL FLIGHT NUMBERS)")
-        logger.info(f"🔄 DATA SOURCE: REAL HISTORICAL DATA (BigQuery)")
+        profile = yield from self._historical_profile_steps(airline_code, origin, destination, years)
+        return profile.get('flight_performance', profile)
+    
+    def get_historical_profile(self, airline_code: str, origin: str, destination: str, years: List[int] = None) -> Dict[str, Any]:
+        """Route performance and On-Time Rate for an airline from one query (see _historical_profile_steps)"""
+        return run_steps(self._historical_profile_steps(airline_code, origin, destination, years))
+    
+    def _historical_profile_steps(self, airline_code: str, origin: str, destination: str, years: List[int] = None):
+        """
+        Get the full historical profile of an airline on a route with a single query
+        
+        Args:
+            airline_code: Airline code (OP_CARRIER column)
+            origin: Origin airport code (ORIGIN column)
+            destination: Destination airport code (DEST column)
+            years: List of years to analyze (default: [2016, 2017, 2018])
+            
+        Returns:
+            Dictionary with 'flight_performance' (same structure as get_flight_historical_performance)
+            and 'on_time' (same structure as a route-specific get_airline_on_time_rate)
+        """
+        key = (airline_code, origin, destination)
+        profiles = yield from self._historical_profiles_steps([key], years)
+        return profiles[key]
+    
+    def get_historical_profiles(self, routes: List[Tuple[str, str, str]], years: List[int] = None) -> Dict[Tuple[str, str, str], Dict[str, Any]]:
+        """Historical profiles for many (airline_code, origin, destination) keys from one query (see _historical_profiles_steps)"""
+        return run_steps(self._historical_profiles_steps(routes, years))
+    
+    def _historical_profiles_steps(self, routes: List[Tuple[str, str, str]], years: List[int] = None):
+        """
+        Get historical profiles for several airline + route keys with a single query
+        
+        Args:
+            routes: (airline_code, origin, destination) keys; duplicates are queried once
+            years: List of years to analyze (default: [2016, 2017, 2018])
+            
+        Returns:
+            Dictionary mapping each key to its profile ('flight_performance' and 'on_time', as
+            _historical_profile_steps); keys without flights get the empty / error structures
+        """
+        routes = list(dict.fromkeys(tuple(route) for route in routes))
+        logger.info(f"📊 ANALYZING ROUTE HISTORY: {len(routes)} airline routes in one query (ALL FLIGHT NUMBERS)")
+        logger.info(f"🔄 DATA SOURCE: REAL HISTORICAL DATA ({self.data_source})")
         
         if not years:
             years = [2016, 2017, 2018]
@@ -62,170 +171,77 @@ class BigQueryFlightTool:
         else:
             logger.info(f"📅 Analyzing years: {years}")
         
-        # Build UNION query for multiple years
-        table_queries = []
-        for year in years:
-            if year in self.available_years:
-                table_name = f"`{self.project_id}.{self.dataset_id}.flights_{year}`"
-                table_queries.append(f"SELECT * FROM {table_name}")
-                logger.info(f"📋 Including table: flights_{year}")
-        
-        if not table_queries:
+        available_years = self._available_years()
+        valid_years = [year for year in years if year in available_years]
+        if not valid_years:
             logger.error(f"❌ No valid years found in range: {years}")
-            return {"error": f"No valid years provided. Available: {self.available_years}"}
+            error = {"error": f"No valid years provided. Available: {available_years}"}
+            return {route: {'flight_performance': error, 'on_time': error} for route in routes}
         
-        union_query = " UNION ALL ".join(table_queries)
-        
-        # ROUTE-BASED QUERY: Analyze ALL flights for this airline + route combination
-        query = f"""
-        WITH combined_data AS (
-            {union_query}
-        )
-        SELECT 
-            OP_CARRIER as airline_code,
-            ORIGIN as origin_airport,
-            DEST as destination_airport,
-            COUNT(*) as total_flights,
-            COUNT(DISTINCT OP_CARRIER_FL_NUM) as unique_flight_numbers,
-            COUNT(CASE WHEN CANCELLED = 1.0 THEN 1 END) as cancelled_flights,
-            COUNT(CASE WHEN DIVERTED = 1.0 THEN 1 END) as diverted_flights,
-            ROUND(AVG(CASE WHEN DEP_DELAY IS NOT NULL AND DEP_DELAY >= 0 THEN DEP_DELAY ELSE 0 END), 1) as avg_departure_delay,
-            ROUND(AVG(CASE WHEN ARR_DELAY IS NOT NULL AND ARR_DELAY >= 0 THEN ARR_DELAY ELSE 0 END), 1) as avg_arrival_delay,
-            COUNT(CASE WHEN DEP_DELAY > 15 THEN 1 END) as delays_over_15min,
-            COUNT(CASE WHEN DEP_DELAY > 60 THEN 1 END) as delays_over_1hour,
-            ROUND(AVG(CASE WHEN CARRIER_DELAY IS NOT NULL AND CARRIER_DELAY > 0 THEN CARRIER_DELAY ELSE 0 END), 1) as avg_carrier_delay,
-            ROUND(AVG(CASE WHEN WEATHER_DELAY IS NOT NULL AND WEATHER_DELAY > 0 THEN WEATHER_DELAY ELSE 0 END), 1) as avg_weather_delay,
-            ROUND(AVG(CASE WHEN NAS_DELAY IS NOT NULL AND NAS_DELAY > 0 THEN NAS_DELAY ELSE 0 END), 1) as avg_nas_delay,
-            ROUND(AVG(CASE WHEN SECURITY_DELAY IS NOT NULL AND SECURITY_DELAY > 0 THEN SECURITY_DELAY ELSE 0 END), 1) as avg_security_delay,
-            ROUND(AVG(CASE WHEN LATE_AIRCRAFT_DELAY IS NOT NULL AND LATE_AIRCRAFT_DELAY > 0 THEN LATE_AIRCRAFT_DELAY ELSE 0 END), 1) as avg_late_aircraft_delay,
-            -- Calculate On-Time Rate (flights with departure delay <= 15 minutes)
-            COUNT(CASE WHEN DEP_DELAY IS NOT NULL AND DEP_DELAY <= 15 THEN 1 END) as on_time_flights,
-            ROUND(AVG(CASE WHEN AIR_TIME IS NOT NULL AND AIR_TIME > 0 THEN AIR_TIME ELSE 0 END), 0) as avg_air_time,
-            ROUND(AVG(CASE WHEN DISTANCE IS NOT NULL AND DISTANCE > 0 THEN DISTANCE ELSE 0 END), 0) as avg_distance,
-            COUNT(CASE WHEN CANCELLATION_CODE = 'A' THEN 1 END) as airline_cancellations,
-            COUNT(CASE WHEN CANCELLATION_CODE = 'B' THEN 1 END) as weather_cancellations,
-            COUNT(CASE WHEN CANCELLATION_CODE = 'C' THEN 1 END) as nas_cancellations,
-            COUNT(CASE WHEN CANCELLATION_CODE = 'D' THEN 1 END) as security_cancellations
-        FROM combined_data
-        WHERE OP_CARRIER = @airline_code 
-        AND ORIGIN = @origin 
-        AND DEST = @destination
-        GROUP BY OP_CARRIER, ORIGIN, DEST
-        """
+        if not routes:
+            return {}
         
-        job_config = bigquery.QueryJobConfig(
-            query_parameters=[
-                bigquery.ScalarQueryParameter("airline_code", "STRING", airline_code),
-                bigquery.ScalarQueryParameter("origin", "STRING", origin),
-                bigquery.ScalarQueryParameter("destination", "STRING", destination)
-            ]
-        )
+        # First tier: the precomputed snapshot, when it was built for these years (see route_snapshot.py).
+        # It holds every airline route flown in them, so a route it lacks has no flights and is not queried
+        snapshot_rows = []
+        routes_to_query = routes
+        if route_snapshot is not None and route_snapshot.covers(valid_years):
+            snapshot_rows = [row for row in (route_snapshot.get(*route) for route in routes) if row is not None]
+            routes_to_query = []
+            logger.info(f"🗺️ ROUTE SNAPSHOT: {len(routes)} airline routes served without a query ({len(snapshot_rows)} with flights)")
+        elif not self.client and self.local_store is None:
+            logger.error("❌ BigQuery connection not available")
+            raise Exception("BigQuery connection required for historical analysis")
+        
+        rows_step = None
+        if routes_to_query:
+            if self.local_store is not None:
+                rows_step = _local_step(self.local_store.profile_rows, routes_to_query, valid_years)
+            else:
+                query, job_config = self._historical_profiles_query(routes_to_query, valid_years)
+                rows_step = _query_step(self, query, job_config, 'bigquery_tool.historical_profiles')
         
         try:
-            query_job = self.client.query(query, job_config=job_config)
-            logger.info("🔄 Executing BigQuery job...")
-            logger.info(f"📊 Query parameters: airline={airline_code}, route={origin}->{destination}")
-            
-            results = query_job.result()
-            logger.info("✅ Query completed successfully")
-            
-            for row in results:
-                total_flights = row.total_flights or 0
-                cancelled_flights = row.cancelled_flights or 0
+            results = []
+            if rows_step is not None:
+                logger.info(f"🔄 Executing {self.data_source} query...")
+                logger.info(f"📊 Query parameters: routes={', '.join(f'{a} {o}->{d}' for a, o, d in routes_to_query)}")
                 
-                if total_flights == 0:
-                    logger.warning(f"⚠️ No historical data found for {airline_code} {origin}->{destination}")
+                results = yield rows_step
+                logger.info("✅ Query completed successfully")
+            
+            profiles = {}
+            for row in [*snapshot_rows, *results]:
+                route = (row.airline_code, row.origin_airport, row.destination_airport)
+                if not row.total_flights:
+                    logger.warning(f"⚠️ No historical data found for {route[0]} {route[1]}->{route[2]}")
                     # Continue processing even with 0 flights - return valid structure
                     continue
                 
-                performance_data = {
-                    "flight_identifier": f"{airline_code} {origin}->{destination}",
-                    "route": f"{origin} -> {destination}",
-                    "years_analyzed": years,
-                    "historical_summary": {
-                        "total_flights": total_flights,
-                        "data_reliability": "high" if total_flights >= 100 else "medium" if total_flights >= 50 else "low"
-                    },
-                    "cancellation_metrics": {
-                        "cancellation_rate": round((cancelled_flights / total_flights) * 100, 1),
-                        "total_cancellations": cancelled_flights,
-                        "cancellation_breakdown": {
-                            "airline_fault": row.airline_cancellations or 0,
-                            "weather_related": row.weather_cancellations or 0,
-                            "air_system": row.nas_cancellations or 0,
-                            "security": row.security_cancellations or 0
-                        }
-                    },
-                    "delay_metrics": {
-                        "avg_departure_delay_minutes": row.avg_departure_delay or 0,
-                        "avg_arrival_delay_minutes": row.avg_arrival_delay or 0,
-                        "on_time_performance": round(((total_flights - (row.delays_over_15min or 0)) / total_flights) * 100, 1),
-                        "severe_delay_rate": round(((row.delays_over_1hour or 0) / total_flights) * 100, 1),
-                        "delay_breakdown": {
-                            "carrier_delay": row.avg_carrier_delay or 0,
-                            "weather_delay": row.avg_weather_delay or 0,
-                            "nas_delay": row.avg_nas_delay or 0,
-                            "security_delay": row.avg_security_delay or 0,
-                            "late_aircraft_delay": row.avg_late_aircraft_delay or 0
-                        }
-                    },
-                    "operational_metrics": {
-                        "diversion_rate": round(((row.diverted_flights or 0) / total_flights) * 100, 2),
-                        "avg_flight_time_minutes": row.avg_air_time or 0,
-                        "avg_distance_miles": row.avg_distance or 0
-                    },
-                    "query_timestamp": datetime.now().isoformat()
+                performance_data = self._flight_performance_from_row(row, *route, years)
+                profiles[route] = {
+                    'flight_performance': performance_data,
+                    'on_time': self._on_time_rate_from_row(row, route[0], years)
                 }
                 
-                logger.info(f"📈 Historical analysis complete for {airline_code} {origin}->{destination}")
-                logger.info(f"✈️ Total flights analyzed: {total_flights}")
+                logger.info(f"📈 Historical analysis complete for {route[0]} {route[1]}->{route[2]}")
+                logger.info(f"✈️ Total flights analyzed: {performance_data['historical_summary']['total_flights']}")
                 logger.info(f"📊 Cancellation rate: {performance_data['cancellation_metrics']['cancellation_rate']}%")
                 logger.info(f"⏰ Avg delay: {performance_data['delay_metrics']['avg_departure_delay_minutes']} minutes")
-                
-                return performance_data
             
-            # No results found - but return valid empty structure
-            logger.warning(f"⚠️ No historical data found for {airline_code} {origin}->{destination}")
-            logger.error("🚨🚨🚨 NO HISTORICAL DATA FOUND IN BIGQUERY - THIS ROUTE WAS NEVER FLOWN 🚨🚨🚨")
-            logger.error(f"🚨🚨🚨 AIRLINE: {airline_code}, ROUTE: {origin}->{destination} 🚨🚨🚨")
-            return {
-                "flight_identifier": f"{airline_code} {origin}->{destination}",
-                "route": f"{origin} -> {destination}",
-                "years_analyzed": years,
-                "historical_summary": {
-                    "total_flights": 0,
-                    "data_reliability": "no_data"
-                },
-                "cancellation_metrics": {
-                    "cancellation_rate": 0,
-                    "total_cancellations": 0,
-                    "cancellation_breakdown": {
-                        "airline_fault": 0,
-                        "weather_related": 0,
-                        "air_system": 0,
-                        "security": 0
-                    }
-                },
-                "delay_metrics": {
-                    "avg_departure_delay_minutes": 0,
-                    "avg_arrival_delay_minutes": 0,
-                    "on_time_performance": 100,
-                    "severe_delay_rate": 0,
-                    "delay_breakdown": {
-                        "carrier_delay": 0,
-                        "weather_delay": 0,
-                        "nas_delay": 0,
-                        "security_delay": 0,
-                        "late_aircraft_delay": 0
-                    }
-                },
-                "operational_metrics": {
-                    "diversion_rate": 0,
-                    "avg_flight_time_minutes": 0,
-                    "avg_distance_miles": 0
-                },
-                "query_timestamp": datetime.now().isoformat()
-            }
+            for airline_code, origin, destination in routes:
+                if (airline_code, origin, destination) in profiles:
+                    continue
+                # No results found - but return valid empty structure
+                logger.warning(f"⚠️ No historical data found for {airline_code} {origin}->{destination}")
+                logger.error("🚨🚨🚨 NO HISTORICAL DATA FOUND IN BIGQUERY - THIS ROUTE WAS NEVER FLOWN 🚨🚨🚨")
+                logger.error(f"🚨🚨🚨 AIRLINE: {airline_code}, ROUTE: {origin}->{destination} 🚨🚨🚨")
+                profiles[(airline_code, origin, destination)] = {
+                    'flight_performance': self._empty_flight_performance(airline_code, origin, destination, years),
+                    'on_time': self._no_on_time_data(airline_code, years)
+                }
+            
+            return profiles
             
         except Exception as e:
             logger.error(f"❌ Error analyzing flight performance: {str(e)}")
@@ -233,7 +249,94 @@ class BigQueryFlightTool:
             # Re-raise the exception to be handled upstream
             raise
     
+    def _flight_performance_from_row(self, row, airline_code: str, origin: str, destination: str, years: List[int]) -> Dict[str, Any]:
+        """Flight performance response from an airline + route aggregate row"""
+        total_flights = row.total_flights or 0
+        cancelled_flights = row.cancelled_flights or 0
+        return {
+            "flight_identifier": f"{airline_code} {origin}->{destination}",
+            "route": f"{origin} -> {destination}",
+            "years_analyzed": years,
+            "historical_summary": {
+                "total_flights": total_flights,
+                "data_reliability": "high" if total_flights >= 100 else "medium" if total_flights >= 50 else "low"
+            },
+            "cancellation_metrics": {
+                "cancellation_rate": round((cancelled_flights / total_flights) * 100, 1),
+                "total_cancellations": cancelled_flights,
+                "cancellation_breakdown": {
+                    "airline_fault": row.airline_cancellations or 0,
+                    "weather_related": row.weather_cancellations or 0,
+                    "air_system": row.nas_cancellations or 0,
+                    "security": row.security_cancellations or 0
+                }
+            },
+            "delay_metrics": {
+                "avg_departure_delay_minutes": row.avg_departure_delay or 0,
+                "avg_arrival_delay_minutes": row.avg_arrival_delay or 0,
+                "on_time_performance": round(((total_flights - (row.delays_over_15min or 0)) / total_flights) * 100, 1),
+                "severe_delay_rate": round(((row.delays_over_1hour or 0) / total_flights) * 100, 1),
+                "delay_breakdown": {
+                    "carrier_delay": row.avg_carrier_delay or 0,
+                    "weather_delay": row.avg_weather_delay or 0,
+                    "nas_delay": row.avg_nas_delay or 0,
+                    "security_delay": row.avg_security_delay or 0,
+                    "late_aircraft_delay": row.avg_late_aircraft_delay or 0
+                }
+            },
+            "operational_metrics": {
+                "diversion_rate": round(((row.diverted_flights or 0) / total_flights) * 100, 2),
+                "avg_flight_time_minutes": row.avg_air_time or 0,
+                "avg_distance_miles": row.avg_distance or 0
+            },
+            "query_timestamp": datetime.now().isoformat()
+        }
+    
+    def _empty_flight_performance(self, airline_code: str, origin: str, destination: str, years: List[int]) -> Dict[str, Any]:
+        return {
+            "flight_identifier": f"{airline_code} {origin}->{destination}",
+            "route": f"{origin} -> {destination}",
+            "years_analyzed": years,
+            "historical_summary": {
+                "total_flights": 0,
+                "data_reliability": "no_data"
+            },
+            "cancellation_metrics": {
+                "cancellation_rate": 0,
+                "total_cancellations": 0,
+                "cancellation_breakdown": {
+                    "airline_fault": 0,
+                    "weather_related": 0,
+                    "air_system": 0,
+                    "security": 0
+                }
+            },
+            "delay_metrics": {
+                "avg_departure_delay_minutes": 0,
+                "avg_arrival_delay_minutes": 0,
+                "on_time_performance": 100,
+                "severe_delay_rate": 0,
+                "delay_breakdown": {
+                    "carrier_delay": 0,
+                    "weather_delay": 0,
+                    "nas_delay": 0,
+                    "security_delay": 0,
+                    "late_aircraft_delay": 0
+                }
+            },
+            "operational_metrics": {
+                "diversion_rate": 0,
+                "avg_flight_time_minutes": 0,
+                "avg_distance_miles": 0
+            },
+            "query_timestamp": datetime.now().isoformat()
+        }
+    
     def get_route_statistics(self, origin: str, destination: str, years: List[int] = None) -> Dict[str, Any]:
+        """Route statistics across all airlines (see _route_statistics_steps)"""
+        return run_steps(self._route_statistics_steps(origin, destination, years))
+    
+    def _route_statistics_steps(self, origin: str, destination: str, years: List[int] = None):
         """
         Get historical statistics for a specific route across all airlines
         
@@ -245,12 +348,12 @@ class BigQueryFlightTool:
         Returns:
             Dictionary with route statistics
         """
-        if not self.client:
+        if not self.client and self.local_store is None:
             logger.error("❌ BigQuery connection not available")
             raise Exception("BigQuery connection required for route statistics")
 
         logger.info(f"📊 ANALYZING ROUTE: {origin} -> {destination}")
-        logger.info(f"🔄 DATA SOURCE: REAL HISTORICAL DATA (BigQuery)")
+        logger.info(f"🔄 DATA SOURCE: REAL HISTORICAL DATA ({self.data_source})")
         
         if not years:
             years = [2016, 2017, 2018]
@@ -258,63 +361,22 @@ class BigQueryFlightTool:
         else:
             logger.info(f"📅 Analyzing years: {years}")
         
-        # Build UNION query
-        table_queries = []
-        for year in years:
-            if year in self.available_years:
-                table_name = f"`{self.project_id}.{self.dataset_id}.flights_{year}`"
-                table_queries.append(f"SELECT * FROM {table_name}")
-                logger.info(f"📋 Including table: flights_{year}")
-        
-        if not table_queries:
+        valid_years = [year for year in years if year in self.available_years]
+        if not valid_years:
             logger.error(f"❌ No valid years found in range: {years}")
             return {"error": f"No valid years provided. Available: {self.available_years}"}
         
-        union_query = " UNION ALL ".join(table_queries)
-        
-        query = f"""
-        WITH combined_data AS (
-            {union_query}
-        )
-        SELECT 
-            OP_CARRIER as airline_code,
-            ORIGIN as origin_airport,
-            DEST as destination_airport,
-            COUNT(*) as total_flights,
-            COUNT(CASE WHEN CANCELLED = 1.0 THEN 1 END) as cancelled_flights,
-            COUNT(CASE WHEN DIVERTED = 1.0 THEN 1 END) as diverted_flights,
-            ROUND(AVG(CASE WHEN DEP_DELAY IS NOT NULL THEN DEP_DELAY ELSE 0 END), 2) as avg_departure_delay,
-            ROUND(AVG(CASE WHEN ARR_DELAY IS NOT NULL THEN ARR_DELAY ELSE 0 END), 2) as avg_arrival_delay,
-            ROUND(STDDEV(CASE WHEN DEP_DELAY IS NOT NULL THEN DEP_DELAY ELSE 0 END), 2) as std_departure_delay,
-            COUNT(CASE WHEN DEP_DELAY > 15 THEN 1 END) as delays_over_15min,
-            COUNT(CASE WHEN DEP_DELAY > 60 THEN 1 END) as delays_over_1hour,
-            ROUND(AVG(CASE WHEN CARRIER_DELAY IS NOT NULL THEN CARRIER_DELAY ELSE 0 END), 2) as avg_carrier_delay,
-            ROUND(AVG(CASE WHEN WEATHER_DELAY IS NOT NULL THEN WEATHER_DELAY ELSE 0 END), 2) as avg_weather_delay,
-            ROUND(AVG(CASE WHEN NAS_DELAY IS NOT NULL THEN NAS_DELAY ELSE 0 END), 2) as avg_nas_delay,
-            ROUND(AVG(CASE WHEN SECURITY_DELAY IS NOT NULL THEN SECURITY_DELAY ELSE 0 END), 2) as avg_security_delay,
-            ROUND(AVG(CASE WHEN LATE_AIRCRAFT_DELAY IS NOT NULL THEN LATE_AIRCRAFT_DELAY ELSE 0 END), 2) as avg_late_aircraft_delay,
-            ROUND(AVG(CASE WHEN AIR_TIME IS NOT NULL THEN AIR_TIME ELSE 0 END), 0) as avg_air_time,
-            ROUND(AVG(CASE WHEN DISTANCE IS NOT NULL THEN DISTANCE ELSE 0 END), 0) as avg_distance
-        FROM combined_data
-        WHERE ORIGIN = @origin 
-        AND DEST = @destination
-        GROUP BY OP_CARRIER, ORIGIN, DEST
-        ORDER BY total_flights DESC
-        """
-        
-        job_config = bigquery.QueryJobConfig(
-            query_parameters=[
-                bigquery.ScalarQueryParameter("origin", "STRING", origin),
-                bigquery.ScalarQueryParameter("destination", "STRING", destination)
-            ]
-        )
+        if self.local_store is not None:
+            rows_step = _local_step(self.local_store.route_statistics_rows, origin, destination, valid_years)
+        else:
+            query, job_config = self._route_statistics_query(origin, destination, valid_years)
+            rows_step = _query_step(self, query, job_config, 'bigquery_tool.route_statistics')
         
         try:
-            query_job = self.client.query(query, job_config=job_config)
-            logger.info("🔄 Executing BigQuery job...")
+            logger.info(f"🔄 Executing {self.data_source} query...")
             logger.info(f"📊 Query parameters: origin={origin}, destination={destination}")
             
-            results = query_job.result()
+            results = yield rows_step
             logger.info("✅ Query completed successfully")
             
             route_stats = []
@@ -366,6 +428,389 @@ class BigQueryFlightTool:
             # Re-raise the exception to be handled upstream
             raise
 
+    def _on_time_rate_from_row(self, row, airline_code: str, years: List[int]) -> Dict[str, Any]:
+        """On-Time Rate response from an aggregate row (on-time rate or historical profile query)"""
+        # Calculate On-Time Rate percentage
+        total_flights = row.total_flights
+        on_time_flights = row.on_time_flights
+        on_time_rate = round((on_time_flights / total_flights) * 100, 1) if total_flights > 0 else 0.0
+        
+        # Calculate other metrics
+        cancellation_rate = round((row.cancelled_flights / total_flights) * 100, 2) if total_flights > 0 else 0.0
+        diversion_rate = round((row.diverted_flights / total_flights) * 100, 2) if total_flights > 0 else 0.0
+        delay_rate = round((row.delayed_flights / total_flights) * 100, 2) if total_flights > 0 else 0.0
+        severe_delay_rate = round((row.severe_delays_over_1hour / total_flights) * 100, 2) if total_flights > 0 else 0.0
+        
+        response = {
+            "airline_code": airline_code,
+            "years_analyzed": years,
+            "total_flights_analyzed": total_flights,
+            "on_time_rate": on_time_rate,
+            "performance_metrics": {
+                "cancellation_rate": cancellation_rate,
+                "diversion_rate": diversion_rate,
+                "delay_rate": delay_rate,
+                "severe_delay_rate": severe_delay_rate,
+                "avg_departure_delay_minutes": row.avg_departure_delay,
+                "avg_arrival_delay_minutes": row.avg_arrival_delay
+            },
+            "delay_breakdown": {
+                "carrier_delay": row.avg_carrier_delay,
+                "weather_delay": row.avg_weather_delay,
+                "nas_delay": row.avg_nas_delay,
+                "security_delay": row.avg_security_delay,
+                "late_aircraft_delay": row.avg_late_aircraft_delay
+            },
+            "data_reliability": "real_historical_data",
+            "query_timestamp": datetime.now().isoformat()
+        }
+        
+        logger.info(f"✅ AIRLINE ON-TIME RATE CALCULATED: {airline_code} = {on_time_rate}%")
+        logger.info(f"📊 Total flights analyzed: {total_flights}")
+        logger.info(f"📊 On-time flights: {on_time_flights}")
+        logger.info(f"📊 Cancellation rate: {cancellation_rate}%")
+        logger.info(f"📊 Delay rate: {delay_rate}%")
+        
+        return response
+    
+    def _no_on_time_data(self, airline_code: str, years: List[int]) -> Dict[str, Any]:
+        return {
+            "airline_code": airline_code,
+            "years_analyzed": years,
+            "error": f"No historical data found for airline {airline_code}",
+            "query_timestamp": datetime.now().isoformat()
+        }
+    
+    def _historical_profiles_query(self, routes: Optional[List[Tuple[str, str, str]]], valid_years: List[int]):
+        """
+        Historical profiles query and job config (route summary table when available, raw flights tables otherwise)
+        
+        routes=None profiles every airline route flown in the years (used to build the route snapshot)
+        """
+        # Every key is joined against @routes, so one scan answers all of them
+        if self.use_route_summary:
+            route_join = """JOIN UNNEST(@routes) AS route
+            ON carrier = route.key_carrier 
+            AND origin = route.key_origin 
+            AND dest = route.key_dest""" if routes is not None else ""
+            # ROUTE-BASED QUERY on the monthly summary: a few rows per route instead of every flight
+            query = f"""
+            SELECT 
+                carrier as airline_code,
+                origin as origin_airport,
+                dest as destination_airport,
+                SUM(total_flights) as total_flights,
+                SUM(cancelled_flights) as cancelled_flights,
+                SUM(diverted_flights) as diverted_flights,
+                ROUND(SAFE_DIVIDE(SUM(dep_delay_sum), SUM(total_flights)), 1) as avg_departure_delay,
+                ROUND(SAFE_DIVIDE(SUM(arr_delay_sum), SUM(total_flights)), 1) as avg_arrival_delay,
+                SUM(delays_over_15min) as delays_over_15min,
+                SUM(delays_over_1hour) as delays_over_1hour,
+                ROUND(SAFE_DIVIDE(SUM(carrier_delay_sum), SUM(total_flights)), 1) as avg_carrier_delay,
+                ROUND(SAFE_DIVIDE(SUM(weather_delay_sum), SUM(total_flights)), 1) as avg_weather_delay,
+                ROUND(SAFE_DIVIDE(SUM(nas_delay_sum), SUM(total_flights)), 1) as avg_nas_delay,
+                ROUND(SAFE_DIVIDE(SUM(security_delay_sum), SUM(total_flights)), 1) as avg_security_delay,
+                ROUND(SAFE_DIVIDE(SUM(late_aircraft_delay_sum), SUM(total_flights)), 1) as avg_late_aircraft_delay,
+                SUM(on_time_flights) as on_time_flights,
+                SUM(delays_over_15min) as delayed_flights,
+                SUM(delays_over_1hour) as severe_delays_over_1hour,
+                SUM(delays_over_2hours) as severe_delays_over_2hours,
+                ROUND(SAFE_DIVIDE(SUM(air_time_sum), SUM(total_flights)), 0) as avg_air_time,
+                ROUND(SAFE_DIVIDE(SUM(distance_sum), SUM(total_flights)), 0) as avg_distance,
+                SUM(airline_cancellations) as airline_cancellations,
+                SUM(weather_cancellations) as weather_cancellations,
+                SUM(nas_cancellations) as nas_cancellations,
+                SUM(security_cancellations) as security_cancellations
+            FROM {summary_table_name(self.project_id, self.dataset_id)}
+            {route_join}
+            WHERE year IN UNNEST(@years)
+            GROUP BY carrier, origin, dest
+            """
+        else:
+            source_query = self._flights_source(valid_years, _PROFILE_COLUMNS)
+            route_join = """JOIN UNNEST(@routes) AS route
+            ON OP_CARRIER = route.key_carrier 
+            AND ORIGIN = route.key_origin 
+            AND DEST = route.key_dest""" if routes is not None else ""
+            
+            # ROUTE-BASED QUERY: Analyze ALL flights for each airline + route combination
+            query = f"""
+            WITH combined_data AS (
+                {source_query}
+            )
+            SELECT 
+                OP_CARRIER as airline_code,
+                ORIGIN as origin_airport,
+                DEST as destination_airport,
+                COUNT(*) as total_flights,
+                COUNT(DISTINCT OP_CARRIER_FL_NUM) as unique_flight_numbers,
+                COUNT(CASE WHEN CANCELLED = 1.0 THEN 1 END) as cancelled_flights,
+                COUNT(CASE WHEN DIVERTED = 1.0 THEN 1 END) as diverted_flights,
+                ROUND(AVG(CASE WHEN DEP_DELAY IS NOT NULL AND DEP_DELAY >= 0 THEN DEP_DELAY ELSE 0 END), 1) as avg_departure_delay,
+                ROUND(AVG(CASE WHEN ARR_DELAY IS NOT NULL AND ARR_DELAY >= 0 THEN ARR_DELAY ELSE 0 END), 1) as avg_arrival_delay,
+                COUNT(CASE WHEN DEP_DELAY > 15 THEN 1 END) as delays_over_15min,
+                COUNT(CASE WHEN DEP_DELAY > 60 THEN 1 END) as delays_over_1hour,
+                ROUND(AVG(CASE WHEN CARRIER_DELAY IS NOT NULL AND CARRIER_DELAY > 0 THEN CARRIER_DELAY ELSE 0 END), 1) as avg_carrier_delay,
+                ROUND(AVG(CASE WHEN WEATHER_DELAY IS NOT NULL AND WEATHER_DELAY > 0 THEN WEATHER_DELAY ELSE 0 END), 1) as avg_weather_delay,
+                ROUND(AVG(CASE WHEN NAS_DELAY IS NOT NULL AND NAS_DELAY > 0 THEN NAS_DELAY ELSE 0 END), 1) as avg_nas_delay,
+                ROUND(AVG(CASE WHEN SECURITY_DELAY IS NOT NULL AND SECURITY_DELAY > 0 THEN SECURITY_DELAY ELSE 0 END), 1) as avg_security_delay,
+                ROUND(AVG(CASE WHEN LATE_AIRCRAFT_DELAY IS NOT NULL AND LATE_AIRCRAFT_DELAY > 0 THEN LATE_AIRCRAFT_DELAY ELSE 0 END), 1) as avg_late_aircraft_delay,
+                -- Calculate On-Time Rate (flights with departure delay <= 15 minutes)
+                COUNT(CASE WHEN DEP_DELAY IS NOT NULL AND DEP_DELAY <= 15 THEN 1 END) as on_time_flights,
+                COUNT(CASE WHEN DEP_DELAY IS NOT NULL AND DEP_DELAY > 15 THEN 1 END) as delayed_flights,
+                COUNT(CASE WHEN DEP_DELAY > 60 THEN 1 END) as severe_delays_over_1hour,
+                COUNT(CASE WHEN DEP_DELAY > 120 THEN 1 END) as severe_delays_over_2hours,
+                ROUND(AVG(CASE WHEN AIR_TIME IS NOT NULL AND AIR_TIME > 0 THEN AIR_TIME ELSE 0 END), 0) as avg_air_time,
+                ROUND(AVG(CASE WHEN DISTANCE IS NOT NULL AND DISTANCE > 0 THEN DISTANCE ELSE 0 END), 0) as avg_distance,
+                COUNT(CASE WHEN CANCELLATION_CODE = 'A' THEN 1 END) as airline_cancellations,
+                COUNT(CASE WHEN CANCELLATION_CODE = 'B' THEN 1 END) as weather_cancellations,
+                COUNT(CASE WHEN CANCELLATION_CODE = 'C' THEN 1 END) as nas_cancellations,
+                COUNT(CASE WHEN CANCELLATION_CODE = 'D' THEN 1 END) as security_cancellations
+            FROM combined_data
+            {route_join}
+            GROUP BY OP_CARRIER, ORIGIN, DEST
+            """
+        
+        query_parameters = [] if routes is None else [
+            bigquery.ArrayQueryParameter("routes", "STRUCT", [
+                bigquery.StructQueryParameter(
+                    None,
+                    bigquery.ScalarQueryParameter("key_carrier", "STRING", airline_code),
+                    bigquery.ScalarQueryParameter("key_origin", "STRING", origin),
+                    bigquery.ScalarQueryParameter("key_dest", "STRING", destination)
+                )
+                for airline_code, origin, destination in routes
+            ])
+        ]
+        if self.use_route_summary:
+            query_parameters.append(bigquery.ArrayQueryParameter("years", "INT64", valid_years))
+        job_config = bigquery.QueryJobConfig(query_parameters=query_parameters)
+        return query, job_config
+    
+    def _route_statistics_query(self, origin: str, destination: str, valid_years: List[int]):
+        """Route statistics query and job config"""
+        if self.use_route_summary:
+            # Standard deviation from the monthly sums: sqrt((sum(x^2) - sum(x)^2 / n) / (n - 1))
+            query = f"""
+            SELECT 
+                carrier as airline_code,
+                origin as origin_airport,
+                dest as destination_airport,
+                SUM(total_flights) as total_flights,
+                SUM(cancelled_flights) as cancelled_flights,
+                SUM(diverted_flights) as diverted_flights,
+                ROUND(SAFE_DIVIDE(SUM(dep_delay_net_sum), SUM(total_flights)), 2) as avg_departure_delay,
+                ROUND(SAFE_DIVIDE(SUM(arr_delay_net_sum), SUM(total_flights)), 2) as avg_arrival_delay,
+                ROUND(SQRT(GREATEST(SAFE_DIVIDE(
+                    SUM(dep_delay_net_sq_sum) - POW(SUM(dep_delay_net_sum), 2) / SUM(total_flights),
+                    SUM(total_flights) - 1
+                ), 0)), 2) as std_departure_delay,
+                SUM(delays_over_15min) as delays_over_15min,
+                SUM(delays_over_1hour) as delays_over_1hour,
+                ROUND(SAFE_DIVIDE(SUM(carrier_delay_sum), SUM(total_flights)), 2) as avg_carrier_delay,
+                ROUND(SAFE_DIVIDE(SUM(weather_delay_sum), SUM(total_flights)), 2) as avg_weather_delay,
+                ROUND(SAFE_DIVIDE(SUM(nas_delay_sum), SUM(total_flights)), 2) as avg_nas_delay,
+                ROUND(SAFE_DIVIDE(SUM(security_delay_sum), SUM(total_flights)), 2) as avg_security_delay,
+                ROUND(SAFE_DIVIDE(SUM(late_aircraft_delay_sum), SUM(total_flights)), 2) as avg_late_aircraft_delay,
+                ROUND(SAFE_DIVIDE(SUM(air_time_sum), SUM(total_flights)), 0) as avg_air_time,
+                ROUND(SAFE_DIVIDE(SUM(distance_sum), SUM(total_flights)), 0) as avg_distance
+            FROM {summary_table_name(self.project_id, self.dataset_id)}
+            WHERE origin = @origin 
+            AND dest = @destination
+            AND year IN UNNEST(@years)
+            GROUP BY carrier, origin, dest
+            ORDER BY total_flights DESC
+            """
+        else:
+            source_query = self._flights_source(valid_years, _ROUTE_STATISTICS_COLUMNS)
+            
+            query = f"""
+            WITH combined_data AS (
+                {source_query}
+            )
+            SELECT 
+                OP_CARRIER as airline_code,
+                ORIGIN as origin_airport,
+                DEST as destination_airport,
+                COUNT(*) as total_flights,
+                COUNT(CASE WHEN CANCELLED = 1.0 THEN 1 END) as cancelled_flights,
+                COUNT(CASE WHEN DIVERTED = 1.0 THEN 1 END) as diverted_flights,
+                ROUND(AVG(CASE WHEN DEP_DELAY IS NOT NULL THEN DEP_DELAY ELSE 0 END), 2) as avg_departure_delay,
+                ROUND(AVG(CASE WHEN ARR_DELAY IS NOT NULL THEN ARR_DELAY ELSE 0 END), 2) as avg_arrival_delay,
+                ROUND(STDDEV(CASE WHEN DEP_DELAY IS NOT NULL THEN DEP_DELAY ELSE 0 END), 2) as std_departure_delay,
+                COUNT(CASE WHEN DEP_DELAY > 15 THEN 1 END) as delays_over_15min,
+                COUNT(CASE WHEN DEP_DELAY > 60 THEN 1 END) as delays_over_1hour,
+                ROUND(AVG(CASE WHEN CARRIER_DELAY IS NOT NULL THEN CARRIER_DELAY ELSE 0 END), 2) as avg_carrier_delay,
+                ROUND(AVG(CASE WHEN WEATHER_DELAY IS NOT NULL THEN WEATHER_DELAY ELSE 0 END), 2) as avg_weather_delay,
+                ROUND(AVG(CASE WHEN NAS_DELAY IS NOT NULL THEN NAS_DELAY ELSE 0 END), 2) as avg_nas_delay,
+                ROUND(AVG(CASE WHEN SECURITY_DELAY IS NOT NULL THEN SECURITY_DELAY ELSE 0 END), 2) as avg_security_delay,
+                ROUND(AVG(CASE WHEN LATE_AIRCRAFT_DELAY IS NOT NULL THEN LATE_AIRCRAFT_DELAY ELSE 0 END), 2) as avg_late_aircraft_delay,
+                ROUND(AVG(CASE WHEN AIR_TIME IS NOT NULL THEN AIR_TIME ELSE 0 END), 0) as avg_air_time,
+                ROUND(AVG(CASE WHEN DISTANCE IS NOT NULL THEN DISTANCE ELSE 0 END), 0) as avg_distance
+            FROM combined_data
+            WHERE ORIGIN = @origin 
+            AND DEST = @destination
+            GROUP BY OP_CARRIER, ORIGIN, DEST
+            ORDER BY total_flights DESC
+            """
+        
+        query_parameters = [
+            bigquery.ScalarQueryParameter("origin", "STRING", origin),
+            bigquery.ScalarQueryParameter("destination", "STRING", destination)
+        ]
+        if self.use_route_summary:
+            query_parameters.append(bigquery.ArrayQueryParameter("years", "INT64", valid_years))
+        job_config = bigquery.QueryJobConfig(query_parameters=query_parameters)
+        return query, job_config
+    
+    def _on_time_rate_query(self, airline_code: str, origin: Optional[str], destination: Optional[str], valid_years: List[int]):
+        """Airline On-Time Rate query and job config"""
+        route_specific = bool(origin and destination)
+        
+        if self.use_route_summary:
+            query = f"""
+            SELECT 
+                carrier as airline_code,
+                {"origin as origin_airport, dest as destination_airport," if route_specific else ""}
+                SUM(total_flights) as total_flights,
+                SUM(cancelled_flights) as cancelled_flights,
+                SUM(diverted_flights) as diverted_flights,
+                SUM(on_time_flights) as on_time_flights,
+                SUM(delays_over_15min) as delayed_flights,
+                ROUND(SAFE_DIVIDE(SUM(dep_delay_sum), SUM(total_flights)), 1) as avg_departure_delay,
+                ROUND(SAFE_DIVIDE(SUM(arr_delay_sum), SUM(total_flights)), 1) as avg_arrival_delay,
+                SUM(delays_over_1hour) as severe_delays_over_1hour,
+                SUM(delays_over_2hours) as severe_delays_over_2hours,
+                ROUND(SAFE_DIVIDE(SUM(carrier_delay_sum), SUM(total_flights)), 1) as avg_carrier_delay,
+                ROUND(SAFE_DIVIDE(SUM(weather_delay_sum), SUM(total_flights)), 1) as avg_weather_delay,
+                ROUND(SAFE_DIVIDE(SUM(nas_delay_sum), SUM(total_flights)), 1) as avg_nas_delay,
+                ROUND(SAFE_DIVIDE(SUM(security_delay_sum), SUM(total_flights)), 1) as avg_security_delay,
+                ROUND(SAFE_DIVIDE(SUM(late_aircraft_delay_sum), SUM(total_flights)), 1) as avg_late_aircraft_delay
+            FROM {summary_table_name(self.project_id, self.dataset_id)}
+            WHERE carrier = @airline_code
+            {"AND origin = @origin AND dest = @destination" if route_specific else ""}
+            AND year IN UNNEST(@years)
+            GROUP BY carrier{", origin, dest" if route_specific else ""}
+            ORDER BY total_flights DESC
+            """
+        else:
+            source_query = self._flights_source(valid_years, _ON_TIME_COLUMNS)
+            
+            # ROUTE-SPECIFIC QUERY: Analyze flights for this airline on specific routes
+            query = f"""
+            WITH combined_data AS (
+                {source_query}
+            )
+            SELECT 
+                OP_CARRIER as airline_code,
+                {"ORIGIN as origin_airport, DEST as destination_airport," if route_specific else ""}
+                COUNT(*) as total_flights,
+                COUNT(CASE WHEN CANCELLED = 1.0 THEN 1 END) as cancelled_flights,
+                COUNT(CASE WHEN DIVERTED = 1.0 THEN 1 END) as diverted_flights,
+                -- Calculate On-Time Rate (flights with departure delay <= 15 minutes)
+                COUNT(CASE WHEN DEP_DELAY IS NOT NULL AND DEP_DELAY <= 15 THEN 1 END) as on_time_flights,
+                COUNT(CASE WHEN DEP_DELAY IS NOT NULL AND DEP_DELAY > 15 THEN 1 END) as delayed_flights,
+                ROUND(AVG(CASE WHEN DEP_DELAY IS NOT NULL AND DEP_DELAY >= 0 THEN DEP_DELAY ELSE 0 END), 1) as avg_departure_delay,
+                ROUND(AVG(CASE WHEN ARR_DELAY IS NOT NULL AND ARR_DELAY >= 0 THEN ARR_DELAY ELSE 0 END), 1) as avg_arrival_delay,
+                COUNT(CASE WHEN DEP_DELAY > 60 THEN 1 END) as severe_delays_over_1hour,
+                COUNT(CASE WHEN DEP_DELAY > 120 THEN 1 END) as severe_delays_over_2hours,
+                ROUND(AVG(CASE WHEN CARRIER_DELAY IS NOT NULL AND CARRIER_DELAY > 0 THEN CARRIER_DELAY ELSE 0 END), 1) as avg_carrier_delay,
+                ROUND(AVG(CASE WHEN WEATHER_DELAY IS NOT NULL AND WEATHER_DELAY > 0 THEN WEATHER_DELAY ELSE 0 END), 1) as avg_weather_delay,
+                ROUND(AVG(CASE WHEN NAS_DELAY IS NOT NULL AND NAS_DELAY > 0 THEN NAS_DELAY ELSE 0 END), 1) as avg_nas_delay,
+                ROUND(AVG(CASE WHEN SECURITY_DELAY IS NOT NULL AND SECURITY_DELAY > 0 THEN SECURITY_DELAY ELSE 0 END), 1) as avg_security_delay,
+                ROUND(AVG(CASE WHEN LATE_AIRCRAFT_DELAY IS NOT NULL AND LATE_AIRCRAFT_DELAY > 0 THEN LATE_AIRCRAFT_DELAY ELSE 0 END), 1) as avg_late_aircraft_delay
+            FROM combined_data
+            WHERE OP_CARRIER = @airline_code
+            {"AND ORIGIN = @origin AND DEST = @destination" if route_specific else ""}
+            GROUP BY OP_CARRIER{", ORIGIN, DEST" if route_specific else ""}
+            ORDER BY total_flights DESC
+            """
+        
+        query_parameters = [bigquery.ScalarQueryParameter("airline_code", "STRING", airline_code)]
+        if route_specific:
+            query_parameters += [
+                bigquery.ScalarQueryParameter("origin", "STRING", origin),
+                bigquery.ScalarQueryParameter("destination", "STRING", destination)
+            ]
+        if self.use_route_summary:
+            query_parameters.append(bigquery.ArrayQueryParameter("years", "INT64", valid_years))
+        job_config = bigquery.QueryJobConfig(query_parameters=query_parameters)
+        return query, job_config
+    
+    def _flights_source(self, years: List[int], columns: List[str]) -> str:
+        """The given columns of the raw flights tables for the given years (used when the route summary table is unavailable)"""
+        logger.info(f"📋 Reading flights_* for years {years} ({len(columns)} columns)")
+        return flights_source(f"{self.project_id}.{self.dataset_id}", years, columns)
+    
+    def _run_query(self, query: str, job_config: bigquery.QueryJobConfig = None, call_site: str = 'bigquery_tool'):
+        """Run a query job and wait for its rows, serving repeated queries from the result cache"""
+        key = query_result_cache.make_key(self.client, query, job_config) if QUERY_CACHE_ENABLED else None
+        if key is not None:
+            cached = query_result_cache.get(call_site, key)
+            if cached is not None:
+                logger.info(f"⚡ QUERY CACHE HIT: {call_site} ({len(cached)} rows)")
+                return cached
+        
+        start = time.time()
+        try:
+            query_job, results = query_executor.run_job(self.client, query, job_config, call_site)
+        except Exception as e:
+            self._record_query(time.time() - start, e)
+            raise
+        self._record_query(time.time() - start)
+        if key is not None:
+            return query_result_cache.put(call_site, key, results, query_job.total_bytes_processed)
+        return results
+    
+    async def _run_query_async(self, query: str, job_config: bigquery.QueryJobConfig = None, call_site: str = 'bigquery_tool'):
+        """Run a query job, polling its state without blocking the event loop"""
+        # Table version checks call the BigQuery API, so building the key happens off the loop
+        key = await run_blocking(query_result_cache.make_key, self.client, query, job_config) if QUERY_CACHE_ENABLED else None
+        if key is not None:
+            # The persistent tier is SQLite, so lookups and stores also run off the loop
+            cached = await run_blocking(query_result_cache.get, call_site, key)
+            if cached is not None:
+                logger.info(f"⚡ QUERY CACHE HIT: {call_site} ({len(cached)} rows)")
+                return cached
+        
+        start = time.time()
+        try:
+            query_job, results = await query_executor.run_job_async(self.client, query, job_config, call_site, BIGQUERY_POLL_INTERVAL)
+        except Exception as e:
+            self._record_query(time.time() - start, e)
+            raise
+        self._record_query(time.time() - start)
+        if key is not None:
+            return await run_blocking(query_result_cache.put, call_site, key, results, query_job.total_bytes_processed)
+        return results
+    
+    def _record_query(self, duration: float, error: Exception = None):
+        with self._health_lock:
+            self.health['queries'] += 1
+            self.health['total_query_time'] += duration
+            if error is None:
+                self.health['consecutive_failures'] = 0
+                self.health['last_success'] = datetime.now().isoformat()
+            else:
+                self.health['failures'] += 1
+                self.health['consecutive_failures'] += 1
+                self.health['last_error'] = f"{type(error).__name__}: {error}"
+    
+    def get_health(self) -> Dict[str, Any]:
+        """Connection state and query counters for the health check"""
+        with self._health_lock:
+            health = dict(self.health)
+        return {
+            **health,
+            'connected': self.client is not None or self.local_store is not None,
+            'backend': HISTORICAL_BACKEND,
+            'local_store': self.local_store.get_info() if self.local_store is not None else None,
+            'route_snapshot': route_snapshot.get_info() if route_snapshot is not None else None,
+            'use_route_summary': self.use_route_summary,
+            'avg_query_time': health['total_query_time'] / health['queries'] if health['queries'] else 0.0,
+            'age_seconds': round(time.time() - self.created_at, 1)
+        }
+    
     def _get_mock_flight_performance(self, airline_code: str, flight_number: str, origin: str, destination: str) -> Dict[str, Any]:
         """Provide mock flight performance data when BigQuery is not available"""
         return {
@@ -419,6 +864,10 @@ class BigQueryFlightTool:
         }
 
     def get_airline_on_time_rate(self, airline_code: str, origin: str = None, destination: str = None, years: List[int] = None) -> Dict[str, Any]:
+        """Airline On-Time Rate, route-specific when origin and destination are given (see _airline_on_time_rate_steps)"""
+        return run_steps(self._airline_on_time_rate_steps(airline_code, origin, destination, years))
+    
+    def _airline_on_time_rate_steps(self, airline_code: str, origin: str = None, destination: str = None, years: List[int] = None):
         """
         Calculate airline On-Time Rate based on historical data from BigQuery
         
@@ -431,119 +880,47 @@ class BigQueryFlightTool:
         Returns:
             Dictionary with airline On-Time Rate and performance metrics (route-specific if origin/destination provided)
         """
-        if not self.client:
-            logger.error("❌ BigQuery connection not available")
-            raise Exception("BigQuery connection required for airline On-Time Rate analysis")
-
         if not years:
             years = [2016, 2017, 2018]  # Last 3 years of available data
         
         logger.info(f"📊 CALCULATING AIRLINE ON-TIME RATE: {airline_code}")
-        logger.info(f"🔄 DATA SOURCE: REAL HISTORICAL DATA (BigQuery)")
+        logger.info(f"🔄 DATA SOURCE: REAL HISTORICAL DATA ({self.data_source})")
         logger.info(f"📅 ANALYZING YEARS: {years}")
         
-        # Build UNION query for multiple years
-        table_queries = []
-        for year in years:
-            if year in self.available_years:
-                table_name = f"`{self.project_id}.{self.dataset_id}.flights_{year}`"
-                table_queries.append(f"SELECT * FROM {table_name}")
-                logger.info(f"📋 Including table: flights_{year}")
-        
-        if not table_queries:
+        available_years = self._available_years()
+        valid_years = [year for year in years if year in available_years]
+        if not valid_years:
             logger.error(f"❌ No valid years found in range: {years}")
-            return {"error": f"No valid years provided. Available: {self.available_years}"}
+            return {"error": f"No valid years provided. Available: {available_years}"}
         
-        union_query = " UNION ALL ".join(table_queries)
-        
-        # ROUTE-SPECIFIC QUERY: Analyze flights for this airline on specific routes
-        query = f"""
-        WITH combined_data AS (
-            {union_query}
-        )
-        SELECT 
-            OP_CARRIER as airline_code,
-            {f"ORIGIN as origin_airport, DEST as destination_airport," if origin and destination else ""}
-            COUNT(*) as total_flights,
-            COUNT(CASE WHEN CANCELLED = 1.0 THEN 1 END) as cancelled_flights,
-            COUNT(CASE WHEN DIVERTED = 1.0 THEN 1 END) as diverted_flights,
-            -- Calculate On-Time Rate (flights with departure delay <= 15 minutes)
-            COUNT(CASE WHEN DEP_DELAY IS NOT NULL AND DEP_DELAY <= 15 THEN 1 END) as on_time_flights,
-            COUNT(CASE WHEN DEP_DELAY IS NOT NULL AND DEP_DELAY > 15 THEN 1 END) as delayed_flights,
-            ROUND(AVG(CASE WHEN DEP_DELAY IS NOT NULL AND DEP_DELAY >= 0 THEN DEP_DELAY ELSE 0 END), 1) as avg_departure_delay,
-            ROUND(AVG(CASE WHEN ARR_DELAY IS NOT NULL AND ARR_DELAY >= 0 THEN ARR_DELAY ELSE 0 END), 1) as avg_arrival_delay,
-            COUNT(CASE WHEN DEP_DELAY > 60 THEN 1 END) as severe_delays_over_1hour,
-            COUNT(CASE WHEN DEP_DELAY > 120 THEN 1 END) as severe_delays_over_2hours,
-            ROUND(AVG(CASE WHEN CARRIER_DELAY IS NOT NULL AND CARRIER_DELAY > 0 THEN CARRIER_DELAY ELSE 0 END), 1) as avg_carrier_delay,
-            ROUND(AVG(CASE WHEN WEATHER_DELAY IS NOT NULL AND WEATHER_DELAY > 0 THEN WEATHER_DELAY ELSE 0 END), 1) as avg_weather_delay,
-            ROUND(AVG(CASE WHEN NAS_DELAY IS NOT NULL AND NAS_DELAY > 0 THEN NAS_DELAY ELSE 0 END), 1) as avg_nas_delay,
-            ROUND(AVG(CASE WHEN SECURITY_DELAY IS NOT NULL AND SECURITY_DELAY > 0 THEN SECURITY_DELAY ELSE 0 END), 1) as avg_security_delay,
-            ROUND(AVG(CASE WHEN LATE_AIRCRAFT_DELAY IS NOT NULL AND LATE_AIRCRAFT_DELAY > 0 THEN LATE_AIRCRAFT_DELAY ELSE 0 END), 1) as avg_late_aircraft_delay
-        FROM combined_data
-        WHERE OP_CARRIER = '{airline_code}'
-        {f"AND ORIGIN = '{origin}' AND DEST = '{destination}'" if origin and destination else ""}
-        GROUP BY OP_CARRIER{", ORIGIN, DEST" if origin and destination else ""}
-        ORDER BY total_flights DESC
-        """
+        # A route the snapshot lacks was not flown by the airline in these years
+        if origin and destination and route_snapshot is not None and route_snapshot.covers(valid_years):
+            row = route_snapshot.get(airline_code, origin, destination)
+            logger.info(f"🗺️ ROUTE SNAPSHOT: {airline_code} {origin}->{destination} served without a query")
+            if row is None:
+                return self._no_on_time_data(airline_code, years)
+            return self._on_time_rate_from_row(row, airline_code, years)
+        
+        if not self.client and self.local_store is None:
+            logger.error("❌ BigQuery connection not available")
+            raise Exception("BigQuery connection required for airline On-Time Rate analysis")
+        
+        if self.local_store is not None:
+            rows_step = _local_step(self.local_store.on_time_rows, airline_code, origin, destination, valid_years)
+        else:
+            query, job_config = self._on_time_rate_query(airline_code, origin, destination, valid_years)
+            rows_step = _query_step(self, query, job_config, 'bigquery_tool.airline_on_time_rate')
         
         try:
             logger.info(f"🔍 EXECUTING QUERY FOR AIRLINE: {airline_code}")
-            query_job = self.client.query(query)
-            results = query_job.result()
+            results = yield rows_step
             
-            if not results:
+            rows = list(results)
+            if not rows:
                 logger.warning(f"⚠️ No data found for airline: {airline_code}")
-                return {
-                    "airline_code": airline_code,
-                    "years_analyzed": years,
-                    "error": f"No historical data found for airline {airline_code}",
-                    "query_timestamp": datetime.now().isoformat()
-                }
-            
-            row = list(results)[0]
-            
-            # Calculate On-Time Rate percentage
-            total_flights = row.total_flights
-            on_time_flights = row.on_time_flights
-            on_time_rate = round((on_time_flights / total_flights) * 100, 1) if total_flights > 0 else 0.0
-            
-            # Calculate other metrics
-            cancellation_rate = round((row.cancelled_flights / total_flights) * 100, 2) if total_flights > 0 else 0.0
-            diversion_rate = round((row.diverted_flights / total_flights) * 100, 2) if total_flights > 0 else 0.0
-            delay_rate = round((row.delayed_flights / total_flights) * 100, 2) if total_flights > 0 else 0.0
-            severe_delay_rate = round((row.severe_delays_over_1hour / total_flights) * 100, 2) if total_flights > 0 else 0.0
-            
-            response = {
-                "airline_code": airline_code,
-                "years_analyzed": years,
-                "total_flights_analyzed": total_flights,
-                "on_time_rate": on_time_rate,
-                "performance_metrics": {
-                    "cancellation_rate": cancellation_rate,
-                    "diversion_rate": diversion_rate,
-                    "delay_rate": delay_rate,
-                    "severe_delay_rate": severe_delay_rate,
-                    "avg_departure_delay_minutes": row.avg_departure_delay,
-                    "avg_arrival_delay_minutes": row.avg_arrival_delay
-                },
-                "delay_breakdown": {
-                    "carrier_delay": row.avg_carrier_delay,
-                    "weather_delay": row.avg_weather_delay,
-                    "nas_delay": row.avg_nas_delay,
-                    "security_delay": row.avg_security_delay,
-                    "late_aircraft_delay": row.avg_late_aircraft_delay
-                },
-                "data_reliability": "real_historical_data",
-                "query_timestamp": datetime.now().isoformat()
-            }
+                return self._no_on_time_data(airline_code, years)
             
-            logger.info(f"✅ AIRLINE ON-TIME RATE CALCULATED: {airline_code} = {on_time_rate}%")
-            logger.info(f"📊 Total flights analyzed: {total_flights}")
-            logger.info(f"📊 On-time flights: {on_time_flights}")
-            logger.info(f"📊 Cancellation rate: {cancellation_rate}%")
-            logger.info(f"📊 Delay rate: {delay_rate}%")
-            
-            return response
+            return self._on_time_rate_from_row(rows[0], airline_code, years)
             
         except Exception as e:
             logger.error(f"❌ Error calculating airline On-Time Rate: {str(e)}")
@@ -567,8 +944,7 @@ def get_flight_historical_data(airline_code: str, flight_number: str, origin: st
     Returns:
         Dictionary with historical performance data
     """
-    tool = BigQueryFlightTool()
-    return tool.get_flight_historical_performance(airline_code, flight_number, origin, destination, years)
+    return run_steps(flight_historical_data_steps(airline_code, flight_number, origin, destination, years))
 
 
 def get_route_historical_data(origin: str, destination: str, years: List[int] = None) -> Dict[str, Any]:
@@ -583,8 +959,7 @@ def get_route_historical_data(origin: str, destination: str, years: List[int] =
     Returns:
         Dictionary with route performance data
     """
-    tool = BigQueryFlightTool()
-    return tool.get_route_statistics(origin, destination, years)
+    return run_steps(route_historical_data_steps(origin, destination, years))
 
 def get_airline_on_time_rate(airline_code: str, origin: str = None, destination: str = None, years: List[int] = None) -> Dict[str, Any]:
     """
@@ -599,8 +974,94 @@ def get_airline_on_time_rate(airline_code: str, origin: str = None, destination:
     Returns:
         Dictionary with airline On-Time Rate and performance metrics (route-specific if origin/destination provided)
     """
+    return run_steps(airline_on_time_rate_steps(airline_code, origin, destination, years))
+
+
+def get_historical_profile(airline_code: str, origin: str, destination: str, years: List[int] = None) -> Dict[str, Any]:
+    """
+    Get route performance and On-Time Rate for an airline from a single BigQuery query
+    
+    Args:
+        airline_code: Airline code (e.g., 'DL')
+        origin: Origin airport code (e.g., 'ATL')
+        destination: Destination airport code (e.g., 'LAX')
+        years: List of years to analyze (default: [2016, 2017, 2018])
+        
+    Returns:
+        Dictionary with 'flight_performance' (as get_flight_historical_data) and 'on_time' (as get_airline_on_time_rate)
+    """
+    return run_steps(historical_profile_steps(airline_code, origin, destination, years))
+
+
+def get_historical_profiles(routes: List[Tuple[str, str, str]], years: List[int] = None) -> Dict[Tuple[str, str, str], Dict[str, Any]]:
+    """
+    Get historical profiles for many airline routes from a single BigQuery query
+    
+    Args:
+        routes: List of (airline_code, origin, destination) keys (e.g., [('DL', 'ATL', 'LAX')])
+        years: List of years to analyze (default: [2016, 2017, 2018])
+        
+    Returns:
+        Dictionary mapping each key to its profile, as returned by get_historical_profile
+    """
+    return run_steps(historical_profiles_steps(routes, years))
+
+
+def get_bigquery_tool() -> BigQueryFlightTool:
+    """
+    Process-wide BigQueryFlightTool shared by every lookup (built on first use).
+    
+    A tool built while BigQuery was unreachable has no client; it is rebuilt once
+    BIGQUERY_TOOL_RETRY_SECONDS have passed instead of failing every lookup for the life of the process.
+    """
+    tool = shared_tool.get()
+    if tool.client is None and tool.local_store is None and time.time() - tool.created_at >= BIGQUERY_TOOL_RETRY_SECONDS:
+        logger.warning("🔄 Rebuilding shared BigQuery tool after connection failure")
+        shared_tool.reset()
+        tool = shared_tool.get()
+    return tool
+
+
+def get_bigquery_tool_health() -> Dict[str, Any]:
+    """Health of the shared tool, without building it"""
+    if not shared_tool.built:
+        return {'built': False}
+    return {'built': True, **shared_tool.get().get_health()}
+
+
+# Steps generators, for agents that compose these lookups into their own sync/async steps
+def flight_historical_data_steps(airline_code: str, flight_number: str, origin: str, destination: str, years: List[int] = None):
+    tool = get_bigquery_tool()
+    return (yield from tool._flight_historical_performance_steps(airline_code, flight_number, origin, destination, years))
+
+
+def historical_profile_steps(airline_code: str, origin: str, destination: str, years: List[int] = None):
+    tool = get_bigquery_tool()
+    return (yield from tool._historical_profile_steps(airline_code, origin, destination, years))
+
+
+def historical_profiles_steps(routes: List[Tuple[str, str, str]], years: List[int] = None):
+    tool = get_bigquery_tool()
+    return (yield from tool._historical_profiles_steps(routes, years))
+
+
+def route_historical_data_steps(origin: str, destination: str, years: List[int] = None):
+    tool = get_bigquery_tool()
+    return (yield from tool._route_statistics_steps(origin, destination, years))
+
+
+def airline_on_time_rate_steps(airline_code: str, origin: str = None, destination: str = None, years: List[int] = None):
     if not years:
         years = [2016, 2017, 2018]  # Last 3 years of available data
     
-    tool = BigQueryFlightTool()
-    return tool.get_airline_on_time_rate(airline_code, origin, destination, years) 
\ No newline at end of file
+    tool = get_bigquery_tool()
+    return (yield from tool._airline_on_time_rate_steps(airline_code, origin, destination, years))
+
+
+def _query_step(tool: BigQueryFlightTool, query: str, job_config: bigquery.QueryJobConfig = None, call_site: str = 'bigquery_tool') -> Step:
+    return Step(tool._run_query, tool._run_query_async, query, job_config, call_site) 
+
+
+def _local_step(func, *args) -> Step:
+    """Aggregation over the local flight store; runs on an offload thread on the async path"""
+    return Step(func, lambda *step_args: run_blocking(func, *step_args), *args)
@@ -6,7 +6,8 @@ import os
 import re
 import json
 from datetime import datetime, timedelta, timezone
-import google.generativeai as genai
+from llm_gateway import get_model
+from reference_data import AIRLINE_NAMES, AIRLINE_CODES, resolve_airport_code, record_llm_fallback
 
 # Import Google ADK - REAL IMPLEMENTATION ONLY
 from google.adk.agents import Agent
@@ -31,8 +32,7 @@ class ChatAdvisorAgent(Agent):
         if not api_key:
             raise ValueError("GOOGLE_API_KEY environment variable is required")
         
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.0-flash')
+        self.model = get_model()
         
         print("💬 Google ADK Chat Advisor Agent initialized")
     
@@ -175,7 +175,13 @@ class ChatAdvisorAgent(Agent):
             if len(city_or_airport.strip()) <= 4 and city_or_airport.strip().isalpha():
                 return city_or_airport.strip().upper()
             
+            # Well-known cities resolve without a Gemini call
+            airport_code = resolve_airport_code(city_or_airport)
+            if airport_code:
+                return airport_code
+            
             # Use AI to convert city names to airport codes
+            record_llm_fallback('airport_code')
             prompt = f"""
             Convert the following city name or location to the most appropriate IATA airport code:
             Input: "{city_or_airport}"
@@ -222,35 +228,9 @@ class ChatAdvisorAgent(Agent):
             # Extract airline code from flight number
             flight_code = ''.join([c for c in flight_number if c.isalpha()]).upper()
             
-            # Common airline mappings
-            airline_mappings = {
-                'AA': 'American Airlines',
-                'DL': 'Delta Air Lines', 
-                'UA': 'United Airlines',
-                'WN': 'Southwest Airlines',
-                'B6': 'JetBlue Airways',
-                'AS': 'Alaska Airlines',
-                'NK': 'Spirit Airlines',
-                'F9': 'Frontier Airlines',
-                'G4': 'Allegiant Air',
-                'SY': 'Sun Country Airlines',
-                'AC': 'Air Canada',
-                'BA': 'British Airways',
-                'LH': 'Lufthansa',
-                'AF': 'Air France',
-                'KL': 'KLM',
-                'EK': 'Emirates',
-                'QR': 'Qatar Airways',
-                'TK': 'Turkish Airlines',
-                'SQ': 'Singapore Airlines',
-                'CX': 'Cathay Pacific',
-                'JL': 'Japan Airlines',
-                'NH': 'All Nippon Airways'
-            }
-            
             # If flight code matches known airline, use that
-            if flight_code in airline_mappings:
-                correct_airline = airline_mappings[flight_code]
+            if flight_code in AIRLINE_NAMES:
+                correct_airline = AIRLINE_NAMES[flight_code]
                 
                 # Check if user's airline name is significantly different
                 airline_lower = airline_name.lower()
@@ -276,33 +256,7 @@ class ChatAdvisorAgent(Agent):
             # Extract airline code from flight number
             flight_code = ''.join([c for c in flight_number if c.isalpha()]).upper()
             
-            # Common airline mappings
-            airline_mappings = {
-                'AA': 'American Airlines',
-                'DL': 'Delta Air Lines', 
-                'UA': 'United Airlines',
-                'WN': 'Southwest Airlines',
-                'B6': 'JetBlue Airways',
-                'AS': 'Alaska Airlines',
-                'NK': 'Spirit Airlines',
-                'F9': 'Frontier Airlines',
-                'G4': 'Allegiant Air',
-                'SY': 'Sun Country Airlines',
-                'AC': 'Air Canada',
-                'BA': 'British Airways',
-                'LH': 'Lufthansa',
-                'AF': 'Air France',
-                'KL': 'KLM',
-                'EK': 'Emirates',
-                'QR': 'Qatar Airways',
-                'TK': 'Turkish Airlines',
-                'SQ': 'Singapore Airlines',
-                'CX': 'Cathay Pacific',
-                'JL': 'Japan Airlines',
-                'NH': 'All Nippon Airways'
-            }
-            
-            return airline_mappings.get(flight_code, flight_code)
+            return AIRLINE_NAMES.get(flight_code, flight_code)
             
         except Exception as e:
             print(f"❌ CHAT ADVISOR: Flight code extraction failed: {e}")
@@ -313,34 +267,8 @@ class ChatAdvisorAgent(Agent):
         Get full airline name from airline code
         """
         try:
-            # Common airline mappings
-            airline_mappings = {
-                'AA': 'American Airlines',
-                'DL': 'Delta Air Lines', 
-                'UA': 'United Airlines',
-                'WN': 'Southwest Airlines',
-                'B6': 'JetBlue Airways',
-                'AS': 'Alaska Airlines',
-                'NK': 'Spirit Airlines',
-                'F9': 'Frontier Airlines',
-                'G4': 'Allegiant Air',
-                'SY': 'Sun Country Airlines',
-                'AC': 'Air Canada',
-                'BA': 'British Airways',
-                'LH': 'Lufthansa',
-                'AF': 'Air France',
-                'KL': 'KLM',
-                'EK': 'Emirates',
-                'QR': 'Qatar Airways',
-                'TK': 'Turkish Airlines',
-                'SQ': 'Singapore Airlines',
-                'CX': 'Cathay Pacific',
-                'JL': 'Japan Airlines',
-                'NH': 'All Nippon Airways'
-            }
-            
             # Return mapped airline name or the original code if not found
-            return airline_mappings.get(airline_code.upper(), airline_code)
+            return AIRLINE_NAMES.get(airline_code.upper(), airline_code)
             
         except Exception as e:
             print(f"❌ CHAT ADVISOR: Airline name mapping failed: {e}")
@@ -351,38 +279,12 @@ class ChatAdvisorAgent(Agent):
         Convert airline name back to airline code for BigQuery lookup
         """
         try:
-            # Reverse mapping from airline names to codes
-            name_to_code_mappings = {
-                'American Airlines': 'AA',
-                'Delta Air Lines': 'DL', 
-                'United Airlines': 'UA',
-                'Southwest Airlines': 'WN',
-                'JetBlue Airways': 'B6',
-                'Alaska Airlines': 'AS',
-                'Spirit Airlines': 'NK',
-                'Frontier Airlines': 'F9',
-                'Allegiant Air': 'G4',
-                'Sun Country Airlines': 'SY',
-                'Air Canada': 'AC',
-                'British Airways': 'BA',
-                'Lufthansa': 'LH',
-                'Air France': 'AF',
-                'KLM': 'KL',
-                'Emirates': 'EK',
-                'Qatar Airways': 'QR',
-                'Turkish Airlines': 'TK',
-                'Singapore Airlines': 'SQ',
-                'Cathay Pacific': 'CX',
-                'Japan Airlines': 'JL',
-                'All Nippon Airways': 'NH'
-            }
-            
             # Check if it's already a code (2-3 letters)
             if len(airline_name) <= 3 and airline_name.isalpha():
                 return airline_name.upper()
             
             # Convert name to code
-            airline_code = name_to_code_mappings.get(airline_name, airline_name)
+            airline_code = AIRLINE_CODES.get(airline_name, airline_name)
             print(f"🔄 CHAT ADVISOR: Converted airline name '{airline_name}' to code '{airline_code}'")
             return airline_code
             
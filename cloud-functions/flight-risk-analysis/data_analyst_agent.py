@@ -7,7 +7,6 @@ import os
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
 import requests
-from google.cloud import bigquery
 import google.generativeai as genai
 
 # Import Google ADK - REAL IMPLEMENTATION ONLY
@@ -15,10 +14,10 @@ from google.adk.agents import Agent
 from google.adk.tools import FunctionTool
 print("✅ Data Analyst Agent: Using real Google ADK")
 
-# Import Google ADK Sub-Agents
-from airport_complexity_agent import AirportComplexityAgent
-from weather_impact_agent import WeatherImpactAgent
-from layover_analysis_agent import LayoverAnalysisAgent
+# Google ADK Sub-Agents and the BigQuery client are shared through the lazy agent registry
+import agent_registry
+from async_support import http_get_step, run_steps
+from query_executor import query_executor
 
 class DataAnalystAgent:
     """
@@ -34,35 +33,35 @@ class DataAnalystAgent:
         if not self.serpapi_key:
             raise ValueError("SERPAPI_API_KEY environment variable is required")
         
-        # Initialize BigQuery client
-        try:
-            self.bq_client = bigquery.Client()
-            self.bq_available = True  # FIXED: Set bq_available to True when successful
-            print("🔍 Data Analyst Agent: BigQuery client initialized")
-        except Exception as e:
-            print(f"❌ Data Analyst Agent: BigQuery init failed: {e}")
-            self.bq_client = None
-            self.bq_available = False  # FIXED: Set bq_available to False when failed
+        # Sub-agents are shared registry proxies, built the first time they are used
+        self.airport_complexity_agent = agent_registry.airport_complexity_agent
+        self.weather_impact_agent = agent_registry.weather_impact_agent
+        self.layover_analysis_agent = agent_registry.layover_analysis_agent
         
-        # Initialize Google ADK Sub-Agents
+        print("📊 Google ADK Data Analyst Agent initialized")
+    
+    @property
+    def bq_client(self):
+        """Shared BigQuery client, created on first BigQuery query"""
         try:
-            self.airport_complexity_agent = AirportComplexityAgent()
-            self.weather_impact_agent = WeatherImpactAgent()
-            self.layover_analysis_agent = LayoverAnalysisAgent()
-            print("📊 Data Analyst Agent: Google ADK sub-agents initialized")
+            return agent_registry.get_bigquery_client()
         except Exception as e:
-            print(f"❌ Data Analyst Agent: Failed to initialize ADK sub-agents: {e}")
-            self.airport_complexity_agent = None
-            self.weather_impact_agent = None
-            self.layover_analysis_agent = None
-        
-        print("📊 Google ADK Data Analyst Agent initialized")
+            print(f"❌ Data Analyst Agent: BigQuery init failed: {e}")
+            return None
+    
+    @property
+    def bq_available(self):
+        """True when the shared BigQuery client can be created"""
+        return self.bq_client is not None
     
     def analyze_route(self, origin, destination, date, connections=None):
         """Analyze route using SerpAPI"""
+        return run_steps(self._analyze_route_steps(origin, destination, date, connections))
+    
+    def _analyze_route_steps(self, origin, destination, date, connections=None):
         try:
             # Call SerpAPI to get real flight data
-            flight_data = self._call_serpapi_flights(origin, destination, date)
+            flight_data = yield from self._call_serpapi_flights_steps(origin, destination, date)
             
             if not flight_data:
                 print(f"❌ Data Analyst Agent: No SerpAPI data available for {origin} → {destination}")
@@ -138,8 +137,7 @@ class DataAnalystAgent:
             print(f"📊 DATA ANALYST AGENT: Executing unified BigQuery query")
             print(f"🔍 DATA ANALYST AGENT: Query: {query}")
             
-            query_job = self.bq_client.query(query)
-            results = query_job.result()
+            results = query_executor.run(self.bq_client, query, call_site='data_analyst_agent.flight_data')
             
             # Convert results to list
             flight_data_list = []
@@ -263,6 +261,9 @@ class DataAnalystAgent:
     
     def _call_serpapi_flights(self, origin, destination, date):
         """Call SerpAPI to get flight data"""
+        return run_steps(self._call_serpapi_flights_steps(origin, destination, date))
+    
+    def _call_serpapi_flights_steps(self, origin, destination, date):
         print("="*100)
         print("🌤️ SERPAPI CALL FOR CURRENT WEATHER ANALYSIS - ROUTE SEARCH")
         print("="*100)
@@ -294,7 +295,7 @@ class DataAnalystAgent:
                     print(f"📤 SERPAPI PARAM: {key} = [HIDDEN]")
             print("🚨" * 50)
             
-            response = requests.get('https://serpapi.com/search', params=params, timeout=30)
+            response = yield http_get_step('https://serpapi.com/search', params=params, timeout=30)
             
             print("🚨" * 50)
             print("SERPAPI RESPONSE RECEIVED:")
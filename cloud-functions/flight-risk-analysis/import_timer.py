@@ -0,0 +1,88 @@
+"""
+Import Timer for Flight Risk Analysis
+Opt-in per-module import cost report (IMPORT_TIME_REPORT=1) for diagnosing cold starts
+"""
+import builtins
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, List
+
+IMPORT_TIME_REPORT = os.environ.get("IMPORT_TIME_REPORT", "").lower() in ("1", "true", "yes")
+
+# Number of modules listed per report, slowest first
+IMPORT_TIME_REPORT_TOP = int(os.environ.get("IMPORT_TIME_REPORT_TOP", "25"))
+
+_original_import = builtins.__import__
+_local = threading.local()
+_lock = threading.Lock()
+_records: List[Dict[str, Any]] = []
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    # Only first-time absolute imports cost anything worth reporting
+    if level or name in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+
+    stack.append(0.0)
+    start = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        elapsed = time.perf_counter() - start
+        nested = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        with _lock:
+            _records.append({
+                'module': name,
+                'cumulative': elapsed,
+                'self': max(0.0, elapsed - nested),
+                'depth': len(stack)
+            })
+
+
+def start_import_timer() -> bool:
+    """
+    Start recording module import times when IMPORT_TIME_REPORT is enabled.
+
+    Returns:
+        True if the timer is active
+    """
+    if not IMPORT_TIME_REPORT:
+        return False
+    if builtins.__import__ is not _timed_import:
+        builtins.__import__ = _timed_import
+    return True
+
+
+def print_import_report(title: str) -> float:
+    """
+    Print and reset the imports recorded since the previous report.
+
+    Args:
+        title: What the recorded imports were for, e.g. "main.py import" or "agent 'risk_assessment' build"
+
+    Returns:
+        Total top-level import time in seconds covered by the report
+    """
+    if builtins.__import__ is not _timed_import:
+        return 0.0
+
+    with _lock:
+        records = list(_records)
+        _records.clear()
+
+    if not records:
+        return 0.0
+
+    total = sum(record['cumulative'] for record in records if record['depth'] == 0)
+    print(f"📦 IMPORT TIME REPORT [{title}]: {len(records)} modules imported in {total:.3f} seconds")
+    for record in sorted(records, key=lambda r: r['cumulative'], reverse=True)[:IMPORT_TIME_REPORT_TOP]:
+        print(f"📦   {record['cumulative']:8.3f}s total {record['self']:8.3f}s self  {'  ' * record['depth']}{record['module']}")
+    return total
@@ -1,11 +1,13 @@
-white_circle_360x360.svg"""
+"""
 Insurance Recommendation Agent
 Generates personalized, natural insurance recommendations based on flight risk analysis.
 """
 
-import google.generativeai as genai
+from llm_gateway import get_model
+from llm_batch import generate_batched, generate_fallbacks
+from async_support import llm_step, run_steps
 import os
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 
 class InsuranceRecommendationAgent:
     def __init__(self):
@@ -19,11 +21,10 @@ class InsuranceRecommendationAgent:
             print("❌ Insurance Recommendation Agent: No Google API key available")
             return
         
-        genai.configure(api_key=api_key)
-        self.gemini_model = genai.GenerativeModel('gemini-2.0-flash')
+        self.gemini_model = get_model()
         print("🛡️ Insurance Recommendation Agent: Gemini model initialized")
     
-    def generate_insurance_recommendation(self, flight_data: Dict[str, Any], risk_analysis: Dict[str, Any], weather_analysis: Dict[str, Any]) -> Dict[str, Any]:
+    def generate_insurance_recommendation(self, flight_data: Dict[str, Any], risk_analysis: Dict[str, Any], weather_analysis: Dict[str, Any], deadline=None) -> Dict[str, Any]:
         """
         Generate a personalized insurance recommendation based on comprehensive flight analysis.
         
@@ -31,14 +32,21 @@ class InsuranceRecommendationAgent:
             flight_data: Dictionary containing flight information from BigQuery/SerpAPI
             risk_analysis: Dictionary containing risk assessment from RiskAssessmentAgent
             weather_analysis: Dictionary containing weather analysis from WeatherIntelligenceAgent
+            deadline: Optional RequestDeadline; the fallback recommendation is used when too little budget is left
             
         Returns:
             Dictionary with AI-generated insurance recommendation
         """
+        return run_steps(self.generate_insurance_recommendation_steps(flight_data, risk_analysis, weather_analysis, deadline))
+    
+    def generate_insurance_recommendation_steps(self, flight_data: Dict[str, Any], risk_analysis: Dict[str, Any], weather_analysis: Dict[str, Any], deadline=None):
         if not self.gemini_model:
             print("❌ Insurance Recommendation Agent: Model not initialized")
             return self._get_fallback_recommendation(risk_analysis)
         
+        if deadline is not None and not deadline.allows('insurance_recommendation'):
+            return self._get_fallback_recommendation(risk_analysis)
+        
         try:
             print(f"🛡️ Insurance Agent: Starting recommendation generation...")
             
@@ -52,15 +60,10 @@ class InsuranceRecommendationAgent:
             overall_risk_score = risk_analysis.get('overall_risk_score', 50)
             
             # Determine recommendation type based on risk analysis
-            if overall_risk_level == 'low' and overall_risk_score < 30:
-                recommendation_type = 'skip_insurance'
-            elif overall_risk_level == 'high' or overall_risk_score > 70:
-                recommendation_type = 'strongly_recommend'
-            else:
-                recommendation_type = 'consider_insurance'
+            recommendation_type = self._get_recommendation_type(overall_risk_level, overall_risk_score)
             
             # Generate natural language recommendation
-            recommendation = self._generate_natural_recommendation(context, recommendation_type, overall_risk_score)
+            recommendation = yield from self._generate_natural_recommendation_steps(context, recommendation_type, overall_risk_score)
             
             print(f"🛡️ Insurance Agent: Recommendation generated ({len(recommendation)} chars)")
             print(f"🛡️ Insurance Agent: Type: {recommendation_type}, Risk Score: {overall_risk_score}")
@@ -285,18 +288,13 @@ class InsuranceRecommendationAgent:
         
         return "\n".join(context_parts)
     
-    def _generate_natural_recommendation(self, context: str, recommendation_type: str, risk_score: int) -> str:
+    def _generate_natural_recommendation_steps(self, context: str, recommendation_type: str, risk_score: int):
         """Generate a natural, conversational insurance recommendation based on risk analysis."""
         
         print(f"🛡️ Insurance Agent: Generating {recommendation_type} recommendation...")
         
         # Tailor the prompt based on recommendation type
-        if recommendation_type == 'skip_insurance':
-            decision_guidance = "explain why travel insurance is NOT necessary for this low-risk flight and that they should save their money"
-        elif recommendation_type == 'strongly_recommend':
-            decision_guidance = "strongly recommend travel insurance due to the high-risk factors and explain why the cost is justified given the risks"
-        else:  # consider_insurance
-            decision_guidance = "suggest considering travel insurance due to moderate risk factors, presenting both the benefits and the cost consideration"
+        decision_guidance = self._get_decision_guidance(recommendation_type)
         
         prompt = f"""
         You are an experienced travel insurance advisor providing concise, honest advice. Based on this flight analysis, {decision_guidance}:
@@ -318,16 +316,12 @@ class InsuranceRecommendationAgent:
         
         try:
             print(f"🛡️ Insurance Agent: Calling Gemini model...")
-            response = self.gemini_model.generate_content(prompt)
+            response = yield llm_step(self.gemini_model, prompt, call_site='insurance_recommendation_agent._generate_natural_recommendation')
             recommendation = response.text.strip()
             
             print(f"🛡️ Insurance Agent: Raw response received ({len(recommendation)} chars)")
             
-            # Clean up any markdown formatting
-            recommendation = recommendation.replace('**', '').replace('*', '')
-            
-            # Remove any quotation marks at the start/end
-            recommendation = recommendation.strip('"\'')
+            recommendation = self._clean_recommendation_text(recommendation)
             
             print(f"🛡️ Insurance Agent: Final recommendation ready")
             return recommendation
@@ -336,18 +330,107 @@ class InsuranceRecommendationAgent:
             print(f"❌ Insurance Recommendation Agent: Error generating content: {e}")
             return self._get_fallback_text(recommendation_type)
     
+    def generate_insurance_recommendations_batch(self, flights: Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]], weather_analysis: Dict[str, Any], deadline=None) -> Dict[str, Dict[str, Any]]:
+        """
+        Generate insurance recommendations for several flights with one batched Gemini prompt.
+        
+        Args:
+            flights: Flight id -> (flight_data, risk_analysis)
+            weather_analysis: Route weather analysis shared by the flights
+            deadline: Optional RequestDeadline; fallback recommendations are used when too little budget is left
+            
+        Returns:
+            Flight id -> recommendation in the same format as generate_insurance_recommendation.
+            Flights missing from (or invalid in) the batched answer get a per-flight recommendation.
+        """
+        if not flights:
+            return {}
+        
+        if not self.gemini_model or (deadline is not None and not deadline.allows('insurance_recommendation')):
+            return {flight_id: self._get_fallback_recommendation(risk_analysis) for flight_id, (_, risk_analysis) in flights.items()}
+        
+        plans = {}
+        contexts = {}
+        for flight_id, (flight_data, risk_analysis) in flights.items():
+            risk_level = risk_analysis.get('risk_level', 'medium')
+            risk_score = risk_analysis.get('overall_risk_score', 50)
+            recommendation_type = self._get_recommendation_type(risk_level, risk_score)
+            plans[flight_id] = (recommendation_type, risk_level, risk_score)
+            contexts[flight_id] = (
+                f"DECISION: {self._get_decision_guidance(recommendation_type)}\n"
+                f"Risk score: {risk_score}/100 (0-30=low, 31-70=medium, 71-100=high)\n"
+                f"{self._build_comprehensive_context(flight_data, risk_analysis, weather_analysis)}"
+            )
+        
+        batch_answers = generate_batched(
+            'insurance_recommendation',
+            contexts,
+            """
+            You are an experienced travel insurance advisor providing concise, honest advice for several flights.
+            For each flight, follow its DECISION line, based on its flight analysis.
+
+            REQUIREMENTS (for each flight):
+            1. **KEEP IT CONCISE**: Write a brief, focused response
+            2. **INCLUDE ALL KEY RISK FACTORS**: Mention specific connection times, weather conditions, airport complexity, and seasonal factors
+            3. **BE SPECIFIC**: Reference exact data points (risk scores, weather conditions, connection durations)
+            4. **GIVE CLEAR RECOMMENDATION**: State your insurance recommendation with brief reasoning
+            """,
+            '"recommendation": "concise, natural recommendation text"',
+            lambda answer: isinstance(answer.get('recommendation'), str) and len(answer['recommendation'].strip()) >= 40,
+            deadline=deadline
+        )
+        
+        fallback_calls = {}
+        for flight_id, (flight_data, risk_analysis) in flights.items():
+            if flight_id not in batch_answers:
+                print(f"🔁 Insurance Agent: Batched recommendation missing for flight {flight_id}, using per-flight prompt")
+                fallback_calls[flight_id] = (self.generate_insurance_recommendation, (flight_data, risk_analysis, weather_analysis, deadline))
+        recommendations = generate_fallbacks('insurance_recommendation', fallback_calls)
+        
+        for flight_id, answer in batch_answers.items():
+            recommendation_type, risk_level, risk_score = plans[flight_id]
+            recommendations[flight_id] = {
+                'success': True,
+                'recommendation': self._clean_recommendation_text(answer['recommendation']),
+                'recommendation_type': recommendation_type,
+                'risk_level': risk_level,
+                'risk_score': risk_score,
+                'confidence': 'high'
+            }
+        return recommendations
+    
+    def _get_recommendation_type(self, risk_level: str, risk_score: int) -> str:
+        """Map overall risk to skip_insurance, consider_insurance or strongly_recommend."""
+        if risk_level == 'low' and risk_score < 30:
+            return 'skip_insurance'
+        elif risk_level == 'high' or risk_score > 70:
+            return 'strongly_recommend'
+        return 'consider_insurance'
+    
+    def _get_decision_guidance(self, recommendation_type: str) -> str:
+        """Prompt instruction for the recommendation type."""
+        if recommendation_type == 'skip_insurance':
+            return "explain why travel insurance is NOT necessary for this low-risk flight and that they should save their money"
+        elif recommendation_type == 'strongly_recommend':
+            return "strongly recommend travel insurance due to the high-risk factors and explain why the cost is justified given the risks"
+        else:  # consider_insurance
+            return "suggest considering travel insurance due to moderate risk factors, presenting both the benefits and the cost consideration"
+    
+    def _clean_recommendation_text(self, recommendation: str) -> str:
+        """Strip markdown emphasis and surrounding quotes from a generated recommendation."""
+        # Clean up any markdown formatting
+        recommendation = recommendation.strip().replace('**', '').replace('*', '')
+        
+        # Remove any quotation marks at the start/end
+        return recommendation.strip('"\'')
+    
     def _get_fallback_recommendation(self, risk_analysis: Dict[str, Any]) -> Dict[str, Any]:
         """Provide a fallback recommendation if AI generation fails."""
         risk_level = risk_analysis.get('risk_level', 'medium') if isinstance(risk_analysis, dict) else 'medium'
         risk_score = risk_analysis.get('overall_risk_score', 50) if isinstance(risk_analysis, dict) else 50
         
         # Determine recommendation type for fallback
-        if risk_level == 'low' and risk_score < 30:
-            recommendation_type = 'skip_insurance'
-        elif risk_level == 'high' or risk_score > 70:
-            recommendation_type = 'strongly_recommend'
-        else:
-            recommendation_type = 'consider_insurance'
+        recommendation_type = self._get_recommendation_type(risk_level, risk_score)
         
         return {
             'success': False,
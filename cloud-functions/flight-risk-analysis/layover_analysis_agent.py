@@ -7,7 +7,11 @@ import json
 from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Any
 import re
-import google.generativeai as genai
+from llm_gateway import get_model
+from llm_cache import LLMCachePolicy
+
+# Connection procedures at an airport rarely change; bump the version when the prompt changes
+CONNECTION_INSIGHTS_CACHE = LLMCachePolicy('layover_analysis_agent.get_airport_connection_insights', version='v1', ttl_seconds=7 * 24 * 3600)
 
 class LayoverAnalysisAgent:
     """
@@ -22,8 +26,7 @@ class LayoverAnalysisAgent:
             if not api_key:
                 raise ValueError("GOOGLE_API_KEY environment variable is required")
             
-            genai.configure(api_key=api_key)
-            self.gemini_model = genai.GenerativeModel('gemini-2.0-flash')
+            self.gemini_model = get_model()
             print("🔄 Layover Analysis Agent: AI model initialized")
         except Exception as e:
             print(f"❌ Layover Analysis Agent: Failed to initialize AI model: {e}")
@@ -327,7 +330,9 @@ class LayoverAnalysisAgent:
             Format as JSON with specific, actionable information.
             """
             
-            response = self.gemini_model.generate_content(prompt)
+            response = self.gemini_model.generate_content(
+                prompt, cache=CONNECTION_INSIGHTS_CACHE, cache_inputs={'airport_code': airport_code}
+            )
             ai_response = response.text.strip()
             
             if ai_response.startswith('```json'):
@@ -0,0 +1,127 @@
+"""
+Batched LLM Prompts for Flight Risk Analysis
+One Gemini prompt for many flights of the same stage, answered as a JSON array keyed by flight id
+"""
+import json
+import os
+from typing import Any, Callable, Dict, Tuple
+
+from llm_gateway import get_model
+from worker_pools import get_pool, iter_windowed
+
+# Flights packed into one prompt; larger batches are split into several prompts
+LLM_BATCH_MAX_ITEMS = int(os.environ.get("LLM_BATCH_MAX_ITEMS", "10"))
+
+# Per-flight fallback prompts run at once for the flights a batched answer left out
+LLM_BATCH_FALLBACK_MAX_WORKERS = int(os.environ.get("LLM_BATCH_FALLBACK_MAX_WORKERS", "4"))
+
+# Batched answers are several times longer than a single flight's answer
+BATCH_GENERATION_CONFIG = {
+    'temperature': 0.1,
+    'top_p': 0.8,
+    'top_k': 10,
+    'max_output_tokens': 8192,
+}
+
+
+def generate_batched(stage: str, items: Dict[str, str], instructions: str, item_fields: str,
+                     validate: Callable[[Dict[str, Any]], bool], deadline=None) -> Dict[str, Dict[str, Any]]:
+    """
+    Ask Gemini for one stage's output for many flights at once.
+
+    Generalizes the approach of LayoverAnalysisAgent.analyze_batch_layover_feasibility:
+    each item's context is listed under its id, and the model returns one JSON
+    object per item carrying that id. Entries that are missing, unknown or fail
+    ``validate`` are left out of the result, so the caller can fall back to its
+    per-flight prompt for exactly those items.
+
+    Args:
+        stage: Stage name, used in logs and as the gateway call site (llm_batch.<stage>)
+        items: Item id -> context text for that item
+        instructions: Task description shared by every item
+        item_fields: JSON fields of one answer object, excluding "id" (shown to the model as the format)
+        validate: Returns True if an answer object is usable
+        deadline: Optional RequestDeadline passed to the gateway
+
+    Returns:
+        Item id -> validated answer object, for the items that were answered correctly
+    """
+    results = {}
+    item_ids = list(items.keys())
+
+    for start in range(0, len(item_ids), max(1, LLM_BATCH_MAX_ITEMS)):
+        chunk = {item_id: items[item_id] for item_id in item_ids[start:start + max(1, LLM_BATCH_MAX_ITEMS)]}
+        results.update(_generate_chunk(stage, chunk, instructions, item_fields, validate, deadline))
+
+    print(f"📦 LLM BATCH: {stage} - {len(results)}/{len(items)} flights answered by batched prompts")
+    return results
+
+
+def generate_fallbacks(stage: str, calls: Dict[str, Tuple[Callable[..., Any], tuple]]) -> Dict[str, Any]:
+    """
+    Run the per-flight fallback prompts of the flights a batched answer left out, concurrently on the shared LLM pool.
+
+    Args:
+        stage: Stage name, used in logs
+        calls: Item id -> (per-flight function, its arguments)
+
+    Returns:
+        Item id -> that function's result
+    """
+    if not calls:
+        return {}
+    print(f"🔁 LLM BATCH: {stage} - running per-flight prompts for {len(calls)} flights")
+    max_workers = max(1, min(LLM_BATCH_FALLBACK_MAX_WORKERS, len(calls)))
+    tasks = ((item_id, func, args) for item_id, (func, args) in calls.items())
+    return {item_id: future.result() for item_id, future in iter_windowed(get_pool('llm'), max_workers, tasks)}
+
+
+def _generate_chunk(stage: str, items: Dict[str, str], instructions: str, item_fields: str,
+                    validate: Callable[[Dict[str, Any]], bool], deadline) -> Dict[str, Dict[str, Any]]:
+    item_sections = "\n".join(
+        f"=== FLIGHT ID: {item_id} ===\n{context.strip()}\n" for item_id, context in items.items()
+    )
+    prompt = f"""
+        {instructions.strip()}
+
+        There are {len(items)} flights below. Each one starts with its FLIGHT ID.
+
+        {item_sections}
+
+        Respond with valid JSON only: an array with exactly one object per flight, each carrying its FLIGHT ID as "id":
+        [
+            {{"id": "<FLIGHT ID>", {item_fields}}}
+        ]
+        """
+
+    try:
+        response = get_model(BATCH_GENERATION_CONFIG).generate_content(prompt, call_site=f'llm_batch.{stage}', deadline=deadline)
+        ai_response = response.text.strip().replace('```json', '').replace('```', '').strip()
+
+        # Tolerate text around the array
+        if not ai_response.startswith('[') and '[' in ai_response:
+            ai_response = ai_response[ai_response.index('['):ai_response.rindex(']') + 1]
+        answers = json.loads(ai_response)
+    except Exception as e:
+        print(f"❌ LLM BATCH: {stage} batched prompt failed for {len(items)} flights: {e}")
+        return {}
+
+    # Some responses come back as an object keyed by id instead of an array
+    if isinstance(answers, dict):
+        answers = [{**answer, 'id': item_id} for item_id, answer in answers.items() if isinstance(answer, dict)]
+    if not isinstance(answers, list):
+        print(f"❌ LLM BATCH: {stage} batched response is not a JSON array")
+        return {}
+
+    valid = {}
+    for answer in answers:
+        if not isinstance(answer, dict):
+            continue
+        item_id = str(answer.get('id', ''))
+        if item_id in items and item_id not in valid:
+            try:
+                if validate(answer):
+                    valid[item_id] = answer
+            except Exception:
+                pass
+    return valid
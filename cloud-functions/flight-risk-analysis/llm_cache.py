@@ -0,0 +1,184 @@
+"""
+LLM Response Cache for Flight Risk Analysis
+Prompt-keyed Gemini response cache with an in-memory LRU tier and a persistent SQLite tier
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# Persistent tier location; point it at a mounted volume to keep entries across instances
+LLM_CACHE_PATH = os.environ.get("LLM_CACHE_PATH", "/tmp/flight_risk_llm_cache.sqlite3")
+
+# Set to 0 to keep only the in-memory tier
+LLM_CACHE_PERSISTENT = os.environ.get("LLM_CACHE_PERSISTENT", "1") == "1"
+
+# Entries kept in the in-memory LRU tier
+LLM_CACHE_MEMORY_ENTRIES = int(os.environ.get("LLM_CACHE_MEMORY_ENTRIES", "2048"))
+
+
+class LLMCachePolicy:
+    """
+    Caching rules for one prompt call site.
+
+    ``version`` is part of every key, so bumping it when the prompt template
+    (or the way its response is parsed) changes retires the old entries.
+    """
+
+    def __init__(self, call_site: str, version: str, ttl_seconds: int):
+        self.call_site = call_site
+        self.version = version
+        self.ttl_seconds = ttl_seconds
+
+
+class CachedResponse:
+    """Stand-in for a Gemini response served from the cache; call sites only read ``text``"""
+
+    cached = True
+    usage_metadata = None
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return ' '.join(value.split()).upper()
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+class LLMResponseCache:
+    """
+    Two-tier cache of Gemini response text.
+
+    Keys combine the call site, its prompt version, the generation config and
+    the normalized prompt inputs (whitespace collapsed, case folded), so
+    "chicago" and " Chicago " share an entry. Lookups try memory first, then
+    SQLite, and promote disk hits into memory. If the SQLite file cannot be
+    used the cache keeps working with the memory tier only.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, max_entries: int = LLM_CACHE_MEMORY_ENTRIES, persistent: bool = LLM_CACHE_PERSISTENT):
+        self.path = path
+        self.max_entries = max_entries
+        self.persistent = persistent
+        self._memory: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def make_key(self, policy: LLMCachePolicy, inputs: Dict[str, Any], generation_config: Dict[str, Any] = None) -> str:
+        payload = json.dumps({
+            'call_site': policy.call_site,
+            'version': policy.version,
+            'config': generation_config or {},
+            'inputs': _normalize(inputs)
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, policy: LLMCachePolicy, key: str) -> Optional[str]:
+        """Cached response text, or None on a miss or expired entry"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                text, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._count(policy.call_site, 'memory_hits')
+                    return text
+                del self._memory[key]
+
+        row = self._db_execute("SELECT text, expires_at FROM llm_cache WHERE key = ?", (key,), fetch=True)
+        if row and row[1] > now:
+            self._remember(key, row[0], row[1])
+            with self._lock:
+                self._count(policy.call_site, 'disk_hits')
+            return row[0]
+
+        with self._lock:
+            self._count(policy.call_site, 'misses')
+        return None
+
+    def put(self, policy: LLMCachePolicy, key: str, text: str):
+        """Store response text in both tiers for the policy's TTL"""
+        if not text:
+            return
+        expires_at = time.time() + policy.ttl_seconds
+        self._remember(key, text, expires_at)
+        self._db_execute(
+            "INSERT OR REPLACE INTO llm_cache (key, call_site, text, expires_at) VALUES (?, ?, ?, ?)",
+            (key, policy.call_site, text, expires_at)
+        )
+        with self._lock:
+            self._count(policy.call_site, 'stores')
+
+    def invalidate(self, policy: LLMCachePolicy, inputs: Dict[str, Any], generation_config: Dict[str, Any] = None):
+        """Drop an entry whose response turned out to be unusable (e.g. unparseable JSON)"""
+        key = self.make_key(policy, inputs, generation_config)
+        with self._lock:
+            self._memory.pop(key, None)
+            self._count(policy.call_site, 'invalidations')
+        self._db_execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Hits, misses and hit ratio per call site"""
+        with self._lock:
+            result = {}
+            for call_site, counts in self.stats.items():
+                hits = counts.get('memory_hits', 0) + counts.get('disk_hits', 0)
+                lookups = hits + counts.get('misses', 0)
+                result[call_site] = {**counts, 'hit_ratio': hits / lookups if lookups else 0.0}
+            return {
+                'memory_entries': len(self._memory),
+                'persistent': self._db is not None,
+                'call_sites': result
+            }
+
+    def _count(self, call_site: str, counter: str):
+        # Caller holds self._lock
+        counts = self.stats.setdefault(call_site, {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0, 'invalidations': 0})
+        counts[counter] += 1
+
+    def _remember(self, key: str, text: str, expires_at: float):
+        with self._lock:
+            self._memory[key] = (text, expires_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _db_execute(self, sql: str, params: tuple, fetch: bool = False):
+        if not self.persistent:
+            return None
+        with self._db_lock:
+            try:
+                if self._db is None:
+                    self._db = sqlite3.connect(self.path, check_same_thread=False)
+                    self._db.execute(
+                        "CREATE TABLE IF NOT EXISTS llm_cache "
+                        "(key TEXT PRIMARY KEY, call_site TEXT, text TEXT, expires_at REAL)"
+                    )
+                    self._db.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+                    self._db.commit()
+                    print(f"💾 LLM CACHE: Persistent tier opened at {self.path}")
+                cursor = self._db.execute(sql, params)
+                if fetch:
+                    return cursor.fetchone()
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"❌ LLM CACHE: Persistent tier disabled after SQLite error: {e}")
+                self.persistent = False
+                self._db = None
+            return None
+
+
+llm_response_cache = LLMResponseCache()
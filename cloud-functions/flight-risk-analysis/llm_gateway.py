@@ -0,0 +1,346 @@
+"""
+LLM Gateway for Flight Risk Analysis
+Single path to Gemini: shared models, global concurrency and rate limits, timeouts and per-call-site metrics
+"""
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict
+
+from llm_cache import LLMCachePolicy, CachedResponse, llm_response_cache
+from async_support import run_blocking
+
+GEMINI_MODEL_NAME = os.environ.get("GEMINI_MODEL_NAME", "gemini-2.0-flash")
+
+# Gemini calls in flight at once across the whole process
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "16"))
+
+# Gemini calls started per minute across the whole process (0 disables the limit)
+LLM_RATE_LIMIT_PER_MINUTE = int(os.environ.get("LLM_RATE_LIMIT_PER_MINUTE", "1000"))
+
+# Seconds a single call may take, including the time spent waiting for a slot
+LLM_CALL_TIMEOUT = float(os.environ.get("LLM_CALL_TIMEOUT", "30"))
+
+# Calls slower than this are logged
+LLM_SLOW_CALL_SECONDS = float(os.environ.get("LLM_SLOW_CALL_SECONDS", "10"))
+
+
+class LLMGatewayTimeout(TimeoutError):
+    """Raised when a call cannot get a slot or a response within its timeout"""
+
+
+class _RateLimiter:
+    """Token bucket allowing ``per_minute`` calls per minute with bursts up to the same size"""
+
+    def __init__(self, per_minute: int):
+        self.rate = per_minute / 60.0
+        self.capacity = float(max(1, per_minute))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: float) -> bool:
+        give_up_at = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if now + wait > give_up_at:
+                return False
+            time.sleep(wait)
+
+
+_configured = False
+_configure_lock = threading.Lock()
+_models: Dict[str, 'GatewayModel'] = {}
+_models_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(max(1, LLM_MAX_CONCURRENCY))
+_rate_limiter = _RateLimiter(LLM_RATE_LIMIT_PER_MINUTE) if LLM_RATE_LIMIT_PER_MINUTE > 0 else None
+_stats_lock = threading.Lock()
+_call_site_stats: Dict[str, Dict[str, Any]] = {}
+_in_flight = 0
+
+
+def _ensure_configured():
+    global _configured
+    if _configured:
+        return
+    with _configure_lock:
+        if not _configured:
+            api_key = os.environ.get("GOOGLE_API_KEY")
+            if not api_key:
+                raise ValueError("GOOGLE_API_KEY environment variable is required")
+            import google.generativeai as genai
+            genai.configure(api_key=api_key)
+            _configured = True
+
+
+class GatewayModel:
+    """
+    Shared Gemini model for one generation config.
+
+    Drop-in for ``genai.GenerativeModel`` at the call sites: ``generate_content``
+    goes through the gateway's concurrency limit, rate limit and timeout, and is
+    recorded under the calling ``module.function`` unless ``call_site`` is given.
+    """
+
+    def __init__(self, model, generation_config: Dict[str, Any] = None):
+        self._model = model
+        self.generation_config = dict(generation_config or {})
+
+    def generate_content(self, prompt, call_site: str = None, timeout: float = None, deadline=None,
+                         cache: LLMCachePolicy = None, cache_inputs: Dict[str, Any] = None):
+        """
+        Generate content through the gateway.
+
+        Args:
+            prompt: Prompt passed to Gemini
+            call_site: Metrics label; defaults to the cache policy's call site, then the caller's module.function
+            timeout: Seconds for this call; defaults to LLM_CALL_TIMEOUT
+            deadline: Optional RequestDeadline; the timeout never exceeds its remaining budget
+            cache: Optional LLMCachePolicy; the response text is served from / stored in the LLM response cache
+            cache_inputs: Values the prompt was built from, used as the cache key instead of the prompt text
+
+        Returns:
+            The Gemini response, or a CachedResponse with the same ``text`` on a cache hit
+
+        Raises:
+            LLMGatewayTimeout: No slot or response within the timeout
+        """
+        call_site = call_site or _default_call_site(cache)
+        key, cached = self._cache_lookup(prompt, cache, cache_inputs)
+        if cached is not None:
+            return cached
+
+        response = _generate(self._model, prompt, call_site, timeout, deadline)
+        self._cache_store(cache, key, response)
+        return response
+
+    async def generate_content_async(self, prompt, call_site: str = None, timeout: float = None, deadline=None,
+                                     cache: LLMCachePolicy = None, cache_inputs: Dict[str, Any] = None):
+        """Async variant of generate_content, sharing its limits, cache and metrics"""
+        call_site = call_site or _default_call_site(cache)
+        if cache is None:
+            return await _generate_async(self._model, prompt, call_site, timeout, deadline)
+
+        # The response cache has a SQLite tier, so lookups and stores run off the loop
+        key, cached = await run_blocking(self._cache_lookup, prompt, cache, cache_inputs)
+        if cached is not None:
+            return cached
+
+        response = await _generate_async(self._model, prompt, call_site, timeout, deadline)
+        await run_blocking(self._cache_store, cache, key, response)
+        return response
+
+    def _cache_lookup(self, prompt, cache: LLMCachePolicy, cache_inputs: Dict[str, Any]):
+        if cache is None:
+            return None, None
+        key = llm_response_cache.make_key(cache, cache_inputs if cache_inputs is not None else {'prompt': prompt}, self.generation_config)
+        text = llm_response_cache.get(cache, key)
+        return key, CachedResponse(text) if text is not None else None
+
+    def _cache_store(self, cache: LLMCachePolicy, key: str, response):
+        if cache is None:
+            return
+        try:
+            llm_response_cache.put(cache, key, response.text)
+        except ValueError:
+            # Blocked or empty responses have no text; leave them uncached
+            pass
+
+
+def _default_call_site(cache: LLMCachePolicy = None) -> str:
+    if cache is not None:
+        return cache.call_site
+    # Two frames up: past generate_content(_async) to the code calling it
+    caller = sys._getframe(2)
+    return f"{caller.f_globals.get('__name__', '?')}.{caller.f_code.co_name}"
+
+
+def get_model(generation_config: Dict[str, Any] = None) -> GatewayModel:
+    """
+    Get the shared model for a generation config, creating it on first use.
+
+    Args:
+        generation_config: Gemini generation settings (temperature, top_p, top_k, max_output_tokens...)
+
+    Returns:
+        GatewayModel shared by every caller using the same config
+    """
+    key = json.dumps(generation_config or {}, sort_keys=True)
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    with _models_lock:
+        if key not in _models:
+            _ensure_configured()
+            import google.generativeai as genai
+            _models[key] = GatewayModel(
+                genai.GenerativeModel(GEMINI_MODEL_NAME, generation_config=generation_config or None),
+                generation_config
+            )
+            print(f"🤖 LLM GATEWAY: Created shared {GEMINI_MODEL_NAME} model for config {key}")
+        return _models[key]
+
+
+def _admit(call_site: str, stats: Dict[str, Any], timeout: float, deadline):
+    """
+    Wait for a concurrency slot and a rate-limit token.
+
+    Returns:
+        (seconds waited, seconds left for the call); the caller must release the slot
+    """
+    timeout = LLM_CALL_TIMEOUT if timeout is None else timeout
+    if deadline is not None:
+        timeout = min(timeout, deadline.remaining())
+    start = time.time()
+
+    if timeout <= 0 or not _slots.acquire(timeout=timeout):
+        _record_rejection(stats)
+        raise LLMGatewayTimeout(f"LLM gateway: no slot for {call_site} within {timeout:.1f}s")
+    try:
+        if _rate_limiter is not None and not _rate_limiter.acquire(max(0.0, timeout - (time.time() - start))):
+            _record_rejection(stats)
+            raise LLMGatewayTimeout(f"LLM gateway: rate limit reached for {call_site}")
+
+        waited = time.time() - start
+        remaining = timeout - waited
+        if remaining <= 0:
+            _record_rejection(stats)
+            raise LLMGatewayTimeout(f"LLM gateway: {call_site} timed out waiting for a slot")
+        return waited, remaining
+    except Exception:
+        _slots.release()
+        raise
+
+
+def _track_in_flight(delta: int):
+    global _in_flight
+    with _stats_lock:
+        _in_flight += delta
+
+
+def _generate(model, prompt, call_site: str, timeout: float, deadline):
+    stats = _site_stats(call_site)
+    waited, remaining = _admit(call_site, stats, timeout, deadline)
+    try:
+        _track_in_flight(1)
+        call_start = time.time()
+        try:
+            response = model.generate_content(prompt, request_options={'timeout': remaining})
+        except Exception as e:
+            _record_call(call_site, stats, waited, time.time() - call_start, None, e)
+            raise
+        finally:
+            _track_in_flight(-1)
+
+        _record_call(call_site, stats, waited, time.time() - call_start, response, None)
+        return response
+    finally:
+        _slots.release()
+
+
+async def _generate_async(model, prompt, call_site: str, timeout: float, deadline):
+    stats = _site_stats(call_site)
+    # Waiting for a slot blocks, so it happens on an offload thread; the Gemini call itself does not hold a thread
+    admission = asyncio.ensure_future(run_blocking(_admit, call_site, stats, timeout, deadline))
+    try:
+        waited, remaining = await asyncio.shield(admission)
+    except asyncio.CancelledError:
+        # The offload thread can still take a slot after this task is cancelled; give it back once it has
+        admission.add_done_callback(_release_admitted_slot)
+        raise
+    try:
+        _track_in_flight(1)
+        call_start = time.time()
+        try:
+            response = await model.generate_content_async(prompt, request_options={'timeout': remaining})
+        except Exception as e:
+            _record_call(call_site, stats, waited, time.time() - call_start, None, e)
+            raise
+        finally:
+            _track_in_flight(-1)
+
+        _record_call(call_site, stats, waited, time.time() - call_start, response, None)
+        return response
+    finally:
+        _slots.release()
+
+
+def _release_admitted_slot(admission: asyncio.Future):
+    if not admission.cancelled() and admission.exception() is None:
+        _slots.release()
+
+
+def _site_stats(call_site: str) -> Dict[str, Any]:
+    with _stats_lock:
+        stats = _call_site_stats.get(call_site)
+        if stats is None:
+            stats = _call_site_stats[call_site] = {
+                'calls': 0,
+                'errors': 0,
+                'timeouts': 0,
+                'rejected': 0,
+                'total_latency': 0.0,
+                'max_latency': 0.0,
+                'total_wait_time': 0.0,
+                'prompt_tokens': 0,
+                'response_tokens': 0
+            }
+        return stats
+
+
+def _record_rejection(stats: Dict[str, Any]):
+    with _stats_lock:
+        stats['rejected'] += 1
+
+
+def _record_call(call_site: str, stats: Dict[str, Any], waited: float, latency: float, response, error):
+    usage = getattr(response, 'usage_metadata', None) if response is not None else None
+    timed_out = error is not None and (isinstance(error, TimeoutError) or 'DeadlineExceeded' in type(error).__name__)
+
+    with _stats_lock:
+        stats['calls'] += 1
+        stats['total_latency'] += latency
+        stats['max_latency'] = max(stats['max_latency'], latency)
+        stats['total_wait_time'] += waited
+        if error is not None:
+            stats['errors'] += 1
+        if timed_out:
+            stats['timeouts'] += 1
+        if usage is not None:
+            stats['prompt_tokens'] += getattr(usage, 'prompt_token_count', 0) or 0
+            stats['response_tokens'] += getattr(usage, 'candidates_token_count', 0) or 0
+
+    if latency >= LLM_SLOW_CALL_SECONDS:
+        print(f"🐢 LLM GATEWAY: Slow Gemini call from {call_site} took {latency:.2f} seconds")
+
+
+def get_llm_stats() -> Dict[str, Any]:
+    """Gateway limits, current in-flight calls and metrics per call site, slowest total first"""
+    with _stats_lock:
+        call_sites = {
+            site: {
+                **stats,
+                'avg_latency': stats['total_latency'] / stats['calls'] if stats['calls'] else 0.0
+            }
+            for site, stats in sorted(_call_site_stats.items(), key=lambda item: item[1]['total_latency'], reverse=True)
+        }
+        in_flight = _in_flight
+    return {
+        'model': GEMINI_MODEL_NAME,
+        'max_concurrency': LLM_MAX_CONCURRENCY,
+        'rate_limit_per_minute': LLM_RATE_LIMIT_PER_MINUTE,
+        'call_timeout': LLM_CALL_TIMEOUT,
+        'in_flight': in_flight,
+        'call_sites': call_sites
+    }
@@ -0,0 +1,326 @@
+"""
+Local Flight Store for Flight Risk Analysis
+Memory-mapped NumPy columns of the BTS years, aggregated in-process as an alternative to BigQuery
+
+Selected with HISTORICAL_BACKEND=local; bigquery_tool only imports this
+module then, so NumPy stays off the default cold start. Each year is a
+directory of .npy column files; airline and airport codes are stored as
+integer codes into dictionaries shared by every year. Build the store offline from the yearly
+BTS files (CSV, gzip CSV or Parquet; needs pandas):
+    python local_flight_store.py --out /data/flight_store 2016.csv.gz 2017.csv.gz 2018.csv.gz
+
+The aggregate functions return rows with the same columns as the matching
+BigQuery queries in bigquery_tool, so the tool's response builders (and the
+get_flight_historical_performance / get_route_statistics /
+get_airline_on_time_rate contracts) are unchanged.
+"""
+import argparse
+import json
+import os
+import re
+import threading
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Directory holding dictionaries.json and one <year>/ directory of .npy columns per year
+LOCAL_FLIGHT_STORE_PATH = os.environ.get("LOCAL_FLIGHT_STORE_PATH", "/tmp/flight_store")
+
+# Stored columns and their on-disk dtypes; NaN stands for NULL in the float columns
+_CODE_COLUMNS = ['OP_CARRIER', 'ORIGIN', 'DEST', 'CANCELLATION_CODE']
+_COLUMN_DTYPES = {
+    'OP_CARRIER': np.int16,
+    'ORIGIN': np.int16,
+    'DEST': np.int16,
+    'CANCELLATION_CODE': np.int16,
+    'OP_CARRIER_FL_NUM': np.int32,
+    'CANCELLED': np.float32,
+    'DIVERTED': np.float32,
+    'DEP_DELAY': np.float32,
+    'ARR_DELAY': np.float32,
+    'CARRIER_DELAY': np.float32,
+    'WEATHER_DELAY': np.float32,
+    'NAS_DELAY': np.float32,
+    'SECURITY_DELAY': np.float32,
+    'LATE_AIRCRAFT_DELAY': np.float32,
+    'AIR_TIME': np.float32,
+    'DISTANCE': np.float32
+}
+
+_DELAY_CAUSES = [
+    ('CARRIER_DELAY', 'avg_carrier_delay'),
+    ('WEATHER_DELAY', 'avg_weather_delay'),
+    ('NAS_DELAY', 'avg_nas_delay'),
+    ('SECURITY_DELAY', 'avg_security_delay'),
+    ('LATE_AIRCRAFT_DELAY', 'avg_late_aircraft_delay')
+]
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def _positive_mean(values: np.ndarray, ndigits: int) -> float:
+    """AVG(CASE WHEN x IS NOT NULL AND x > 0 THEN x ELSE 0 END); comparisons with NaN are False, like NULL"""
+    if not len(values):
+        return 0.0
+    return round(float(np.where(values > 0, values, 0).mean(dtype=np.float64)), ndigits)
+
+
+def _null_as_zero(values: np.ndarray) -> np.ndarray:
+    return np.nan_to_num(values.astype(np.float64), nan=0.0)
+
+
+class LocalFlightStore:
+    """
+    Read-only columnar store of the yearly flight tables.
+
+    Columns are opened with mmap_mode='r', so the OS page cache holds them and
+    concurrent requests share the same pages; nothing is loaded until a
+    column is first read. Filters are vectorized comparisons on the integer
+    code columns, and only the matching rows are copied out for aggregation.
+    """
+
+    def __init__(self, path: str = LOCAL_FLIGHT_STORE_PATH):
+        self.path = path
+        with open(os.path.join(path, 'dictionaries.json')) as f:
+            self.dictionaries: Dict[str, List[str]] = json.load(f)
+        self._codes = {column: {value: code for code, value in enumerate(values)}
+                       for column, values in self.dictionaries.items()}
+        self.years = sorted(int(name) for name in os.listdir(path) if name.isdigit())
+        self._columns: Dict[Tuple[int, str], np.ndarray] = {}
+        self._lock = threading.Lock()
+        print(f"🗄️ LOCAL FLIGHT STORE: Opened {path} with years {self.years}")
+
+    def column(self, year: int, name: str) -> np.ndarray:
+        key = (year, name)
+        array = self._columns.get(key)
+        if array is None:
+            with self._lock:
+                array = self._columns.get(key)
+                if array is None:
+                    array = np.load(os.path.join(self.path, str(year), f"{name}.npy"), mmap_mode='r')
+                    self._columns[key] = array
+        return array
+
+    def code(self, column: str, value: str) -> Optional[int]:
+        """Integer code of a value in a code column, or None if it never occurs"""
+        return self._codes[column].get(value)
+
+    def select(self, years: List[int], columns: List[str], **filters: str) -> Dict[str, np.ndarray]:
+        """
+        Rows of the given years matching every filter (column=value), as arrays of the requested columns.
+
+        A filter value missing from the dictionaries matches nothing.
+        """
+        codes = {}
+        for column, value in filters.items():
+            code = self.code(column, value)
+            if code is None:
+                return {name: np.empty(0, dtype=_COLUMN_DTYPES[name]) for name in columns}
+            codes[column] = code
+
+        parts: Dict[str, List[np.ndarray]] = {name: [] for name in columns}
+        for year in years:
+            if year not in self.years:
+                continue
+            mask = None
+            for column, code in codes.items():
+                matches = self.column(year, column) == code
+                mask = matches if mask is None else mask & matches
+            for name in columns:
+                values = self.column(year, name)
+                parts[name].append(np.asarray(values[mask]) if mask is not None else np.asarray(values))
+        return {
+            name: np.concatenate(arrays) if arrays else np.empty(0, dtype=_COLUMN_DTYPES[name])
+            for name, arrays in parts.items()
+        }
+
+    def decode(self, column: str, code: int) -> str:
+        return self.dictionaries[column][int(code)]
+
+    def profile_rows(self, routes: List[Tuple[str, str, str]], years: List[int]) -> List[SimpleNamespace]:
+        """Rows of the historical profile query (airline + route aggregates), one per key with flights"""
+        rows = []
+        for airline_code, origin, destination in routes:
+            data = self.select(years, list(_COLUMN_DTYPES), OP_CARRIER=airline_code, ORIGIN=origin, DEST=destination)
+            total = len(data['OP_CARRIER'])
+            if not total:
+                continue
+            dep_delay, cancellation_code = data['DEP_DELAY'], data['CANCELLATION_CODE']
+            row = {
+                'airline_code': airline_code,
+                'origin_airport': origin,
+                'destination_airport': destination,
+                'total_flights': total,
+                'unique_flight_numbers': int(len(np.unique(data['OP_CARRIER_FL_NUM']))),
+                'cancelled_flights': int((data['CANCELLED'] == 1.0).sum()),
+                'diverted_flights': int((data['DIVERTED'] == 1.0).sum()),
+                'avg_departure_delay': _positive_mean(dep_delay, 1),
+                'avg_arrival_delay': _positive_mean(data['ARR_DELAY'], 1),
+                'delays_over_15min': int((dep_delay > 15).sum()),
+                'delays_over_1hour': int((dep_delay > 60).sum()),
+                'on_time_flights': int((dep_delay <= 15).sum()),
+                'delayed_flights': int((dep_delay > 15).sum()),
+                'severe_delays_over_1hour': int((dep_delay > 60).sum()),
+                'severe_delays_over_2hours': int((dep_delay > 120).sum()),
+                'avg_air_time': _positive_mean(data['AIR_TIME'], 0),
+                'avg_distance': _positive_mean(data['DISTANCE'], 0)
+            }
+            for column, field in _DELAY_CAUSES:
+                row[field] = _positive_mean(data[column], 1)
+            for letter, field in (('A', 'airline_cancellations'), ('B', 'weather_cancellations'),
+                                  ('C', 'nas_cancellations'), ('D', 'security_cancellations')):
+                code = self.code('CANCELLATION_CODE', letter)
+                row[field] = int((cancellation_code == code).sum()) if code is not None else 0
+            rows.append(SimpleNamespace(**row))
+        return rows
+
+    def route_statistics_rows(self, origin: str, destination: str, years: List[int]) -> List[SimpleNamespace]:
+        """Rows of the route statistics query: one per airline on the route, most flights first"""
+        columns = ['OP_CARRIER', 'CANCELLED', 'DIVERTED', 'DEP_DELAY', 'ARR_DELAY', 'AIR_TIME', 'DISTANCE'] + \
+            [column for column, _ in _DELAY_CAUSES]
+        data = self.select(years, columns, ORIGIN=origin, DEST=destination)
+        carriers, groups = np.unique(data['OP_CARRIER'], return_inverse=True)
+        counts = np.bincount(groups, minlength=len(carriers))
+
+        def group_sum(values: np.ndarray) -> np.ndarray:
+            return np.bincount(groups, weights=values, minlength=len(carriers))
+
+        def group_mean(values: np.ndarray) -> np.ndarray:
+            # AVG(CASE WHEN x IS NOT NULL THEN x ELSE 0 END)
+            return group_sum(_null_as_zero(values)) / counts
+
+        dep_delay = _null_as_zero(data['DEP_DELAY'])
+        dep_mean = group_sum(dep_delay) / counts
+        # STDDEV (sample) of the departure delay with NULL as 0
+        dep_var = (group_sum(dep_delay * dep_delay) - counts * dep_mean * dep_mean) / np.maximum(counts - 1, 1)
+        averages = {field: group_mean(data[column]) for column, field in _DELAY_CAUSES}
+        arr_mean, air_time, distance = group_mean(data['ARR_DELAY']), group_mean(data['AIR_TIME']), group_mean(data['DISTANCE'])
+        cancelled = group_sum((data['CANCELLED'] == 1.0).astype(np.float64))
+        diverted = group_sum((data['DIVERTED'] == 1.0).astype(np.float64))
+        over_15 = group_sum((data['DEP_DELAY'] > 15).astype(np.float64))
+        over_60 = group_sum((data['DEP_DELAY'] > 60).astype(np.float64))
+
+        rows = []
+        for i, carrier in enumerate(carriers):
+            rows.append(SimpleNamespace(
+                airline_code=self.decode('OP_CARRIER', carrier),
+                origin_airport=origin,
+                destination_airport=destination,
+                total_flights=int(counts[i]),
+                cancelled_flights=int(cancelled[i]),
+                diverted_flights=int(diverted[i]),
+                avg_departure_delay=round(float(dep_mean[i]), 2),
+                avg_arrival_delay=round(float(arr_mean[i]), 2),
+                std_departure_delay=round(float(np.sqrt(max(dep_var[i], 0.0))), 2) if counts[i] > 1 else None,
+                delays_over_15min=int(over_15[i]),
+                delays_over_1hour=int(over_60[i]),
+                avg_air_time=round(float(air_time[i]), 0),
+                avg_distance=round(float(distance[i]), 0),
+                **{field: round(float(values[i]), 2) for field, values in averages.items()}
+            ))
+        rows.sort(key=lambda row: row.total_flights, reverse=True)
+        return rows
+
+    def on_time_rows(self, airline_code: str, origin: Optional[str], destination: Optional[str], years: List[int]) -> List[SimpleNamespace]:
+        """Rows of the airline On-Time Rate query (route-specific when origin and destination are given)"""
+        columns = ['CANCELLED', 'DIVERTED', 'DEP_DELAY', 'ARR_DELAY'] + [column for column, _ in _DELAY_CAUSES]
+        filters = {'OP_CARRIER': airline_code}
+        if origin and destination:
+            filters.update(ORIGIN=origin, DEST=destination)
+        data = self.select(years, columns, **filters)
+        total = len(data['DEP_DELAY'])
+        if not total:
+            return []
+        dep_delay = data['DEP_DELAY']
+        row = {
+            'airline_code': airline_code,
+            'total_flights': total,
+            'cancelled_flights': int((data['CANCELLED'] == 1.0).sum()),
+            'diverted_flights': int((data['DIVERTED'] == 1.0).sum()),
+            'on_time_flights': int((dep_delay <= 15).sum()),
+            'delayed_flights': int((dep_delay > 15).sum()),
+            'avg_departure_delay': _positive_mean(dep_delay, 1),
+            'avg_arrival_delay': _positive_mean(data['ARR_DELAY'], 1),
+            'severe_delays_over_1hour': int((dep_delay > 60).sum()),
+            'severe_delays_over_2hours': int((dep_delay > 120).sum())
+        }
+        if origin and destination:
+            row.update(origin_airport=origin, destination_airport=destination)
+        for column, field in _DELAY_CAUSES:
+            row[field] = _positive_mean(data[column], 1)
+        return [SimpleNamespace(**row)]
+
+    def get_info(self) -> Dict[str, Any]:
+        return {
+            'path': self.path,
+            'years': self.years,
+            'airlines': len(self.dictionaries.get('OP_CARRIER', [])),
+            'airports': len(self.dictionaries.get('ORIGIN', [])),
+            'open_columns': len(self._columns)
+        }
+
+
+def get_local_flight_store() -> LocalFlightStore:
+    """Process-wide store, opened on first use"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = LocalFlightStore()
+    return _store
+
+
+def build_local_store(source_files: List[str], out_path: str):
+    """Convert yearly BTS files into the store layout (one <year>/ directory of .npy columns per file)"""
+    import pandas as pd
+
+    frames = {}
+    for source_file in source_files:
+        match = re.search(r"(20\d\d)", os.path.basename(source_file))
+        if not match:
+            raise ValueError(f"Cannot tell the year of {source_file}")
+        columns = list(_COLUMN_DTYPES)
+        if source_file.lower().endswith('.parquet'):
+            frame = pd.read_parquet(source_file, columns=columns)
+        else:
+            frame = pd.read_csv(source_file, usecols=columns, dtype={column: 'string' for column in _CODE_COLUMNS})
+        frames[int(match.group(1))] = frame
+        print(f"📥 LOCAL FLIGHT STORE: Read {len(frame)} rows from {source_file}")
+
+    # Dictionaries shared by every year; ORIGIN and DEST use one airport dictionary
+    airports = sorted(set().union(*(set(f['ORIGIN'].dropna()) | set(f['DEST'].dropna()) for f in frames.values())))
+    dictionaries = {
+        'OP_CARRIER': sorted(set().union(*(set(f['OP_CARRIER'].dropna()) for f in frames.values()))),
+        'ORIGIN': airports,
+        'DEST': airports,
+        'CANCELLATION_CODE': [''] + sorted(set().union(*(set(f['CANCELLATION_CODE'].dropna()) for f in frames.values())))
+    }
+
+    os.makedirs(out_path, exist_ok=True)
+    for year, frame in frames.items():
+        year_path = os.path.join(out_path, str(year))
+        os.makedirs(year_path, exist_ok=True)
+        for column, dtype in _COLUMN_DTYPES.items():
+            if column in _CODE_COLUMNS:
+                codes = {value: code for code, value in enumerate(dictionaries[column])}
+                values = frame[column].fillna('').map(codes).to_numpy(dtype=dtype)
+            elif np.issubdtype(dtype, np.integer):
+                values = frame[column].fillna(0).to_numpy(dtype=dtype)
+            else:
+                values = frame[column].to_numpy(dtype=dtype, na_value=np.nan)
+            np.save(os.path.join(year_path, f"{column}.npy"), values)
+        print(f"💾 LOCAL FLIGHT STORE: Wrote {len(frame)} rows for {year} to {year_path}")
+
+    with open(os.path.join(out_path, 'dictionaries.json'), 'w') as f:
+        json.dump(dictionaries, f)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the local flight store from yearly BTS files")
+    parser.add_argument("files", nargs="+", help="Yearly .csv, .csv.gz or .parquet files, e.g. 2016.csv.gz")
+    parser.add_argument("--out", default=LOCAL_FLIGHT_STORE_PATH)
+    args = parser.parse_args()
+
+    build_local_store(args.files, args.out)
@@ -51,13 +51,15 @@ Airline Code Mapping     | ✅ Standard       | ✅ Standard | ChatAdvisorAgent
 
 This unified approach eliminates discrepancies and ensures reliable results.
 """
+from import_timer import start_import_timer, print_import_report
+# Must run before the heavy imports below; no-op unless IMPORT_TIME_REPORT=1
+start_import_timer()
+
 import functions_framework
 import json
 import os
 from datetime import datetime, timedelta, timezone
 from typing import List
-from google.cloud import bigquery
-import google.generativeai as genai
 
 # Custom JSON encoder to handle datetime objects
 class DateTimeEncoder(json.JSONEncoder):
@@ -66,25 +68,26 @@ class DateTimeEncoder(json.JSONEncoder):
             return obj.isoformat()
         return super().default(obj)
 
-# Import Google ADK - REAL IMPLEMENTATION ONLY
-try:
-    from google.adk.agents import Agent
-    from google.adk.tools import FunctionTool
-    print("✅ Using real Google ADK")
-except ImportError as e:
-    print(f"⚠️ Google ADK import failed: {e}")
-    print("⚠️ Continuing without Google ADK - using standard implementation")
-
-# Import ADK agents
-from weather_intelligence_agent import WeatherIntelligenceAgent
-from data_analyst_agent import DataAnalystAgent
-from risk_assessment_agent import RiskAssessmentAgent
-from weather_tool import analyze_weather_conditions
-from layover_analysis_agent import LayoverAnalysisAgent
-from chat_advisor_agent import ChatAdvisorAgent
-from insurance_recommendation_agent import InsuranceRecommendationAgent
-from airport_complexity_agent import AirportComplexityAgent
-from bigquery_tool import get_flight_historical_data, get_route_historical_data, get_airline_on_time_rate
+# ADK agents are built lazily by the registry on first use, so importing this
+# module (and serving health checks) constructs no agents or clients
+from agent_registry import (
+    register, get_registry_status,
+    weather_agent, data_agent, risk_agent, layover_agent,
+    chat_agent, insurance_agent, airport_complexity_agent
+)
+from bigquery_tool import get_flight_historical_data, get_route_historical_data, get_historical_profile, get_historical_profiles, historical_profile_steps, get_bigquery_tool_health
+from stage_executor import StageGraph, StageCheckpoints, stage_succeeded
+from request_coalescer import RequestCoalescer
+from worker_pools import get_pool, get_pool_stats, iter_windowed
+from request_deadline import RequestDeadline
+from shared_lookups import SharedLookups
+from llm_gateway import get_model, get_llm_stats
+from llm_cache import LLMCachePolicy, llm_response_cache
+from query_cache import query_result_cache
+from query_executor import query_executor
+from llm_batch import generate_batched, generate_fallbacks
+from reference_data import AIRLINE_NAMES, resolve_airport_code, record_llm_fallback, get_resolver_stats
+from async_support import ASYNC_EXECUTION, ASYNC_ROUTE_MAX_CONCURRENCY, drive_steps, llm_step, run_steps, steps_executor
 
 # Set Gemini API Key from environment variable
 GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY")
@@ -92,25 +95,24 @@ if not GOOGLE_API_KEY:
     raise ValueError("GOOGLE_API_KEY environment variable is required")
 
 os.environ["GOOGLE_API_KEY"] = GOOGLE_API_KEY
-genai.configure(api_key=GOOGLE_API_KEY)
-
-# Initialize BigQuery client
-try:
-    bq_client = bigquery.Client()
-    BQ_AVAILABLE = True
-    print("🔍 BigQuery client initialized")
-except Exception as e:
-    print(f"❌ BigQuery init failed: {e}")
-    BQ_AVAILABLE = False
-
-# Initialize ADK agents
-weather_agent = WeatherIntelligenceAgent()
-data_agent = DataAnalystAgent()
-risk_agent = RiskAssessmentAgent()
-layover_agent = LayoverAnalysisAgent()
-chat_agent = ChatAdvisorAgent()
-insurance_agent = InsuranceRecommendationAgent()
-airport_complexity_agent = AirportComplexityAgent()
+
+# Maximum concurrent stages when running the direct flight analysis stage graph
+DIRECT_ANALYSIS_MAX_WORKERS = int(os.environ.get("DIRECT_ANALYSIS_MAX_WORKERS", "6"))
+
+# Maximum flights analyzed concurrently during route analysis (risk, seasonal factors, insurance)
+ROUTE_ANALYSIS_MAX_WORKERS = int(os.environ.get("ROUTE_ANALYSIS_MAX_WORKERS", "4"))
+
+# Route searches explain risk, generate seasonal factors and recommend insurance with one Gemini prompt per stage
+# for all flights instead of one per flight; set to 0 for per-flight prompts
+ROUTE_BATCHED_PROMPTS = os.environ.get("ROUTE_BATCHED_PROMPTS", "1") == "1"
+
+# Concurrent identical requests share one in-flight analysis
+request_coalescer = RequestCoalescer()
+
+# Batch flight analysis: flights per request, flights analyzed concurrently, and the whole batch's latency budget
+BATCH_MAX_FLIGHTS = int(os.environ.get("BATCH_MAX_FLIGHTS", "50"))
+BATCH_ANALYSIS_MAX_WORKERS = int(os.environ.get("BATCH_ANALYSIS_MAX_WORKERS", "4"))
+BATCH_DEADLINE_SECONDS = float(os.environ.get("BATCH_DEADLINE_SECONDS", "240"))
 
 # Add this function near the top of the file, after the imports
 def extract_city_from_airport_code(airport_code: str) -> str:
@@ -162,15 +164,21 @@ def analyze_flight_risk_tool(analysis_type: str, **kwargs) -> dict:
             'error': str(e)
         }
 
-def _handle_direct_flight_analysis_with_retry(parameters, max_retries=3):
+def _handle_direct_flight_analysis_with_retry(parameters, max_retries=3, deadline=None):
     """
     Wrapper function that implements retry logic for direct flight analysis.
     Handles intermittent 'str' object has no attribute 'get' errors.
+    All attempts share one request deadline, and stage checkpoints so a retry
+    resumes from the stage that failed instead of rerunning the whole pipeline.
     """
+    if deadline is None:
+        deadline = RequestDeadline()
+    checkpoints = StageCheckpoints()
+    
     for attempt in range(max_retries):
         try:
             print(f"🔄 RETRY WRAPPER: Attempt {attempt + 1}/{max_retries} for direct flight analysis")
-            result = _handle_direct_flight_analysis(parameters)
+            result = _handle_direct_flight_analysis(parameters, deadline, checkpoints)
             
             # Validate result structure to ensure it's properly formed
             if isinstance(result, dict) and 'success' in result:
@@ -217,7 +225,7 @@ def _handle_direct_flight_analysis_with_retry(parameters, max_retries=3):
         'retry_attempts': max_retries
         }
 
-def _handle_direct_flight_analysis(parameters):
+def _handle_direct_flight_analysis(parameters, deadline=None, checkpoints=None):
     """
     UNIFIED STANDARD AGENT for direct flight analysis - used by BOTH natural language chat and HTML form controls
     This ensures identical processing regardless of input method using the SAME backend agents:
@@ -226,9 +234,20 @@ def _handle_direct_flight_analysis(parameters):
     - Airport Complexity Agent (airport analysis) 
     - Layover Analysis Agent (connection analysis)
     - Risk Assessment Agent (final risk evaluation)
+
+    Steps run on a StageGraph: on-time rate, weather, airport complexity, layovers and
+    seasonal factors only depend on the flight data, so they execute concurrently. The BigQuery,
+    airport complexity, seasonal factor, risk and insurance steps run on the event loop when
+    ASYNC_EXECUTION is on; weather and layovers still use the worker pools.
+    Optional AI stages fall back to deterministic output when the request deadline is nearly spent.
+    Stage outputs are saved to checkpoints, so a retry with the same checkpoints resumes after them.
     """
     import time
     start_time = time.time()
+    if deadline is None:
+        deadline = RequestDeadline()
+    if checkpoints is None:
+        checkpoints = StageCheckpoints()
     print("🤖 ADK TOOL: Coordinating direct flight analysis...")
     
     # LOG: Show incoming parameters
@@ -248,71 +267,52 @@ def _handle_direct_flight_analysis(parameters):
     print(f"🔍 ADK TOOL: Parameters received: {list(parameters.keys()) if isinstance(parameters, dict) else 'NOT_DICT'}")
     
     try:
+        # Steps are registered on a stage graph: each stage declares the stages it needs,
+        # and stages whose inputs are ready run concurrently with per-stage timing spans
+        graph = StageGraph('direct_flight_analysis', max_workers=DIRECT_ANALYSIS_MAX_WORKERS, checkpoints=checkpoints)
+        travel_date = parameters.get('date', '')
+
+        def route_airports(flight):
+            # FIXED: Handle both BigQuery data (origin_airport_code) and AI-generated data (origin)
+            origin = flight.get('origin_airport_code') or flight.get('origin', '')
+            destination = flight.get('destination_airport_code') or flight.get('destination', '')
+            return origin, destination
+
         # Step 1: Data Analyst Agent - Get flight data from BigQuery
-        step1_start = time.time()
-        print("📊 ADK TOOL: Calling Data Analyst Agent...")
-        print("📥 DATA ANALYST AGENT PARAMETERS:")
-        print(f"   airline_code: {parameters.get('airline', '')}")
-        print(f"   flight_number: {parameters.get('flight_number', '')}")
-        print(f"   date: {parameters.get('date', '')}")
-        print(f"   airline_name: {parameters.get('airline_name', '')}")
-        print(f"   origin_airport_code: {parameters.get('origin_airport_code', '')}")
-        print(f"   destination_airport_code: {parameters.get('destination_airport_code', '')}")
-        
-        flight_data = data_agent.get_flight_data_from_bigquery(
-            airline_code=parameters.get('airline', ''),
-            flight_number=parameters.get('flight_number', ''),
-            date=parameters.get('date', ''),
-            airline_name=parameters.get('airline_name', ''),
-            origin_airport_code=parameters.get('origin_airport_code', ''),
-            destination_airport_code=parameters.get('destination_airport_code', '')
-        )
-        step1_time = time.time() - step1_start
-        print(f"⏱️ ADK TOOL: Step 1 (Data Analyst) took {step1_time:.2f} seconds")
-        
+        def run_data_analyst():
+            print("📊 ADK TOOL: Calling Data Analyst Agent...")
+            print("📥 DATA ANALYST AGENT PARAMETERS:")
+            print(f"   airline_code: {parameters.get('airline', '')}")
+            print(f"   flight_number: {parameters.get('flight_number', '')}")
+            print(f"   date: {parameters.get('date', '')}")
+            print(f"   airline_name: {parameters.get('airline_name', '')}")
+            print(f"   origin_airport_code: {parameters.get('origin_airport_code', '')}")
+            print(f"   destination_airport_code: {parameters.get('destination_airport_code', '')}")
+
+            return data_agent.get_flight_data_from_bigquery(
+                airline_code=parameters.get('airline', ''),
+                flight_number=parameters.get('flight_number', ''),
+                date=parameters.get('date', ''),
+                airline_name=parameters.get('airline_name', ''),
+                origin_airport_code=parameters.get('origin_airport_code', ''),
+                destination_airport_code=parameters.get('destination_airport_code', '')
+            )
+
+        # An empty or malformed flight record is not checkpointed, so a retry fetches it again
+        graph.add_stage('data_analyst', run_data_analyst, pool='bigquery',
+                        checkpoint_if=lambda flight: bool(flight) and stage_succeeded(flight))
+        flight_data = graph.run()['data_analyst']
+
         print("📤 DATA ANALYST AGENT RESULT:")
         print(f"   Flight data type: {type(flight_data)}")
         print(f"   Flight data: {flight_data}")
-        
+
         if not flight_data:
             return {
                 'success': False,
                 'error': 'Flight not found in database'
             }
-        
-        # Step 1.5: Calculate Airline On-Time Rate from BigQuery historical data
-        step15_start = time.time()
-        print("⏰ ADK TOOL: Calculating airline On-Time Rate from BigQuery historical data...")
-        
-        try:
-            # Get airline code and route from BigQuery flight data for route-specific performance
-            airline_code = flight_data.get('airline_code', '')
-            origin_airport = flight_data.get('origin_airport_code', '')
-            destination_airport = flight_data.get('destination_airport_code', '')
-            
-            if airline_code and origin_airport and destination_airport:
-                on_time_data = get_airline_on_time_rate(airline_code, origin_airport, destination_airport, years=[2016, 2017, 2018])
-                if on_time_data and 'on_time_rate' in on_time_data:
-                    flight_data['on_time_rate'] = on_time_data['on_time_rate']
-                    flight_data['on_time_data'] = on_time_data
-                    print(f"✅ ADK TOOL: On-Time Rate calculated: {airline_code} = {on_time_data['on_time_rate']}%")
-                    print(f"📊 ADK TOOL: Total flights analyzed: {on_time_data.get('total_flights_analyzed', 0)}")
-                else:
-                    print(f"⚠️ ADK TOOL: On-Time Rate calculation failed for {airline_code}")
-                    flight_data['on_time_rate'] = None
-            else:
-                print(f"⚠️ ADK TOOL: No airline code provided for On-Time Rate calculation")
-                flight_data['on_time_rate'] = None
-        except Exception as e:
-            print(f"❌ ADK TOOL: On-Time Rate calculation failed: {e}")
-            flight_data['on_time_rate'] = None
-        
-        step15_time = time.time() - step15_start
-        print(f"⏱️ ADK TOOL: Step 1.5 (On-Time Rate) took {step15_time:.2f} seconds")
-        
-        # Step 2: Weather Intelligence Agent - Get weather for origin and destination
-        step2_start = time.time()
-        print("🌤️ ADK TOOL: Calling Weather Intelligence Agent...")
+
         # DEFENSIVE: Ensure flight_data is a dictionary
         if not isinstance(flight_data, dict):
             print(f"❌ ADK TOOL: flight_data is not a dict: {type(flight_data)} - {str(flight_data)[:100]}")
@@ -320,210 +320,151 @@ def _handle_direct_flight_analysis(parameters):
                 'success': False,
                 'error': f'Invalid flight_data type: expected dict, got {type(flight_data)}'
             }
-        
-        # FIXED: Handle both BigQuery data (origin_airport_code) and AI-generated data (origin)
-        origin_airport = flight_data.get('origin_airport_code') or flight_data.get('origin', '')
-        destination_airport = flight_data.get('destination_airport_code') or flight_data.get('destination', '')
-        
+
+        origin_airport, destination_airport = route_airports(flight_data)
         print(f"🔍 ADK TOOL: Using airport codes - Origin: {origin_airport}, Destination: {destination_airport}")
         print(f"🔍 ADK TOOL: Flight data keys: {list(flight_data.keys())}")
         print(f"🔍 ADK TOOL: Flight data origin fields: origin_airport_code={flight_data.get('origin_airport_code')}, origin={flight_data.get('origin')}")
-        
-        # Log weather analysis type for direct flight
-        try:
-            travel_datetime = datetime.strptime(parameters.get('date', ''), "%Y-%m-%d")
-            today = datetime.now()
-            days_ahead = (travel_datetime.date() - today.date()).days
-            if days_ahead > 7:
-                print(f"🌤️ CLOUD LOGS: Direct flight weather analysis - SEASONAL analysis (flight is {days_ahead} days from today)")
-            else:
-                print(f"🌤️ CLOUD LOGS: Direct flight weather analysis - REAL-TIME SerpAPI analysis (flight is {days_ahead} days from today)")
-        except Exception as e:
-            print(f"⚠️ CLOUD LOGS: Could not determine direct flight weather analysis type: {e}")
-        
-        # Use the WeatherIntelligenceTool directly to get proper structure
-        print(f"🌤️ CALLING WEATHER TOOL FOR MULTI-CITY ANALYSIS: {origin_airport} → {destination_airport}")
-        from weather_tool import WeatherIntelligenceTool
-        weather_tool = WeatherIntelligenceTool()
-        weather_analysis = weather_tool.analyze_multi_city_route_weather(
-            origin=origin_airport,
-            destination=destination_airport,
-            connections=[],  # No connections for direct flight
-            travel_date=parameters.get('date', '')
-        )
-        
-        print(f"🌤️ WEATHER TOOL RAW RESPONSE: {str(weather_analysis)[:500]}")
-        step2_time = time.time() - step2_start
-        print(f"⏱️ ADK TOOL: Step 2 (Weather Intelligence) took {step2_time:.2f} seconds")
-        
-        print("🔍 WEATHER ANALYSIS RESULT DETAILED INSPECTION:")
-        print(f"   Type: {type(weather_analysis)}")
-        print(f"   Keys: {list(weather_analysis.keys()) if isinstance(weather_analysis, dict) else 'NOT_DICT'}")
-        if isinstance(weather_analysis, dict):
-            for key, value in weather_analysis.items():
-                print(f"   {key}: {type(value)} = {str(value)[:200]}")
-        print("=" * 80)
-        
-        # DEFENSIVE: Ensure weather_analysis is a dictionary
-        if not isinstance(weather_analysis, dict):
-            print(f"❌ ADK TOOL: weather_analysis is not a dict: {type(weather_analysis)} - {str(weather_analysis)[:100]}")
-            return {
-                'success': False,
-                'error': f'Invalid weather_analysis type: expected dict, got {type(weather_analysis)}'
-            }
-        
-        # Step 2.1: INDEPENDENT AIRPORT COMPLEXITY ANALYSIS (NO WEATHER DEPENDENCY)
-        step21_start = time.time()
-        print("🏢 ADK TOOL: Running INDEPENDENT airport complexity analysis...")
-        
-        # Initialize the airport complexity agent directly
-        from airport_complexity_agent import AirportComplexityAgent
-        airport_complexity_agent = AirportComplexityAgent()
-        
-        # Get INDEPENDENT airport complexity analysis for origin
-        if origin_airport:
-            print(f"🏢 ADK TOOL: Analyzing origin airport complexity for {origin_airport} (INDEPENDENT)")
+
+        # Step 1.5: Airline On-Time Rate and route performance from one BigQuery historical query;
+        # the risk assessment reuses the route performance instead of querying again.
+        # This stage and the AI stages below are steps generators, driven on the event loop (see StageGraph)
+        def run_historical_profile(data_analyst):
+            print("⏰ ADK TOOL: Fetching historical profile (On-Time Rate + route performance) from BigQuery...")
+            try:
+                # Get airline code and route from BigQuery flight data for route-specific performance
+                airline_code = data_analyst.get('airline_code', '')
+                origin = data_analyst.get('origin_airport_code', '')
+                destination = data_analyst.get('destination_airport_code', '')
+
+                if airline_code and origin and destination:
+                    profile = yield from historical_profile_steps(airline_code, origin, destination, years=[2016, 2017, 2018])
+                    on_time_data = profile.get('on_time')
+                    if on_time_data and 'on_time_rate' in on_time_data:
+                        print(f"✅ ADK TOOL: On-Time Rate calculated: {airline_code} = {on_time_data['on_time_rate']}%")
+                        print(f"📊 ADK TOOL: Total flights analyzed: {on_time_data.get('total_flights_analyzed', 0)}")
+                    else:
+                        print(f"⚠️ ADK TOOL: On-Time Rate calculation failed for {airline_code}")
+                    return profile
+                print(f"⚠️ ADK TOOL: No airline code provided for On-Time Rate calculation")
+            except Exception as e:
+                print(f"❌ ADK TOOL: Historical profile query failed: {e}")
+            return None
+
+        # Step 2: Weather Intelligence Agent - Get weather for origin and destination
+        def run_weather_intelligence(data_analyst):
+            print("🌤️ ADK TOOL: Calling Weather Intelligence Agent...")
+            origin, destination = route_airports(data_analyst)
+
+            # Log weather analysis type for direct flight
             try:
-                origin_complexity = airport_complexity_agent.analyze_airport_complexity(origin_airport)
-                print(f"✅ ADK TOOL: Origin airport complexity analysis complete for {origin_airport}")
+                travel_datetime = datetime.strptime(travel_date, "%Y-%m-%d")
+                today = datetime.now()
+                days_ahead = (travel_datetime.date() - today.date()).days
+                if days_ahead > 7:
+                    print(f"🌤️ CLOUD LOGS: Direct flight weather analysis - SEASONAL analysis (flight is {days_ahead} days from today)")
+                else:
+                    print(f"🌤️ CLOUD LOGS: Direct flight weather analysis - REAL-TIME SerpAPI analysis (flight is {days_ahead} days from today)")
             except Exception as e:
-                print(f"❌ ADK TOOL: Origin airport complexity analysis failed for {origin_airport}: {e}")
-                origin_complexity = {
+                print(f"⚠️ CLOUD LOGS: Could not determine direct flight weather analysis type: {e}")
+
+            # Use the WeatherIntelligenceTool directly to get proper structure
+            print(f"🌤️ CALLING WEATHER TOOL FOR MULTI-CITY ANALYSIS: {origin} → {destination}")
+            from weather_tool import WeatherIntelligenceTool
+            weather_tool = WeatherIntelligenceTool()
+            weather_result = weather_tool.analyze_multi_city_route_weather(
+                origin=origin,
+                destination=destination,
+                connections=[],  # No connections for direct flight
+                travel_date=travel_date
+            )
+
+            print(f"🌤️ WEATHER TOOL RAW RESPONSE: {str(weather_result)[:500]}")
+            return weather_result
+
+        # Step 2.1: INDEPENDENT AIRPORT COMPLEXITY ANALYSIS (NO WEATHER DEPENDENCY)
+        def analyze_endpoint_complexity(airport_code, label):
+            if not airport_code:
+                return {
                     "complexity": "unknown",
-                    "description": f"Airport complexity analysis failed for {origin_airport}",
-                    "concerns": ["Airport complexity analysis error"]
+                    "description": f"{label.capitalize()} airport code not available",
+                    "concerns": ["Missing airport information"]
                 }
-        else:
-            origin_complexity = {
-                "complexity": "unknown", 
-                "description": "Origin airport code not available",
-                "concerns": ["Missing airport information"]
-            }
-        
-        # Get INDEPENDENT airport complexity analysis for destination
-        if destination_airport:
-            print(f"🏢 ADK TOOL: Analyzing destination airport complexity for {destination_airport} (INDEPENDENT)")
+
+            print(f"🏢 ADK TOOL: Analyzing {label} airport complexity for {airport_code} (INDEPENDENT)")
             try:
-                destination_complexity = airport_complexity_agent.analyze_airport_complexity(destination_airport)
-                print(f"✅ ADK TOOL: Destination airport complexity analysis complete for {destination_airport}")
+                complexity = yield from airport_complexity_agent.analyze_airport_complexity_steps(airport_code)
+                print(f"✅ ADK TOOL: {label.capitalize()} airport complexity analysis complete for {airport_code}")
+                return complexity
             except Exception as e:
-                print(f"❌ ADK TOOL: Destination airport complexity analysis failed for {destination_airport}: {e}")
-                destination_complexity = {
+                print(f"❌ ADK TOOL: {label.capitalize()} airport complexity analysis failed for {airport_code}: {e}")
+                return {
                     "complexity": "unknown",
-                    "description": f"Airport complexity analysis failed for {destination_airport}",
+                    "description": f"Airport complexity analysis failed for {airport_code}",
                     "concerns": ["Airport complexity analysis error"]
                 }
-        else:
-            destination_complexity = {
-                "complexity": "unknown",
-                "description": "Destination airport code not available", 
-                "concerns": ["Missing airport information"]
-            }
-        
-        # Add complexity data to existing weather analysis (preserve weather_risk from weather tool)
-        if 'origin_airport_analysis' not in weather_analysis:
-            weather_analysis['origin_airport_analysis'] = {}
-        
-        # Only add missing fields, preserve existing weather_risk data from weather tool
-        if 'airport_code' not in weather_analysis['origin_airport_analysis']:
-            weather_analysis['origin_airport_analysis']['airport_code'] = origin_airport
-        if 'airport_complexity' not in weather_analysis['origin_airport_analysis']:
-            weather_analysis['origin_airport_analysis']['airport_complexity'] = origin_complexity
-        if 'data_source' not in weather_analysis['origin_airport_analysis']:
-            weather_analysis['origin_airport_analysis']['data_source'] = "Real Analysis"
-        
-        print(f"✅ DIRECT: Preserved origin analysis structure: {list(weather_analysis['origin_airport_analysis'].keys())}")
-        
-        if 'destination_airport_analysis' not in weather_analysis:
-            weather_analysis['destination_airport_analysis'] = {}
-            
-        # Only add missing fields, preserve existing weather_risk data from weather tool
-        if 'airport_code' not in weather_analysis['destination_airport_analysis']:
-            weather_analysis['destination_airport_analysis']['airport_code'] = destination_airport
-        if 'airport_complexity' not in weather_analysis['destination_airport_analysis']:
-            weather_analysis['destination_airport_analysis']['airport_complexity'] = destination_complexity
-        if 'data_source' not in weather_analysis['destination_airport_analysis']:
-            weather_analysis['destination_airport_analysis']['data_source'] = "Real Analysis"
-            
-        print(f"✅ DIRECT: Preserved destination analysis structure: {list(weather_analysis['destination_airport_analysis'].keys())}")
-        
-        # CRITICAL FIX: Ensure weather_risk data from OpenWeatherMap gets copied to airport analysis
-        if 'weather_risk' in weather_analysis and weather_analysis['weather_risk']:
-            # Copy main weather analysis to origin airport analysis
-            if 'origin_airport_analysis' not in weather_analysis:
-                weather_analysis['origin_airport_analysis'] = {}
-            if 'weather_risk' not in weather_analysis['origin_airport_analysis']:
-                weather_analysis['origin_airport_analysis']['weather_risk'] = weather_analysis['weather_risk'].copy()
-                print(f"✅ DIRECT: Copied main weather_risk to origin_airport_analysis: {weather_analysis['weather_risk']['description'][:100]}")
-            
-            # Copy main weather analysis to destination airport analysis  
-            if 'destination_airport_analysis' not in weather_analysis:
-                weather_analysis['destination_airport_analysis'] = {}
-            if 'weather_risk' not in weather_analysis['destination_airport_analysis']:
-                weather_analysis['destination_airport_analysis']['weather_risk'] = weather_analysis['weather_risk'].copy()
-                print(f"✅ DIRECT: Copied main weather_risk to destination_airport_analysis: {weather_analysis['weather_risk']['description'][:100]}")
-        
-        step21_time = time.time() - step21_start
-        print(f"⏱️ ADK TOOL: Step 2.1 (Extract Airport Data) took {step21_time:.2f} seconds")
-        
+
+        def run_origin_complexity(data_analyst):
+            return (yield from analyze_endpoint_complexity(route_airports(data_analyst)[0], 'origin'))
+
+        def run_destination_complexity(data_analyst):
+            return (yield from analyze_endpoint_complexity(route_airports(data_analyst)[1], 'destination'))
+
         # Step 2.5: OPTIMIZED - Get layover weather in parallel using threading
-        step25_start = time.time()
-        print("🌤️ ADK TOOL: Getting layover weather in parallel...")
-        layover_weather_analysis = {}
+        def run_layover_analysis(data_analyst):
+            print("🌤️ ADK TOOL: Getting layover weather in parallel...")
+            layover_weather_analysis = {}
         
-        # Get unique layover airports to avoid duplicate processing
-        layover_airports = []
-        connections = flight_data.get('connections', [])
+            # Get unique layover airports to avoid duplicate processing
+            layover_airports = []
+            connections = data_analyst.get('connections', [])
         
-        # DEFENSIVE: Ensure connections is a list
-        if not isinstance(connections, list):
-            print(f"⚠️ ADK TOOL: connections is not a list: {type(connections)} - treating as empty")
-            connections = []
+            # DEFENSIVE: Ensure connections is a list
+            if not isinstance(connections, list):
+                print(f"⚠️ ADK TOOL: connections is not a list: {type(connections)} - treating as empty")
+                connections = []
         
-        for connection in connections:
-            # DEFENSIVE: Ensure each connection is a dictionary
-            if not isinstance(connection, dict):
-                print(f"⚠️ ADK TOOL: connection is not a dict: {type(connection)} - skipping")
-                continue
+            for connection in connections:
+                # DEFENSIVE: Ensure each connection is a dictionary
+                if not isinstance(connection, dict):
+                    print(f"⚠️ ADK TOOL: connection is not a dict: {type(connection)} - skipping")
+                    continue
                 
-            airport_code = connection.get('airport', '')  # FIXED: BigQuery uses 'airport' field, not 'airport_code'
-            if airport_code and airport_code.strip() and airport_code not in layover_airports:
-                layover_airports.append(airport_code)
+                airport_code = connection.get('airport', '')  # FIXED: BigQuery uses 'airport' field, not 'airport_code'
+                if airport_code and airport_code.strip() and airport_code not in layover_airports:
+                    layover_airports.append(airport_code)
         
-        if layover_airports:
-            print(f"🚀 ADK TOOL: Processing {len(layover_airports)} unique layover airports in parallel: {layover_airports}")
+            if layover_airports:
+                print(f"🚀 ADK TOOL: Processing {len(layover_airports)} unique layover airports in parallel: {layover_airports}")
             
-            # Use parallel processing for weather analysis
-            import concurrent.futures
-            import threading
+                # Use parallel processing for weather analysis
+                import concurrent.futures
             
-            def analyze_single_layover_weather(airport_code):
-                """Analyze weather for a single layover airport using UNIFIED AGENT APPROACH"""
-                try:
-                    print(f"🌤️ ADK TOOL: [Thread] Using SAME WeatherIntelligenceAgent for layover {airport_code}")
+                def analyze_single_layover_weather(airport_code):
+                    """Analyze weather for a single layover airport using UNIFIED AGENT APPROACH"""
+                    try:
+                        print(f"🌤️ ADK TOOL: [Thread] Using SAME WeatherIntelligenceAgent for layover {airport_code}")
                     
-                    # UNIFIED AGENT APPROACH: Use the SAME WeatherIntelligenceAgent as origin/destination
-                    layover_weather_result = weather_agent.analyze_weather_conditions(
-                        airport_code=airport_code,
-                        flight_date=parameters.get('date', '')
-                    )
+                        # UNIFIED AGENT APPROACH: Use the SAME WeatherIntelligenceAgent as origin/destination
+                        layover_weather_result = weather_agent.analyze_weather_conditions(
+                            airport_code=airport_code,
+                            flight_date=parameters.get('date', '')
+                        )
                     
-                    print(f"✅ ADK TOOL: [Thread] Got weather data from WeatherIntelligenceAgent for layover {airport_code}")
-                    return airport_code, layover_weather_result
+                        print(f"✅ ADK TOOL: [Thread] Got weather data from WeatherIntelligenceAgent for layover {airport_code}")
+                        return airport_code, layover_weather_result
                     
-                except Exception as e:
-                    print(f"❌ ADK TOOL: [Thread] Failed to get weather for layover {airport_code}: {e}")
-                    return airport_code, {
-                        "error": f"Weather analysis failed for {airport_code}: {str(e)}",
-                        "weather_available": False
-                    }
+                    except Exception as e:
+                        print(f"❌ ADK TOOL: [Thread] Failed to get weather for layover {airport_code}: {e}")
+                        return airport_code, {
+                            "error": f"Weather analysis failed for {airport_code}: {str(e)}",
+                            "weather_available": False
+                        }
             
-            # Process layovers in parallel with maximum 4 concurrent threads
-            max_workers = min(4, len(layover_airports))
-            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-                # Submit all layover weather analysis tasks
+                # Process layovers in parallel on the shared HTTP worker pool
+                weather_pool = get_pool('http')
                 future_to_airport = {
-                    executor.submit(analyze_single_layover_weather, airport_code): airport_code 
+                    weather_pool.submit(analyze_single_layover_weather, airport_code): airport_code 
                     for airport_code in layover_airports
                 }
                 
@@ -532,39 +473,38 @@ def _handle_direct_flight_analysis(parameters):
                     airport_code, weather_data = future.result()
                     layover_weather_analysis[airport_code] = weather_data
             
-            print(f"🚀 ADK TOOL: Parallel weather analysis complete for {len(layover_airports)} layovers")
-        else:
-            print("ℹ️ ADK TOOL: No layover airports to analyze")
+                print(f"🚀 ADK TOOL: Parallel weather analysis complete for {len(layover_airports)} layovers")
+            else:
+                print("ℹ️ ADK TOOL: No layover airports to analyze")
         
-        # UNIFIED AGENT APPROACH: Add INDEPENDENT airport complexity analysis for layovers
-        print("🏢 ADK TOOL: Running UNIFIED AGENT airport complexity analysis for layovers...")
-        layover_complexity_analysis = {}
+            # UNIFIED AGENT APPROACH: Add INDEPENDENT airport complexity analysis for layovers
+            print("🏢 ADK TOOL: Running UNIFIED AGENT airport complexity analysis for layovers...")
+            layover_complexity_analysis = {}
         
-        if layover_airports:
-            def analyze_single_layover_complexity(airport_code):
-                """Analyze airport complexity for a single layover airport using UNIFIED AGENT APPROACH"""
-                try:
-                    print(f"🏢 ADK TOOL: [Thread] Using SAME AirportComplexityAgent for layover {airport_code}")
+            if layover_airports:
+                def analyze_single_layover_complexity(airport_code):
+                    """Analyze airport complexity for a single layover airport using UNIFIED AGENT APPROACH"""
+                    try:
+                        print(f"🏢 ADK TOOL: [Thread] Using SAME AirportComplexityAgent for layover {airport_code}")
                     
-                    # UNIFIED AGENT APPROACH: Use the SAME AirportComplexityAgent as origin/destination
-                    complexity_result = airport_complexity_agent.analyze_airport_complexity(airport_code)
+                        # UNIFIED AGENT APPROACH: Use the SAME AirportComplexityAgent as origin/destination
+                        complexity_result = airport_complexity_agent.analyze_airport_complexity(airport_code)
                     
-                    print(f"✅ ADK TOOL: [Thread] Got complexity data from AirportComplexityAgent for layover {airport_code}")
-                    return airport_code, complexity_result
+                        print(f"✅ ADK TOOL: [Thread] Got complexity data from AirportComplexityAgent for layover {airport_code}")
+                        return airport_code, complexity_result
                     
-                except Exception as e:
-                    print(f"❌ ADK TOOL: [Thread] Failed to get complexity for layover {airport_code}: {e}")
-                    return airport_code, {
-                        "complexity": "unknown",
-                        "description": f"Airport complexity analysis failed for {airport_code}",
-                        "concerns": ["Airport complexity analysis error"]
-                    }
+                    except Exception as e:
+                        print(f"❌ ADK TOOL: [Thread] Failed to get complexity for layover {airport_code}: {e}")
+                        return airport_code, {
+                            "complexity": "unknown",
+                            "description": f"Airport complexity analysis failed for {airport_code}",
+                            "concerns": ["Airport complexity analysis error"]
+                        }
             
-            # Process layover complexity in parallel
-            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-                # Submit all layover complexity analysis tasks
+                # Process layover complexity in parallel on the shared LLM worker pool
+                complexity_pool = get_pool('llm')
                 future_to_airport = {
-                    executor.submit(analyze_single_layover_complexity, airport_code): airport_code 
+                    complexity_pool.submit(analyze_single_layover_complexity, airport_code): airport_code 
                     for airport_code in layover_airports
                 }
                 
@@ -573,222 +513,332 @@ def _handle_direct_flight_analysis(parameters):
                     airport_code, complexity_data = future.result()
                     layover_complexity_analysis[airport_code] = complexity_data
             
-            print(f"🚀 ADK TOOL: Parallel complexity analysis complete for {len(layover_airports)} layovers")
+                print(f"🚀 ADK TOOL: Parallel complexity analysis complete for {len(layover_airports)} layovers")
         
-        # Add layover weather to the main weather analysis
-        weather_analysis['layover_weather_analysis'] = layover_weather_analysis
-        
-        # DEBUG: Print the connection data structure before and after
-        print(f"🔍 DEBUG: flight_data connections: {flight_data.get('connections', [])}")
+            # DEBUG: Print the connection data structure before and after
+            print(f"🔍 DEBUG: flight_data connections: {data_analyst.get('connections', [])}")
         
-        # OPTIMIZED: Batch process layover feasibility analysis
-        connections = flight_data.get('connections', [])
-        if connections:
-            print(f"🚀 ADK TOOL: Processing {len(connections)} connections with UNIFIED AGENT analysis")
+            # OPTIMIZED: Batch process layover feasibility analysis
+            connections = data_analyst.get('connections', [])
+            if connections:
+                print(f"🚀 ADK TOOL: Processing {len(connections)} connections with UNIFIED AGENT analysis")
             
-            # Prepare batch layover analysis data with UNIFIED data
-            batch_layover_data = []
-            print(f"🔍 DEBUG: Preparing batch layover data from {len(connections)} connections")
-            for connection in connections:
-                airport_code = connection.get('airport', '')  # FIXED: BigQuery uses 'airport' field, not 'airport_code'
-                print(f"🔍 DEBUG: Processing connection for airport: {airport_code}")
-                print(f"🔍 DEBUG: Airport in layover_weather_analysis: {airport_code in layover_weather_analysis}")
+                # Prepare batch layover analysis data with UNIFIED data
+                batch_layover_data = []
+                print(f"🔍 DEBUG: Preparing batch layover data from {len(connections)} connections")
+                for connection in connections:
+                    airport_code = connection.get('airport', '')  # FIXED: BigQuery uses 'airport' field, not 'airport_code'
+                    print(f"🔍 DEBUG: Processing connection for airport: {airport_code}")
+                    print(f"🔍 DEBUG: Airport in layover_weather_analysis: {airport_code in layover_weather_analysis}")
                 
-                if airport_code in layover_weather_analysis:
-                    layover_weather_data = layover_weather_analysis[airport_code]
-                    layover_complexity_data = layover_complexity_analysis.get(airport_code, {})
+                    if airport_code in layover_weather_analysis:
+                        layover_weather_data = layover_weather_analysis[airport_code]
+                        layover_complexity_data = layover_complexity_analysis.get(airport_code, {})
                     
-                    print(f"🔍 DEBUG: Weather data error status: {layover_weather_data.get('error')}")
-                    if not layover_weather_data.get('error'):
-                        # FIXED: Always get layover duration from layoverInfo if available
-                        # The layoverInfo contains the actual layover duration at the airport
-                        layover_info = connection.get('layoverInfo', {})
-                        layover_duration = layover_info.get('duration', '1h')
+                        print(f"🔍 DEBUG: Weather data error status: {layover_weather_data.get('error')}")
+                        if not layover_weather_data.get('error'):
+                            # FIXED: Always get layover duration from layoverInfo if available
+                            # The layoverInfo contains the actual layover duration at the airport
+                            layover_info = connection.get('layoverInfo', {})
+                            layover_duration = layover_info.get('duration', '1h')
                         
-                        print(f"🔍 DEBUG: Layover duration for {airport_code}: {layover_duration} (from layoverInfo)")
-                        print(f"🔍 DEBUG: Connection duration (flight segment): {connection.get('duration', 'N/A')}")
+                            print(f"🔍 DEBUG: Layover duration for {airport_code}: {layover_duration} (from layoverInfo)")
+                            print(f"🔍 DEBUG: Connection duration (flight segment): {connection.get('duration', 'N/A')}")
                         
-                        layover_item = {
-                            'airport_code': airport_code,
-                            'duration_str': layover_duration,
-                            'arrival_time': layover_info.get('arrival_time', connection.get('arrival_time')),
-                            'travel_date': parameters.get('date', ''),
-                            'weather_risk': layover_weather_data.get('weather_risk', {}).get('level', 'medium'),
-                            'airport_complexity': layover_complexity_data.get('complexity', 'medium'),
-                            'weather_data': layover_weather_data
-                        }
-                        batch_layover_data.append(layover_item)
-                        print(f"🔍 DEBUG: Added layover data for {airport_code}: duration={layover_duration}")
-                        print(f"🔍 DEBUG: Layover item details: {layover_item}")
+                            layover_item = {
+                                'airport_code': airport_code,
+                                'duration_str': layover_duration,
+                                'arrival_time': layover_info.get('arrival_time', connection.get('arrival_time')),
+                                'travel_date': parameters.get('date', ''),
+                                'weather_risk': layover_weather_data.get('weather_risk', {}).get('level', 'medium'),
+                                'airport_complexity': layover_complexity_data.get('complexity', 'medium'),
+                                'weather_data': layover_weather_data
+                            }
+                            batch_layover_data.append(layover_item)
+                            print(f"🔍 DEBUG: Added layover data for {airport_code}: duration={layover_duration}")
+                            print(f"🔍 DEBUG: Layover item details: {layover_item}")
+                        else:
+                            print(f"🔍 DEBUG: Skipped {airport_code} due to weather data error")
                     else:
-                        print(f"🔍 DEBUG: Skipped {airport_code} due to weather data error")
+                        print(f"🔍 DEBUG: Skipped {airport_code} - not in weather analysis")
+            
+                print(f"🔍 DEBUG: Final batch_layover_data contains {len(batch_layover_data)} items")
+            
+                # Run batch layover analysis if we have valid data
+                batch_layover_results = {}
+                if batch_layover_data:
+                    print(f"🤖 ADK TOOL: Running batch layover analysis for {len(batch_layover_data)} layovers")
+                    print(f"🔍 DEBUG: Batch layover data: {batch_layover_data}")
+                    try:
+                        batch_layover_results = layover_agent.analyze_batch_layover_feasibility(batch_layover_data)
+                        print(f"✅ ADK TOOL: Batch layover analysis complete")
+                        print(f"🔍 DEBUG: Batch results keys: {list(batch_layover_results.keys())}")
+                        print(f"🔍 DEBUG: Batch results content: {batch_layover_results}")
+                    except Exception as e:
+                        print(f"❌ ADK TOOL: Batch layover analysis failed: {e}")
+                        batch_layover_results = {}
                 else:
-                    print(f"🔍 DEBUG: Skipped {airport_code} - not in weather analysis")
-            
-            print(f"🔍 DEBUG: Final batch_layover_data contains {len(batch_layover_data)} items")
-            
-            # Run batch layover analysis if we have valid data
-            batch_layover_results = {}
-            if batch_layover_data:
-                print(f"🤖 ADK TOOL: Running batch layover analysis for {len(batch_layover_data)} layovers")
-                print(f"🔍 DEBUG: Batch layover data: {batch_layover_data}")
-                try:
-                    batch_layover_results = layover_agent.analyze_batch_layover_feasibility(batch_layover_data)
-                    print(f"✅ ADK TOOL: Batch layover analysis complete")
-                    print(f"🔍 DEBUG: Batch results keys: {list(batch_layover_results.keys())}")
-                    print(f"🔍 DEBUG: Batch results content: {batch_layover_results}")
-                except Exception as e:
-                    print(f"❌ ADK TOOL: Batch layover analysis failed: {e}")
-                    batch_layover_results = {}
-            else:
-                print(f"🔍 DEBUG: No batch layover data to process")
+                    print(f"🔍 DEBUG: No batch layover data to process")
             
-            # Apply results to connections using UNIFIED AGENT data structure
-            for i, connection in enumerate(connections):
-                print(f"🔍 DEBUG: Processing connection {i}, type: {type(connection)}")
-                if not isinstance(connection, dict):
-                    print(f"❌ ERROR: Connection {i} is not a dict: {connection}")
-                    continue
+                # Apply results to connections using UNIFIED AGENT data structure
+                for i, connection in enumerate(connections):
+                    print(f"🔍 DEBUG: Processing connection {i}, type: {type(connection)}")
+                    if not isinstance(connection, dict):
+                        print(f"❌ ERROR: Connection {i} is not a dict: {connection}")
+                        continue
                     
-                airport_code = connection.get('airport', '')  # FIXED: BigQuery uses 'airport' field, not 'airport_code'
-                print(f"🔍 DEBUG: Processing connection for airport_code: {airport_code}")
-                print(f"🔍 DEBUG: Connection keys: {list(connection.keys())}")
-                print(f"🔍 DEBUG: Available layover weather keys: {list(layover_weather_analysis.keys())}")
-                print(f"🔍 DEBUG: Available layover complexity keys: {list(layover_complexity_analysis.keys())}")
+                    airport_code = connection.get('airport', '')  # FIXED: BigQuery uses 'airport' field, not 'airport_code'
+                    print(f"🔍 DEBUG: Processing connection for airport_code: {airport_code}")
+                    print(f"🔍 DEBUG: Connection keys: {list(connection.keys())}")
+                    print(f"🔍 DEBUG: Available layover weather keys: {list(layover_weather_analysis.keys())}")
+                    print(f"🔍 DEBUG: Available layover complexity keys: {list(layover_complexity_analysis.keys())}")
                 
-                if airport_code in layover_weather_analysis and airport_code in layover_complexity_analysis:
-                    layover_weather_data = layover_weather_analysis[airport_code]
-                    layover_complexity_data = layover_complexity_analysis[airport_code]
-                    print(f"🔍 DEBUG: Found UNIFIED AGENT data for {airport_code}")
+                    if airport_code in layover_weather_analysis and airport_code in layover_complexity_analysis:
+                        layover_weather_data = layover_weather_analysis[airport_code]
+                        layover_complexity_data = layover_complexity_analysis[airport_code]
+                        print(f"🔍 DEBUG: Found UNIFIED AGENT data for {airport_code}")
                     
-                    # UNIFIED AGENT DATA STRUCTURE: Use the SAME format as origin/destination - FIXED: Add to layoverInfo structure
-                    if not layover_weather_data.get('error'):
-                        # Ensure layoverInfo exists
-                        if 'layoverInfo' not in connection:
-                            connection['layoverInfo'] = {}
+                        # UNIFIED AGENT DATA STRUCTURE: Use the SAME format as origin/destination - FIXED: Add to layoverInfo structure
+                        if not layover_weather_data.get('error'):
+                            # Ensure layoverInfo exists
+                            if 'layoverInfo' not in connection:
+                                connection['layoverInfo'] = {}
                         
-                        connection['layoverInfo']['weather_risk'] = {
-                            "level": layover_weather_data.get('weather_risk', {}).get('level', 'medium'),
-                            "description": layover_weather_data.get('weather_risk', {}).get('description', 'Weather analysis not available'),
-                            "risk_factors": layover_weather_data.get('weather_risk', {}).get('risk_factors', [])
-                        }
+                            connection['layoverInfo']['weather_risk'] = {
+                                "level": layover_weather_data.get('weather_risk', {}).get('level', 'medium'),
+                                "description": layover_weather_data.get('weather_risk', {}).get('description', 'Weather analysis not available'),
+                                "risk_factors": layover_weather_data.get('weather_risk', {}).get('risk_factors', [])
+                            }
                         
-                        connection['layoverInfo']['airport_complexity'] = {
-                            "complexity": layover_complexity_data.get('complexity', 'medium'),
-                            "description": layover_complexity_data.get("description", "Airport complexity analysis not available"),
-                            "concerns": layover_complexity_data.get("concerns", ["❌ Airport complexity analysis failed"])
-                        }
+                            connection['layoverInfo']['airport_complexity'] = {
+                                "complexity": layover_complexity_data.get('complexity', 'medium'),
+                                "description": layover_complexity_data.get("description", "Airport complexity analysis not available"),
+                                "concerns": layover_complexity_data.get("concerns", ["❌ Airport complexity analysis failed"])
+                            }
                         
-                        # ADD: Comprehensive layover feasibility analysis from batch results
-                        print(f"🔍 DEBUG: Checking if {airport_code} in batch_layover_results")
-                        print(f"🔍 DEBUG: Batch results available for: {list(batch_layover_results.keys())}")
+                            # ADD: Comprehensive layover feasibility analysis from batch results
+                            print(f"🔍 DEBUG: Checking if {airport_code} in batch_layover_results")
+                            print(f"🔍 DEBUG: Batch results available for: {list(batch_layover_results.keys())}")
                         
-                        # Make case-insensitive lookup
-                        airport_code_upper = airport_code.upper()
-                        batch_results_upper = {k.upper(): v for k, v in batch_layover_results.items()}
+                            # Make case-insensitive lookup
+                            airport_code_upper = airport_code.upper()
+                            batch_results_upper = {k.upper(): v for k, v in batch_layover_results.items()}
                         
-                        # If not in results, add a default analysis
-                        if airport_code_upper not in batch_results_upper:
-                            print(f"⚠️ DEBUG: {airport_code} not found in batch results, adding default analysis")
-                            # Calculate basic risk based on duration
-                            layover_duration_str = connection.get('layoverInfo', {}).get('duration', '2h')
-                            duration_minutes = 120  # Default 2 hours
-                            try:
-                                # Parse duration like "3h 25m"
-                                import re
-                                match = re.match(r'(\d+)h\s*(\d+)m', layover_duration_str)
-                                if match:
-                                    hours, minutes = match.groups()
-                                    duration_minutes = int(hours) * 60 + int(minutes)
-                            except:
-                                pass
+                            # If not in results, add a default analysis
+                            if airport_code_upper not in batch_results_upper:
+                                print(f"⚠️ DEBUG: {airport_code} not found in batch results, adding default analysis")
+                                # Calculate basic risk based on duration
+                                layover_duration_str = connection.get('layoverInfo', {}).get('duration', '2h')
+                                duration_minutes = 120  # Default 2 hours
+                                try:
+                                    # Parse duration like "3h 25m"
+                                    import re
+                                    match = re.match(r'(\d+)h\s*(\d+)m', layover_duration_str)
+                                    if match:
+                                        hours, minutes = match.groups()
+                                        duration_minutes = int(hours) * 60 + int(minutes)
+                                except:
+                                    pass
                             
-                            # Determine risk based on duration
-                            if duration_minutes >= 180:  # 3+ hours
-                                risk_level = "low"
-                                risk_score = 25
-                                feasibility = "Comfortable connection time"
-                            elif duration_minutes >= 90:  # 1.5-3 hours
-                                risk_level = "medium"
-                                risk_score = 50
-                                feasibility = "Adequate connection time"
-                            else:  # Less than 1.5 hours
-                                risk_level = "high"
-                                risk_score = 75
-                                feasibility = "Tight connection time"
+                                # Determine risk based on duration
+                                if duration_minutes >= 180:  # 3+ hours
+                                    risk_level = "low"
+                                    risk_score = 25
+                                    feasibility = "Comfortable connection time"
+                                elif duration_minutes >= 90:  # 1.5-3 hours
+                                    risk_level = "medium"
+                                    risk_score = 50
+                                    feasibility = "Adequate connection time"
+                                else:  # Less than 1.5 hours
+                                    risk_level = "high"
+                                    risk_score = 75
+                                    feasibility = "Tight connection time"
                             
-                            batch_results_upper[airport_code_upper] = {
-                                'risk_level': risk_level,
-                                'risk_score': risk_score,
-                                'overall_feasibility': feasibility,
-                                'minimum_connection_time': 60,
-                                'buffer_analysis': {'buffer_adequacy': 'Calculated based on duration'},
-                                'recommendations': ['Monitor flight status', 'Check gate information'],
-                                'risk_factors': ['Default analysis based on layover duration'],
-                                'contextual_analysis': {'airport_specific': f'{duration_minutes} minutes layover at {airport_code}'}
-                            }
+                                batch_results_upper[airport_code_upper] = {
+                                    'risk_level': risk_level,
+                                    'risk_score': risk_score,
+                                    'overall_feasibility': feasibility,
+                                    'minimum_connection_time': 60,
+                                    'buffer_analysis': {'buffer_adequacy': 'Calculated based on duration'},
+                                    'recommendations': ['Monitor flight status', 'Check gate information'],
+                                    'risk_factors': ['Default analysis based on layover duration'],
+                                    'contextual_analysis': {'airport_specific': f'{duration_minutes} minutes layover at {airport_code}'}
+                                }
                         
-                        if airport_code_upper in batch_results_upper:
-                            ai_analysis = batch_results_upper[airport_code_upper]
-                            print(f"🔍 DEBUG: Found batch analysis for {airport_code}: {ai_analysis}")
-                            connection['layover_analysis'] = {
-                                "feasibility_risk": ai_analysis.get('risk_level', 'medium'),
-                                "feasibility_score": ai_analysis.get('risk_score', 50),
-                                "feasibility_description": ai_analysis.get('overall_feasibility', 'Analysis not available'),
-                                "minimum_connection_time": ai_analysis.get('minimum_connection_time', 60),
-                                "buffer_time": ai_analysis.get('buffer_analysis', {}).get('buffer_adequacy', 'Not assessed'),
-                                "recommendations": ai_analysis.get('recommendations', ['Monitor flight status'])[:5],
-                                "risk_modifiers": ai_analysis.get('risk_factors', ['Analysis not available']),
-                                "duration_assessment": ai_analysis.get('contextual_analysis', {}).get('airport_specific', 'Analysis not available')
-                            }
-                            print(f"🤖 ADK TOOL: Added BATCH AI analysis for layover {airport_code}")
+                            if airport_code_upper in batch_results_upper:
+                                ai_analysis = batch_results_upper[airport_code_upper]
+                                print(f"🔍 DEBUG: Found batch analysis for {airport_code}: {ai_analysis}")
+                                connection['layover_analysis'] = {
+                                    "feasibility_risk": ai_analysis.get('risk_level', 'medium'),
+                                    "feasibility_score": ai_analysis.get('risk_score', 50),
+                                    "feasibility_description": ai_analysis.get('overall_feasibility', 'Analysis not available'),
+                                    "minimum_connection_time": ai_analysis.get('minimum_connection_time', 60),
+                                    "buffer_time": ai_analysis.get('buffer_analysis', {}).get('buffer_adequacy', 'Not assessed'),
+                                    "recommendations": ai_analysis.get('recommendations', ['Monitor flight status'])[:5],
+                                    "risk_modifiers": ai_analysis.get('risk_factors', ['Analysis not available']),
+                                    "duration_assessment": ai_analysis.get('contextual_analysis', {}).get('airport_specific', 'Analysis not available')
+                                }
+                                print(f"🤖 ADK TOOL: Added BATCH AI analysis for layover {airport_code}")
                         
-                        connection['data_source'] = 'Real Analysis'
-                        print(f"🔍 DEBUG: Weather risk: {connection['layoverInfo']['weather_risk']}")
-                        print(f"🔍 DEBUG: Airport complexity: {connection['layoverInfo']['airport_complexity']}")
-                        print(f"🔍 DEBUG: Layover feasibility: {connection['layover_analysis']['feasibility_risk']}")
+                            connection['data_source'] = 'Real Analysis'
+                            print(f"🔍 DEBUG: Weather risk: {connection['layoverInfo']['weather_risk']}")
+                            print(f"🔍 DEBUG: Airport complexity: {connection['layoverInfo']['airport_complexity']}")
+                            print(f"🔍 DEBUG: Layover feasibility: {connection['layover_analysis']['feasibility_risk']}")
                         
-                    else:
-                        # Handle error case - ensure layoverInfo structure exists
-                        if 'layoverInfo' not in connection:
-                            connection['layoverInfo'] = {}
+                        else:
+                            # Handle error case - ensure layoverInfo structure exists
+                            if 'layoverInfo' not in connection:
+                                connection['layoverInfo'] = {}
                         
-                        connection['layoverInfo']['weather_risk'] = {
-                            "risk_level": "unknown",
-                            "description": f"Weather analysis failed for {airport_code}. Error: {layover_weather_data.get('error', 'Unknown error')}",
-                            "risk_factors": [f"Weather analysis failed for {airport_code}"]
-                        }
+                            connection['layoverInfo']['weather_risk'] = {
+                                "risk_level": "unknown",
+                                "description": f"Weather analysis failed for {airport_code}. Error: {layover_weather_data.get('error', 'Unknown error')}",
+                                "risk_factors": [f"Weather analysis failed for {airport_code}"]
+                            }
                         
-                        connection['layoverInfo']['airport_complexity'] = {
-                            "complexity": "unknown",
-                            "description": f"Airport complexity analysis failed for {airport_code}. Error: {layover_complexity_data.get('error', 'Unknown error')}",
-                            "concerns": [f"Analysis failed for {airport_code}"]
-                        }
+                            connection['layoverInfo']['airport_complexity'] = {
+                                "complexity": "unknown",
+                                "description": f"Airport complexity analysis failed for {airport_code}. Error: {layover_complexity_data.get('error', 'Unknown error')}",
+                                "concerns": [f"Analysis failed for {airport_code}"]
+                            }
                         
-                        connection['data_source'] = 'Analysis Failed'
-                        print(f"❌ ADK TOOL: Failed to add AI analysis for layover {airport_code}")
-                else:
-                    print(f"🔍 DEBUG: No layover data found for airport_code: {airport_code}")
+                            connection['data_source'] = 'Analysis Failed'
+                            print(f"❌ ADK TOOL: Failed to add AI analysis for layover {airport_code}")
+                    else:
+                        print(f"🔍 DEBUG: No layover data found for airport_code: {airport_code}")
+            else:
+                print("ℹ️ ADK TOOL: No connections to process")
+        
+            # DEBUG: Print final connection data
+            print(f"🔍 DEBUG: Final flight_data connections: {data_analyst.get('connections', [])}")
+
+            return layover_weather_analysis
+
+        # STEP 4: ALWAYS GENERATE 5-BULLET AI SEASONAL FACTORS ANALYSIS
+        # This analysis considers: origin, destination, exact date, season, holidays, weather data (if available)
+        # It only needs the flight itself, so it runs alongside the other stages instead of after risk assessment
+        def run_seasonal_factors(data_analyst):
+            print("🗓️ ADK TOOL: Generating comprehensive 5-bullet seasonal factors analysis...")
+            flight_number = data_analyst.get('flight_number', 'Unknown')
+
+            try:
+                # Generate AI-powered seasonal factors that consider ALL available information
+                seasonal_factors, success = yield from _ai_generate_flight_seasonal_factors_steps(
+                    data_analyst.get('origin_airport_code', ''),
+                    data_analyst.get('destination_airport_code', ''),
+                    travel_date,
+                    flight_number,
+                    deadline=deadline
+                )
+
+                if success and len(seasonal_factors) >= 5:
+                    print(f"✅ ADK TOOL: Generated {len(seasonal_factors[:5])} AI seasonal factors for direct flight {flight_number}")
+                    return seasonal_factors[:5]
+
+            except Exception as e:
+                print(f"❌ ADK TOOL: Seasonal factor generation failed for direct flight {flight_number}: {e}")
+
+            # Fallback to basic seasonal factors based on season/date
+            return _ai_generate_basic_seasonal_factors(travel_date)[:5]
+
+        # Steps 1.5, 2, 2.1, 2.5 and the seasonal factors only depend on the flight data,
+        # so they run concurrently and the phase costs roughly the slowest of them
+        graph.add_stage('historical_profile', run_historical_profile, depends_on=['data_analyst'], pool='bigquery', steps=True)
+        graph.add_stage('weather_intelligence', run_weather_intelligence, depends_on=['data_analyst'], pool='http')
+        graph.add_stage('origin_airport_complexity', run_origin_complexity, depends_on=['data_analyst'], pool='llm', steps=True)
+        graph.add_stage('destination_airport_complexity', run_destination_complexity, depends_on=['data_analyst'], pool='llm', steps=True)
+        # Layover analysis fans out to the http and llm pools itself, so it runs on the orchestration pool
+        graph.add_stage('layover_analysis', run_layover_analysis, depends_on=['data_analyst'], pool='orchestration')
+        graph.add_stage('seasonal_factors', run_seasonal_factors, depends_on=['data_analyst'], pool='llm', steps=True,
+                        checkpoint_if=lambda factors: isinstance(factors, list))
+        stage_results = graph.run()
+
+        historical_profile = stage_results['historical_profile'] or {}
+        on_time_data = historical_profile.get('on_time')
+        if on_time_data and 'on_time_rate' in on_time_data:
+            flight_data['on_time_rate'] = on_time_data['on_time_rate']
+            flight_data['on_time_data'] = on_time_data
         else:
-            print("ℹ️ ADK TOOL: No connections to process")
+            flight_data['on_time_rate'] = None
+
+        weather_analysis = stage_results['weather_intelligence']
+
+        print("🔍 WEATHER ANALYSIS RESULT DETAILED INSPECTION:")
+        print(f"   Type: {type(weather_analysis)}")
+        print(f"   Keys: {list(weather_analysis.keys()) if isinstance(weather_analysis, dict) else 'NOT_DICT'}")
+        if isinstance(weather_analysis, dict):
+            for key, value in weather_analysis.items():
+                print(f"   {key}: {type(value)} = {str(value)[:200]}")
+        print("=" * 80)
+
+        # DEFENSIVE: Ensure weather_analysis is a dictionary
+        if not isinstance(weather_analysis, dict):
+            print(f"❌ ADK TOOL: weather_analysis is not a dict: {type(weather_analysis)} - {str(weather_analysis)[:100]}")
+            return {
+                'success': False,
+                'error': f'Invalid weather_analysis type: expected dict, got {type(weather_analysis)}'
+            }
+
+        origin_complexity = stage_results['origin_airport_complexity']
+        destination_complexity = stage_results['destination_airport_complexity']
+
+        # Add complexity data to existing weather analysis (preserve weather_risk from weather tool)
+        if 'origin_airport_analysis' not in weather_analysis:
+            weather_analysis['origin_airport_analysis'] = {}
         
-        # DEBUG: Print final connection data
-        print(f"🔍 DEBUG: Final flight_data connections: {flight_data.get('connections', [])}")
+        # Only add missing fields, preserve existing weather_risk data from weather tool
+        if 'airport_code' not in weather_analysis['origin_airport_analysis']:
+            weather_analysis['origin_airport_analysis']['airport_code'] = origin_airport
+        if 'airport_complexity' not in weather_analysis['origin_airport_analysis']:
+            weather_analysis['origin_airport_analysis']['airport_complexity'] = origin_complexity
+        if 'data_source' not in weather_analysis['origin_airport_analysis']:
+            weather_analysis['origin_airport_analysis']['data_source'] = "Real Analysis"
         
-        step25_time = time.time() - step25_start
-        print(f"⏱️ ADK TOOL: Step 2.5 (Layover Analysis) took {step25_time:.2f} seconds")
+        print(f"✅ DIRECT: Preserved origin analysis structure: {list(weather_analysis['origin_airport_analysis'].keys())}")
         
-        # Step 3: Risk Assessment Agent - Generate final analysis
-        step3_start = time.time()
-        print("⚠️ ADK TOOL: Calling Risk Assessment Agent...")
-        risk_analysis = risk_agent.generate_flight_risk_analysis(
-            flight_data,
-            weather_analysis,
-            parameters
-        )
-        step3_time = time.time() - step3_start
-        print(f"⏱️ ADK TOOL: Step 3 (Risk Assessment) took {step3_time:.2f} seconds")
+        if 'destination_airport_analysis' not in weather_analysis:
+            weather_analysis['destination_airport_analysis'] = {}
+            
+        # Only add missing fields, preserve existing weather_risk data from weather tool
+        if 'airport_code' not in weather_analysis['destination_airport_analysis']:
+            weather_analysis['destination_airport_analysis']['airport_code'] = destination_airport
+        if 'airport_complexity' not in weather_analysis['destination_airport_analysis']:
+            weather_analysis['destination_airport_analysis']['airport_complexity'] = destination_complexity
+        if 'data_source' not in weather_analysis['destination_airport_analysis']:
+            weather_analysis['destination_airport_analysis']['data_source'] = "Real Analysis"
+            
+        print(f"✅ DIRECT: Preserved destination analysis structure: {list(weather_analysis['destination_airport_analysis'].keys())}")
         
+        # CRITICAL FIX: Ensure weather_risk data from OpenWeatherMap gets copied to airport analysis
+        if 'weather_risk' in weather_analysis and weather_analysis['weather_risk']:
+            # Copy main weather analysis to origin airport analysis
+            if 'origin_airport_analysis' not in weather_analysis:
+                weather_analysis['origin_airport_analysis'] = {}
+            if 'weather_risk' not in weather_analysis['origin_airport_analysis']:
+                weather_analysis['origin_airport_analysis']['weather_risk'] = weather_analysis['weather_risk'].copy()
+                print(f"✅ DIRECT: Copied main weather_risk to origin_airport_analysis: {weather_analysis['weather_risk']['description'][:100]}")
+            
+            # Copy main weather analysis to destination airport analysis  
+            if 'destination_airport_analysis' not in weather_analysis:
+                weather_analysis['destination_airport_analysis'] = {}
+            if 'weather_risk' not in weather_analysis['destination_airport_analysis']:
+                weather_analysis['destination_airport_analysis']['weather_risk'] = weather_analysis['weather_risk'].copy()
+                print(f"✅ DIRECT: Copied main weather_risk to destination_airport_analysis: {weather_analysis['weather_risk']['description'][:100]}")
+
+        # Add layover weather to the main weather analysis
+        weather_analysis['layover_weather_analysis'] = stage_results['layover_analysis']
+
+        # Step 3: Risk Assessment Agent - Generate final analysis
+        with graph.span('risk_assessment', depends_on=list(stage_results.keys())):
+            print("⚠️ ADK TOOL: Calling Risk Assessment Agent...")
+            risk_analysis = checkpoints.run('risk_assessment', lambda: drive_steps(risk_agent.generate_flight_risk_analysis_steps(
+                flight_data,
+                weather_analysis,
+                parameters,
+                deadline=deadline,
+                historical_data=historical_profile.get('flight_performance')
+            )))
+
         # LOG: Show risk analysis result
         print("📤 RISK ANALYSIS RESULT:")
         print(f"   Risk analysis type: {type(risk_analysis)}")
@@ -819,41 +869,11 @@ def _handle_direct_flight_analysis(parameters):
                     'success': False,
                     'error': f'Invalid risk_analysis type: expected dict, got {type(risk_analysis)}'
                 }
-        
-        # STEP 4: ALWAYS GENERATE 5-BULLET AI SEASONAL FACTORS ANALYSIS
-        # This analysis considers: origin, destination, exact date, season, holidays, weather data (if available)
-        print("🗓️ ADK TOOL: Generating comprehensive 5-bullet seasonal factors analysis...")
-        origin_airport = flight_data.get('origin_airport_code', '')
-        destination_airport = flight_data.get('destination_airport_code', '')
-        flight_number = flight_data.get('flight_number', 'Unknown')
-        travel_date = parameters.get('date', '')
-        
-        try:
-            # Generate AI-powered seasonal factors that consider ALL available information
-            seasonal_factors, success = _ai_generate_flight_seasonal_factors(
-                origin_airport, 
-                destination_airport, 
-                travel_date,
-                flight_number
-            )
-            
-            if success and len(seasonal_factors) >= 5:
-                risk_analysis['seasonal_factors'] = seasonal_factors[:5]
-                risk_analysis['key_risk_factors'] = seasonal_factors[:5]
-                print(f"✅ ADK TOOL: Generated {len(seasonal_factors[:5])} AI seasonal factors for direct flight {flight_number}")
-            else:
-                # Fallback to basic seasonal factors based on season/date
-                basic_factors = _ai_generate_basic_seasonal_factors(travel_date)
-                risk_analysis['seasonal_factors'] = basic_factors[:5]
-                risk_analysis['key_risk_factors'] = basic_factors[:5]
-                
-        except Exception as e:
-            print(f"❌ ADK TOOL: Seasonal factor generation failed for direct flight {flight_number}: {e}")
-            # Use basic seasonal factors when AI generation fails completely
-            basic_factors = _ai_generate_basic_seasonal_factors(travel_date)
-            risk_analysis['seasonal_factors'] = basic_factors[:5]
-            risk_analysis['key_risk_factors'] = basic_factors[:5]
-        
+
+        seasonal_factors = stage_results['seasonal_factors']
+        risk_analysis['seasonal_factors'] = seasonal_factors[:5]
+        risk_analysis['key_risk_factors'] = seasonal_factors[:5]
+
         # CRITICAL: Map airport analysis to flight object structure for UI compatibility
         print("🗺️ CRITICAL WEATHER DATA MAPPING TO FLIGHT OBJECT:")
         print(f"   Weather analysis keys: {list(weather_analysis.keys())}")
@@ -954,7 +974,8 @@ def _handle_direct_flight_analysis(parameters):
         # Return in the EXACT format the UI expects (same as original working code)
         total_time = time.time() - start_time
         print(f"🏁 ADK TOOL: TOTAL ANALYSIS TIME: {total_time:.2f} seconds")
-        print(f"📊 ADK TOOL: Performance breakdown - Data: {step1_time:.1f}s, Weather: {step2_time:.1f}s, Extract: {step21_time:.1f}s, Layover: {step25_time:.1f}s, Risk: {step3_time:.1f}s")
+        extract_airport_data_time = max(graph.duration('origin_airport_complexity'), graph.duration('destination_airport_complexity'))
+        print(f"📊 ADK TOOL: Performance breakdown - Data: {graph.duration('data_analyst'):.1f}s, On-Time: {graph.duration('historical_profile'):.1f}s, Weather: {graph.duration('weather_intelligence'):.1f}s, Extract: {extract_airport_data_time:.1f}s, Layover: {graph.duration('layover_analysis'):.1f}s, Seasonal: {graph.duration('seasonal_factors'):.1f}s, Risk: {graph.duration('risk_assessment'):.1f}s")
         print(f"🚀 ADK TOOL: OPTIMIZATION SUCCESS - Eliminated duplicate airport analysis calls!")
         
         # Extract seasonal factors from risk analysis for top-level access
@@ -986,11 +1007,14 @@ def _handle_direct_flight_analysis(parameters):
             'analysis_timestamp': datetime.now(timezone.utc).isoformat(),
             'performance_metrics': {
                 'total_time': total_time,
-                'data_analyst_time': step1_time,
-                'weather_intelligence_time': step2_time,
-                'extract_airport_data_time': step21_time,
-                'layover_analysis_time': step25_time,
-                'risk_assessment_time': step3_time
+                'data_analyst_time': graph.duration('data_analyst'),
+                'on_time_rate_time': graph.duration('historical_profile'),
+                'weather_intelligence_time': graph.duration('weather_intelligence'),
+                'extract_airport_data_time': extract_airport_data_time,
+                'layover_analysis_time': graph.duration('layover_analysis'),
+                'seasonal_factors_time': graph.duration('seasonal_factors'),
+                'risk_assessment_time': graph.duration('risk_assessment'),
+                'stage_spans': graph.spans
             }
         }
         
@@ -1020,40 +1044,40 @@ def _handle_direct_flight_analysis(parameters):
             print(f"✅ ADK TOOL: Added {len(seasonal_factors)} seasonal factors to response")
         
         # STEP 4: Generate AI-powered insurance recommendation
-        print("🛡️ ADK TOOL: Generating AI-powered insurance recommendation...")
-        step4_start = time.time()
+        with graph.span('insurance_recommendation', depends_on=['risk_assessment']):
+            print("🛡️ ADK TOOL: Generating AI-powered insurance recommendation...")
         
-        try:
-            insurance_recommendation = insurance_agent.generate_insurance_recommendation(
-                flight_data, risk_analysis, weather_analysis
-            )
-            
-            if insurance_recommendation.get('success'):
-                # Add insurance recommendation to flight data for frontend access
-                flight_data['insurance_recommendation'] = insurance_recommendation
-                print(f"✅ ADK TOOL: AI insurance recommendation generated successfully")
-                print(f"🛡️ ADK TOOL: Recommendation type: {insurance_recommendation.get('recommendation_type', 'unknown')}")
-            else:
-                print(f"⚠️ ADK TOOL: Insurance recommendation generation failed, using fallback")
-                flight_data['insurance_recommendation'] = insurance_recommendation
+            try:
+                insurance_recommendation = checkpoints.run('insurance_recommendation', lambda: drive_steps(insurance_agent.generate_insurance_recommendation_steps(
+                    flight_data, risk_analysis, weather_analysis, deadline=deadline
+                )))
+            
+                if insurance_recommendation.get('success'):
+                    # Add insurance recommendation to flight data for frontend access
+                    flight_data['insurance_recommendation'] = insurance_recommendation
+                    print(f"✅ ADK TOOL: AI insurance recommendation generated successfully")
+                    print(f"🛡️ ADK TOOL: Recommendation type: {insurance_recommendation.get('recommendation_type', 'unknown')}")
+                else:
+                    print(f"⚠️ ADK TOOL: Insurance recommendation generation failed, using fallback")
+                    flight_data['insurance_recommendation'] = insurance_recommendation
                 
-        except Exception as e:
-            print(f"❌ ADK TOOL: Insurance recommendation failed: {e}")
-            # Add minimal fallback recommendation
-            flight_data['insurance_recommendation'] = {
-                'success': False,
-                'recommendation': 'Insurance recommendation analysis temporarily unavailable. Please consider your individual risk tolerance and trip investment when deciding on travel insurance.',
-                'recommendation_type': 'neutral',
-                'risk_level': risk_analysis.get('risk_level', 'medium'),
-                'confidence': 'low'
-            }
-        
-        step4_time = time.time() - step4_start
-        print(f"⏱️ ADK TOOL: Step 4 (Insurance Recommendation) took {step4_time:.2f} seconds")
+            except Exception as e:
+                print(f"❌ ADK TOOL: Insurance recommendation failed: {e}")
+                # Add minimal fallback recommendation
+                flight_data['insurance_recommendation'] = {
+                    'success': False,
+                    'recommendation': 'Insurance recommendation analysis temporarily unavailable. Please consider your individual risk tolerance and trip investment when deciding on travel insurance.',
+                    'recommendation_type': 'neutral',
+                    'risk_level': risk_analysis.get('risk_level', 'medium'),
+                    'confidence': 'low'
+                }
         
         # Update performance metrics
-        response['performance_metrics']['insurance_recommendation_time'] = step4_time
+        response['performance_metrics']['insurance_recommendation_time'] = graph.duration('insurance_recommendation')
         response['performance_metrics']['total_time'] = time.time() - start_time
+        response['performance_metrics']['deadline'] = deadline.to_dict()
+        response['performance_metrics']['resumed_stages'] = list(checkpoints.restored)
+        response['degraded_stages'] = deadline.degraded_stages
         
         return response
         
@@ -1064,9 +1088,19 @@ def _handle_direct_flight_analysis(parameters):
             'error': f'Direct flight analysis failed: {str(e)}'
         }
 
+# A city's primary airport does not change; bump the version when the prompt changes
+CITY_AIRPORT_CACHE = LLMCachePolicy('main._ai_convert_city_to_airport_code', version='v1', ttl_seconds=30 * 24 * 3600)
+
 def _ai_convert_city_to_airport_code(city_name: str) -> str:
-    """Convert city name to primary airport code using AI intelligence"""
+    """Convert city name to primary airport code; AI intelligence is only used for cities not in the reference data"""
+    airport_code = resolve_airport_code(city_name)
+    if airport_code:
+        print(f"✅ Airport Converter: {city_name} → {airport_code}")
+        return airport_code
+    
     try:
+        record_llm_fallback('airport_code')
+        
         # Initialize Gemini AI if not already done
         if not hasattr(_ai_convert_city_to_airport_code, 'gemini_model'):
             api_key = os.environ.get("GOOGLE_API_KEY")
@@ -1074,8 +1108,7 @@ def _ai_convert_city_to_airport_code(city_name: str) -> str:
                 print("❌ AI Airport Converter: No Google API key available")
                 return city_name
             
-            genai.configure(api_key=api_key)
-            _ai_convert_city_to_airport_code.gemini_model = genai.GenerativeModel('gemini-2.0-flash')
+            _ai_convert_city_to_airport_code.gemini_model = get_model()
             print("🤖 AI Airport Converter: Gemini model initialized")
         
         # AI-powered city to airport code conversion
@@ -1098,7 +1131,8 @@ def _ai_convert_city_to_airport_code(city_name: str) -> str:
         If unclear, return the original input.
         """
         
-        response = _ai_convert_city_to_airport_code.gemini_model.generate_content(prompt)
+        cache_inputs = {'city_name': city_name}
+        response = _ai_convert_city_to_airport_code.gemini_model.generate_content(prompt, cache=CITY_AIRPORT_CACHE, cache_inputs=cache_inputs)
         airport_code = response.text.strip().upper()
         
         # Validate it's a 3-letter code
@@ -1107,17 +1141,25 @@ def _ai_convert_city_to_airport_code(city_name: str) -> str:
             return airport_code
         else:
             print(f"❌ AI Airport Converter: Invalid response '{airport_code}' for {city_name}")
+            llm_response_cache.invalidate(CITY_AIRPORT_CACHE, cache_inputs)
             return city_name
             
     except Exception as e:
         print(f"❌ AI Airport Converter: Failed to convert {city_name}: {e}")
         return city_name
 
-def _ai_generate_flight_seasonal_factors(origin_airport: str, destination_airport: str, travel_date: str, flight_number: str) -> tuple[List[str], bool]:
+def _ai_generate_flight_seasonal_factors(origin_airport: str, destination_airport: str, travel_date: str, flight_number: str, deadline: RequestDeadline = None) -> tuple[List[str], bool]:
     """
     Generate comprehensive 5-bullet AI seasonal factors analysis
     Considers: origin city, destination city, exact date, season, holidays, weather patterns, airport congestion
+    Returns the basic date-based factors without calling Gemini when the request deadline is nearly spent.
     """
+    return run_steps(_ai_generate_flight_seasonal_factors_steps(origin_airport, destination_airport, travel_date, flight_number, deadline))
+
+def _ai_generate_flight_seasonal_factors_steps(origin_airport: str, destination_airport: str, travel_date: str, flight_number: str, deadline: RequestDeadline = None):
+    if deadline is not None and not deadline.allows('seasonal_factors'):
+        return _ai_generate_basic_seasonal_factors(travel_date), False
+    
     try:
         # Initialize Gemini AI if not already done
         if not hasattr(_ai_generate_flight_seasonal_factors, 'gemini_model'):
@@ -1126,32 +1168,14 @@ def _ai_generate_flight_seasonal_factors(origin_airport: str, destination_airpor
                 print("❌ AI Seasonal Generator: No Google API key available")
                 return _ai_generate_basic_seasonal_factors(travel_date), False
             
-            genai.configure(api_key=api_key)
-            _ai_generate_flight_seasonal_factors.gemini_model = genai.GenerativeModel('gemini-2.0-flash')
+            _ai_generate_flight_seasonal_factors.gemini_model = get_model()
             print("🤖 AI Seasonal Generator: Gemini model initialized")
         
         # Parse travel date for comprehensive seasonal context
-        try:
-            from datetime import datetime
-            travel_datetime = datetime.strptime(travel_date, "%Y-%m-%d")
-            formatted_date = travel_datetime.strftime("%B %d, %Y")
-            month = travel_datetime.strftime("%B")
-            day = travel_datetime.day
-            season = _get_season_from_date(travel_datetime)
-            weekday = travel_datetime.strftime("%A")
-            
-            # Check if it's within 7 days (for weather API consideration)
-            today = datetime.now()
-            days_until_travel = (travel_datetime - today).days
-            weather_api_available = 0 <= days_until_travel <= 7
-            
-        except:
-            formatted_date = travel_date
-            month = "Unknown"
-            day = 1
-            season = "Unknown"
-            weekday = "Unknown"
-            weather_api_available = False
+        date_context = _seasonal_date_context(travel_date)
+        formatted_date = date_context['formatted_date']
+        season = date_context['season']
+        weekday = date_context['weekday']
         
         # Enhanced AI-powered seasonal factor generation with comprehensive context
         prompt = f"""
@@ -1162,7 +1186,7 @@ def _ai_generate_flight_seasonal_factors(origin_airport: str, destination_airpor
         - Route: {origin_airport} → {destination_airport}
         - Travel Date: {formatted_date} ({weekday})
         - Season: {season}
-        - Weather API Available: {weather_api_available} (within 7 days: {days_until_travel} days)
+        - Weather API Available: {date_context['weather_api_available']} (within 7 days: {date_context['days_until_travel']} days)
         
         ANALYSIS REQUIREMENTS:
         Consider ALL of these factors in your analysis:
@@ -1188,7 +1212,7 @@ def _ai_generate_flight_seasonal_factors(origin_airport: str, destination_airpor
         Return ONLY the JSON array with exactly 5 seasonal factors.
         """
         
-        response = _ai_generate_flight_seasonal_factors.gemini_model.generate_content(prompt)
+        response = yield llm_step(_ai_generate_flight_seasonal_factors.gemini_model, prompt, call_site='main._ai_generate_flight_seasonal_factors', deadline=deadline)
         ai_response = response.text.strip()
         
         # Clean up JSON formatting
@@ -1219,6 +1243,82 @@ def _ai_generate_flight_seasonal_factors(origin_airport: str, destination_airpor
         # Return basic seasonal factors based on date
         return _ai_generate_basic_seasonal_factors(travel_date), False
 
+def _seasonal_date_context(travel_date: str) -> dict:
+    """Date, weekday, season and weather-API availability used by the seasonal factor prompts"""
+    try:
+        travel_datetime = datetime.strptime(travel_date, "%Y-%m-%d")
+        # Check if it's within 7 days (for weather API consideration)
+        days_until_travel = (travel_datetime - datetime.now()).days
+        return {
+            'formatted_date': travel_datetime.strftime("%B %d, %Y"),
+            'season': _get_season_from_date(travel_datetime),
+            'weekday': travel_datetime.strftime("%A"),
+            'days_until_travel': days_until_travel,
+            'weather_api_available': 0 <= days_until_travel <= 7
+        }
+    except:
+        return {
+            'formatted_date': travel_date,
+            'season': "Unknown",
+            'weekday': "Unknown",
+            'days_until_travel': "Unknown",
+            'weather_api_available': False
+        }
+
+def _ai_generate_batch_seasonal_factors(origin_airport: str, destination_airport: str, travel_date: str, flight_numbers: dict, deadline: RequestDeadline = None) -> dict:
+    """
+    Seasonal factors for several flights on the same route and date with one batched Gemini prompt.
+    flight_numbers maps flight id -> flight number; returns flight id -> (factors, success) like
+    _ai_generate_flight_seasonal_factors, which is used for flights the batched answer leaves out.
+    """
+    if not flight_numbers:
+        return {}
+    if deadline is not None and not deadline.allows('seasonal_factors'):
+        basic_factors = _ai_generate_basic_seasonal_factors(travel_date)
+        return {flight_id: (list(basic_factors), False) for flight_id in flight_numbers}
+    
+    date_context = _seasonal_date_context(travel_date)
+    season = date_context['season']
+    batch_answers = generate_batched(
+        'seasonal_factors',
+        {flight_id: f"- Flight: {flight_number}" for flight_id, flight_number in flight_numbers.items()},
+        f"""
+        You are an expert flight risk analyst. Generate exactly 5 comprehensive seasonal risk factors for each flight below.
+        
+        SHARED FLIGHT DETAILS:
+        - Route: {origin_airport} → {destination_airport}
+        - Travel Date: {date_context['formatted_date']} ({date_context['weekday']})
+        - Season: {season}
+        - Weather API Available: {date_context['weather_api_available']} (within 7 days: {date_context['days_until_travel']} days)
+        
+        Consider seasonal weather patterns at {origin_airport} and {destination_airport}, nearby major holidays,
+        peak travel seasons, seasonal airport congestion, {season} weather-related delays, seasonal airline
+        operations, tourism patterns and {date_context['weekday']} travel patterns.
+        
+        FORMATTING REQUIREMENTS (for each flight):
+        - Exactly 5 factors
+        - Each factor 40-70 characters max
+        - Start with appropriate emoji
+        - Be specific and actionable
+        - Focus on REAL seasonal risks
+        """,
+        '"seasonal_factors": ["☀️ Peak summer travel increases airport congestion", "⛈️ Afternoon thunderstorms common in July", "🏖️ Vacation season delays at tourist hubs", "🔥 Heat-related ground delays possible", "✈️ Extended daylight hours benefit operations"]',
+        lambda answer: isinstance(answer.get('seasonal_factors'), list) and len(answer['seasonal_factors']) >= 5,
+        deadline=deadline
+    )
+    
+    results = {flight_id: (answer['seasonal_factors'][:5], True) for flight_id, answer in batch_answers.items()}
+    fallback_calls = {}
+    for flight_id, flight_number in flight_numbers.items():
+        if flight_id not in results:
+            print(f"🔁 AI Seasonal Generator: Batched factors missing for flight {flight_number}, using per-flight prompt")
+            fallback_calls[flight_id] = (
+                _ai_generate_flight_seasonal_factors,
+                (origin_airport, destination_airport, travel_date, flight_number, deadline)
+            )
+    results.update(generate_fallbacks('seasonal_factors', fallback_calls))
+    return results
+
 def _ai_generate_basic_seasonal_factors(travel_date: str) -> List[str]:
     """Generate basic seasonal factors based on date/season when AI generation fails"""
     try:
@@ -1282,15 +1382,21 @@ def _get_season_from_date(travel_datetime) -> str:
     else:
         return "Fall"
 
-def _handle_route_analysis_with_retry(parameters, max_retries=3):
+def _handle_route_analysis_with_retry(parameters, max_retries=3, deadline=None):
     """
     Wrapper function that implements retry logic for route analysis.
     Handles intermittent 'str' object has no attribute 'get' errors.
+    All attempts share one request deadline, and stage checkpoints so a retry
+    resumes from the stage that failed instead of rerunning the whole pipeline.
     """
+    if deadline is None:
+        deadline = RequestDeadline()
+    checkpoints = StageCheckpoints()
+    
     for attempt in range(max_retries):
         try:
             print(f"🔄 RETRY WRAPPER: Attempt {attempt + 1}/{max_retries} for route analysis")
-            result = _handle_route_analysis(parameters)
+            result = _handle_route_analysis(parameters, deadline, checkpoints)
             
             # Validate result structure to ensure it's properly formed
             if isinstance(result, dict) and 'success' in result:
@@ -1331,490 +1437,661 @@ def _handle_route_analysis_with_retry(parameters, max_retries=3):
                     'flights': []
                 }
     
-    # Should not reach here, but return error just in case
-    return {
-        'success': False,
-        'error': f'Route analysis failed after {max_retries} attempts with unknown error',
-        'retry_attempts': max_retries,
-        'flights': []
+    # Should not reach here, but return error just in case
+    return {
+        'success': False,
+        'error': f'Route analysis failed after {max_retries} attempts with unknown error',
+        'retry_attempts': max_retries,
+        'flights': []
+        }
+
+def _handle_route_analysis(parameters, deadline=None, checkpoints=None):
+    """
+    Handle route analysis using ADK agents with SerpAPI.
+    The flight list, route enrichment and each analyzed flight are saved to checkpoints,
+    so a retry with the same checkpoints only redoes the work that failed.
+    """
+    print("🤖 ADK TOOL: Coordinating route analysis with SerpAPI...")
+    if deadline is None:
+        deadline = RequestDeadline()
+    if checkpoints is None:
+        checkpoints = StageCheckpoints()
+    
+    # DEFENSIVE: Ensure parameters is a dictionary
+    if not isinstance(parameters, dict):
+        print(f"❌ ADK TOOL: parameters is not a dict: {type(parameters)} - {str(parameters)[:100]}")
+        return {
+            'success': False,
+            'error': f'Invalid parameters type: expected dict, got {type(parameters)}',
+            'flights': []
+        }
+    
+    print(f"🔍 ADK TOOL: Route parameters received: {list(parameters.keys()) if isinstance(parameters, dict) else 'NOT_DICT'}")
+    
+    try:
+        route_context = checkpoints.run('route_flights', lambda: _fetch_route_flights(parameters))
+        if route_context['success']:
+            route_context = checkpoints.run('route_enrichment', lambda: _enrich_route_flights(parameters, route_context))
+        if not route_context['success']:
+            return route_context
+        
+        # Flights are independent of each other, so they fan out over a bounded pool;
+        # results are placed by index to keep the SerpAPI ranking
+        analyzed_flights = [None] * len(route_context['flights'])
+        for index, analyzed_flight in _iter_route_flight_analyses(parameters, route_context, deadline, checkpoints):
+            analyzed_flights[index] = analyzed_flight
+        
+        # Return in the EXACT format the UI expects for route analysis
+        return {
+            'success': True,
+            'flights': analyzed_flights,  # Array of flights with risk_analysis for each
+            'weather_analysis': route_context['weather_analysis'],  # Route weather analysis
+            'degraded_stages': deadline.degraded_stages,
+            'deadline': deadline.to_dict(),
+            'resumed_stages': list(checkpoints.restored),
+            'analysis_timestamp': datetime.now(timezone.utc).isoformat()
+        }
+        
+    except Exception as e:
+        print(f"❌ ADK TOOL: Route analysis failed - {str(e)}")
+        return {
+            'success': False,
+            'error': f'Route analysis failed: {str(e)}',
+            'flights': []
+        }
+
+def _fetch_route_flights(parameters):
+    """Steps 0-1 of route analysis: resolve airport codes and get the SerpAPI flight list"""
+    origin = parameters.get('origin')
+    destination = parameters.get('destination')
+    date = parameters.get('date')
+    
+    # STEP 0: AI-powered city to airport code conversion
+    print("🏢 ADK TOOL: Converting city names to airport codes using AI...")
+    origin_airport_code = _ai_convert_city_to_airport_code(origin)
+    destination_airport_code = _ai_convert_city_to_airport_code(destination)
+    
+    print(f"✅ ADK TOOL: Origin: {origin} → {origin_airport_code}")
+    print(f"✅ ADK TOOL: Destination: {destination} → {destination_airport_code}")
+    
+    # Step 1: Get flight data from SerpAPI via Data Analyst Agent
+    print("📊 ADK TOOL: Getting flight data from SerpAPI...")
+    data_result = data_agent.analyze_route(origin_airport_code, destination_airport_code, date)
+    
+    if not data_result['success']:
+        return {
+            'success': False,
+            'error': data_result['message'],
+            'flights': []
+        }
+    
+    flights = data_result['flights']
+    print(f"📊 ADK TOOL: Found {len(flights)} flights from SerpAPI")
+    
+    return {
+        'success': True,
+        'flights': flights,
+        'origin_airport_code': origin_airport_code,
+        'destination_airport_code': destination_airport_code
+    }
+
+def _enrich_route_flights(parameters, route_context):
+    """
+    Steps 2-2.5 of route analysis: route weather, airport complexity, layovers and on-time rates.
+    Adds weather_analysis and airline_profiles to route_context.
+    """
+    flights = route_context['flights']
+    origin_airport_code = route_context['origin_airport_code']
+    destination_airport_code = route_context['destination_airport_code']
+    date = parameters.get('date')
+    
+    # Step 2: Get weather analysis for origin and destination using converted airport codes
+    print("🌤️ ADK TOOL: Getting weather analysis...")
+    
+    # Log weather analysis type for both airports
+    try:
+        travel_datetime = datetime.strptime(date, "%Y-%m-%d")
+        today = datetime.now()
+        days_ahead = (travel_datetime.date() - today.date()).days
+        if days_ahead > 7:
+            print(f"🌤️ CLOUD LOGS: Weather analysis for {origin_airport_code} - SEASONAL analysis (flight is {days_ahead} days from today)")
+            print(f"🌤️ CLOUD LOGS: Weather analysis for {destination_airport_code} - SEASONAL analysis (flight is {days_ahead} days from today)")
+        else:
+            print(f"🌤️ CLOUD LOGS: Weather analysis for {origin_airport_code} - REAL-TIME SerpAPI analysis (flight is {days_ahead} days from today)")
+            print(f"🌤️ CLOUD LOGS: Weather analysis for {destination_airport_code} - REAL-TIME SerpAPI analysis (flight is {days_ahead} days from today)")
+    except Exception as e:
+        print(f"⚠️ CLOUD LOGS: Could not determine weather analysis type: {e}")
+    
+    try:
+        # FIXED: Call Weather Intelligence Agent separately for each airport to get individual weather data
+        print(f"🌤️ ADK TOOL: Analyzing weather for origin airport {origin_airport_code}")
+        origin_weather = weather_agent.analyze_weather_conditions(origin_airport_code, date)
+        
+        print(f"🌤️ ADK TOOL: Analyzing weather for destination airport {destination_airport_code}")
+        destination_weather = weather_agent.analyze_weather_conditions(destination_airport_code, date)
+        
+        # Combine the individual weather analyses
+        # Extract city names from weather analysis for proper display
+        origin_city = origin_weather.get('city', 'Unknown City')
+        destination_city = destination_weather.get('city', 'Unknown City')
+        
+        weather_result = {
+            'origin_weather': origin_weather,
+            'destination_weather': destination_weather,
+            'weather_conditions': {
+                'conditions': f"Origin ({origin_airport_code}, {origin_city}): {origin_weather.get('weather_conditions', {}).get('conditions', 'Analysis pending')} | Destination ({destination_airport_code}, {destination_city}): {destination_weather.get('weather_conditions', {}).get('conditions', 'Analysis pending')}"
+            },
+            'weather_risk': {
+                'level': 'medium',  # Default level, can be enhanced with individual analysis
+                'description': f"Route weather analysis: {origin_airport_code} and {destination_airport_code} conditions assessed"
+            },
+            'data_source': 'Individual Airport Weather Analysis'
+        }
+        
+        print(f"✅ ADK TOOL: Individual weather analysis successful for both airports")
+    except Exception as e:
+        print(f"❌ ADK TOOL: Weather analysis failed: {e}")
+        # NO FALLBACK - Return actual error
+        return {
+            'success': False,
+            'error': f'Weather analysis failed: {str(e)}',
+            'flights': []
+        }
+    
+    # Step 2.1: INDEPENDENT AIRPORT COMPLEXITY ANALYSIS FOR ROUTE (SAME AS DIRECT FLIGHT)
+    print("🏢 ADK TOOL: Running INDEPENDENT airport complexity analysis for route...")
+    
+    # Get INDEPENDENT airport complexity analysis for route origin
+    if origin_airport_code:
+        print(f"🏢 ADK TOOL: Analyzing route origin airport complexity for {origin_airport_code} (INDEPENDENT)")
+        try:
+            origin_complexity = airport_complexity_agent.analyze_airport_complexity(origin_airport_code)
+            weather_result['origin_airport_analysis'] = {
+                'airport_complexity': origin_complexity,
+                'data_source': 'Independent Airport Complexity Agent'
+            }
+            print(f"✅ ADK TOOL: Route origin complexity analysis complete")
+        except Exception as e:
+            print(f"❌ ADK TOOL: Route origin complexity analysis failed: {e}")
+            weather_result['origin_airport_analysis'] = {
+                'airport_complexity': {
+                    'complexity': 'unknown',
+                    'description': f'Complexity analysis failed for {origin_airport_code}',
+                    'concerns': ['Analysis error']
+                },
+                'data_source': 'Analysis Failed'
+            }
+    
+    # Get INDEPENDENT airport complexity analysis for route destination
+    if destination_airport_code:
+        print(f"🏢 ADK TOOL: Analyzing route destination airport complexity for {destination_airport_code} (INDEPENDENT)")
+        try:
+            destination_complexity = airport_complexity_agent.analyze_airport_complexity(destination_airport_code)
+            weather_result['destination_airport_analysis'] = {
+                'airport_complexity': destination_complexity,
+                'data_source': 'Independent Airport Complexity Agent'
+            }
+            print(f"✅ ADK TOOL: Route destination complexity analysis complete")
+        except Exception as e:
+            print(f"❌ ADK TOOL: Route destination complexity analysis failed: {e}")
+            weather_result['destination_airport_analysis'] = {
+                'airport_complexity': {
+                    'complexity': 'unknown',
+                    'description': f'Complexity analysis failed for {destination_airport_code}',
+                    'concerns': ['Analysis error']
+                },
+                'data_source': 'Analysis Failed'
+            }
+    
+    # Step 2.5: LAYOVER ANALYSIS FOR ROUTE FLIGHTS
+    # Itineraries on the same route usually share a few hubs, so layover weather and
+    # complexity are resolved once per distinct airport and then joined back into each flight
+    print("🔗 ADK TOOL: Running route-wide layover analysis for route flights...")
+    
+    def get_connection_airport(connection):
+        return connection.get('airport', connection.get('layoverInfo', {}).get('airport', ''))
+    
+    # Collect every unique layover airport across all flights
+    layover_airports = []
+    for flight in flights:
+        for connection in flight.get('connections', []) or []:
+            airport_code = get_connection_airport(connection)
+            if airport_code and airport_code.strip() and airport_code not in layover_airports:
+                layover_airports.append(airport_code)
+    
+    layover_weather_analysis = {}
+    layover_complexity_analysis = {}
+    
+    if layover_airports:
+        print(f"🚀 ADK TOOL: Processing {len(layover_airports)} unique layover airports across {len(flights)} flights: {layover_airports}")
+        
+        def analyze_single_layover_weather(airport_code):
+            """Analyze weather for a single layover airport"""
+            try:
+                print(f"🌤️ ADK TOOL: [Thread] Analyzing weather for layover {airport_code}")
+                
+                # Use the same WeatherIntelligenceAgent as origin/destination
+                layover_weather_result = weather_agent.analyze_weather_conditions(
+                    airport_code=airport_code,
+                    flight_date=date
+                )
+                
+                print(f"✅ ADK TOOL: [Thread] Got weather data for layover {airport_code}")
+                return layover_weather_result
+                
+            except Exception as e:
+                print(f"❌ ADK TOOL: [Thread] Failed to get weather for layover {airport_code}: {e}")
+                return {
+                    "error": f"Weather analysis failed for {airport_code}: {str(e)}",
+                    "weather_available": False
+                }
+        
+        def analyze_single_layover_complexity(airport_code):
+            """Analyze airport complexity for a single layover airport"""
+            try:
+                print(f"🏢 ADK TOOL: [Thread] Analyzing complexity for layover {airport_code}")
+                
+                # Use the same AirportComplexityAgent as origin/destination
+                complexity_result = airport_complexity_agent.analyze_airport_complexity(airport_code)
+                
+                print(f"✅ ADK TOOL: [Thread] Got complexity data for layover {airport_code}")
+                return complexity_result
+                
+            except Exception as e:
+                print(f"❌ ADK TOOL: [Thread] Failed to get complexity for layover {airport_code}: {e}")
+                return {
+                    "complexity": "unknown",
+                    "description": f"Airport complexity analysis failed for {airport_code}",
+                    "concerns": ["Airport complexity analysis error"]
+                }
+        
+        # Weather lookups run on the shared HTTP pool and complexity on the shared LLM pool
+        weather_futures = {
+            airport_code: get_pool('http').submit(analyze_single_layover_weather, airport_code)
+            for airport_code in layover_airports
+        }
+        complexity_futures = {
+            airport_code: get_pool('llm').submit(analyze_single_layover_complexity, airport_code)
+            for airport_code in layover_airports
+        }
+        
+        for airport_code in layover_airports:
+            layover_weather_analysis[airport_code] = weather_futures[airport_code].result()
+            layover_complexity_analysis[airport_code] = complexity_futures[airport_code].result()
+        
+        print(f"🚀 ADK TOOL: Parallel layover analysis complete for {len(layover_airports)} unique layovers")
+    else:
+        print("ℹ️ ADK TOOL: No layover airports to analyze")
+    
+    # Join the per-airport results back into every flight's connections
+    for flight in flights:
+        connections = flight.get('connections', [])
+        if not connections:
+            print("ℹ️ ADK TOOL: Direct flight - no layovers to analyze")
+            continue
+        
+        print(f"🔗 ADK TOOL: Applying layover analysis to {len(connections)} connections for flight {flight.get('flight_number', 'Unknown')}")
+        for connection in connections:
+            airport_code = get_connection_airport(connection)
+            
+            # FIXED: Extract city name from airport code
+            city_name = extract_city_from_airport_code(airport_code)
+            
+            # FIXED: Ensure connection has proper structure with city name
+            connection['airport'] = airport_code
+            connection['city'] = city_name
+            connection['airport_name'] = f"{city_name} Airport"
+            
+            if airport_code in layover_weather_analysis and airport_code in layover_complexity_analysis:
+                layover_weather_data = layover_weather_analysis[airport_code]
+                layover_complexity_data = layover_complexity_analysis[airport_code]
+                
+                # Add weather risk data to connection - FIXED: Add to layoverInfo structure that frontend expects
+                if not layover_weather_data.get('error'):
+                    # Ensure layoverInfo exists
+                    if 'layoverInfo' not in connection:
+                        connection['layoverInfo'] = {}
+                    
+                    connection['layoverInfo']['weather_risk'] = {
+                        "level": layover_weather_data.get('weather_risk', {}).get('level', 'medium'),
+                        "description": layover_weather_data.get('weather_risk', {}).get('description', 'Weather analysis not available'),
+                        "risk_factors": layover_weather_data.get('weather_risk', {}).get('risk_factors', [])
+                    }
+                    
+                    connection['layoverInfo']['airport_complexity'] = {
+                        "complexity": layover_complexity_data.get('complexity', 'medium'),
+                        "description": layover_complexity_data.get("description", "Airport complexity analysis not available"),
+                        "concerns": layover_complexity_data.get("concerns", ["❌ Airport complexity analysis failed"])
+                    }
+                    
+                    connection['data_source'] = 'Real Analysis'
+                    print(f"✅ ADK TOOL: Added weather and complexity data for layover {airport_code} ({city_name})")
+                else:
+                    print(f"❌ ADK TOOL: Weather analysis failed for layover {airport_code} ({city_name})")
+            else:
+                print(f"🔍 DEBUG: No layover data found for airport_code: {airport_code} ({city_name})")
+    
+    # Step 2.5: Historical profiles (On-Time Rate + route performance) for every airline in the flights
+    print("⏰ ADK TOOL: Fetching historical profiles for airlines in route...")
+    airline_profiles = {}
+    
+    # Collect unique airline-route combinations from all flights
+    unique_airline_routes = set()
+    for flight in flights:
+        airline_code = flight.get('airline_code', '')
+        origin = flight.get('origin_airport_code', '')
+        destination = flight.get('destination_airport_code', '')
+        if airline_code and origin and destination:
+            unique_airline_routes.add((airline_code, origin, destination))
+    
+    # One BigQuery query for all unique airline-route combinations of the search
+    if unique_airline_routes:
+        try:
+            airline_profiles = get_historical_profiles(sorted(unique_airline_routes), years=[2016, 2017, 2018])
+            for (airline_code, origin, destination), profile in airline_profiles.items():
+                on_time_data = profile.get('on_time', {})
+                if 'on_time_rate' in on_time_data:
+                    print(f"✅ ADK TOOL: On-Time Rate calculated for route: {airline_code} = {on_time_data['on_time_rate']}%")
+                else:
+                    print(f"⚠️ ADK TOOL: On-Time Rate calculation failed for route airline {airline_code}")
+        except Exception as e:
+            print(f"❌ ADK TOOL: Historical profile query failed for route airlines: {e}")
+    
+    route_context['weather_analysis'] = weather_result
+    route_context['airline_profiles'] = airline_profiles
+    return route_context
+
+def _iter_route_flight_analyses(parameters, route_context, deadline=None, checkpoints=None, batched=None):
+    """
+    Step 3 of route analysis: fan out per-flight risk, seasonal factors and insurance over a bounded pool.
+    Yields (index, analyzed_flight) as each flight completes; index is the flight's SerpAPI ranking position.
+    Flights analyzed successfully by an earlier attempt are taken from checkpoints instead of re-analyzed.
+    In batched mode (ROUTE_BATCHED_PROMPTS, default on) the Gemini stages use one prompt for all
+    flights, so every flight completes at the same time. Otherwise, with ASYNC_EXECUTION (default on),
+    the per-flight analyses run as coroutines on the shared event loop instead of holding a pool thread each.
+    """
+    flights = route_context['flights']
+    weather_result = route_context['weather_analysis']
+    if batched is None:
+        batched = ROUTE_BATCHED_PROMPTS
+    
+    remaining_flights = []
+    for index, flight in enumerate(flights):
+        if checkpoints is not None and checkpoints.has(f'flight_{index}'):
+            yield index, checkpoints.restore(f'flight_{index}')
+        else:
+            remaining_flights.append((index, flight))
+    if not remaining_flights:
+        return
+    
+    if batched and len(remaining_flights) > 1:
+        analyzed_flights = _analyze_route_flights_batched(remaining_flights, parameters, route_context, deadline)
+        for index, _ in remaining_flights:
+            yield index, _finish_route_flight(index, analyzed_flights[index], weather_result, checkpoints)
+        return
+    
+    max_workers = max(1, min(ASYNC_ROUTE_MAX_CONCURRENCY if ASYNC_EXECUTION else ROUTE_ANALYSIS_MAX_WORKERS, len(remaining_flights)))
+    print(f"⚠️ ADK TOOL: Analyzing flight risks with historical data ({len(remaining_flights)} flights, {max_workers} concurrent{', async' if ASYNC_EXECUTION else ''})...")
+    
+    # At most max_workers flights of this request are in flight on the event loop or the shared LLM pool
+    tasks = (
+        (index, _analyze_route_flight_steps if ASYNC_EXECUTION else _analyze_route_flight, (
+            flight,
+            weather_result,
+            parameters,
+            route_context['origin_airport_code'],
+            route_context['destination_airport_code'],
+            route_context['airline_profiles'],
+            deadline
+        ))
+        for index, flight in remaining_flights
+    )
+    executor = steps_executor if ASYNC_EXECUTION else get_pool('llm')
+    for index, future in iter_windowed(executor, max_workers, tasks):
+        yield index, _finish_route_flight(index, future.result(), weather_result, checkpoints)
+
+def _finish_route_flight(index, analyzed_flight, weather_result, checkpoints=None):
+    """Attach the route's airport analyses to an analyzed flight and checkpoint it if it succeeded"""
+    # Add airport analysis to each flight for easier frontend access
+    if 'origin_airport_analysis' in weather_result:
+        analyzed_flight['origin_analysis'] = weather_result['origin_airport_analysis']
+    if 'destination_airport_analysis' in weather_result:
+        analyzed_flight['destination_analysis'] = weather_result['destination_airport_analysis']
+    
+    # Flights that failed are left out so a retry analyzes them again
+    if checkpoints is not None and 'error' not in analyzed_flight.get('risk_analysis', {}):
+        checkpoints.save(f'flight_{index}', analyzed_flight)
+    
+    return analyzed_flight
+
+def _analyze_route_flights_batched(remaining_flights, parameters, route_context, deadline=None):
+    """
+    Batched variant of _analyze_route_flight for a whole route search.
+    Deterministic risk scoring runs per flight on the bounded pool; the risk explanation, seasonal
+    factors and insurance recommendation stages then each use one Gemini prompt for all flights
+    (about 3 calls instead of 3 per flight). Flights a batched answer leaves out fall back to the
+    per-flight prompt inside the agents. Returns {index: analyzed_flight}.
+    """
+    date = parameters.get('date', '')
+    weather_result = route_context['weather_analysis']
+    origin_airport_code = route_context['origin_airport_code']
+    destination_airport_code = route_context['destination_airport_code']
+    llm_pool = get_pool('llm')
+    
+    print(f"📦 ADK TOOL: Analyzing {len(remaining_flights)} flights with batched Gemini prompts...")
+    
+    # Seasonal factors only depend on the route, date and flight number, so their batch runs alongside risk scoring
+    # (on the orchestration pool, so its per-flight fallbacks can fan out on the LLM pool)
+    seasonal_future = get_pool('orchestration').submit(
+        _ai_generate_batch_seasonal_factors,
+        origin_airport_code,
+        destination_airport_code,
+        date,
+        {str(index): flight.get('flight_number', 'Unknown') for index, flight in remaining_flights},
+        deadline
+    )
+    
+    flights_by_index = dict(remaining_flights)
+    analyzed_flights = {}
+    risk_results = {}
+    max_workers = max(1, min(ROUTE_ANALYSIS_MAX_WORKERS, len(remaining_flights)))
+    tasks = (
+        (index, _score_route_flight, (flight, weather_result, parameters, route_context['airline_profiles'], deadline, True))
+        for index, flight in remaining_flights
+    )
+    for index, future in iter_windowed(llm_pool, max_workers, tasks):
+        try:
+            risk_results[index] = future.result()
+        except Exception as e:
+            print(f"❌ ADK TOOL: Failed to analyze flight - {str(e)}")
+            analyzed_flights[index] = {
+                **flights_by_index[index],
+                'risk_analysis': {'error': str(e)},
+                'weather_summary': 'Analysis failed'
+            }
+    
+    risk_agent.explain_risk_analyses_batch({str(index): risk_result for index, risk_result in risk_results.items()}, deadline=deadline)
+    
+    try:
+        seasonal_results = seasonal_future.result()
+    except Exception as e:
+        print(f"❌ ADK TOOL: Batched seasonal factor generation failed: {e}")
+        seasonal_results = {}
+    for index, risk_result in risk_results.items():
+        seasonal_factors, success = seasonal_results.get(str(index), (_ai_generate_basic_seasonal_factors(date), False))
+        risk_result['seasonal_factors'] = seasonal_factors[:5] if success and seasonal_factors else seasonal_factors
+        risk_result['key_risk_factors'] = risk_result['seasonal_factors']  # For frontend compatibility
+    
+    try:
+        insurance_results = insurance_agent.generate_insurance_recommendations_batch(
+            {
+                str(index): (_route_flight_insurance_data(flights_by_index[index], date, origin_airport_code, destination_airport_code), risk_result)
+                for index, risk_result in risk_results.items()
+            },
+            weather_result,
+            deadline=deadline
+        )
+    except Exception as e:
+        print(f"❌ ADK TOOL: Batched insurance recommendation failed: {e}")
+        insurance_results = {}
+    
+    for index, risk_result in risk_results.items():
+        flight = flights_by_index[index]
+        flight['insurance_recommendation'] = insurance_results.get(str(index)) or _unavailable_insurance_recommendation(risk_result)
+        analyzed_flights[index] = {
+            **flight,
+            'risk_analysis': risk_result,
+            'weather_summary': weather_result.get('summary', 'Weather analysis available')
         }
+    
+    return analyzed_flights
 
-def _handle_route_analysis(parameters):
-    """Handle route analysis using ADK agents with SerpAPI"""
-    print("🤖 ADK TOOL: Coordinating route analysis with SerpAPI...")
+def _score_route_flight(flight, weather_result, parameters, airline_profiles, deadline=None, defer_explanation=False):
+    """Attach the airline's on-time rate to a route flight and run its deterministic risk assessment"""
+    return run_steps(_score_route_flight_steps(flight, weather_result, parameters, airline_profiles, deadline, defer_explanation))
+
+def _score_route_flight_steps(flight, weather_result, parameters, airline_profiles, deadline=None, defer_explanation=False):
+    # Use the SAME method as direct flight lookup for deterministic historical data
+    airline_code = flight.get('airline_code', 'Unknown')
+    flight_number = flight.get('flight_number', 'Unknown')
+    print(f"📊 ADK TOOL: Route analysis - analyzing {airline_code}{flight_number} with historical data lookup")
     
-    # DEFENSIVE: Ensure parameters is a dictionary
-    if not isinstance(parameters, dict):
-        print(f"❌ ADK TOOL: parameters is not a dict: {type(parameters)} - {str(parameters)[:100]}")
-        return {
-            'success': False,
-            'error': f'Invalid parameters type: expected dict, got {type(parameters)}',
-            'flights': []
-        }
+    # Historical profile fetched once for the whole search (see _enrich_route_flights)
+    profile = airline_profiles.get((airline_code, flight.get('origin_airport_code', ''), flight.get('destination_airport_code', '')), {})
+    on_time_data = profile.get('on_time', {})
     
-    print(f"🔍 ADK TOOL: Route parameters received: {list(parameters.keys()) if isinstance(parameters, dict) else 'NOT_DICT'}")
+    # Add On-Time Rate to flight data
+    if 'on_time_rate' in on_time_data:
+        flight['on_time_rate'] = on_time_data['on_time_rate']
+        flight['on_time_data'] = on_time_data
+        print(f"⏰ ADK TOOL: Added On-Time Rate to flight {flight_number}: {airline_code} = {flight['on_time_rate']}%")
+    else:
+        flight['on_time_rate'] = None
+        print(f"⚠️ ADK TOOL: No On-Time Rate data available for flight {flight_number} ({airline_code})")
+    
+    # CRITICAL: Use same historical data method as direct flight lookup
+    risk_result = yield from risk_agent.generate_flight_risk_analysis_steps(
+        flight, weather_result, parameters, deadline, defer_explanation,
+        historical_data=profile.get('flight_performance')
+    )
+    
+    # Log historical data usage for route analysis
+    if 'historical_performance' in risk_result:
+        historical_perf = risk_result['historical_performance']
+        total_flights = historical_perf.get('total_flights_analyzed', 0)
+        cancellation_rate = historical_perf.get('cancellation_rate', 'N/A')
+        avg_delay = historical_perf.get('average_delay', 'N/A')
+        print(f"✅ ADK TOOL: Route analysis - {airline_code}{flight_number} historical data: {total_flights} flights, {cancellation_rate} cancellation, {avg_delay} delay")
+    else:
+        print(f"⚠️ ADK TOOL: Route analysis - No historical data found for {airline_code}{flight_number}")
+    
+    return risk_result
+
+def _route_flight_insurance_data(flight, date, origin_airport_code, destination_airport_code):
+    """Flight data structure for insurance analysis of a route flight"""
+    return {
+        **flight,
+        'date': date,
+        'origin_airport_code': origin_airport_code,
+        'destination_airport_code': destination_airport_code
+    }
+
+def _unavailable_insurance_recommendation(risk_result):
+    return {
+        'success': False,
+        'recommendation': 'Insurance recommendation analysis temporarily unavailable.',
+        'recommendation_type': 'neutral',
+        'risk_level': risk_result.get('risk_level', 'medium'),
+        'confidence': 'low'
+    }
+
+def _analyze_route_flight(flight, weather_result, parameters, origin_airport_code, destination_airport_code, airline_profiles, deadline=None):
+    """
+    Run risk assessment, seasonal factors and insurance recommendation for one route flight.
+    Errors are contained per flight so one failure never affects the rest of the search results.
+    """
+    return run_steps(_analyze_route_flight_steps(flight, weather_result, parameters, origin_airport_code, destination_airport_code, airline_profiles, deadline))
+
+def _analyze_route_flight_steps(flight, weather_result, parameters, origin_airport_code, destination_airport_code, airline_profiles, deadline=None):
+    date = parameters.get('date', '')
     
     try:
-        origin = parameters.get('origin')
-        destination = parameters.get('destination')
-        date = parameters.get('date')
-        
-        # STEP 0: AI-powered city to airport code conversion
-        print("🏢 ADK TOOL: Converting city names to airport codes using AI...")
-        origin_airport_code = _ai_convert_city_to_airport_code(origin)
-        destination_airport_code = _ai_convert_city_to_airport_code(destination)
-        
-        print(f"✅ ADK TOOL: Origin: {origin} → {origin_airport_code}")
-        print(f"✅ ADK TOOL: Destination: {destination} → {destination_airport_code}")
-        
-        # Step 1: Get flight data from SerpAPI via Data Analyst Agent
-        print("📊 ADK TOOL: Getting flight data from SerpAPI...")
-        data_result = data_agent.analyze_route(origin_airport_code, destination_airport_code, date)
-        
-        if not data_result['success']:
-            return {
-                'success': False,
-                'error': data_result['message'],
-                'flights': []
-            }
+        risk_result = yield from _score_route_flight_steps(flight, weather_result, parameters, airline_profiles, deadline)
         
-        flights = data_result['flights']
-        print(f"📊 ADK TOOL: Found {len(flights)} flights from SerpAPI")
+        # ENHANCED: Extract seasonal factors from weather analysis for each flight
+        print(f"🗓️ ADK TOOL: Extracting seasonal factors for flight {flight.get('flight_number', 'Unknown')}")
+        seasonal_factors = []
         
-        # Step 2: Get weather analysis for origin and destination using converted airport codes
-        print("🌤️ ADK TOOL: Getting weather analysis...")
+        # Generate AI-powered seasonal factors for this specific flight
+        flight_number = flight.get('flight_number', 'Unknown')
+        print(f"🗓️ ADK TOOL: Generating AI seasonal factors for flight {flight_number}")
         
-        # Log weather analysis type for both airports
         try:
-            travel_datetime = datetime.strptime(date, "%Y-%m-%d")
-            today = datetime.now()
-            days_ahead = (travel_datetime.date() - today.date()).days
-            if days_ahead > 7:
-                print(f"🌤️ CLOUD LOGS: Weather analysis for {origin_airport_code} - SEASONAL analysis (flight is {days_ahead} days from today)")
-                print(f"🌤️ CLOUD LOGS: Weather analysis for {destination_airport_code} - SEASONAL analysis (flight is {days_ahead} days from today)")
+            # AI-powered seasonal factor generation
+            seasonal_factors, success = yield from _ai_generate_flight_seasonal_factors_steps(
+                origin_airport_code, 
+                destination_airport_code, 
+                date,
+                flight_number,
+                deadline=deadline
+            )
+        
+            if success and len(seasonal_factors) > 0:
+                risk_result['seasonal_factors'] = seasonal_factors[:5]
+                risk_result['key_risk_factors'] = seasonal_factors[:5]  # For frontend compatibility
+                print(f"✅ ADK TOOL: Added {len(seasonal_factors)} AI seasonal factors to flight {flight_number}")
             else:
-                print(f"🌤️ CLOUD LOGS: Weather analysis for {origin_airport_code} - REAL-TIME SerpAPI analysis (flight is {days_ahead} days from today)")
-                print(f"🌤️ CLOUD LOGS: Weather analysis for {destination_airport_code} - REAL-TIME SerpAPI analysis (flight is {days_ahead} days from today)")
-        except Exception as e:
-            print(f"⚠️ CLOUD LOGS: Could not determine weather analysis type: {e}")
+                # User-friendly message when seasonal factor generation fails
+                risk_result['seasonal_factors'] = seasonal_factors
+                risk_result['key_risk_factors'] = risk_result['seasonal_factors']
+                print(f"⚠️ ADK TOOL: Seasonal factor generation failed for flight {flight_number} - showing user-friendly message")
         
-        try:
-            # FIXED: Call Weather Intelligence Agent separately for each airport to get individual weather data
-            print(f"🌤️ ADK TOOL: Analyzing weather for origin airport {origin_airport_code}")
-            origin_weather = weather_agent.analyze_weather_conditions(origin_airport_code, date)
-            
-            print(f"🌤️ ADK TOOL: Analyzing weather for destination airport {destination_airport_code}")
-            destination_weather = weather_agent.analyze_weather_conditions(destination_airport_code, date)
-            
-            # Combine the individual weather analyses
-            # Extract city names from weather analysis for proper display
-            origin_city = origin_weather.get('city', 'Unknown City')
-            destination_city = destination_weather.get('city', 'Unknown City')
-            
-            weather_result = {
-                'origin_weather': origin_weather,
-                'destination_weather': destination_weather,
-                'weather_conditions': {
-                    'conditions': f"Origin ({origin_airport_code}, {origin_city}): {origin_weather.get('weather_conditions', {}).get('conditions', 'Analysis pending')} | Destination ({destination_airport_code}, {destination_city}): {destination_weather.get('weather_conditions', {}).get('conditions', 'Analysis pending')}"
-                },
-                'weather_risk': {
-                    'level': 'medium',  # Default level, can be enhanced with individual analysis
-                    'description': f"Route weather analysis: {origin_airport_code} and {destination_airport_code} conditions assessed"
-                },
-                'data_source': 'Individual Airport Weather Analysis'
-            }
-            
-            print(f"✅ ADK TOOL: Individual weather analysis successful for both airports")
         except Exception as e:
-            print(f"❌ ADK TOOL: Weather analysis failed: {e}")
-            # NO FALLBACK - Return actual error
-            return {
-                'success': False,
-                'error': f'Weather analysis failed: {str(e)}',
-                'flights': []
-            }
-        
-        # Step 2.1: INDEPENDENT AIRPORT COMPLEXITY ANALYSIS FOR ROUTE (SAME AS DIRECT FLIGHT)
-        print("🏢 ADK TOOL: Running INDEPENDENT airport complexity analysis for route...")
-        
-        # Initialize the airport complexity agent directly
-        from airport_complexity_agent import AirportComplexityAgent
-        airport_complexity_agent = AirportComplexityAgent()
-        
-        # Get INDEPENDENT airport complexity analysis for route origin
-        if origin_airport_code:
-            print(f"🏢 ADK TOOL: Analyzing route origin airport complexity for {origin_airport_code} (INDEPENDENT)")
-            try:
-                origin_complexity = airport_complexity_agent.analyze_airport_complexity(origin_airport_code)
-                weather_result['origin_airport_analysis'] = {
-                    'airport_complexity': origin_complexity,
-                    'data_source': 'Independent Airport Complexity Agent'
-                }
-                print(f"✅ ADK TOOL: Route origin complexity analysis complete")
-            except Exception as e:
-                print(f"❌ ADK TOOL: Route origin complexity analysis failed: {e}")
-                weather_result['origin_airport_analysis'] = {
-                    'airport_complexity': {
-                        'complexity': 'unknown',
-                        'description': f'Complexity analysis failed for {origin_airport_code}',
-                        'concerns': ['Analysis error']
-                    },
-                    'data_source': 'Analysis Failed'
-                }
-        
-        # Get INDEPENDENT airport complexity analysis for route destination
-        if destination_airport_code:
-            print(f"🏢 ADK TOOL: Analyzing route destination airport complexity for {destination_airport_code} (INDEPENDENT)")
-            try:
-                destination_complexity = airport_complexity_agent.analyze_airport_complexity(destination_airport_code)
-                weather_result['destination_airport_analysis'] = {
-                    'airport_complexity': destination_complexity,
-                    'data_source': 'Independent Airport Complexity Agent'
-                }
-                print(f"✅ ADK TOOL: Route destination complexity analysis complete")
-            except Exception as e:
-                print(f"❌ ADK TOOL: Route destination complexity analysis failed: {e}")
-                weather_result['destination_airport_analysis'] = {
-                    'airport_complexity': {
-                        'complexity': 'unknown',
-                        'description': f'Complexity analysis failed for {destination_airport_code}',
-                        'concerns': ['Analysis error']
-                    },
-                    'data_source': 'Analysis Failed'
-                }
+            print(f"❌ ADK TOOL: Seasonal factor generation failed for {flight_number}: {e}")
+            # Use basic seasonal factors when generation fails
+            basic_factors = _ai_generate_basic_seasonal_factors(date)
+            risk_result['seasonal_factors'] = basic_factors
+            risk_result['key_risk_factors'] = basic_factors
+        
+        # Generate AI-powered insurance recommendation for this flight
+        print(f"🛡️ ADK TOOL: Generating insurance recommendation for route flight {flight_number}")
+        try:
+            # Create a temporary flight data structure for insurance analysis
+            flight_data_for_insurance = _route_flight_insurance_data(flight, date, origin_airport_code, destination_airport_code)
         
-        # Step 2.5: LAYOVER ANALYSIS FOR ROUTE FLIGHTS (NEW - ADDED TO ROUTE ANALYSIS)
-        print("🔗 ADK TOOL: Running layover analysis for route flights...")
+            insurance_recommendation = yield from insurance_agent.generate_insurance_recommendation_steps(
+                flight_data_for_insurance, risk_result, weather_result, deadline=deadline
+            )
         
-        # Process each flight to add layover weather and complexity data
-        for flight in flights:
-            connections = flight.get('connections', [])
-            if connections:
-                print(f"🔗 ADK TOOL: Processing {len(connections)} connections for flight {flight.get('flight_number', 'Unknown')}")
-                
-                # Get unique layover airports to avoid duplicate processing
-                layover_airports = []
-                for connection in connections:
-                    airport_code = connection.get('airport', 
-                                               connection.get('layoverInfo', {}).get('airport', ''))
-                    if airport_code and airport_code.strip() and airport_code not in layover_airports:
-                        layover_airports.append(airport_code)
-                
-                if layover_airports:
-                    print(f"🚀 ADK TOOL: Processing {len(layover_airports)} unique layover airports: {layover_airports}")
-                    
-                    # Use parallel processing for weather analysis
-                    import concurrent.futures
-                    import threading
-                    
-                    def analyze_single_layover_weather(airport_code):
-                        """Analyze weather for a single layover airport"""
-                        try:
-                            print(f"🌤️ ADK TOOL: [Thread] Analyzing weather for layover {airport_code}")
-                            
-                            # Use the same WeatherIntelligenceAgent as origin/destination
-                            from weather_intelligence_agent import weather_intelligence_agent
-                            layover_weather_result = weather_intelligence_agent.analyze_weather_conditions(
-                                airport_code=airport_code,
-                                flight_date=date
-                            )
-                            
-                            print(f"✅ ADK TOOL: [Thread] Got weather data for layover {airport_code}")
-                            return airport_code, layover_weather_result
-                            
-                        except Exception as e:
-                            print(f"❌ ADK TOOL: [Thread] Failed to get weather for layover {airport_code}: {e}")
-                            return airport_code, {
-                                "error": f"Weather analysis failed for {airport_code}: {str(e)}",
-                                "weather_available": False
-                            }
-                    
-                    def analyze_single_layover_complexity(airport_code):
-                        """Analyze airport complexity for a single layover airport"""
-                        try:
-                            print(f"🏢 ADK TOOL: [Thread] Analyzing complexity for layover {airport_code}")
-                            
-                            # Use the same AirportComplexityAgent as origin/destination
-                            complexity_result = airport_complexity_agent.analyze_airport_complexity(airport_code)
-                            
-                            print(f"✅ ADK TOOL: [Thread] Got complexity data for layover {airport_code}")
-                            return airport_code, complexity_result
-                            
-                        except Exception as e:
-                            print(f"❌ ADK TOOL: [Thread] Failed to get complexity for layover {airport_code}: {e}")
-                            return airport_code, {
-                                "complexity": "unknown",
-                                "description": f"Airport complexity analysis failed for {airport_code}",
-                                "concerns": ["Airport complexity analysis error"]
-                            }
-                    
-                    # Process layovers in parallel with maximum 4 concurrent threads
-                    max_workers = min(4, len(layover_airports))
-                    layover_weather_analysis = {}
-                    layover_complexity_analysis = {}
-                    
-                    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-                        # Submit all layover weather analysis tasks
-                        future_to_airport = {
-                            executor.submit(analyze_single_layover_weather, airport_code): airport_code 
-                            for airport_code in layover_airports
-                        }
-                        
-                        # Collect weather results as they complete
-                        for future in concurrent.futures.as_completed(future_to_airport):
-                            airport_code, weather_data = future.result()
-                            layover_weather_analysis[airport_code] = weather_data
-                        
-                        # Submit all layover complexity analysis tasks
-                        future_to_airport = {
-                            executor.submit(analyze_single_layover_complexity, airport_code): airport_code 
-                            for airport_code in layover_airports
-                        }
-                        
-                        # Collect complexity results as they complete
-                        for future in concurrent.futures.as_completed(future_to_airport):
-                            airport_code, complexity_data = future.result()
-                            layover_complexity_analysis[airport_code] = complexity_data
-                    
-                    print(f"🚀 ADK TOOL: Parallel layover analysis complete for {len(layover_airports)} layovers")
-                    
-                    # Apply results to connections
-                    for connection in connections:
-                        airport_code = connection.get('airport', 
-                                                   connection.get('layoverInfo', {}).get('airport', ''))
-                        
-                        # FIXED: Extract city name from airport code
-                        city_name = extract_city_from_airport_code(airport_code)
-                        
-                        # FIXED: Ensure connection has proper structure with city name
-                        connection['airport'] = airport_code
-                        connection['city'] = city_name
-                        connection['airport_name'] = f"{city_name} Airport"
-                        
-                        if airport_code in layover_weather_analysis and airport_code in layover_complexity_analysis:
-                            layover_weather_data = layover_weather_analysis[airport_code]
-                            layover_complexity_data = layover_complexity_analysis[airport_code]
-                            
-                            # Add weather risk data to connection - FIXED: Add to layoverInfo structure that frontend expects
-                            if not layover_weather_data.get('error'):
-                                # Ensure layoverInfo exists
-                                if 'layoverInfo' not in connection:
-                                    connection['layoverInfo'] = {}
-                                
-                                connection['layoverInfo']['weather_risk'] = {
-                                    "level": layover_weather_data.get('weather_risk', {}).get('level', 'medium'),
-                                    "description": layover_weather_data.get('weather_risk', {}).get('description', 'Weather analysis not available'),
-                                    "risk_factors": layover_weather_data.get('weather_risk', {}).get('risk_factors', [])
-                                }
-                                
-                                connection['layoverInfo']['airport_complexity'] = {
-                                    "complexity": layover_complexity_data.get('complexity', 'medium'),
-                                    "description": layover_complexity_data.get("description", "Airport complexity analysis not available"),
-                                    "concerns": layover_complexity_data.get("concerns", ["❌ Airport complexity analysis failed"])
-                                }
-                                
-                                connection['data_source'] = 'Real Analysis'
-                                print(f"✅ ADK TOOL: Added weather and complexity data for layover {airport_code} ({city_name})")
-                            else:
-                                print(f"❌ ADK TOOL: Weather analysis failed for layover {airport_code} ({city_name})")
-                        else:
-                            print(f"🔍 DEBUG: No layover data found for airport_code: {airport_code} ({city_name})")
-                else:
-                    print("ℹ️ ADK TOOL: No layover airports to analyze")
+            if insurance_recommendation.get('success'):
+                flight['insurance_recommendation'] = insurance_recommendation
+                print(f"✅ ADK TOOL: Insurance recommendation generated for flight {flight_number}")
             else:
-                print("ℹ️ ADK TOOL: Direct flight - no layovers to analyze")
-        
-        # Step 2.5: Calculate On-Time Rate for each airline in the flights
-        print("⏰ ADK TOOL: Calculating On-Time Rates for airlines in route...")
-        airline_on_time_rates = {}
-        
-        # Collect unique airline-route combinations from all flights
-        unique_airline_routes = set()
-        for flight in flights:
-            airline_code = flight.get('airline_code', '')
-            origin = flight.get('origin_airport_code', '')
-            destination = flight.get('destination_airport_code', '')
-            if airline_code and origin and destination:
-                unique_airline_routes.add((airline_code, origin, destination))
-        
-        # Calculate On-Time Rate for each unique airline-route combination
-        for airline_code, origin, destination in unique_airline_routes:
-            try:
-                on_time_data = get_airline_on_time_rate(airline_code, origin, destination, years=[2016, 2017, 2018])
-                if on_time_data and 'on_time_rate' in on_time_data:
-                    airline_on_time_rates[airline_code] = on_time_data
-                    print(f"✅ ADK TOOL: On-Time Rate calculated for route: {airline_code} = {on_time_data['on_time_rate']}%")
-                else:
-                    print(f"⚠️ ADK TOOL: On-Time Rate calculation failed for route airline {airline_code}")
-            except Exception as e:
-                print(f"❌ ADK TOOL: On-Time Rate calculation failed for route airline {airline_code}: {e}")
-        
-        # Step 3: Process each flight with risk analysis
-        print("⚠️ ADK TOOL: Analyzing flight risks with historical data...")
-        analyzed_flights = []
+                flight['insurance_recommendation'] = insurance_recommendation
+                print(f"⚠️ ADK TOOL: Insurance recommendation fallback used for flight {flight_number}")
         
-        for flight in flights:
-            try:
-                # Use the SAME method as direct flight lookup for deterministic historical data
-                airline_code = flight.get('airline_code', 'Unknown')
-                flight_number = flight.get('flight_number', 'Unknown')
-                print(f"📊 ADK TOOL: Route analysis - analyzing {airline_code}{flight_number} with historical data lookup")
-                
-                # Add On-Time Rate to flight data
-                if airline_code in airline_on_time_rates:
-                    flight['on_time_rate'] = airline_on_time_rates[airline_code]['on_time_rate']
-                    flight['on_time_data'] = airline_on_time_rates[airline_code]
-                    print(f"⏰ ADK TOOL: Added On-Time Rate to flight {flight_number}: {airline_code} = {flight['on_time_rate']}%")
-                else:
-                    flight['on_time_rate'] = None
-                    print(f"⚠️ ADK TOOL: No On-Time Rate data available for flight {flight_number} ({airline_code})")
-                
-                # CRITICAL: Use same historical data method as direct flight lookup
-                risk_result = risk_agent.generate_flight_risk_analysis(flight, weather_result, parameters)
-                
-                # Log historical data usage for route analysis
-                if 'historical_performance' in risk_result:
-                    historical_perf = risk_result['historical_performance']
-                    total_flights = historical_perf.get('total_flights_analyzed', 0)
-                    cancellation_rate = historical_perf.get('cancellation_rate', 'N/A')
-                    avg_delay = historical_perf.get('average_delay', 'N/A')
-                    print(f"✅ ADK TOOL: Route analysis - {airline_code}{flight_number} historical data: {total_flights} flights, {cancellation_rate} cancellation, {avg_delay} delay")
-                else:
-                    print(f"⚠️ ADK TOOL: Route analysis - No historical data found for {airline_code}{flight_number}")
-                
-                # ENHANCED: Extract seasonal factors from weather analysis for each flight
-                print(f"🗓️ ADK TOOL: Extracting seasonal factors for flight {flight.get('flight_number', 'Unknown')}")
-                seasonal_factors = []
-                
-                # Generate AI-powered seasonal factors for this specific flight
-                flight_number = flight.get('flight_number', 'Unknown')
-                print(f"🗓️ ADK TOOL: Generating AI seasonal factors for flight {flight_number}")
-                
-                try:
-                    # AI-powered seasonal factor generation
-                    seasonal_factors, success = _ai_generate_flight_seasonal_factors(
-                        origin_airport_code, 
-                        destination_airport_code, 
-                        parameters.get('date', ''),
-                        flight_number
-                    )
-                    
-                    if success and len(seasonal_factors) > 0:
-                        risk_result['seasonal_factors'] = seasonal_factors[:5]
-                        risk_result['key_risk_factors'] = seasonal_factors[:5]  # For frontend compatibility
-                        print(f"✅ ADK TOOL: Added {len(seasonal_factors)} AI seasonal factors to flight {flight_number}")
-                    else:
-                        # User-friendly message when seasonal factor generation fails
-                        risk_result['seasonal_factors'] = seasonal_factors
-                        risk_result['key_risk_factors'] = risk_result['seasonal_factors']
-                        print(f"⚠️ ADK TOOL: Seasonal factor generation failed for flight {flight_number} - showing user-friendly message")
-                        
-                except Exception as e:
-                    print(f"❌ ADK TOOL: Seasonal factor generation failed for {flight_number}: {e}")
-                    # Use basic seasonal factors when generation fails
-                    basic_factors = _ai_generate_basic_seasonal_factors(date)
-                    risk_result['seasonal_factors'] = basic_factors
-                    risk_result['key_risk_factors'] = basic_factors
-                
-                # Generate AI-powered insurance recommendation for this flight
-                print(f"🛡️ ADK TOOL: Generating insurance recommendation for route flight {flight_number}")
-                try:
-                    # Create a temporary flight data structure for insurance analysis
-                    flight_data_for_insurance = {
-                        **flight,
-                        'date': parameters.get('date', ''),
-                        'origin_airport_code': origin_airport_code,
-                        'destination_airport_code': destination_airport_code
-                    }
-                    
-                    insurance_recommendation = insurance_agent.generate_insurance_recommendation(
-                        flight_data_for_insurance, risk_result, weather_result
-                    )
-                    
-                    if insurance_recommendation.get('success'):
-                        flight['insurance_recommendation'] = insurance_recommendation
-                        print(f"✅ ADK TOOL: Insurance recommendation generated for flight {flight_number}")
-                    else:
-                        flight['insurance_recommendation'] = insurance_recommendation
-                        print(f"⚠️ ADK TOOL: Insurance recommendation fallback used for flight {flight_number}")
-                        
-                except Exception as e:
-                    print(f"❌ ADK TOOL: Insurance recommendation failed for flight {flight_number}: {e}")
-                    flight['insurance_recommendation'] = {
-                        'success': False,
-                        'recommendation': 'Insurance recommendation analysis temporarily unavailable.',
-                        'recommendation_type': 'neutral',
-                        'risk_level': risk_result.get('risk_level', 'medium'),
-                        'confidence': 'low'
-                    }
-                
-                analyzed_flight = {
-                    **flight,
-                    'risk_analysis': risk_result,
-                    'weather_summary': weather_result.get('summary', 'Weather analysis available')
-                }
-                analyzed_flights.append(analyzed_flight)
-            except Exception as e:
-                print(f"❌ ADK TOOL: Failed to analyze flight - {str(e)}")
-                analyzed_flights.append({
-                    **flight,
-                    'risk_analysis': {'error': str(e)},
-                    'weather_summary': 'Analysis failed'
-                })
-        
-        # Add airport analysis to each flight for easier frontend access
-        for flight in analyzed_flights:
-            if 'origin_airport_analysis' in weather_result:
-                flight['origin_analysis'] = weather_result['origin_airport_analysis']
-            if 'destination_airport_analysis' in weather_result:
-                flight['destination_analysis'] = weather_result['destination_airport_analysis']
+        except Exception as e:
+            print(f"❌ ADK TOOL: Insurance recommendation failed for flight {flight_number}: {e}")
+            flight['insurance_recommendation'] = _unavailable_insurance_recommendation(risk_result)
         
-        # Return in the EXACT format the UI expects for route analysis
         return {
-            'success': True,
-            'flights': analyzed_flights,  # Array of flights with risk_analysis for each
-            'weather_analysis': weather_result,  # Route weather analysis
-            'analysis_timestamp': datetime.now(timezone.utc).isoformat()
+            **flight,
+            'risk_analysis': risk_result,
+            'weather_summary': weather_result.get('summary', 'Weather analysis available')
         }
-        
     except Exception as e:
-        print(f"❌ ADK TOOL: Route analysis failed - {str(e)}")
+        print(f"❌ ADK TOOL: Failed to analyze flight - {str(e)}")
         return {
-            'success': False,
-            'error': f'Route analysis failed: {str(e)}',
-            'flights': []
+            **flight,
+            'risk_analysis': {'error': str(e)},
+            'weather_summary': 'Analysis failed'
         }
 
 def _get_airline_name_from_code(airline_code: str) -> str:
     """Convert airline code to full airline name for BigQuery lookup"""
-    airline_mappings = {
-        'AA': 'American Airlines',
-        'DL': 'Delta Air Lines', 
-        'UA': 'United Airlines',
-        'WN': 'Southwest Airlines',
-        'B6': 'JetBlue Airways',
-        'AS': 'Alaska Airlines',
-        'NK': 'Spirit Airlines',
-        'F9': 'Frontier Airlines',
-        'G4': 'Allegiant Air',
-        'SY': 'Sun Country Airlines',
-        'AC': 'Air Canada',
-        'BA': 'British Airways',
-        'LH': 'Lufthansa',
-        'AF': 'Air France',
-        'KL': 'KLM',
-        'EK': 'Emirates',
-        'QR': 'Qatar Airways',
-        'TK': 'Turkish Airlines',
-        'SQ': 'Singapore Airlines',
-        'CX': 'Cathay Pacific',
-        'JL': 'Japan Airlines',
-        'NH': 'All Nippon Airways'
-    }
-    
-    return airline_mappings.get(airline_code.upper(), airline_code)
+    return AIRLINE_NAMES.get(airline_code.upper(), airline_code)
 
-def _handle_unified_route_analysis(params: dict, reasoning: str = "Route analysis requested") -> dict:
+def _handle_unified_route_analysis(params: dict, reasoning: str = "Route analysis requested", deadline: RequestDeadline = None) -> dict:
     """
     UNIFIED STANDARD AGENT for route analysis - used by BOTH natural language and HTML form controls
     This ensures identical processing regardless of input method using the SAME backend agents:
@@ -1854,7 +2131,7 @@ def _handle_unified_route_analysis(params: dict, reasoning: str = "Route analysi
         print(f"🚀 UNIFIED ROUTE ANALYSIS: Calling backend route analysis...")
         
         # Call the SAME backend route analysis function used by natural language with retry logic
-        analysis_result = _handle_route_analysis_with_retry(params)
+        analysis_result = _handle_route_analysis_with_retry(params, deadline=deadline)
         
         print(f"🚀 UNIFIED ROUTE ANALYSIS: Backend analysis complete - Success: {analysis_result.get('success')}")
         
@@ -1867,6 +2144,7 @@ def _handle_unified_route_analysis(params: dict, reasoning: str = "Route analysi
             },
             'flights': analysis_result.get('flights', []),
             'weather_analysis': analysis_result.get('weather_analysis', {}),
+            'degraded_stages': analysis_result.get('degraded_stages', []),
             'route_info': {
                 'origin': params.get('origin', 'Unknown'),
                 'destination': params.get('destination', 'Unknown'),
@@ -1901,8 +2179,7 @@ def determine_intent_and_route_analysis(message: str) -> dict:
         print(f"🎯 MAIN ORCHESTRATOR: Analyzing user message for intent detection")
         
         # Use Gemini AI to analyze the message and determine intent
-        genai.configure(api_key=GOOGLE_API_KEY)
-        model = genai.GenerativeModel('gemini-2.0-flash')
+        model = get_model()
         
         intent_prompt = f"""
         You are an AI Flight Risk Analysis Orchestrator. Analyze this user message and determine the intent.
@@ -2022,6 +2299,7 @@ def determine_intent_and_route_analysis(message: str) -> dict:
                 'flight_data': analysis_result.get('flight_data', {}),
                 'risk_analysis': analysis_result.get('risk_analysis', {}),
                 'weather_analysis': analysis_result.get('weather_analysis', {}),
+                'degraded_stages': analysis_result.get('degraded_stages', []),
                 'error': analysis_result.get('error'),
                 'timestamp': datetime.now(timezone.utc).isoformat()
             }
@@ -2078,12 +2356,17 @@ def handle_chat_conversation(message: str) -> dict:
             'response': "I apologize, but I'm having trouble processing your request right now. Please try rephrasing your question about flight risks, insurance, or travel advice, and I'll do my best to help you."
         }
 
-# Create Google ADK Agent with proper tools using correct API
-flight_risk_orchestrator = Agent(
-    name="flight_risk_orchestrator",
-    model="gemini-2.0-flash",
-    description="AI-Powered Flight Risk Analysis Orchestrator using Google ADK",
-    instruction="""You are an AI flight risk analysis orchestrator using Google ADK agents. You coordinate multiple specialized agents to provide comprehensive flight risk analysis and travel advice.
+def _build_flight_risk_orchestrator():
+    """Create the Google ADK orchestrator agent (built lazily by the agent registry)"""
+    from google.adk.agents import Agent
+    from google.adk.tools import FunctionTool
+    print("✅ Using real Google ADK")
+
+    return Agent(
+        name="flight_risk_orchestrator",
+        model="gemini-2.0-flash",
+        description="AI-Powered Flight Risk Analysis Orchestrator using Google ADK",
+        instruction="""You are an AI flight risk analysis orchestrator using Google ADK agents. You coordinate multiple specialized agents to provide comprehensive flight risk analysis and travel advice.
 
 Your team includes:
 - Data Analyst Agent: Analyzes flight data from BigQuery and SerpAPI
@@ -2100,11 +2383,29 @@ When users request flight analysis:
 3. For general questions, insurance advice, or travel guidance, use handle_chat_conversation tool
 
 Always provide helpful, accurate information prioritizing passenger safety and informed decision-making.""",
-    tools=[
-        FunctionTool(func=analyze_flight_risk_tool),
-        FunctionTool(func=handle_chat_conversation)
-    ]
-)
+        tools=[
+            FunctionTool(func=analyze_flight_risk_tool),
+            FunctionTool(func=handle_chat_conversation)
+        ]
+    )
+
+# Google ADK orchestrator agent, built on first use
+flight_risk_orchestrator = register('flight_risk_orchestrator', _build_flight_risk_orchestrator)
+
+def _run_coalesced(request_type: str, fingerprint_fields: dict, analysis_func):
+    """
+    Run an analysis through the process-wide request coalescer.
+    Returns (result, coalesced) where coalesced is True if the result came from a concurrent duplicate.
+    """
+    key = RequestCoalescer.fingerprint(request_type, fingerprint_fields)
+    result, coalesced = request_coalescer.run(key, analysis_func)
+    if coalesced:
+        print(f"🔗 UNIFIED ORCHESTRATOR: {request_type} request coalesced with an identical in-flight request")
+    return result, coalesced
+
+def _direct_flight_fingerprint(params: dict) -> dict:
+    """Fields that identify a direct flight lookup, so every request path coalesces the same flight"""
+    return {key: params.get(key, '') for key in ('airline', 'flight_number', 'date', 'origin_airport_code', 'destination_airport_code')}
 
 def log_start(params):
     now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
@@ -2114,6 +2415,120 @@ def log_end():
     now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     print(f"\n{'*'*60}\n🏁🏁🏁 LOGS ENDS [{now}] 🏁��🏁\n{'*'*60}\n\n")
 
+def _get_stream_format(request_data: dict):
+    """
+    Streaming is opt-in: "stream": "ndjson" or "sse" selects the wire format,
+    "stream": true defaults to NDJSON. Returns None for a regular JSON response.
+    """
+    stream = request_data.get('stream')
+    if stream is True:
+        return 'ndjson'
+    if isinstance(stream, str) and stream.lower() in ('ndjson', 'sse'):
+        return stream.lower()
+    return None
+
+def _format_stream_event(event: str, data: dict, stream_format: str) -> str:
+    """Serialize one streaming event as an NDJSON line or an SSE frame"""
+    if stream_format == 'sse':
+        return f"event: {event}\ndata: {json.dumps(data, cls=DateTimeEncoder)}\n\n"
+    return json.dumps({'event': event, 'data': data}, cls=DateTimeEncoder) + "\n"
+
+def _build_streaming_response(events, stream_format: str, headers: dict):
+    """Wrap an event generator in a chunked HTTP response"""
+    from flask import Response, stream_with_context
+    
+    stream_headers = {
+        **headers,
+        'Content-Type': 'text/event-stream' if stream_format == 'sse' else 'application/x-ndjson',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    }
+    return Response(stream_with_context(events), status=200, headers=stream_headers)
+
+def _stream_route_analysis(parameters, stream_format='ndjson', deadline=None):
+    """
+    Streaming variant of route analysis for clients that opt in with "stream".
+    Events, in order:
+    - flights: the SerpAPI flight list as soon as it is available
+    - flight: one per flight as its risk, seasonal factors and insurance finish (completion order, with index)
+    - summary: route weather analysis and totals once every flight is done
+    - error: replaces the remaining events if the route itself cannot be analyzed
+    """
+    import time
+    start_time = time.time()
+    if deadline is None:
+        deadline = RequestDeadline()
+    route_info = {
+        'origin': parameters.get('origin', 'Unknown'),
+        'destination': parameters.get('destination', 'Unknown'),
+        'date': parameters.get('date', 'Unknown')
+    }
+    print(f"📡 STREAMING ROUTE ANALYSIS: Streaming route search as {stream_format.upper()}: {route_info}")
+    
+    try:
+        route_context = _fetch_route_flights(parameters)
+        if not route_context['success']:
+            yield _format_stream_event('error', {
+                'success': False,
+                'error': route_context.get('error'),
+                'route_info': route_info
+            }, stream_format)
+            return
+        
+        flights = route_context['flights']
+        yield _format_stream_event('flights', {
+            'flights': flights,
+            'total_flights': len(flights),
+            'route_info': route_info,
+            'elapsed_time': time.time() - start_time
+        }, stream_format)
+        
+        route_context = _enrich_route_flights(parameters, route_context)
+        if not route_context['success']:
+            yield _format_stream_event('error', {
+                'success': False,
+                'error': route_context.get('error'),
+                'route_info': route_info
+            }, stream_format)
+            return
+        
+        failed_flights = 0
+        # Per-flight prompts, so each flight can be streamed as soon as it is done
+        for index, analyzed_flight in _iter_route_flight_analyses(parameters, route_context, deadline, batched=False):
+            if 'error' in analyzed_flight.get('risk_analysis', {}):
+                failed_flights += 1
+            print(f"📡 STREAMING ROUTE ANALYSIS: Flight {index + 1}/{len(flights)} ready after {time.time() - start_time:.2f} seconds")
+            yield _format_stream_event('flight', {
+                'index': index,
+                'flight': analyzed_flight,
+                'elapsed_time': time.time() - start_time
+            }, stream_format)
+        
+        yield _format_stream_event('summary', {
+            'success': True,
+            'orchestrator': {
+                'intent': 'route_analysis',
+                'reasoning': 'Streaming route search'
+            },
+            'total_flights': len(flights),
+            'failed_flights': failed_flights,
+            'weather_analysis': route_context['weather_analysis'],
+            'degraded_stages': deadline.degraded_stages,
+            'route_info': route_info,
+            'total_time': time.time() - start_time,
+            'timestamp': datetime.now(timezone.utc).isoformat()
+        }, stream_format)
+        
+    except Exception as e:
+        print(f"❌ STREAMING ROUTE ANALYSIS: Failed - {str(e)}")
+        yield _format_stream_event('error', {
+            'success': False,
+            'error': f'Route analysis failed: {str(e)}',
+            'route_info': route_info
+        }, stream_format)
+    finally:
+        log_end()
+
 @functions_framework.http
 def main(request):
     """
@@ -2140,6 +2555,15 @@ def main(request):
                 'framework': 'Google ADK',
                 'model': 'gemini-2.0-flash',
                 'agents': ['data_analyst', 'weather_intelligence', 'risk_assessment'],
+                'request_coalescing': request_coalescer.get_stats(),
+                'worker_pools': get_pool_stats(),
+                'agent_registry': get_registry_status(),
+                'llm_gateway': get_llm_stats(),
+                'llm_cache': llm_response_cache.get_stats(),
+                'reference_data': get_resolver_stats(),
+                'bigquery_tool': get_bigquery_tool_health(),
+                'bigquery_cache': query_result_cache.get_stats(),
+                'bigquery_jobs': query_executor.get_stats(),
                 'timestamp': datetime.now(timezone.utc).isoformat()
             }, cls=DateTimeEncoder), 200, headers)
 
@@ -2147,9 +2571,15 @@ def main(request):
         request_data = request.get_json(silent=True)
         if not request_data:
             return (json.dumps({'success': False, 'error': 'No JSON data'}, cls=DateTimeEncoder), 400, headers)
+        
+        # Latency budget for this request, passed through the orchestrators to every agent call
+        deadline = RequestDeadline()
+        # BigQuery jobs run for this request, from any thread or task working on it
+        query_costs = query_executor.track()
 
         # UNIFIED ROUTING - All requests use the same standard agents
         result = None
+        coalesced = False
         
         # Handle chat messages with intent detection using main orchestrator
         if 'message' in request_data:
@@ -2158,31 +2588,47 @@ def main(request):
             result = determine_intent_and_route_analysis(request_data.get('message', ''))
             log_end()
             
+        # Handle batch flight analysis - many Google Flights flight_data objects in one round-trip
+        elif request_data.get('batch_flights') is not None:
+            print(f"📦 UNIFIED ORCHESTRATOR: Processing batch flight analysis")
+            
+            batch_flights = request_data.get('batch_flights')
+            batch_date = request_data.get('date', '')
+            log_start({
+                'batch_flights': len(batch_flights) if isinstance(batch_flights, list) else type(batch_flights).__name__,
+                'date': batch_date
+            })
+            # A batch gets its own, larger latency budget than a single flight
+            batch_deadline = RequestDeadline(BATCH_DEADLINE_SECONDS)
+            result, coalesced = _run_coalesced(
+                'batch_flight_analysis',
+                {'batch_flights': batch_flights, 'date': batch_date},
+                lambda: _handle_batch_flight_analysis(batch_flights, batch_date, batch_deadline)
+            )
+            log_end()
+            
+            result['orchestrator'] = {
+                'intent': 'batch_flight_analysis',
+                'reasoning': 'Batch flight analysis'
+            }
+            result['timestamp'] = datetime.now(timezone.utc).isoformat()
+            
         # Handle Chrome Extension flight analysis - USES GOOGLE FLIGHTS DATA INSTEAD OF BIGQUERY LOOKUP
         elif request_data.get('extension'):
             print(f"🔌 UNIFIED ORCHESTRATOR: Processing Chrome Extension flight analysis")
             
             # Extract flight data from Google Flights format - extension_data is the flight_data object
             flight_data = request_data.get('flight_data', {})
-            params = {
-                'airline': flight_data.get('airline_code', flight_data.get('airline', '')),  # Try airline_code first, then airline
-                'airline_name': flight_data.get('airline_name', ''),
-                'flight_number': flight_data.get('flight_number', ''),
-                'origin': flight_data.get('origin_airport_code', flight_data.get('origin', '')),  # Try origin_airport_code first
-                'destination': flight_data.get('destination_airport_code', flight_data.get('destination', '')),  # Try destination_airport_code first
-                'date': request_data.get('date', ''),
-                'departure_time': flight_data.get('departure_time_local', flight_data.get('departure_time', '')),  # Try departure_time_local first
-                'arrival_time': flight_data.get('arrival_time_local', flight_data.get('arrival_time', '')),  # Try arrival_time_local first
-                'duration_minutes': flight_data.get('duration_minutes', 0),
-                'connections': flight_data.get('connections', []),
-                'price': flight_data.get('price', ''),
-                'aircraft_type': flight_data.get('airplane_model', flight_data.get('aircraft', ''))  # Try airplane_model first
-            }
+            params = _extension_params_from_flight_data(flight_data, request_data.get('date', ''))
             
             print(f"🔌 UNIFIED ORCHESTRATOR: Extension params: {params}")
             log_start(params)
             # Use the NEW extension flight analysis function
-            analysis_result = _handle_extension_flight_analysis(params)
+            analysis_result, coalesced = _run_coalesced(
+                'extension_flight_analysis',
+                {'flight_data': flight_data, 'date': request_data.get('date', '')},
+                lambda: _handle_extension_flight_analysis(params, deadline)
+            )
             log_end()
             
             # Format response in standard format
@@ -2197,6 +2643,7 @@ def main(request):
                 'weather_analysis': analysis_result.get('weather_analysis', {}),
                 'insurance_recommendation': analysis_result.get('insurance_recommendation', {}),
                 'analysis_metadata': analysis_result.get('analysis_metadata', {}),
+                'degraded_stages': analysis_result.get('degraded_stages', []),
                 'error': analysis_result.get('error'),
                 'timestamp': datetime.now(timezone.utc).isoformat()
             }
@@ -2212,8 +2659,18 @@ def main(request):
             }
             print(f"🛫 UNIFIED ORCHESTRATOR: Route search params: {params}")
             log_start(params)
+            
+            # Opt-in streaming: flights are sent as soon as SerpAPI returns and each analysis as it completes
+            stream_format = _get_stream_format(request_data)
+            if stream_format and params['origin'] and params['destination'] and params['date']:
+                return _build_streaming_response(_stream_route_analysis(params, stream_format, deadline), stream_format, headers)
+            
             # STANDARDIZED: Use the SAME unified route analysis as natural language chat
-            result = _handle_unified_route_analysis(params, "HTML form route search")
+            result, coalesced = _run_coalesced(
+                'route_analysis',
+                params,
+                lambda: _handle_unified_route_analysis(params, "HTML form route search", deadline)
+            )
             log_end()
             
         # Handle HTML form direct flight lookup - USES SAME AGENT AS NATURAL LANGUAGE
@@ -2231,16 +2688,18 @@ def main(request):
             }
             
             # Add airline name mapping for standardized BigQuery queries
-            from chat_advisor_agent import ChatAdvisorAgent
-            chat_agent_instance = ChatAdvisorAgent()
-            airline_name = chat_agent_instance._get_airline_name_from_code(params['airline'])
+            airline_name = chat_agent._get_airline_name_from_code(params['airline'])
             params['airline_name'] = airline_name
             
             print(f"✈️ UNIFIED ORCHESTRATOR: Direct flight params: {params}")
             print(f"✈️ UNIFIED ORCHESTRATOR: Mapped airline code '{params['airline']}' to name '{airline_name}'")
             log_start(params)
             # STANDARDIZED: Use the SAME _handle_direct_flight_analysis function as natural language with retry logic
-            analysis_result = _handle_direct_flight_analysis_with_retry(params)
+            analysis_result, coalesced = _run_coalesced(
+                'direct_flight_lookup',
+                _direct_flight_fingerprint(params),
+                lambda: _handle_direct_flight_analysis_with_retry(params, deadline=deadline)
+            )
             log_end()
             
             # Format response in standard format
@@ -2253,6 +2712,7 @@ def main(request):
                 'flight_data': analysis_result.get('flight_data', {}),
                 'risk_analysis': analysis_result.get('risk_analysis', {}),
                 'weather_analysis': analysis_result.get('weather_analysis', {}),
+                'degraded_stages': analysis_result.get('degraded_stages', []),
                 'error': analysis_result.get('error'),
                 'timestamp': datetime.now(timezone.utc).isoformat()
             }
@@ -2265,15 +2725,17 @@ def main(request):
             params = {k: v for k, v in request_data.items() if k != 'analysis_type'}
             
             # Add airline name mapping for standardized BigQuery queries
-            from chat_advisor_agent import ChatAdvisorAgent
-            chat_agent_instance = ChatAdvisorAgent()
-            airline_name = chat_agent_instance._get_airline_name_from_code(params.get('airline', ''))
+            airline_name = chat_agent._get_airline_name_from_code(params.get('airline', ''))
             params['airline_name'] = airline_name
             
             print(f"✈️ UNIFIED ORCHESTRATOR: Legacy direct flight params: {params}")
             print(f"✈️ UNIFIED ORCHESTRATOR: Mapped airline code '{params.get('airline', '')}' to name '{airline_name}'")
             log_start(params)
-            analysis_result = _handle_direct_flight_analysis_with_retry(params)
+            analysis_result, coalesced = _run_coalesced(
+                'direct_flight_lookup',
+                _direct_flight_fingerprint(params),
+                lambda: _handle_direct_flight_analysis_with_retry(params, deadline=deadline)
+            )
             log_end()
             
             # Format response in standard format
@@ -2286,6 +2748,7 @@ def main(request):
                 'flight_data': analysis_result.get('flight_data', {}),
                 'risk_analysis': analysis_result.get('risk_analysis', {}),
                 'weather_analysis': analysis_result.get('weather_analysis', {}),
+                'degraded_stages': analysis_result.get('degraded_stages', []),
                 'error': analysis_result.get('error'),
                 'timestamp': datetime.now(timezone.utc).isoformat()
             }
@@ -2295,9 +2758,18 @@ def main(request):
             print(f"🛫 UNIFIED ORCHESTRATOR: Processing legacy route analysis")
             
             # STANDARDIZED: Use the SAME unified route analysis function as natural language
-            params = {k: v for k, v in request_data.items() if k != 'analysis_type'}
+            params = {k: v for k, v in request_data.items() if k not in ('analysis_type', 'stream')}
             log_start(params)
-            result = _handle_unified_route_analysis(params, "Legacy route analysis")
+            
+            stream_format = _get_stream_format(request_data)
+            if stream_format and params.get('origin') and params.get('destination') and params.get('date'):
+                return _build_streaming_response(_stream_route_analysis(params, stream_format, deadline), stream_format, headers)
+            
+            result, coalesced = _run_coalesced(
+                'route_analysis',
+                {key: params.get(key, '') for key in ('origin', 'destination', 'date')},
+                lambda: _handle_unified_route_analysis(params, "Legacy route analysis", deadline)
+            )
             log_end()
             
         # Add ADK status information to all responses
@@ -2306,8 +2778,11 @@ def main(request):
                 'framework': 'Google ADK',
                 'model': 'gemini-2.0-flash',
                 'unified_routing': True,
-                'standardized_agents': True
+                'standardized_agents': True,
+                'request_coalesced': coalesced
             }
+            # Bytes, slot time and wall time of the BigQuery jobs behind this response (empty when caches answered)
+            result.setdefault('analysis_metadata', {})['bigquery'] = query_costs.to_dict()
             
             print(f"✅ UNIFIED ORCHESTRATOR: Request processed successfully using standardized agents")
             return (json.dumps(result, cls=DateTimeEncoder), 200, headers)
@@ -2330,7 +2805,24 @@ def main(request):
             'timestamp': datetime.now(timezone.utc).isoformat()
         }, cls=DateTimeEncoder), 500, headers)
 
-def _handle_extension_flight_analysis(parameters):
+def _extension_params_from_flight_data(flight_data: dict, date: str) -> dict:
+    """Map a Google Flights flight_data object from the extension to extension analysis parameters"""
+    return {
+        'airline': flight_data.get('airline_code', flight_data.get('airline', '')),  # Try airline_code first, then airline
+        'airline_name': flight_data.get('airline_name', ''),
+        'flight_number': flight_data.get('flight_number', ''),
+        'origin': flight_data.get('origin_airport_code', flight_data.get('origin', '')),  # Try origin_airport_code first
+        'destination': flight_data.get('destination_airport_code', flight_data.get('destination', '')),  # Try destination_airport_code first
+        'date': date,
+        'departure_time': flight_data.get('departure_time_local', flight_data.get('departure_time', '')),  # Try departure_time_local first
+        'arrival_time': flight_data.get('arrival_time_local', flight_data.get('arrival_time', '')),  # Try arrival_time_local first
+        'duration_minutes': flight_data.get('duration_minutes', 0),
+        'connections': flight_data.get('connections', []),
+        'price': flight_data.get('price', ''),
+        'aircraft_type': flight_data.get('airplane_model', flight_data.get('aircraft', ''))  # Try airplane_model first
+    }
+
+def _handle_extension_flight_analysis(parameters, deadline=None, lookups=None):
     """
     UNIFIED STANDARD AGENT for extension flight analysis - uses Google Flights data instead of BigQuery lookup
     This ensures identical processing using the SAME backend agents:
@@ -2338,9 +2830,16 @@ def _handle_extension_flight_analysis(parameters):
     - Airport Complexity Agent (airport analysis) 
     - Layover Analysis Agent (connection analysis)
     - Risk Assessment Agent (final risk evaluation with BigQuery historical data)
+    Optional AI stages fall back to deterministic output when the request deadline is nearly spent.
+    Airport, route weather and on-time lookups go through lookups, which a batch request
+    shares between all of its flights.
     """
     import time
     start_time = time.time()
+    if deadline is None:
+        deadline = RequestDeadline()
+    if lookups is None:
+        lookups = SharedLookups('extension_flight_analysis')
     print("🔌 EXTENSION TOOL: Coordinating extension flight analysis...")
     
     # LOG: Show incoming parameters
@@ -2422,17 +2921,23 @@ def _handle_extension_flight_analysis(parameters):
                 'error': 'Missing required flight information from Google Flights'
             }
         
-        # Step 1.5: Calculate Airline On-Time Rate from BigQuery historical data (STILL USED)
+        # Step 1.5: Airline On-Time Rate and route performance from one BigQuery historical query (STILL USED)
         step15_start = time.time()
-        print("⏰ EXTENSION TOOL: Calculating airline On-Time Rate from BigQuery historical data...")
+        print("⏰ EXTENSION TOOL: Fetching historical profile (On-Time Rate + route performance) from BigQuery...")
         
+        historical_profile = {}
         try:
             airline_code = flight_data.get('airline_code', '')
             origin_airport = flight_data.get('origin_airport_code', '')
             destination_airport = flight_data.get('destination_airport_code', '')
             
             if airline_code and origin_airport and destination_airport:
-                on_time_data = get_airline_on_time_rate(airline_code, origin_airport, destination_airport, years=[2016, 2017, 2018])
+                historical_profile = lookups.get(
+                    'historical_profile',
+                    (airline_code, origin_airport, destination_airport),
+                    lambda: get_historical_profile(airline_code, origin_airport, destination_airport, years=[2016, 2017, 2018])
+                )
+                on_time_data = historical_profile.get('on_time')
                 if on_time_data and 'on_time_rate' in on_time_data:
                     flight_data['on_time_rate'] = on_time_data['on_time_rate']
                     flight_data['on_time_data'] = on_time_data
@@ -2478,12 +2983,15 @@ def _handle_extension_flight_analysis(parameters):
         # Use the WeatherIntelligenceTool directly to get proper structure
         print(f"🌤️ EXTENSION CALLING WEATHER TOOL FOR MULTI-CITY ANALYSIS: {origin_airport} → {destination_airport}")
         from weather_tool import WeatherIntelligenceTool
-        weather_tool = WeatherIntelligenceTool()
-        weather_analysis = weather_tool.analyze_multi_city_route_weather(
-            origin=origin_airport,
-            destination=destination_airport,
-            connections=[],  # No connections for direct flight
-            travel_date=parameters.get('date', '')
+        weather_analysis = lookups.get(
+            'route_weather',
+            (origin_airport, destination_airport, parameters.get('date', '')),
+            lambda: WeatherIntelligenceTool().analyze_multi_city_route_weather(
+                origin=origin_airport,
+                destination=destination_airport,
+                connections=[],  # No connections for direct flight
+                travel_date=parameters.get('date', '')
+            )
         )
         
         print(f"🌤️ EXTENSION WEATHER TOOL RAW RESPONSE: {str(weather_analysis)[:500]}")
@@ -2506,7 +3014,10 @@ def _handle_extension_flight_analysis(parameters):
         origin_complexity = None
         if origin_airport:
             try:
-                origin_complexity = airport_complexity_agent.analyze_airport_complexity(origin_airport)
+                origin_complexity = lookups.get(
+                    'airport_complexity', origin_airport,
+                    lambda: airport_complexity_agent.analyze_airport_complexity(origin_airport)
+                )
                 print(f"✅ EXTENSION TOOL: Origin airport complexity analyzed: {origin_airport}")
             except Exception as e:
                 print(f"❌ EXTENSION TOOL: Origin airport complexity analysis failed: {e}")
@@ -2516,7 +3027,10 @@ def _handle_extension_flight_analysis(parameters):
         destination_complexity = None
         if destination_airport:
             try:
-                destination_complexity = airport_complexity_agent.analyze_airport_complexity(destination_airport)
+                destination_complexity = lookups.get(
+                    'airport_complexity', destination_airport,
+                    lambda: airport_complexity_agent.analyze_airport_complexity(destination_airport)
+                )
                 print(f"✅ EXTENSION TOOL: Destination airport complexity analyzed: {destination_airport}")
             except Exception as e:
                 print(f"❌ EXTENSION TOOL: Destination airport complexity analysis failed: {e}")
@@ -2594,7 +3108,10 @@ def _handle_extension_flight_analysis(parameters):
                         print(f"🌤️ EXTENSION TOOL: Analyzing weather for connection {i+1}: {airport_code}")
                         try:
                             # Use weather agent directly like we do for origin/destination
-                            connection_weather = weather_agent.analyze_weather_conditions(airport_code, parameters.get('date', ''))
+                            connection_weather = lookups.get(
+                                'airport_weather', (airport_code, parameters.get('date', '')),
+                                lambda: weather_agent.analyze_weather_conditions(airport_code, parameters.get('date', ''))
+                            )
                             layover_weather_analysis[airport_code] = connection_weather
                             print(f"✅ EXTENSION TOOL: Connection {i+1} weather analyzed: {airport_code}")
                         except Exception as e:
@@ -2608,7 +3125,10 @@ def _handle_extension_flight_analysis(parameters):
                     if airport_code:
                         print(f"🏢 EXTENSION TOOL: Analyzing complexity for connection {i+1}: {airport_code}")
                         try:
-                            connection_complexity = airport_complexity_agent.analyze_airport_complexity(airport_code)
+                            connection_complexity = lookups.get(
+                                'airport_complexity', airport_code,
+                                lambda: airport_complexity_agent.analyze_airport_complexity(airport_code)
+                            )
                             layover_complexity_analysis[airport_code] = connection_complexity
                             print(f"✅ EXTENSION TOOL: Connection {i+1} complexity analyzed: {airport_code}")
                         except Exception as e:
@@ -2733,7 +3253,9 @@ def _handle_extension_flight_analysis(parameters):
         risk_analysis = risk_agent.generate_flight_risk_analysis(
             flight_data,
             weather_analysis,
-            parameters
+            parameters,
+            deadline=deadline,
+            historical_data=historical_profile.get('flight_performance')
         )
         
         step5_time = time.time() - step5_start
@@ -2752,7 +3274,8 @@ def _handle_extension_flight_analysis(parameters):
                 origin_airport, 
                 destination_airport, 
                 travel_date,
-                flight_number
+                flight_number,
+                deadline=deadline
             )
             
             if success and len(seasonal_factors) >= 5:
@@ -2858,7 +3381,7 @@ def _handle_extension_flight_analysis(parameters):
         print("🛡️ EXTENSION TOOL: Calling Insurance Recommendation Agent...")
         
         insurance_recommendation = insurance_agent.generate_insurance_recommendation(
-            flight_data, risk_analysis, weather_analysis
+            flight_data, risk_analysis, weather_analysis, deadline=deadline
         )
         
         step6_time = time.time() - step6_start
@@ -2875,9 +3398,11 @@ def _handle_extension_flight_analysis(parameters):
             'weather_analysis': weather_analysis,
             'risk_analysis': risk_analysis,
             'insurance_recommendation': insurance_recommendation,
+            'degraded_stages': deadline.degraded_stages,
             'analysis_metadata': {
                 'source': 'google_flights_extension',
                 'total_time': total_time,
+                'deadline': deadline.to_dict(),
                 'steps': {
                     'google_flights_data': step1_time,
                     'on_time_rate': step15_time,
@@ -2897,4 +3422,95 @@ def _handle_extension_flight_analysis(parameters):
         return {
             'success': False,
             'error': f'Extension analysis failed: {str(e)}'
-        }
\ No newline at end of file
+        }
+
+def _handle_batch_flight_analysis(batch_flights, default_date: str = '', deadline: RequestDeadline = None) -> dict:
+    """
+    Batch extension flight analysis for many flights from one Google Flights page.
+    All flights share one SharedLookups, so airport complexity, route and layover weather and
+    airline on-time rates common to several flights are looked up once. Flights run the
+    extension analysis with at most BATCH_ANALYSIS_MAX_WORKERS in flight, failures are
+    contained per flight, and results are keyed by the flight's index in batch_flights.
+    Each flight_data may carry its own 'date'; otherwise default_date is used.
+    """
+    import time
+    start_time = time.time()
+    if deadline is None:
+        deadline = RequestDeadline(BATCH_DEADLINE_SECONDS)
+    
+    if not isinstance(batch_flights, list) or not batch_flights:
+        return {
+            'success': False,
+            'error': 'batch_flights must be a non-empty list of flight_data objects',
+            'results': {}
+        }
+    
+    if len(batch_flights) > BATCH_MAX_FLIGHTS:
+        return {
+            'success': False,
+            'error': f'Batch contains {len(batch_flights)} flights; the maximum is {BATCH_MAX_FLIGHTS}',
+            'results': {}
+        }
+    
+    lookups = SharedLookups('batch_flight_analysis')
+    
+    def analyze_batch_flight(flight_data):
+        if not isinstance(flight_data, dict):
+            return {
+                'success': False,
+                'error': f'Invalid flight_data type: expected dict, got {type(flight_data)}'
+            }
+        params = _extension_params_from_flight_data(flight_data, flight_data.get('date') or default_date)
+        return _handle_extension_flight_analysis(params, deadline, lookups)
+    
+    max_workers = max(1, min(BATCH_ANALYSIS_MAX_WORKERS, len(batch_flights)))
+    print(f"📦 BATCH TOOL: Analyzing {len(batch_flights)} flights ({max_workers} concurrent)...")
+    
+    # Each flight is a coordinator that waits on lookups, so flights run on the orchestration pool;
+    # the next flight is submitted as soon as one completes
+    tasks = ((index, analyze_batch_flight, (flight_data,)) for index, flight_data in enumerate(batch_flights))
+    results = {}
+    for index, future in iter_windowed(get_pool('orchestration'), max_workers, tasks):
+        try:
+            analysis_result = future.result()
+        except Exception as e:
+            print(f"❌ BATCH TOOL: Flight {index} failed - {str(e)}")
+            analysis_result = {
+                'success': False,
+                'error': f'Extension analysis failed: {str(e)}'
+            }
+        
+        results[str(index)] = {
+            'success': analysis_result.get('success', False),
+            'flight_data': analysis_result.get('flight_data', {}),
+            'risk_analysis': analysis_result.get('risk_analysis', {}),
+            'weather_analysis': analysis_result.get('weather_analysis', {}),
+            'insurance_recommendation': analysis_result.get('insurance_recommendation', {}),
+            'analysis_metadata': analysis_result.get('analysis_metadata', {}),
+            'degraded_stages': analysis_result.get('degraded_stages', []),
+            'error': analysis_result.get('error')
+        }
+        print(f"📦 BATCH TOOL: Flight {index + 1}/{len(batch_flights)} done after {time.time() - start_time:.2f} seconds")
+    
+    failed_flights = sum(1 for result in results.values() if not result['success'])
+    total_time = time.time() - start_time
+    print(f"⏱️ BATCH TOOL: {len(batch_flights)} flights analyzed in {total_time:.2f} seconds ({failed_flights} failed)")
+    print(f"📦 BATCH TOOL: Shared lookups: {lookups.get_stats()}")
+    
+    return {
+        'success': failed_flights < len(batch_flights),
+        'results': results,
+        'total_flights': len(batch_flights),
+        'failed_flights': failed_flights,
+        'degraded_stages': deadline.degraded_stages,
+        'analysis_metadata': {
+            'source': 'google_flights_extension_batch',
+            'total_time': total_time,
+            'max_concurrency': max_workers,
+            'shared_lookups': lookups.get_stats(),
+            'deadline': deadline.to_dict()
+        }
+    }
+
+# Per-module import cost of this module (only when IMPORT_TIME_REPORT=1)
+print_import_report("main.py import")
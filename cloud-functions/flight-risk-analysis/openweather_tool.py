@@ -9,7 +9,9 @@ import os
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 import logging
-import google.generativeai as genai
+from llm_gateway import get_model
+from llm_cache import LLMCachePolicy, llm_response_cache
+from reference_data import weather_risk_level, record_llm_fallback
 
 # Import Google ADK Sub-Agents
 from airport_complexity_agent import AirportComplexityAgent
@@ -17,6 +19,9 @@ from weather_impact_agent import WeatherImpactAgent
 
 logger = logging.getLogger(__name__)
 
+# Seasonal patterns for an airport and date are stable; bump the version when the prompt changes
+SEASONAL_PATTERNS_CACHE = LLMCachePolicy('openweather_tool.OpenWeatherIntelligenceTool._ai_get_seasonal_patterns', version='v1', ttl_seconds=7 * 24 * 3600)
+
 class OpenWeatherIntelligenceTool:
     """Tool for weather-based flight risk assessment using OpenWeatherMap API and Google ADK agents"""
     
@@ -44,7 +49,7 @@ class OpenWeatherIntelligenceTool:
         
         # Initialize Gemini model for AI-powered analysis
         try:
-            self.gemini_model = genai.GenerativeModel('gemini-2.0-flash')
+            self.gemini_model = get_model()
             print("🤖 OpenWeather Intelligence Tool: Gemini AI model initialized")
         except Exception as e:
             print(f"❌ OpenWeather Intelligence Tool: Failed to initialize Gemini model: {e}")
@@ -235,11 +240,21 @@ class OpenWeatherIntelligenceTool:
             return {"error": f"OpenWeatherMap API error: {str(e)}"}
     
     def _ai_assess_weather_risk_level(self, weather_info: Dict[str, Any]) -> str:
-        """Assess flight risk level based on weather conditions using AI analysis"""
+        """Assess flight risk level from the conditions and measurements, using AI analysis only for unrecognized conditions"""
+        risk_level = weather_risk_level(
+            f"{weather_info.get('conditions', '')} {weather_info.get('main_condition', '')}",
+            wind_speed=weather_info.get("wind_speed"),
+            visibility=weather_info.get("visibility"),
+            temperature=weather_info.get("temperature")
+        )
+        if risk_level:
+            return risk_level
+        
         if not self.gemini_model:
             return "medium"
         
         try:
+            record_llm_fallback('weather_risk_level')
             conditions = weather_info.get("conditions", "Unknown")
             main_condition = weather_info.get("main_condition", "Unknown")
             temperature = weather_info.get("temperature", 70)
@@ -380,7 +395,8 @@ class OpenWeatherIntelligenceTool:
             Return only the JSON object.
             """
             
-            response = self.gemini_model.generate_content(prompt)
+            cache_inputs = {'airport_code': airport_code, 'travel_date': travel_date}
+            response = self.gemini_model.generate_content(prompt, cache=SEASONAL_PATTERNS_CACHE, cache_inputs=cache_inputs)
             ai_response = response.text.strip()
             
             # Clean up JSON formatting before parsing
@@ -396,6 +412,7 @@ class OpenWeatherIntelligenceTool:
                 return patterns
             except Exception as parse_error:
                 print(f"❌ JSON parsing failed for seasonal patterns: {parse_error}")
+                llm_response_cache.invalidate(SEASONAL_PATTERNS_CACHE, cache_inputs, self.gemini_model.generation_config)
                 print(f"🔍 AI Response: {ai_response[:200]}...")
                 return {
                     "error": "AI seasonal pattern analysis failed - invalid JSON response",
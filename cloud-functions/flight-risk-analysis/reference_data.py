@@ -0,0 +1,215 @@
+"""
+Reference Data for Flight Risk Analysis
+Deterministic airline, airport, date and weather lookups tried before any Gemini call
+"""
+import re
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+# IATA airline code -> airline name (the carriers the app reports on)
+AIRLINE_NAMES = {
+    'AA': 'American Airlines',
+    'DL': 'Delta Air Lines',
+    'UA': 'United Airlines',
+    'WN': 'Southwest Airlines',
+    'B6': 'JetBlue Airways',
+    'AS': 'Alaska Airlines',
+    'NK': 'Spirit Airlines',
+    'F9': 'Frontier Airlines',
+    'G4': 'Allegiant Air',
+    'SY': 'Sun Country Airlines',
+    'AC': 'Air Canada',
+    'BA': 'British Airways',
+    'LH': 'Lufthansa',
+    'AF': 'Air France',
+    'KL': 'KLM',
+    'EK': 'Emirates',
+    'QR': 'Qatar Airways',
+    'TK': 'Turkish Airlines',
+    'SQ': 'Singapore Airlines',
+    'CX': 'Cathay Pacific',
+    'JL': 'Japan Airlines',
+    'NH': 'All Nippon Airways'
+}
+
+AIRLINE_CODES = {name: code for code, name in AIRLINE_NAMES.items()}
+
+# City names and common aliases -> primary airport (largest international airport for multi-airport cities)
+CITY_AIRPORTS = {
+    'new york': 'JFK', 'new york city': 'JFK', 'nyc': 'JFK', 'manhattan': 'JFK',
+    'los angeles': 'LAX', 'la': 'LAX',
+    'chicago': 'ORD',
+    'san francisco': 'SFO', 'sf': 'SFO',
+    'washington': 'IAD', 'washington dc': 'IAD', 'dc': 'IAD',
+    'atlanta': 'ATL',
+    'dallas': 'DFW', 'fort worth': 'DFW', 'dallas fort worth': 'DFW',
+    'houston': 'IAH',
+    'denver': 'DEN',
+    'seattle': 'SEA',
+    'boston': 'BOS',
+    'miami': 'MIA',
+    'orlando': 'MCO',
+    'las vegas': 'LAS', 'vegas': 'LAS',
+    'phoenix': 'PHX',
+    'charlotte': 'CLT',
+    'detroit': 'DTW',
+    'minneapolis': 'MSP', 'saint paul': 'MSP', 'st paul': 'MSP',
+    'philadelphia': 'PHL', 'philly': 'PHL',
+    'newark': 'EWR',
+    'baltimore': 'BWI',
+    'salt lake city': 'SLC',
+    'san diego': 'SAN',
+    'tampa': 'TPA',
+    'portland': 'PDX',
+    'st louis': 'STL', 'saint louis': 'STL',
+    'nashville': 'BNA',
+    'austin': 'AUS',
+    'san antonio': 'SAT',
+    'new orleans': 'MSY',
+    'raleigh': 'RDU', 'durham': 'RDU',
+    'kansas city': 'MCI',
+    'sacramento': 'SMF',
+    'san jose': 'SJC',
+    'oakland': 'OAK',
+    'pittsburgh': 'PIT',
+    'cleveland': 'CLE',
+    'columbus': 'CMH',
+    'cincinnati': 'CVG',
+    'indianapolis': 'IND',
+    'milwaukee': 'MKE',
+    'honolulu': 'HNL',
+    'anchorage': 'ANC',
+    'fort lauderdale': 'FLL',
+    'london': 'LHR',
+    'paris': 'CDG',
+    'frankfurt': 'FRA',
+    'amsterdam': 'AMS',
+    'madrid': 'MAD',
+    'rome': 'FCO',
+    'dubai': 'DXB',
+    'doha': 'DOH',
+    'istanbul': 'IST',
+    'tokyo': 'NRT',
+    'seoul': 'ICN',
+    'singapore': 'SIN',
+    'hong kong': 'HKG',
+    'toronto': 'YYZ',
+    'vancouver': 'YVR',
+    'montreal': 'YUL',
+    'mexico city': 'MEX',
+    'cancun': 'CUN'
+}
+
+KNOWN_AIRPORT_CODES = set(CITY_AIRPORTS.values()) | {
+    'LGA', 'MDW', 'DAL', 'HOU', 'DCA', 'BUR', 'LGB', 'SNA', 'ONT', 'LHR', 'LGW', 'ORY', 'HND'
+}
+
+# Weather condition keywords, checked from most to least severe
+_WEATHER_RISK_KEYWORDS = (
+    ('high', ('thunderstorm', 'tornado', 'hurricane', 'tropical storm', 'blizzard', 'freezing', 'ice', 'squall',
+              'heavy snow', 'heavy rain', 'hail', 'sleet', 'severe')),
+    ('medium', ('snow', 'rain', 'shower', 'fog', 'storm', 'gust', 'windy', 'smoke', 'dust', 'sand', 'ash')),
+    ('low', ('drizzle', 'cloud', 'overcast', 'mist', 'haze', 'breezy')),
+    ('very_low', ('clear', 'sunny', 'fair', 'sun'))
+)
+
+_RISK_ORDER = ['very_low', 'low', 'medium', 'high']
+
+_stats_lock = threading.Lock()
+_resolver_stats: Dict[str, Dict[str, int]] = {}
+
+
+def _count(resolver: str, outcome: str):
+    with _stats_lock:
+        counts = _resolver_stats.setdefault(resolver, {'resolved': 0, 'llm_fallbacks': 0})
+        counts[outcome] += 1
+
+
+def record_llm_fallback(resolver: str):
+    """Count a lookup the deterministic resolver could not answer, so the caller asks Gemini"""
+    _count(resolver, 'llm_fallbacks')
+    print(f"🧭 REFERENCE DATA: {resolver} not resolved locally, falling back to Gemini")
+
+
+def get_resolver_stats() -> Dict[str, Dict[str, int]]:
+    """Resolved and LLM-fallback counts per resolver"""
+    with _stats_lock:
+        return {resolver: dict(counts) for resolver, counts in _resolver_stats.items()}
+
+
+def airline_name(airline_code: str) -> Optional[str]:
+    """Airline name for an IATA airline code, or None if unknown"""
+    return AIRLINE_NAMES.get((airline_code or '').strip().upper())
+
+
+def airline_code(name: str) -> Optional[str]:
+    """IATA airline code for an airline name, or None if unknown"""
+    return AIRLINE_CODES.get((name or '').strip())
+
+
+def resolve_airport_code(city_or_airport: str) -> Optional[str]:
+    """
+    Primary airport code for a city name, alias or airport code.
+
+    Returns None when the input is not recognized; the caller then falls back
+    to Gemini (and should call record_llm_fallback).
+    """
+    text = (city_or_airport or '').strip()
+    if len(text) == 3 and text.isalpha() and (text.isupper() or text.upper() in KNOWN_AIRPORT_CODES):
+        _count('airport_code', 'resolved')
+        return text.upper()
+
+    # "Chicago, IL" / "St. Louis" / "Dallas-Fort Worth" -> "chicago" / "st louis" / "dallas fort worth"
+    key = re.sub(r'[^a-z ]', ' ', text.split(',')[0].lower())
+    key = ' '.join(key.replace(' airport', '').split())
+    airport_code = CITY_AIRPORTS.get(key)
+    if airport_code:
+        _count('airport_code', 'resolved')
+    return airport_code
+
+
+def format_date_for_query(date_str: str) -> Optional[str]:
+    """YYYY-MM-DD -> "July 10 2025" for weather search queries, or None if the date does not parse"""
+    try:
+        date_obj = datetime.strptime((date_str or '').strip(), "%Y-%m-%d")
+    except ValueError:
+        return None
+    _count('date_format', 'resolved')
+    return f"{date_obj.strftime('%B')} {date_obj.day} {date_obj.year}"
+
+
+def _as_number(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def weather_risk_level(conditions: str, wind_speed: Any = None, visibility: Any = None, temperature: Any = None) -> Optional[str]:
+    """
+    Flight risk level ("very_low", "low", "medium", "high") from weather conditions.
+
+    Condition words set the base level; wind (mph), visibility (miles) and
+    temperature (°F), when known, can only raise it. Returns None when the
+    conditions contain no recognized weather words.
+    """
+    text = (conditions or '').lower()
+    risk_level = None
+    for level, keywords in _WEATHER_RISK_KEYWORDS:
+        if any(keyword in text for keyword in keywords):
+            risk_level = level
+            break
+    if risk_level is None:
+        return None
+
+    floor = 'very_low'
+    wind_speed, visibility, temperature = _as_number(wind_speed), _as_number(visibility), _as_number(temperature)
+    if (wind_speed is not None and wind_speed >= 35) or (visibility is not None and visibility < 1):
+        floor = 'high'
+    elif (wind_speed is not None and wind_speed >= 25) or (visibility is not None and visibility < 3) \
+            or (temperature is not None and (temperature <= 10 or temperature >= 105)):
+        floor = 'medium'
+
+    _count('weather_risk_level', 'resolved')
+    return max(risk_level, floor, key=_RISK_ORDER.index)
@@ -0,0 +1,132 @@
+"""
+Request Coalescer for Flight Risk Analysis
+Single-flight execution: concurrent identical analysis requests share one in-flight computation
+"""
+import copy
+import hashlib
+import json
+import threading
+from typing import Any, Callable, Dict, Tuple
+
+
+class _InFlightCall:
+    """Result slot shared by the leader request and any duplicates waiting on it"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class RequestCoalescer:
+    """
+    Coalesces concurrent duplicate requests.
+
+    The first request for a fingerprint (the leader) runs the analysis; requests
+    with the same fingerprint that arrive while it is running wait for it and
+    receive a copy of its result. Nothing is kept once the leader finishes, so
+    this only removes duplicate work for requests that overlap in time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, _InFlightCall] = {}
+        self.stats = {
+            'executed': 0,
+            'coalesced': 0,
+            'failed': 0
+        }
+
+    @staticmethod
+    def fingerprint(request_type: str, parameters: Dict[str, Any]) -> str:
+        """
+        Build a normalized fingerprint for a request.
+
+        Args:
+            request_type: Analysis type, e.g. 'direct_flight_lookup' or 'route_analysis'
+            parameters: Fields that identify the request (airline, flight number, date, airports...)
+
+        Returns:
+            Hex digest that is identical for requests differing only in case or whitespace
+        """
+        normalized = {
+            'request_type': request_type,
+            'parameters': RequestCoalescer._normalize(parameters)
+        }
+        payload = json.dumps(normalized, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _normalize(value: Any) -> Any:
+        if isinstance(value, str):
+            return value.strip().upper()
+        if isinstance(value, dict):
+            # Empty fields do not distinguish requests
+            return {
+                key: RequestCoalescer._normalize(item)
+                for key, item in value.items()
+                if item not in (None, '', [], {})
+            }
+        if isinstance(value, (list, tuple)):
+            return [RequestCoalescer._normalize(item) for item in value]
+        return value
+
+    def run(self, key: str, func: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run func once per concurrent key.
+
+        Args:
+            key: Request fingerprint from ``fingerprint``
+            func: Zero-argument callable producing the analysis result
+
+        Returns:
+            Tuple of (result, coalesced) where coalesced is True when the result
+            was produced by another in-flight request
+        """
+        with self._lock:
+            call = self._in_flight.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.stats['coalesced'] += 1
+                leader = False
+            else:
+                call = _InFlightCall()
+                self._in_flight[key] = call
+                self.stats['executed'] += 1
+                leader = True
+
+        if not leader:
+            print(f"🔗 REQUEST COALESCER: Waiting on in-flight request {key[:12]} ({call.waiters} waiting)")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            # Each waiter gets its own copy since callers decorate the result before responding
+            return copy.deepcopy(call.result), True
+
+        result = None
+        try:
+            result = func()
+            return result, False
+        except Exception as e:
+            call.error = e
+            with self._lock:
+                self.stats['failed'] += 1
+            raise
+        finally:
+            with self._lock:
+                # No request can join once the key is removed, so the waiter count is final
+                self._in_flight.pop(key, None)
+                waiters = call.waiters
+            if waiters and call.error is None:
+                # Snapshot before the leader's caller starts decorating its own result
+                call.result = copy.deepcopy(result)
+            call.done.set()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Counters for executed, coalesced and failed requests plus current in-flight keys"""
+        with self._lock:
+            return {
+                **self.stats,
+                'in_flight': len(self._in_flight)
+            }
@@ -0,0 +1,86 @@
+"""
+Request Deadline for Flight Risk Analysis
+Per-request latency budget shared by every stage, with graceful degradation of optional stages
+"""
+import os
+import threading
+import time
+from typing import Any, Dict, List
+
+# Total latency budget for one analysis request
+REQUEST_DEADLINE_SECONDS = float(os.environ.get("REQUEST_DEADLINE_SECONDS", "45"))
+
+# Optional stages only start a new remote (Gemini) call with at least this much budget left
+OPTIONAL_STAGE_MIN_SECONDS = float(os.environ.get("OPTIONAL_STAGE_MIN_SECONDS", "8"))
+
+
+class RequestDeadline:
+    """
+    Latency budget for one request, passed through the orchestrators to the agents.
+
+    Optional stages (AI seasonal factors, AI risk explanation, AI insurance
+    recommendation) ask ``allows`` before starting a remote call; when too little
+    budget is left they use their deterministic fallback instead, and the stage
+    is recorded so the response can flag it as degraded. Safe to share between
+    the threads of one request.
+    """
+
+    def __init__(self, budget_seconds: float = None):
+        self.budget = REQUEST_DEADLINE_SECONDS if budget_seconds is None else float(budget_seconds)
+        self.started_at = time.time()
+        self.expires_at = self.started_at + self.budget
+        self._lock = threading.Lock()
+        self._degraded: Dict[str, Dict[str, Any]] = {}
+
+    def remaining(self) -> float:
+        """Seconds left in the budget, never negative"""
+        return max(0.0, self.expires_at - time.time())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def allows(self, stage: str, min_seconds: float = None) -> bool:
+        """
+        Check whether an optional stage may start a remote call.
+
+        Args:
+            stage: Stage name, reported in degraded_stages when the check fails
+            min_seconds: Budget the stage needs; defaults to OPTIONAL_STAGE_MIN_SECONDS
+
+        Returns:
+            True if enough budget is left, otherwise False after recording the stage as degraded
+        """
+        needed = OPTIONAL_STAGE_MIN_SECONDS if min_seconds is None else min_seconds
+        remaining = self.remaining()
+        if remaining >= needed:
+            return True
+
+        self.mark_degraded(stage, f"{remaining:.1f}s of {self.budget:.0f}s budget left, needed {needed:.1f}s")
+        return False
+
+    def mark_degraded(self, stage: str, reason: str):
+        """Record that a stage returned its deterministic fallback because of the deadline"""
+        with self._lock:
+            entry = self._degraded.get(stage)
+            if entry is None:
+                print(f"⏳ REQUEST DEADLINE: Degrading '{stage}' to deterministic fallback - {reason}")
+                self._degraded[stage] = {'stage': stage, 'reason': reason, 'count': 1}
+            else:
+                entry['count'] += 1
+
+    @property
+    def degraded_stages(self) -> List[str]:
+        """Names of degraded stages, in the order they were first degraded"""
+        with self._lock:
+            return list(self._degraded.keys())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Budget summary for performance metrics"""
+        with self._lock:
+            degraded = [dict(entry) for entry in self._degraded.values()]
+        return {
+            'budget_seconds': self.budget,
+            'elapsed_seconds': round(time.time() - self.started_at, 3),
+            'remaining_seconds': round(self.remaining(), 3),
+            'degraded': degraded
+        }
@@ -4,8 +4,10 @@ Flight risk assessment using Google ADK and Gemini AI with real historical data
 """
 import json
 from datetime import datetime, timedelta
-import google.generativeai as genai
-from bigquery_tool import get_flight_historical_data
+from llm_gateway import get_model
+from llm_batch import generate_batched, generate_fallbacks
+from bigquery_tool import get_flight_historical_data, flight_historical_data_steps, route_historical_data_steps
+from async_support import llm_step, run_steps
 
 class RiskAssessmentAgent:
     """
@@ -22,13 +24,13 @@ class RiskAssessmentAgent:
         
         # Initialize Gemini model with deterministic settings
         try:
-            generation_config = genai.types.GenerationConfig(
-                temperature=0.1,  # Low temperature for more deterministic responses
-                top_p=0.8,
-                top_k=10,
-                max_output_tokens=1024,
-            )
-            self.model = genai.GenerativeModel('gemini-2.0-flash', generation_config=generation_config)
+            generation_config = {
+                'temperature': 0.1,  # Low temperature for more deterministic responses
+                'top_p': 0.8,
+                'top_k': 10,
+                'max_output_tokens': 1024,
+            }
+            self.model = get_model(generation_config)
             print("⚠️ Google ADK Risk Assessment Agent initialized with Gemini 2.0 Flash (deterministic settings)")
         except Exception as e:
             print(f"❌ Risk Assessment Agent: Gemini init failed: {e}")
@@ -141,8 +143,19 @@ class RiskAssessmentAgent:
                 'explanation': f'Risk assessment system error: {str(e)}'
             }
     
-    def generate_flight_risk_analysis(self, flight_data, weather_analysis, parameters):
-        """Generate comprehensive flight risk analysis using DETERMINISTIC ALGORITHM with AI explanation"""
+    def generate_flight_risk_analysis(self, flight_data, weather_analysis, parameters, deadline=None, defer_explanation=False, historical_data=None):
+        """
+        Generate comprehensive flight risk analysis using DETERMINISTIC ALGORITHM with AI explanation.
+        When the request deadline (RequestDeadline) is nearly spent, the AI explanation is
+        skipped and the rule-based explanation is used instead.
+        With defer_explanation=True no Gemini call is made; the result carries the explanation
+        inputs so explain_risk_analyses_batch can explain many flights with one prompt.
+        Callers that already fetched the historical profile (get_historical_profile(s)) pass its
+        flight_performance as historical_data, so BigQuery is not queried again.
+        """
+        return run_steps(self.generate_flight_risk_analysis_steps(flight_data, weather_analysis, parameters, deadline, defer_explanation, historical_data))
+    
+    def generate_flight_risk_analysis_steps(self, flight_data, weather_analysis, parameters, deadline=None, defer_explanation=False, historical_data=None):
         print("⚠️ Risk Assessment Agent: Analyzing flight risk with DETERMINISTIC algorithm")
         
         # Create cache key for consistency
@@ -172,13 +185,15 @@ class RiskAssessmentAgent:
             # Route analysis comes from SerpAPI with multiple flights, direct flight comes from BigQuery with specific flight number
             is_route_analysis = flight_data.get('data_source') == 'SerpAPI'
             
-            if is_route_analysis:
+            if historical_data is not None:
+                # Historical profile already fetched by the orchestrator (one query per search or flight)
+                print(f"📊 Risk Assessment Agent: Using provided historical profile for {airline_code} {origin} -> {destination}")
+            elif is_route_analysis:
                 # ROUTE ANALYSIS: Use get_route_historical_data for airline + route aggregation
                 print(f"📊 Risk Assessment Agent: ROUTE ANALYSIS detected - using route-based historical data")
-                from bigquery_tool import get_route_historical_data
                 
                 # Get route historical data (aggregated by airline + route)
-                route_historical_data = get_route_historical_data(origin, destination)
+                route_historical_data = yield from route_historical_data_steps(origin, destination)
                 
                 # Find the specific airline data from the route results
                 historical_data = {'error': 'No data found'}
@@ -210,10 +225,9 @@ class RiskAssessmentAgent:
             else:
                 # DIRECT FLIGHT LOOKUP: Use get_flight_historical_data for specific flight number
                 print(f"📊 Risk Assessment Agent: DIRECT FLIGHT LOOKUP detected - using flight-specific historical data")
-                from bigquery_tool import get_flight_historical_data
                 
                 # Get historical data for this specific flight
-                historical_data = get_flight_historical_data(
+                historical_data = yield from flight_historical_data_steps(
                     airline_code, 
                     flight_number,  # Used for direct flight lookup
                     origin, 
@@ -576,8 +590,7 @@ class RiskAssessmentAgent:
             # ===== DETERMINISTIC ALGORITHM END =====
             
             # Now use AI only for EXPLANATION and FACTORS (not score calculation)
-            explanation_prompt = f"""
-            You are explaining the results of a deterministic flight risk algorithm. The algorithm has already calculated:
+            explanation_inputs = f"""
             - Risk Score: {risk_score:.1f}/100
             - Risk Level: {risk_level}
             - Delay Probability: {delay_probability}
@@ -590,35 +603,22 @@ class RiskAssessmentAgent:
             Weather: Origin {origin_weather_risk}, Destination {destination_weather_risk}
             Airport Complexity: Origin {origin_complexity}, Destination {dest_complexity}
             Connections: {f'{num_connections} layover(s)' if num_connections > 0 else 'Direct flight'}
-            {'SAFETY OVERRIDE APPLIED: Tight connection with extremely high delay probability automatically classified as HIGH RISK' if override_to_high_risk else ''}
-            
-            Provide ONLY these outputs:
-            1. key_risk_factors: Array of 3-4 specific factors that explain the calculated score
-            2. recommendations: Array of 3-4 actionable travel recommendations  
-            3. explanation: Brief explanation of how the algorithm reached this score {'(including safety override for dangerous tight connection)' if override_to_high_risk else ''}
-            
-            Do NOT suggest different scores. Explain the given deterministic results.
-            
-            Respond with valid JSON only:
-            {{
-                "key_risk_factors": ["factor1", "factor2", "factor3"],
-                "recommendations": ["rec1", "rec2", "rec3"],
-                "explanation": "explanation text"
-            }}
+            {'SAFETY OVERRIDE APPLIED: Tight connection with extremely high delay probability automatically classified as HIGH RISK (mention it in the explanation)' if override_to_high_risk else ''}
             """
             
-            # Get AI explanation (NOT score calculation)
-            if self.model:
-                try:
-                    response = self.model.generate_content(explanation_prompt)
-                    ai_explanation = json.loads(response.text.strip().replace('```json', '').replace('```', ''))
+            # Get AI explanation (NOT score calculation), unless the request deadline is nearly spent
+            # or the caller explains a whole batch of flights with one prompt afterwards
+            explanation_degraded = not defer_explanation and deadline is not None and not deadline.allows('risk_explanation')
+            if self.model and not explanation_degraded and not defer_explanation:
+                ai_explanation = yield from self._generate_ai_explanation_steps(explanation_inputs, deadline)
+                if ai_explanation:
                     key_risk_factors = ai_explanation.get('key_risk_factors', [])
                     recommendations = ai_explanation.get('recommendations', [])
                     explanation = ai_explanation.get('explanation', '')
-                except:
-                    key_risk_factors = [f"Historical performance analysis", f"Weather conditions assessment", f"Airport operational complexity"]
-                    recommendations = [f"Monitor weather updates", f"Consider travel insurance", f"Arrive early at airport"]
-                    explanation = f"Risk calculated using deterministic algorithm based on historical data and current conditions"
+                else:
+                    key_risk_factors, recommendations, explanation = self._get_failed_explanation()
+            elif defer_explanation:
+                key_risk_factors, recommendations, explanation = self._get_failed_explanation()
             else:
                 key_risk_factors = [f"Algorithm-based risk assessment", f"Historical data analysis", f"Weather and complexity factors"]
                 recommendations = [f"Review calculated risk factors", f"Plan accordingly for {risk_level} risk", f"Monitor flight status"]
@@ -659,8 +659,16 @@ class RiskAssessmentAgent:
                 }
                 print("🚨🚨🚨 HISTORICAL PERFORMANCE: NO DATA AVAILABLE - USING FALLBACK 🚨🚨🚨")
             
-            # Cache the result
-            self.analysis_cache[cache_key] = (risk_analysis, current_time)
+            # Cache the result (a deadline-degraded explanation is not worth keeping; a deferred
+            # one is cached by explain_risk_analyses_batch once the explanation is filled in)
+            if defer_explanation:
+                risk_analysis['_pending_explanation'] = {
+                    'inputs': explanation_inputs,
+                    'cache_key': cache_key,
+                    'cache_time': current_time
+                }
+            elif not explanation_degraded:
+                self.analysis_cache[cache_key] = (risk_analysis, current_time)
             print(f"✅ Risk Assessment Agent: DETERMINISTIC analysis complete - Score: {risk_score:.1f}")
             return risk_analysis
             
@@ -677,6 +685,104 @@ class RiskAssessmentAgent:
             }
             return fallback_analysis
 
+    def _generate_ai_explanation(self, explanation_inputs, deadline=None):
+        """Ask Gemini to explain one flight's deterministic results; returns the parsed JSON or None"""
+        return run_steps(self._generate_ai_explanation_steps(explanation_inputs, deadline))
+    
+    def _generate_ai_explanation_steps(self, explanation_inputs, deadline=None):
+        explanation_prompt = f"""
+            You are explaining the results of a deterministic flight risk algorithm. The algorithm has already calculated:
+            {explanation_inputs}
+            Provide ONLY these outputs:
+            1. key_risk_factors: Array of 3-4 specific factors that explain the calculated score
+            2. recommendations: Array of 3-4 actionable travel recommendations  
+            3. explanation: Brief explanation of how the algorithm reached this score
+            
+            Do NOT suggest different scores. Explain the given deterministic results.
+            
+            Respond with valid JSON only:
+            {{
+                "key_risk_factors": ["factor1", "factor2", "factor3"],
+                "recommendations": ["rec1", "rec2", "rec3"],
+                "explanation": "explanation text"
+            }}
+            """
+        try:
+            response = yield llm_step(self.model, explanation_prompt, call_site='risk_assessment_agent._generate_ai_explanation', deadline=deadline)
+            return json.loads(response.text.strip().replace('```json', '').replace('```', ''))
+        except Exception:
+            return None
+    
+    def _get_failed_explanation(self):
+        """Rule-based explanation used when the AI explanation fails"""
+        key_risk_factors = [f"Historical performance analysis", f"Weather conditions assessment", f"Airport operational complexity"]
+        recommendations = [f"Monitor weather updates", f"Consider travel insurance", f"Arrive early at airport"]
+        explanation = f"Risk calculated using deterministic algorithm based on historical data and current conditions"
+        return key_risk_factors, recommendations, explanation
+    
+    def explain_risk_analyses_batch(self, risk_analyses, deadline=None):
+        """
+        Fill in AI explanations for analyses generated with defer_explanation=True,
+        using one batched Gemini prompt for all flights.
+        
+        Args:
+            risk_analyses: Flight id -> risk analysis; updated in place
+            deadline: Optional RequestDeadline
+        
+        Flights missing from (or invalid in) the batched answer are explained with
+        the per-flight prompt. Analyses without pending inputs (e.g. cache hits) are left as they are.
+        """
+        pending = {
+            flight_id: analysis.pop('_pending_explanation')
+            for flight_id, analysis in risk_analyses.items()
+            if isinstance(analysis, dict) and '_pending_explanation' in analysis
+        }
+        if not pending:
+            return
+        
+        if not self.model or (deadline is not None and not deadline.allows('risk_explanation')):
+            # Keep the rule-based explanation; only cache it when the model is simply unavailable
+            if not self.model:
+                for flight_id, explanation_state in pending.items():
+                    self.analysis_cache[explanation_state['cache_key']] = (risk_analyses[flight_id], explanation_state['cache_time'])
+            return
+        
+        def is_valid(answer):
+            return (isinstance(answer.get('key_risk_factors'), list) and answer['key_risk_factors']
+                    and isinstance(answer.get('recommendations'), list) and answer['recommendations']
+                    and isinstance(answer.get('explanation'), str) and answer['explanation'].strip())
+        
+        batch_answers = generate_batched(
+            'risk_explanation',
+            {flight_id: explanation_state['inputs'] for flight_id, explanation_state in pending.items()},
+            """
+            You are explaining the results of a deterministic flight risk algorithm for several flights.
+            For each flight the algorithm has already calculated the risk score, level and probabilities shown.
+            Do NOT suggest different scores. Explain the given deterministic results.
+            For each flight provide key_risk_factors (3-4 specific factors that explain its score),
+            recommendations (3-4 actionable travel recommendations) and a brief explanation of how the algorithm reached its score.
+            """,
+            '"key_risk_factors": ["factor1", "factor2", "factor3"], "recommendations": ["rec1", "rec2", "rec3"], "explanation": "explanation text"',
+            is_valid,
+            deadline=deadline
+        )
+        
+        fallback_calls = {}
+        for flight_id, explanation_state in pending.items():
+            if flight_id not in batch_answers:
+                print(f"🔁 Risk Assessment Agent: Batched explanation missing for flight {flight_id}, using per-flight prompt")
+                fallback_calls[flight_id] = (self._generate_ai_explanation, (explanation_state['inputs'], deadline))
+        batch_answers = {**batch_answers, **generate_fallbacks('risk_explanation', fallback_calls)}
+        
+        for flight_id, explanation_state in pending.items():
+            ai_explanation = batch_answers.get(flight_id)
+            if ai_explanation:
+                analysis = risk_analyses[flight_id]
+                analysis['key_risk_factors'] = ai_explanation.get('key_risk_factors', [])[:4]
+                analysis['recommendations'] = ai_explanation.get('recommendations', [])[:4]
+                analysis['explanation'] = ai_explanation.get('explanation', '')
+            self.analysis_cache[explanation_state['cache_key']] = (risk_analyses[flight_id], explanation_state['cache_time'])
+    
     def generate_route_risk_analysis(self, flight_data, weather_analysis, parameters):
         """Generate route risk analysis using Gemini AI"""
         print("⚠️ Risk Assessment Agent: Analyzing route risk")
@@ -947,8 +1053,7 @@ class RiskAssessmentAgent:
             
             # Use AI to generate specific risk factors instead of hardcoded logic
             try:
-                import google.generativeai as genai
-                model = genai.GenerativeModel('gemini-2.0-flash')
+                model = get_model()
                 
                 # Get flight details for context
                 origin_code = flight_data.get('origin_airport_code', 'origin')
@@ -1417,8 +1522,7 @@ class RiskAssessmentAgent:
         
         # Generate AI-based content instead of hardcoded factors
         try:
-            import google.generativeai as genai
-            model = genai.GenerativeModel('gemini-2.0-flash')
+            model = get_model()
             
             # Get flight details
             origin = flight_data.get('origin', 'Unknown')
@@ -1440,7 +1544,7 @@ class RiskAssessmentAgent:
             Return 2-3 factors, one per line.
             """
             
-            response = model.generate_content(risk_factors_prompt)
+            response = model.generate_content(risk_factors_prompt, call_site='risk_assessment_agent.fallback_route_risk_factors')
             ai_factors = response.text.strip().split('\n')
             
             # Process AI-generated factors
@@ -1462,7 +1566,7 @@ class RiskAssessmentAgent:
             Return 3 recommendations, one per line.
             """
             
-            rec_response = model.generate_content(rec_prompt)
+            rec_response = model.generate_content(rec_prompt, call_site='risk_assessment_agent.fallback_route_recommendations')
             ai_recommendations = rec_response.text.strip().split('\n')
             
             # Process AI-generated recommendations
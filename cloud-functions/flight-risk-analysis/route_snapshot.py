@@ -0,0 +1,210 @@
+"""
+Route Snapshot for Flight Risk Analysis
+Precomputed (carrier, origin, dest) historical profiles in one binary file, memory-mapped at cold start
+
+The snapshot holds the aggregate row of the historical profile query for every
+airline route flown in its years, behind a sorted key index, so
+bigquery_tool answers profile and route On-Time Rate lookups with a binary
+search instead of a query. Build it after loading new data and deploy the file
+with the function source:
+    python route_snapshot.py --years 2016 2017 2018
+
+File layout (little-endian): header, record_count sorted 9-byte keys
+(carrier, origin, dest, each space-padded to 3), then record_count fixed-size
+records in key order.
+"""
+import argparse
+import bisect
+import mmap
+import os
+import struct
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Optional
+
+# Set to 0 to always query BigQuery
+ROUTE_SNAPSHOT_ENABLED = os.environ.get("ROUTE_SNAPSHOT_ENABLED", "1") == "1"
+
+# Deployed next to this module by default
+ROUTE_SNAPSHOT_PATH = os.environ.get(
+    "ROUTE_SNAPSHOT_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "route_snapshot.bin")
+)
+
+_MAGIC = b"FRRSNAP1"
+# magic, record count, year count, build time (epoch seconds), years (up to 16, zero-padded)
+_HEADER = struct.Struct("<8sIHxxd16H")
+_KEY_SIZE = 9
+
+# Counts of the profile row, stored as uint32
+_COUNT_FIELDS = [
+    'total_flights', 'cancelled_flights', 'diverted_flights', 'on_time_flights',
+    'delays_over_15min', 'delays_over_1hour', 'severe_delays_over_2hours',
+    'airline_cancellations', 'weather_cancellations', 'nas_cancellations', 'security_cancellations'
+]
+# Averages of the profile row and the decimals the query rounds them to, stored as float32
+_AVERAGE_FIELDS = [
+    ('avg_departure_delay', 1), ('avg_arrival_delay', 1),
+    ('avg_carrier_delay', 1), ('avg_weather_delay', 1), ('avg_nas_delay', 1),
+    ('avg_security_delay', 1), ('avg_late_aircraft_delay', 1),
+    ('avg_air_time', 0), ('avg_distance', 0)
+]
+_RECORD = struct.Struct("<" + "I" * len(_COUNT_FIELDS) + "f" * len(_AVERAGE_FIELDS))
+
+
+def _encode_key(airline_code: str, origin: str, destination: str) -> Optional[bytes]:
+    """Fixed-width index key, or None for codes that cannot be in the snapshot"""
+    parts = (airline_code or '', origin or '', destination or '')
+    if any(len(part) > 3 for part in parts):
+        return None
+    try:
+        return ''.join(part.ljust(3) for part in parts).encode('ascii')
+    except UnicodeEncodeError:
+        return None
+
+
+class _KeyIndex:
+    """The mapped key section as a sequence, so bisect can search it without copying"""
+
+    def __init__(self, buffer: mmap.mmap, offset: int, count: int):
+        self._buffer = buffer
+        self._offset = offset
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> bytes:
+        start = self._offset + index * _KEY_SIZE
+        return self._buffer[start:start + _KEY_SIZE]
+
+
+class RouteSnapshot:
+    """
+    Read-only view of a snapshot file.
+
+    The file is memory-mapped, so opening it reads only the header; lookups
+    touch the O(log n) index pages they compare against and one record, and
+    every function instance on the host shares the pages through the OS cache.
+    """
+
+    def __init__(self, path: str = ROUTE_SNAPSHOT_PATH):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.record_count, year_count, self.built_at, *years = _HEADER.unpack_from(self._buffer, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a route snapshot")
+        self.years = sorted(years[:year_count])
+        self._records_offset = _HEADER.size + self.record_count * _KEY_SIZE
+        expected_size = self._records_offset + self.record_count * _RECORD.size
+        if len(self._buffer) != expected_size:
+            raise ValueError(f"{path} is truncated or corrupt ({len(self._buffer)} bytes, expected {expected_size})")
+
+        self._index = _KeyIndex(self._buffer, _HEADER.size, self.record_count)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def covers(self, years: Iterable[int]) -> bool:
+        """True when the snapshot was built for exactly these years"""
+        return sorted(set(years)) == self.years
+
+    def get(self, airline_code: str, origin: str, destination: str) -> Optional[SimpleNamespace]:
+        """Profile row of an airline route (same columns as the historical profiles query), or None"""
+        key = _encode_key(airline_code, origin, destination)
+        position = bisect.bisect_left(self._index, key) if key is not None else self.record_count
+        if position == self.record_count or self._index[position] != key:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+
+        values = _RECORD.unpack_from(self._buffer, self._records_offset + position * _RECORD.size)
+        row = dict(zip(_COUNT_FIELDS, values))
+        for (field, ndigits), value in zip(_AVERAGE_FIELDS, values[len(_COUNT_FIELDS):]):
+            row[field] = round(value, ndigits)
+        # Same counts under the names the On-Time Rate code reads
+        row['delayed_flights'] = row['delays_over_15min']
+        row['severe_delays_over_1hour'] = row['delays_over_1hour']
+        return SimpleNamespace(airline_code=airline_code, origin_airport=origin, destination_airport=destination, **row)
+
+    def get_info(self) -> Dict[str, Any]:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        return {
+            'path': self.path,
+            'years': self.years,
+            'routes': self.record_count,
+            'built_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(self.built_at)),
+            'hits': hits,
+            'misses': misses
+        }
+
+
+def write_snapshot(rows: Iterable, years: List[int], path: str = ROUTE_SNAPSHOT_PATH) -> int:
+    """Write profile rows (historical profiles query columns) to a snapshot file; returns the routes written"""
+    years = sorted(set(years))
+    if len(years) > 16:
+        raise ValueError("A snapshot covers at most 16 years")
+
+    records = {}
+    for row in rows:
+        key = _encode_key(row.airline_code, row.origin_airport, row.destination_airport)
+        if key is None or not row.total_flights:
+            continue
+        records[key] = _RECORD.pack(
+            *(int(getattr(row, field) or 0) for field in _COUNT_FIELDS),
+            *(float(getattr(row, field) or 0) for field, _ in _AVERAGE_FIELDS)
+        )
+
+    keys = sorted(records)
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, len(keys), len(years), time.time(), *(years + [0] * (16 - len(years)))))
+        for key in keys:
+            f.write(key)
+        for key in keys:
+            f.write(records[key])
+    # Replace atomically so running instances never map a partial file
+    os.replace(temporary_path, path)
+    return len(keys)
+
+
+def load_route_snapshot(path: str = ROUTE_SNAPSHOT_PATH) -> Optional[RouteSnapshot]:
+    """Map the snapshot if enabled and present; None otherwise"""
+    if not ROUTE_SNAPSHOT_ENABLED or not os.path.exists(path):
+        return None
+    try:
+        snapshot = RouteSnapshot(path)
+        print(f"🗺️ ROUTE SNAPSHOT: Mapped {snapshot.record_count} airline routes for {snapshot.years} from {path}")
+        return snapshot
+    except Exception as e:
+        print(f"⚠️ ROUTE SNAPSHOT: Could not map {path} ({type(e).__name__}: {e}) - querying BigQuery instead")
+        return None
+
+
+# Mapped once per process, at import (cold start)
+route_snapshot = load_route_snapshot()
+
+
+if __name__ == "__main__":
+    from bigquery_tool import BigQueryFlightTool
+    from flight_tables import DEFAULT_YEARS
+    from query_executor import query_executor
+
+    parser = argparse.ArgumentParser(description="Export every airline route's historical profile into a route snapshot")
+    parser.add_argument("--years", type=int, nargs="*", default=DEFAULT_YEARS)
+    parser.add_argument("--out", default=ROUTE_SNAPSHOT_PATH)
+    args = parser.parse_args()
+
+    tool = BigQueryFlightTool()
+    if tool.client is None:
+        raise SystemExit("BigQuery connection required to build the route snapshot")
+    query, job_config = tool._historical_profiles_query(None, args.years)
+    rows = query_executor.run(tool.client, query, job_config, call_site='route_snapshot.build')
+    count = write_snapshot(rows, args.years, args.out)
+    print(f"💾 ROUTE SNAPSHOT: Wrote {count} airline routes for {sorted(set(args.years))} to {args.out}")
@@ -0,0 +1,136 @@
+"""
+Route Performance Summary for Flight Risk Analysis
+Materializes the yearly flights_* tables into a monthly (carrier, origin, dest) summary table and queries it
+
+Build or refresh the table after loading a new year of data:
+    python route_summary.py --project argon-acumen-268900 --dataset airline_data
+"""
+import argparse
+import os
+import threading
+from typing import List
+
+from google.cloud import bigquery
+
+from flight_tables import FLIGHT_TABLE_YEARS, flights_source
+from query_executor import query_executor
+
+# Summary table in the flight data dataset
+ROUTE_SUMMARY_TABLE = os.environ.get("ROUTE_SUMMARY_TABLE", "route_performance_monthly")
+
+# Set to 0 to aggregate the raw flights_* tables on every request instead
+USE_ROUTE_SUMMARY = os.environ.get("USE_ROUTE_SUMMARY", "1") == "1"
+
+SUMMARY_YEARS = list(FLIGHT_TABLE_YEARS)
+
+_availability = {}
+_availability_lock = threading.Lock()
+
+
+# One row per carrier, route and month. Every column is a count or a sum, so any
+# set of months and years can be combined with SUM(); averages are derived as sum / total_flights,
+# matching the raw queries, which average over all flights with NULL and out-of-range values as 0.
+_MONTHLY_AGGREGATES = """
+            COUNT(*) AS total_flights,
+            COUNTIF(CANCELLED = 1.0) AS cancelled_flights,
+            COUNTIF(DIVERTED = 1.0) AS diverted_flights,
+            COUNTIF(DEP_DELAY IS NOT NULL AND DEP_DELAY <= 15) AS on_time_flights,
+            COUNTIF(DEP_DELAY > 15) AS delays_over_15min,
+            COUNTIF(DEP_DELAY > 60) AS delays_over_1hour,
+            COUNTIF(DEP_DELAY > 120) AS delays_over_2hours,
+            SUM(IF(DEP_DELAY >= 0, DEP_DELAY, 0)) AS dep_delay_sum,
+            SUM(IF(ARR_DELAY >= 0, ARR_DELAY, 0)) AS arr_delay_sum,
+            SUM(IFNULL(DEP_DELAY, 0)) AS dep_delay_net_sum,
+            SUM(IFNULL(ARR_DELAY, 0)) AS arr_delay_net_sum,
+            SUM(IFNULL(DEP_DELAY, 0) * IFNULL(DEP_DELAY, 0)) AS dep_delay_net_sq_sum,
+            SUM(IF(CARRIER_DELAY > 0, CARRIER_DELAY, 0)) AS carrier_delay_sum,
+            SUM(IF(WEATHER_DELAY > 0, WEATHER_DELAY, 0)) AS weather_delay_sum,
+            SUM(IF(NAS_DELAY > 0, NAS_DELAY, 0)) AS nas_delay_sum,
+            SUM(IF(SECURITY_DELAY > 0, SECURITY_DELAY, 0)) AS security_delay_sum,
+            SUM(IF(LATE_AIRCRAFT_DELAY > 0, LATE_AIRCRAFT_DELAY, 0)) AS late_aircraft_delay_sum,
+            SUM(IF(AIR_TIME > 0, AIR_TIME, 0)) AS air_time_sum,
+            SUM(IF(DISTANCE > 0, DISTANCE, 0)) AS distance_sum,
+            COUNTIF(CANCELLATION_CODE = 'A') AS airline_cancellations,
+            COUNTIF(CANCELLATION_CODE = 'B') AS weather_cancellations,
+            COUNTIF(CANCELLATION_CODE = 'C') AS nas_cancellations,
+            COUNTIF(CANCELLATION_CODE = 'D') AS security_cancellations"""
+
+
+_SOURCE_COLUMNS = [
+    'FL_DATE', 'OP_CARRIER', 'ORIGIN', 'DEST', 'CANCELLED', 'DIVERTED', 'CANCELLATION_CODE', 'DEP_DELAY', 'ARR_DELAY',
+    'CARRIER_DELAY', 'WEATHER_DELAY', 'NAS_DELAY', 'SECURITY_DELAY', 'LATE_AIRCRAFT_DELAY', 'AIR_TIME', 'DISTANCE'
+]
+
+
+def build_summary_query(project_id: str, dataset_id: str, years: List[int]) -> str:
+    """CREATE OR REPLACE statement materializing the monthly summary from the yearly tables"""
+    return f"""
+    CREATE OR REPLACE TABLE `{project_id}.{dataset_id}.{ROUTE_SUMMARY_TABLE}`
+    PARTITION BY RANGE_BUCKET(year, GENERATE_ARRAY({min(SUMMARY_YEARS)}, {max(SUMMARY_YEARS) + 2}, 1))
+    CLUSTER BY carrier, origin, dest
+    OPTIONS (description = 'Monthly flight counts, delay sums and cancellation counts per carrier and route')
+    AS
+        SELECT
+            OP_CARRIER AS carrier,
+            ORIGIN AS origin,
+            DEST AS dest,
+            table_year AS year,
+            EXTRACT(MONTH FROM SAFE_CAST(FL_DATE AS DATE)) AS month,{_MONTHLY_AGGREGATES}
+        FROM ({flights_source(f"{project_id}.{dataset_id}", years, _SOURCE_COLUMNS, with_year=True)})
+        GROUP BY carrier, origin, dest, year, month
+    """
+
+
+def materialize_route_summary(client: bigquery.Client, dataset_id: str, years: List[int] = None) -> int:
+    """
+    Rebuild the summary table from the yearly flights_* tables.
+
+    Returns:
+        Number of rows in the rebuilt table
+    """
+    years = years or SUMMARY_YEARS
+    print(f"🏗️ ROUTE SUMMARY: Building {dataset_id}.{ROUTE_SUMMARY_TABLE} from flights_{min(years)}..flights_{max(years)}")
+    query_job, _ = query_executor.run_job(client, build_summary_query(client.project, dataset_id, years),
+                                          call_site='route_summary.materialize')
+
+    table = client.get_table(f"{client.project}.{dataset_id}.{ROUTE_SUMMARY_TABLE}")
+    print(f"✅ ROUTE SUMMARY: {table.num_rows} rows written, {query_job.total_bytes_processed or 0:,} bytes scanned")
+    with _availability_lock:
+        _availability[(client.project, dataset_id)] = True
+    return table.num_rows
+
+
+def route_summary_available(client: bigquery.Client, dataset_id: str) -> bool:
+    """True when summary queries are enabled and the table exists (checked once per process)"""
+    if not USE_ROUTE_SUMMARY or client is None:
+        return False
+
+    key = (client.project, dataset_id)
+    if key in _availability:
+        return _availability[key]
+
+    with _availability_lock:
+        if key not in _availability:
+            try:
+                client.get_table(f"{client.project}.{dataset_id}.{ROUTE_SUMMARY_TABLE}")
+                _availability[key] = True
+                print(f"📊 ROUTE SUMMARY: Using {dataset_id}.{ROUTE_SUMMARY_TABLE} for historical queries")
+            except Exception as e:
+                _availability[key] = False
+                print(f"⚠️ ROUTE SUMMARY: {dataset_id}.{ROUTE_SUMMARY_TABLE} unavailable ({type(e).__name__}) - "
+                      f"aggregating raw flights tables; run route_summary.py to build it")
+        return _availability[key]
+
+
+def summary_table_name(project_id: str, dataset_id: str) -> str:
+    return f"`{project_id}.{dataset_id}.{ROUTE_SUMMARY_TABLE}`"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the monthly route performance summary table")
+    parser.add_argument("--project", default=None, help="Google Cloud project (default: the client's project)")
+    parser.add_argument("--dataset", default="airline_data")
+    parser.add_argument("--years", type=int, nargs="*", default=SUMMARY_YEARS)
+    args = parser.parse_args()
+
+    materialize_route_summary(bigquery.Client(project=args.project), args.dataset, args.years)
@@ -0,0 +1,80 @@
+"""
+Shared Lookups for Flight Risk Analysis
+Per-batch memo so flights in one request share airport, route weather and on-time lookups
+"""
+import copy
+import threading
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class _Lookup:
+    """Result slot for one lookup key; later callers wait for the first one to fill it"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SharedLookups:
+    """
+    Memoized, single-flight lookups scoped to one request.
+
+    The first flight that needs a lookup (e.g. complexity of ORD, or the on-time
+    rate of AA on JFK-LAX) runs it; flights needing the same lookup at the same
+    time wait for that call, and later flights reuse its result. Each caller
+    receives its own copy because the orchestrators decorate lookup results in
+    place. Failed lookups are not kept, so a later caller runs them again.
+    """
+
+    def __init__(self, name: str = 'request'):
+        self.name = name
+        self._lock = threading.Lock()
+        self._lookups: Dict[Tuple[str, Hashable], _Lookup] = {}
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def get(self, kind: str, key: Hashable, func: Callable[[], Any]) -> Any:
+        """
+        Run or reuse a lookup.
+
+        Args:
+            kind: Lookup type, e.g. 'airport_complexity', 'route_weather' or 'on_time_rate'
+            key: Hashable identity of the lookup within its kind
+            func: Zero-argument callable performing the lookup
+
+        Returns:
+            A copy of the lookup result
+        """
+        with self._lock:
+            kind_stats = self.stats.setdefault(kind, {'executed': 0, 'reused': 0})
+            lookup = self._lookups.get((kind, key))
+            if lookup is None:
+                lookup = _Lookup()
+                self._lookups[(kind, key)] = lookup
+                kind_stats['executed'] += 1
+                leader = True
+            else:
+                kind_stats['reused'] += 1
+                leader = False
+
+        if not leader:
+            lookup.done.wait()
+            if lookup.error is not None:
+                raise lookup.error
+            return copy.deepcopy(lookup.result)
+
+        try:
+            lookup.result = func()
+            return copy.deepcopy(lookup.result)
+        except Exception as e:
+            lookup.error = e
+            with self._lock:
+                self._lookups.pop((kind, key), None)
+            raise
+        finally:
+            lookup.done.set()
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        """Executed and reused counts per lookup kind"""
+        with self._lock:
+            return {kind: dict(counts) for kind, counts in self.stats.items()}
@@ -0,0 +1,230 @@
+"""
+Stage Graph Executor for Flight Risk Analysis
+Runs analysis steps as a dependency graph so independent steps execute concurrently
+"""
+import concurrent.futures
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List
+
+from async_support import ASYNC_EXECUTION, run_steps, run_steps_async, submit
+from worker_pools import get_pool
+
+
+def stage_succeeded(result: Any) -> bool:
+    """Default checkpoint predicate: a dict output that does not report success False"""
+    return isinstance(result, dict) and result.get('success', True) is not False
+
+
+class Stage:
+    """A single named analysis step, the stages whose results it consumes and the pool it runs on"""
+
+    def __init__(self, name: str, func: Callable[..., Any], depends_on: List[str] = None, pool: str = 'llm',
+                 checkpoint_if: Callable[[Any], bool] = stage_succeeded, steps: bool = False):
+        self.name = name
+        self.func = func
+        self.depends_on = list(depends_on or [])
+        self.pool = pool
+        self.checkpoint_if = checkpoint_if
+        self.steps = steps
+
+
+class StageCheckpoints:
+    """
+    Per-request memo of completed stage outputs, shared across retry attempts.
+
+    A retry wrapper creates one instance and passes it to every attempt, so an
+    attempt resumes after the stages that already completed instead of repeating
+    their BigQuery, SerpAPI and Gemini calls. Outputs are kept by reference: a
+    resumed attempt sees them exactly as the failed attempt left them, including
+    updates later stages made in place.
+    """
+
+    def __init__(self):
+        self._results: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self.restored: List[str] = []
+
+    def has(self, name: str) -> bool:
+        with self._lock:
+            return name in self._results
+
+    def save(self, name: str, result: Any):
+        with self._lock:
+            self._results[name] = result
+
+    def restore(self, name: str) -> Any:
+        """Return a saved stage output and record that the stage was skipped"""
+        with self._lock:
+            result = self._results[name]
+            if name not in self.restored:
+                self.restored.append(name)
+        print(f"♻️ STAGE CHECKPOINT: Resuming with saved output of '{name}'")
+        return result
+
+    def run(self, name: str, func: Callable[[], Any], succeeded: Callable[[Any], bool] = stage_succeeded) -> Any:
+        """
+        Return the saved output of a stage, or run it and save the output if it succeeded.
+
+        Failed outputs are not saved, so a retry runs the stage again instead of replaying the failure.
+        """
+        if self.has(name):
+            return self.restore(name)
+        result = func()
+        if succeeded(result):
+            self.save(name, result)
+        else:
+            print(f"⚠️ STAGE CHECKPOINT: Not saving failed output of '{name}'")
+        return result
+
+
+class StageGraph:
+    """
+    Dependency-graph executor for orchestrator steps.
+
+    Each stage declares the stages it depends on and receives their results as
+    keyword arguments named after those stages. Stages whose inputs are ready
+    run concurrently on the shared worker pool named by the stage, with at most
+    ``max_workers`` stages of this graph in flight at once. Steps stages (see
+    async_support.Step) run on the event loop instead when ASYNC_EXECUTION is on,
+    without holding a pool thread while they wait. Every stage (and any
+    inline step wrapped in ``span``) is recorded as a timing span relative to
+    the start of the graph.
+
+    ``run`` may be called more than once: stages that already completed are
+    skipped, so callers can validate intermediate results between phases.
+    With ``checkpoints``, stage outputs accepted by the stage's ``checkpoint_if``
+    are saved there and stages saved by an earlier attempt are restored instead
+    of executed.
+    """
+
+    def __init__(self, name: str, max_workers: int = 4, checkpoints: StageCheckpoints = None):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.checkpoints = checkpoints
+        self.stages: Dict[str, Stage] = {}
+        self.results: Dict[str, Any] = {}
+        self.spans: Dict[str, Dict[str, Any]] = {}
+        self._origin = time.time()
+
+    def add_stage(self, name: str, func: Callable[..., Any], depends_on: List[str] = None, pool: str = 'llm',
+                  checkpoint_if: Callable[[Any], bool] = stage_succeeded, steps: bool = False) -> 'StageGraph':
+        """
+        Register a stage.
+
+        Args:
+            name: Unique stage name, also used as the keyword for dependents
+            func: Callable receiving one keyword argument per dependency
+            depends_on: Names of previously registered stages this stage needs
+            pool: Worker pool the stage runs on ('llm', 'http', 'bigquery' or 'orchestration')
+            checkpoint_if: Predicate on the stage output; only accepted outputs are checkpointed
+            steps: func returns a steps generator; it is driven on the event loop with
+                ASYNC_EXECUTION, and on the pool otherwise
+
+        Returns:
+            The graph, so registrations can be chained
+        """
+        if name in self.stages:
+            raise ValueError(f"Stage '{name}' is already registered in graph '{self.name}'")
+
+        stage = Stage(name, func, depends_on, pool, checkpoint_if, steps)
+        for dependency in stage.depends_on:
+            # Dependencies must be registered first, which keeps the graph acyclic
+            if dependency not in self.stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dependency}'")
+
+        self.stages[name] = stage
+        return self
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Execute every registered stage that has not completed yet.
+
+        Returns:
+            Mapping of stage name to stage result for all completed stages
+
+        Raises:
+            The first exception raised by a stage; stages not yet started are cancelled
+        """
+        pending = {name: stage for name, stage in self.stages.items() if name not in self.results}
+
+        if self.checkpoints is not None:
+            for name in list(pending):
+                if self.checkpoints.has(name):
+                    self.results[name] = self.checkpoints.restore(name)
+                    self.spans[name] = {
+                        'start_offset': round(time.time() - self._origin, 3),
+                        'duration': 0.0,
+                        'depends_on': list(pending[name].depends_on),
+                        'status': 'restored'
+                    }
+                    del pending[name]
+
+        if not pending:
+            return self.results
+
+        print(f"🧩 STAGE GRAPH [{self.name}]: Running {len(pending)} stages: {list(pending.keys())}")
+
+        running = {}
+
+        while pending or running:
+            ready = [
+                stage for stage in pending.values()
+                if all(dependency in self.results for dependency in stage.depends_on)
+            ]
+            for stage in ready[:max(0, self.max_workers - len(running))]:
+                inputs = {dependency: self.results[dependency] for dependency in stage.depends_on}
+                if stage.steps and ASYNC_EXECUTION:
+                    running[submit(self._run_stage_async(stage, inputs))] = stage
+                else:
+                    running[get_pool(stage.pool).submit(self._run_stage, stage, inputs)] = stage
+                del pending[stage.name]
+
+            done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                try:
+                    self.results[stage.name] = future.result()
+                    if self.checkpoints is not None and stage.checkpoint_if(self.results[stage.name]):
+                        self.checkpoints.save(stage.name, self.results[stage.name])
+                except Exception:
+                    for other in running:
+                        other.cancel()
+                    raise
+
+        return self.results
+
+    def _run_stage(self, stage: Stage, inputs: Dict[str, Any]) -> Any:
+        with self.span(stage.name, depends_on=stage.depends_on):
+            if stage.steps:
+                return run_steps(stage.func(**inputs))
+            return stage.func(**inputs)
+
+    async def _run_stage_async(self, stage: Stage, inputs: Dict[str, Any]) -> Any:
+        with self.span(stage.name, depends_on=stage.depends_on):
+            return await run_steps_async(stage.func(**inputs))
+
+    @contextmanager
+    def span(self, name: str, depends_on: List[str] = None):
+        """Record a timing span for a stage or for an inline step outside the graph"""
+        start = time.time()
+        status = 'completed'
+        try:
+            yield
+        except Exception:
+            status = 'failed'
+            raise
+        finally:
+            duration = time.time() - start
+            self.spans[name] = {
+                'start_offset': round(start - self._origin, 3),
+                'duration': duration,
+                'depends_on': list(depends_on or []),
+                'status': status
+            }
+            print(f"⏱️ STAGE GRAPH [{self.name}]: Stage '{name}' {status} in {duration:.2f} seconds")
+
+    def duration(self, name: str) -> float:
+        """Duration of a recorded span in seconds, 0.0 if the stage never ran"""
+        return self.spans.get(name, {}).get('duration', 0.0)
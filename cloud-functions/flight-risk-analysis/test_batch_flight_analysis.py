@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Test batch flight analysis with several flights sharing airports and routes
+"""
+import requests
+import json
+import time
+from datetime import datetime, timedelta
+
+def test_batch_flight_analysis():
+    """Test batch analysis of flights from one Google Flights page"""
+
+    # Cloud function URL
+    function_url = "https://us-central1-argon-acumen-268900.cloudfunctions.net/flight-risk-analysis"
+
+    tomorrow = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+
+    # Same route for every flight, so airport, weather and on-time lookups should be shared
+    test_request = {
+        "batch_flights": [
+            {"airline_code": "AA", "airline_name": "American Airlines", "flight_number": "2", "origin_airport_code": "JFK", "destination_airport_code": "LAX", "duration_minutes": 385},
+            {"airline_code": "AA", "airline_name": "American Airlines", "flight_number": "10", "origin_airport_code": "JFK", "destination_airport_code": "LAX", "duration_minutes": 390},
+            {"airline_code": "DL", "airline_name": "Delta Air Lines", "flight_number": "423", "origin_airport_code": "JFK", "destination_airport_code": "LAX", "duration_minutes": 380},
+            {"airline_code": "B6", "airline_name": "JetBlue Airways", "flight_number": "23", "origin_airport_code": "JFK", "destination_airport_code": "LAX", "duration_minutes": 375}
+        ],
+        "date": tomorrow
+    }
+
+    print(f"🚀 Testing batch flight analysis ({len(test_request['batch_flights'])} flights)...")
+    print(f"🌐 Function URL: {function_url}")
+
+    start_time = time.time()
+
+    try:
+        response = requests.post(
+            function_url,
+            json=test_request,
+            headers={"Content-Type": "application/json"},
+            timeout=300
+        )
+
+        print(f"📥 Response Status: {response.status_code} after {time.time() - start_time:.1f}s")
+
+        if response.status_code != 200:
+            print(f"❌ Request failed with status {response.status_code}")
+            print(f"Response: {response.text}")
+            return
+
+        data = response.json()
+        print(f"✅ Success: {data.get('success')}, failed flights: {data.get('failed_flights')}/{data.get('total_flights')}")
+
+        for index, flight in sorted(data.get("results", {}).items(), key=lambda item: int(item[0])):
+            risk = flight.get("risk_analysis", {})
+            print(f"  📊 #{index} {flight.get('flight_data', {}).get('airline_code', '')}{flight.get('flight_data', {}).get('flight_number', '')}: risk level {risk.get('risk_level', flight.get('error', 'N/A'))}")
+
+        metadata = data.get("analysis_metadata", {})
+        print(f"🔁 Shared lookups: {metadata.get('shared_lookups')}")
+        print(f"⏳ Degraded stages: {data.get('degraded_stages')}")
+
+        # Save full response for analysis
+        output_file = "batch_flight_analysis_test_response.json"
+        with open(output_file, 'w') as f:
+            json.dump(data, f, indent=2)
+
+        print(f"💾 Full response saved to: {output_file}")
+
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+
+if __name__ == "__main__":
+    test_batch_flight_analysis()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test streaming route search and report when each event arrives
+"""
+import requests
+import json
+import time
+from datetime import datetime, timedelta
+
+def test_route_search_stream(stream_format="ndjson"):
+    """Test route search with streaming enabled"""
+
+    # Cloud function URL
+    function_url = "https://us-central1-argon-acumen-268900.cloudfunctions.net/flight-risk-analysis"
+
+    tomorrow = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+
+    test_request = {
+        "route_search": {
+            "origin": "SJC",
+            "destination": "LAX",
+            "date": tomorrow
+        },
+        "stream": stream_format
+    }
+
+    print(f"🚀 Testing streaming route search ({stream_format.upper()})...")
+    print(f"🛫 Route: {test_request['route_search']['origin']} → {test_request['route_search']['destination']} on {tomorrow}")
+    print(f"🌐 Function URL: {function_url}")
+
+    start_time = time.time()
+    events = []
+
+    try:
+        with requests.post(
+            function_url,
+            json=test_request,
+            headers={"Content-Type": "application/json"},
+            stream=True,
+            timeout=180
+        ) as response:
+            print(f"📥 Response Status: {response.status_code}")
+            print(f"📥 Content-Type: {response.headers.get('Content-Type')}")
+
+            if response.status_code != 200:
+                print(f"❌ Request failed with status {response.status_code}")
+                print(f"Response: {response.text}")
+                return
+
+            event_name = None
+            for line in response.iter_lines(decode_unicode=True):
+                if not line:
+                    continue
+
+                if stream_format == "sse":
+                    if line.startswith("event: "):
+                        event_name = line[len("event: "):]
+                        continue
+                    if not line.startswith("data: "):
+                        continue
+                    data = json.loads(line[len("data: "):])
+                else:
+                    message = json.loads(line)
+                    event_name, data = message["event"], message["data"]
+
+                elapsed = time.time() - start_time
+                events.append({"event": event_name, "received_after": elapsed, "data": data})
+
+                if event_name == "flights":
+                    print(f"  ✈️ [{elapsed:.1f}s] flights: {data.get('total_flights', 0)} flights from SerpAPI")
+                elif event_name == "flight":
+                    risk = data.get("flight", {}).get("risk_analysis", {})
+                    print(f"  📊 [{elapsed:.1f}s] flight #{data.get('index')}: risk level {risk.get('risk_level', risk.get('error', 'N/A'))}")
+                elif event_name == "summary":
+                    print(f"  🏁 [{elapsed:.1f}s] summary: {data.get('total_flights')} flights, {data.get('failed_flights')} failed")
+                else:
+                    print(f"  ❌ [{elapsed:.1f}s] {event_name}: {data.get('error')}")
+
+        # Save full event log for analysis
+        output_file = f"route_search_stream_{stream_format}_test_response.json"
+        with open(output_file, 'w') as f:
+            json.dump({
+                "request": test_request,
+                "events": events,
+                "timestamp": datetime.now().isoformat()
+            }, f, indent=2)
+
+        print(f"💾 Full event log saved to: {output_file}")
+
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+
+if __name__ == "__main__":
+    test_route_search_stream("ndjson")
+    test_route_search_stream("sse")
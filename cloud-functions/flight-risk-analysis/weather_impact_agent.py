@@ -3,7 +3,7 @@ Weather Impact Analysis Agent - Google ADK Implementation
 Analyzes weather impact on flight operations using AI instead of hardcoded conditions
 """
 import os
-import google.generativeai as genai
+from llm_gateway import get_model
 
 # Import Google ADK - REAL IMPLEMENTATION ONLY
 from google.adk.agents import Agent
@@ -28,8 +28,7 @@ class WeatherImpactAgent(Agent):
         if not api_key:
             raise ValueError("GOOGLE_API_KEY environment variable is required")
         
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.0-flash')
+        self.model = get_model()
         
         print("🌤️ Google ADK Weather Impact Agent initialized")
     
@@ -79,8 +78,7 @@ class WeatherImpactAgent(Agent):
         """Fallback weather impact description when Google ADK agent fails"""
         try:
             # Generate AI-based weather impact description
-            import google.generativeai as genai
-            model = genai.GenerativeModel('gemini-2.0-flash')
+            model = get_model()
             
             # Convert conditions to string if it's a dict/object
             conditions_str = str(conditions) if not isinstance(conditions, str) else conditions
@@ -149,8 +147,7 @@ class WeatherImpactAgent(Agent):
         """Fallback seasonal weather impact description when Google ADK agent fails"""
         try:
             # Generate AI-based seasonal weather impact description
-            import google.generativeai as genai
-            model = genai.GenerativeModel('gemini-2.0-flash')
+            model = get_model()
             
             # Convert conditions to string if it's a dict/object
             conditions_str = str(conditions) if not isinstance(conditions, str) else conditions
@@ -3,7 +3,7 @@ Weather Intelligence Agent - Google ADK Implementation
 Provides real-time weather analysis for flight risk assessment
 """
 import os
-import google.generativeai as genai
+from llm_gateway import get_model
 from datetime import datetime, timedelta
 import json
 from typing import Dict, Any, List
@@ -33,8 +33,7 @@ class WeatherIntelligenceAgent(Agent):
         if not api_key:
             raise ValueError("GOOGLE_API_KEY environment variable is required")
         
-        genai.configure(api_key=api_key)
-        self._model = genai.GenerativeModel('gemini-2.0-flash')
+        self._model = get_model()
         
         # OpenWeatherMap API key for real-time weather (preferred)
         self._openweather_key = os.getenv('OPENWEATHER_API_KEY')
@@ -658,6 +657,5 @@ class WeatherIntelligenceAgent(Agent):
         else:
             return "Fall"
 
-# Create agent instance
-weather_intelligence_agent = WeatherIntelligenceAgent()
+# Shared instance is built lazily by agent_registry (agent_registry.weather_agent)
 
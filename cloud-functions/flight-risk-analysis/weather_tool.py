@@ -9,7 +9,9 @@ import os
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 import logging
-import google.generativeai as genai
+from llm_gateway import get_model
+from llm_cache import LLMCachePolicy, llm_response_cache
+from reference_data import format_date_for_query, weather_risk_level, record_llm_fallback
 
 # Import Google ADK Sub-Agents
 from airport_complexity_agent import AirportComplexityAgent
@@ -17,6 +19,9 @@ from weather_impact_agent import WeatherImpactAgent
 
 logger = logging.getLogger(__name__)
 
+# Seasonal patterns for an airport and date are stable; bump the version when the prompt changes
+SEASONAL_PATTERNS_CACHE = LLMCachePolicy('weather_tool.WeatherIntelligenceTool._ai_get_seasonal_patterns', version='v1', ttl_seconds=7 * 24 * 3600)
+
 class WeatherIntelligenceTool:
     """Tool for weather-based flight risk assessment using OpenWeatherMap API and Google ADK agents"""
     
@@ -52,7 +57,7 @@ class WeatherIntelligenceTool:
         
         # Initialize Gemini model for AI-powered analysis
         try:
-            self.gemini_model = genai.GenerativeModel('gemini-2.0-flash')
+            self.gemini_model = get_model()
             print("🤖 Weather Intelligence Tool: Gemini AI model initialized")
         except Exception as e:
             print(f"❌ Weather Intelligence Tool: Failed to initialize Gemini model: {e}")
@@ -188,7 +193,11 @@ class WeatherIntelligenceTool:
             return False
     
     def _format_date_for_query(self, date_str: str) -> str:
-        """Format date for SerpAPI query using AI analysis"""
+        """Format date for SerpAPI query; Gemini is only asked for dates that are not YYYY-MM-DD"""
+        formatted_date = format_date_for_query(date_str)
+        if formatted_date:
+            return formatted_date
+        
         try:
             if not self.gemini_model:
                 # Fallback formatting
@@ -196,6 +205,7 @@ class WeatherIntelligenceTool:
                 return date_obj.strftime("%B %d %Y")
             
             # AI-powered date formatting
+            record_llm_fallback('date_format')
             prompt = f"""
             Convert the date {date_str} to a natural language format suitable for weather search queries.
             
@@ -291,11 +301,16 @@ class WeatherIntelligenceTool:
             return "AI weather parsing failed"
     
     def _ai_assess_weather_risk_level(self, conditions: str) -> str:
-        """Assess flight risk level based on weather conditions using AI analysis"""
+        """Assess flight risk level from the condition words, using AI analysis only for unrecognized conditions"""
+        risk_level = weather_risk_level(conditions)
+        if risk_level:
+            return risk_level
+        
         if not self.gemini_model:
             return "medium"
         
         try:
+            record_llm_fallback('weather_risk_level')
             prompt = f"""
             Assess the flight risk level for the following weather conditions: {conditions}
             
@@ -425,7 +440,8 @@ class WeatherIntelligenceTool:
             Return only the JSON object.
             """
             
-            response = self.gemini_model.generate_content(prompt)
+            cache_inputs = {'airport_code': airport_code, 'travel_date': travel_date}
+            response = self.gemini_model.generate_content(prompt, cache=SEASONAL_PATTERNS_CACHE, cache_inputs=cache_inputs)
             ai_response = response.text.strip()
             
             # Clean up JSON formatting before parsing
@@ -442,6 +458,7 @@ class WeatherIntelligenceTool:
                 return patterns
             except Exception as parse_error:
                 print(f"❌ JSON parsing failed for seasonal patterns: {parse_error}")
+                llm_response_cache.invalidate(SEASONAL_PATTERNS_CACHE, cache_inputs, self.gemini_model.generation_config)
                 print(f"🔍 AI Response: {ai_response[:200]}...")
                 # If JSON parsing fails, return error
                 return {
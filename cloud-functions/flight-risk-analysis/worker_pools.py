@@ -0,0 +1,186 @@
+"""
+Worker Pools for Flight Risk Analysis
+Process-wide named thread pools for I/O-bound work (Gemini calls, HTTP APIs, BigQuery jobs)
+"""
+import concurrent.futures
+import contextvars
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, Tuple
+
+# Default pool sizes, overridable with WORKER_POOL_<NAME>_SIZE / WORKER_POOL_<NAME>_QUEUE
+DEFAULT_POOL_SIZES = {
+    'llm': 16,
+    'http': 16,
+    'bigquery': 8,
+    # Coordinator tasks that fan out to the other pools and mostly wait on them
+    'orchestration': 8
+}
+DEFAULT_QUEUE_DEPTH = 64
+
+# Seconds a submit waits for a free slot before the caller runs the task itself
+SUBMIT_TIMEOUT = float(os.environ.get("WORKER_POOL_SUBMIT_TIMEOUT", "2.0"))
+
+
+class WorkerPool:
+    """
+    Named, bounded thread pool shared by every request in the process.
+
+    At most ``max_workers`` tasks run and ``max_queue`` more may wait. When the
+    pool is saturated, ``submit`` blocks for up to SUBMIT_TIMEOUT seconds and then
+    applies backpressure by running the task in the calling thread. Tasks
+    submitted from one of the pool's own threads also run inline, so nested
+    fan-out can never deadlock waiting on its own pool.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix=f"{name}-pool"
+        )
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.stats = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'caller_runs': 0,
+            'queued': 0,
+            'active': 0,
+            'peak_queue_depth': 0,
+            'total_queue_wait_time': 0.0
+        }
+
+    def submit(self, func: Callable[..., Any], *args, **kwargs) -> concurrent.futures.Future:
+        """
+        Schedule func on the pool.
+
+        Returns:
+            A Future; it is already resolved when the task ran in the calling thread
+        """
+        if getattr(self._local, 'in_pool', False):
+            return self._run_inline(func, args, kwargs)
+
+        if not self._slots.acquire(timeout=SUBMIT_TIMEOUT):
+            print(f"⚠️ WORKER POOL [{self.name}]: Saturated ({self.max_workers} workers, {self.max_queue} queued) - running task in caller thread")
+            return self._run_inline(func, args, kwargs)
+
+        with self._lock:
+            self.stats['submitted'] += 1
+            self.stats['queued'] += 1
+            self.stats['peak_queue_depth'] = max(self.stats['peak_queue_depth'], self.stats['queued'])
+
+        try:
+            # The task sees the submitter's context (e.g. the request's BigQuery cost totals)
+            return self._executor.submit(contextvars.copy_context().run, self._run_task, time.time(), func, args, kwargs)
+        except Exception:
+            with self._lock:
+                self.stats['queued'] -= 1
+            self._slots.release()
+            raise
+
+    def _run_task(self, submitted_at: float, func, args, kwargs):
+        with self._lock:
+            self.stats['queued'] -= 1
+            self.stats['active'] += 1
+            self.stats['total_queue_wait_time'] += time.time() - submitted_at
+
+        self._local.in_pool = True
+        try:
+            result = func(*args, **kwargs)
+            with self._lock:
+                self.stats['completed'] += 1
+            return result
+        except Exception:
+            with self._lock:
+                self.stats['failed'] += 1
+            raise
+        finally:
+            self._local.in_pool = False
+            with self._lock:
+                self.stats['active'] -= 1
+            self._slots.release()
+
+    def _run_inline(self, func, args, kwargs) -> concurrent.futures.Future:
+        with self._lock:
+            self.stats['caller_runs'] += 1
+
+        future = concurrent.futures.Future()
+        try:
+            future.set_result(func(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Snapshot of pool size, current queue depth and lifetime counters"""
+        with self._lock:
+            return {
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                **self.stats
+            }
+
+
+_pools: Dict[str, WorkerPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(name: str) -> WorkerPool:
+    """
+    Get (creating on first use) the process-wide pool with this name.
+
+    Args:
+        name: Pool name, normally one of 'llm', 'http', 'bigquery' or 'orchestration'
+
+    Returns:
+        The shared WorkerPool instance
+    """
+    pool = _pools.get(name)
+    if pool is not None:
+        return pool
+
+    with _pools_lock:
+        if name not in _pools:
+            env_name = name.upper()
+            max_workers = int(os.environ.get(f"WORKER_POOL_{env_name}_SIZE", DEFAULT_POOL_SIZES.get(name, 8)))
+            max_queue = int(os.environ.get(f"WORKER_POOL_{env_name}_QUEUE", DEFAULT_QUEUE_DEPTH))
+            _pools[name] = WorkerPool(name, max_workers, max_queue)
+            print(f"🧵 WORKER POOL [{name}]: Created with {max_workers} workers and queue depth {max_queue}")
+        return _pools[name]
+
+
+def get_pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Metrics for every pool created so far, keyed by pool name"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {pool.name: pool.get_stats() for pool in pools}
+
+
+def iter_windowed(pool, max_workers: int, tasks: Iterable[Tuple[Any, Callable[..., Any], tuple]]) -> Iterator[Tuple[Any, concurrent.futures.Future]]:
+    """
+    Run (key, func, args) tasks on a worker pool with at most max_workers of them submitted at once;
+    the next task is submitted as soon as one completes. Yields (key, future) in completion order.
+    """
+    pending_tasks = iter(tasks)
+    future_to_key = {}
+    
+    def submit_next_task():
+        for key, func, args in pending_tasks:
+            future_to_key[pool.submit(func, *args)] = key
+            return
+    
+    for _ in range(max_workers):
+        submit_next_task()
+    
+    while future_to_key:
+        done, _ = concurrent.futures.wait(future_to_key, return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+            key = future_to_key.pop(future)
+            submit_next_task()
+            yield key, future